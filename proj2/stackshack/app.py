@@ -36,6 +36,8 @@ def create_app(config_name="development"):
         PaymentMethod,
         CampusCard,
         Receipt,
+        PaymentRollup,
+        PaymentIdempotencyKey,
     )
     from models.gamification import (  # noqa: F401
         PointsTransaction,
@@ -47,6 +49,11 @@ def create_app(config_name="development"):
         PunchCard,
         Redemption,
         Coupon,
+        UserStats,
+        PointsCheckpoint,
+        GamificationJob,
+        LeaderboardScore,
+        CouponCodeCounter,
     )
     from models.shift import StaffProfile, Shift, ShiftAssignment  # noqa: F401
 
@@ -0,0 +1,83 @@
+"""
+Badge evaluation benchmark.
+
+Compares query count and latency of GamificationService.check_and_grant_badges
+for users with 10, 100 and 1,000 orders. Run from proj2/stackshack:
+
+    python -m benchmarks.bench_badges
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.common import create_bench_app, measure, seed_menu
+from database.db import db
+from models.gamification import UserBadge
+from models.order import Order, OrderItem
+from models.user import User
+from services.gamification_service import GamificationService
+
+HISTORY_SIZES = [10, 100, 1000]
+ITEMS_PER_ORDER = 6
+
+
+def seed_user(username, order_count, menu):
+    """Create a user with order_count orders spread over the past year."""
+    user = User(username=username, email=f"{username}@example.com")
+    user.set_password("benchmark")
+    db.session.add(user)
+    db.session.flush()
+
+    rng = random.Random(order_count)
+    start = datetime.utcnow() - timedelta(days=365)
+    orders = [
+        Order(
+            user_id=user.id,
+            total_price=10,
+            status="Delivered",
+            ordered_at=start + timedelta(minutes=rng.randrange(365 * 24 * 60)),
+        )
+        for _ in range(order_count)
+    ]
+    db.session.add_all(orders)
+    db.session.flush()
+
+    for order in orders:
+        for item in rng.sample(menu, ITEMS_PER_ORDER):
+            db.session.add(
+                OrderItem(
+                    order_id=order.id,
+                    menu_item_id=item.id,
+                    name=item.name,
+                    price=item.price,
+                    quantity=1,
+                    burger_index=1,
+                    burger_name=rng.choice([None, "Classic", "Surprise Box Burger"]),
+                )
+            )
+    db.session.commit()
+    return user.id, orders[-1]
+
+
+def reset_badges(user_id):
+    """Forget earned badges so every run evaluates all rules from scratch."""
+    UserBadge.query.filter_by(user_id=user_id).delete()
+    db.session.commit()
+
+
+def main():
+    create_bench_app()
+    menu = seed_menu()
+
+    print(f"{'orders':>8} {'queries':>8} {'best ms':>10}")
+    for size in HISTORY_SIZES:
+        user_id, last_order = seed_user(f"bench{size}", size, menu)
+        best_ms, queries = measure(
+            lambda: GamificationService.check_and_grant_badges(user_id, last_order),
+            setup=lambda: reset_badges(user_id),
+        )
+        print(f"{size:>8} {queries:>8} {best_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
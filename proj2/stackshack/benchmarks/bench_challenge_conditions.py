@@ -0,0 +1,102 @@
+"""
+Challenge condition microbenchmark.
+
+Checks every daily and weekly challenge condition against 10k synthetic
+orders two ways: rebuilding the order's names and categories for each
+condition (the shape of the old if/elif evaluator) and featurizing each
+order once before running the compiled predicates. No database is touched
+after the menu is seeded. Run from proj2/stackshack:
+
+    python -m benchmarks.bench_challenge_conditions
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import create_bench_app, seed_menu
+from models.order import Order, OrderItem
+from services.challenge_conditions import (
+    DAILY_PREDICATES,
+    WEEKLY_PREDICATES,
+    featurize,
+)
+
+ORDER_COUNT = 10_000
+ITEMS_PER_ORDER = 6
+
+
+def synthetic_orders(menu):
+    """Build transient orders with random items and times over one week."""
+    rng = random.Random(ORDER_COUNT)
+    start = datetime(2024, 3, 11)
+    orders = []
+    for _ in range(ORDER_COUNT):
+        order = Order(
+            total_price=rng.randrange(5, 25),
+            ordered_at=start + timedelta(minutes=rng.randrange(7 * 24 * 60)),
+        )
+        items = [
+            OrderItem(
+                menu_item_id=menu_item.id,
+                name=menu_item.name,
+                price=menu_item.price,
+                quantity=1,
+            )
+            for menu_item in rng.sample(menu, ITEMS_PER_ORDER)
+        ]
+        orders.append((order, items))
+    return orders
+
+
+def per_condition(orders, predicates, menu_items):
+    """Featurize the order again for every condition it is checked against"""
+    hits = 0
+    for order, items in orders:
+        for predicate in predicates:
+            hits += predicate(featurize(order, items, menu_items))
+    return hits
+
+
+def compiled(orders, predicates, menu_items):
+    """Featurize each order once and run every predicate on it"""
+    hits = 0
+    for order, items in orders:
+        features = featurize(order, items, menu_items)
+        for predicate in predicates:
+            hits += predicate(features)
+    return hits
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    create_bench_app()
+    menu = seed_menu()
+    menu_items = {menu_item.id: menu_item for menu_item in menu}
+    orders = synthetic_orders(menu)
+    predicates = list(DAILY_PREDICATES.values()) + list(WEEKLY_PREDICATES.values())
+
+    print(f"{len(predicates)} conditions x {len(orders)} orders")
+    # The per-condition shape is slow; time it on a tenth of the orders
+    sample = orders[: ORDER_COUNT // 10]
+    slow_ms, slow_hits = timed(per_condition, sample, predicates, menu_items)
+    fast_ms, fast_hits = timed(compiled, sample, predicates, menu_items)
+    assert slow_hits == fast_hits
+    print(f"{'per-condition ms':>17} {'compiled ms':>12}  ({len(sample)} orders)")
+    print(f"{slow_ms:>17.1f} {fast_ms:>12.1f}")
+
+    full_ms, hits = timed(compiled, orders, predicates, menu_items)
+    checks = len(predicates) * len(orders)
+    print(
+        f"compiled, all orders: {full_ms:.1f} ms, "
+        f"{checks / full_ms * 1000:,.0f} checks/s, {hits} met"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Batch gamification benchmark.
+
+Compares awarding points, badges and challenges order by order (the old
+inline payment path) with GamificationService.process_orders_batch for a
+backlog of 10, 100 and 500 paid orders spread over 25 users. Run from
+proj2/stackshack:
+
+    python -m benchmarks.bench_gamification_batch
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.common import create_bench_app, measure, seed_menu
+from database.db import db
+from models.gamification import (
+    PointsCheckpoint,
+    PointsTransaction,
+    UserBadge,
+    UserChallengeProgress,
+)
+from models.order import Order, OrderItem
+from models.user import User
+from services.gamification_service import GamificationService
+from services.user_stats_service import UserStatsService
+
+BACKLOG_SIZES = [10, 100, 500]
+USER_COUNT = 25
+ITEMS_PER_ORDER = 6
+
+
+def seed_backlog(order_count, menu, user_ids):
+    """Create order_count paid orders for random users from the last day."""
+    rng = random.Random(order_count)
+    start = datetime.utcnow() - timedelta(days=1)
+    orders = [
+        Order(
+            user_id=rng.choice(user_ids),
+            total_price=12,
+            original_total=12,
+            status="Paid",
+            ordered_at=start + timedelta(minutes=rng.randrange(24 * 60)),
+        )
+        for _ in range(order_count)
+    ]
+    db.session.add_all(orders)
+    db.session.flush()
+
+    for order in orders:
+        for item in rng.sample(menu, ITEMS_PER_ORDER):
+            db.session.add(
+                OrderItem(
+                    order_id=order.id,
+                    menu_item_id=item.id,
+                    name=item.name,
+                    price=item.price,
+                    quantity=1,
+                    burger_index=1,
+                )
+            )
+    db.session.commit()
+
+    for user_id in user_ids:
+        UserStatsService.rebuild(user_id)
+    db.session.commit()
+    return [order.id for order in orders]
+
+
+def reset_rewards():
+    """Forget everything awarded so each run starts from the same state."""
+    for model in (
+        PointsTransaction,
+        PointsCheckpoint,
+        UserBadge,
+        UserChallengeProgress,
+    ):
+        model.query.delete()
+    User.query.update({"total_points": 0, "tier": "Bronze"})
+    db.session.commit()
+
+
+def award_one_by_one(order_ids):
+    """The per-order path payment used to run inline."""
+    for order_id in order_ids:
+        order = db.session.get(Order, order_id)
+        GamificationService.process_order_points(order)
+        GamificationService.check_and_grant_badges(order.user_id, order)
+        GamificationService.check_daily_bonus(order.user_id, order)
+        GamificationService.check_weekly_challenge(order.user_id, order)
+        GamificationService.update_user_tier(order.user_id)
+
+
+def main():
+    create_bench_app()
+    menu = seed_menu()
+
+    users = [
+        User(username=f"bench{i}", email=f"bench{i}@example.com")
+        for i in range(USER_COUNT)
+    ]
+    for user in users:
+        user.set_password("benchmark")
+    db.session.add_all(users)
+    db.session.commit()
+    user_ids = [user.id for user in users]
+
+    print(
+        f"{'orders':>8} {'per-order q':>12} {'per-order ms':>13} "
+        f"{'batch q':>8} {'batch ms':>9}"
+    )
+    for size in BACKLOG_SIZES:
+        order_ids = seed_backlog(size, menu, user_ids)
+        single_ms, single_queries = measure(
+            lambda: award_one_by_one(order_ids), repeat=1, setup=reset_rewards
+        )
+        batch_ms, batch_queries = measure(
+            lambda: GamificationService.process_orders_batch(order_ids),
+            repeat=3,
+            setup=reset_rewards,
+        )
+        print(
+            f"{size:>8} {single_queries:>12} {single_ms:>13.1f} "
+            f"{batch_queries:>8} {batch_ms:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against the in-memory SQLite testing config so they need no
+database server. Run them from proj2/stackshack, e.g.:
+
+    python -m benchmarks.bench_badges
+"""
+
+import sys
+import os
+import time
+from decimal import Decimal
+
+# Add the parent directory to the path so we can import from stackshack
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import event
+
+from app import create_app
+from database.db import db
+from models.menu_item import MenuItem
+
+# A compact menu covering every category the services look at
+BENCH_MENU = [
+    ("plain bun", "bun", "4.00", 300, 8, False),
+    ("keto bun", "bun", "6.50", 40, 18, True),
+    ("sesame bun", "bun", "3.00", 250, 9, False),
+    ("beef patty", "patty", "5.00", 250, 22, False),
+    ("chicken patty", "patty", "4.50", 220, 25, False),
+    ("veg patty", "patty", "4.00", 180, 12, True),
+    ("cheddar cheese", "cheese", "1.00", 110, 7, False),
+    ("swiss cheese", "cheese", "1.25", 100, 8, False),
+    ("lettuce", "topping", "0.50", 5, 0, True),
+    ("tomato", "topping", "0.50", 5, 0, True),
+    ("onion", "topping", "0.50", 10, 0, True),
+    ("pickles", "topping", "0.50", 5, 0, True),
+    ("tomato sauce", "sauce", "0.50", 20, 0, True),
+    ("green sauce", "sauce", "0.75", 30, 0, True),
+    ("mayo", "sauce", "0.50", 90, 0, False),
+]
+
+
+def create_bench_app():
+    """Create a testing app with a fresh schema and push its app context."""
+    app = create_app("testing")
+    ctx = app.app_context()
+    ctx.push()
+    db.create_all()
+    return app
+
+
+def seed_menu():
+    """Insert BENCH_MENU and return the MenuItem rows."""
+    items = [
+        MenuItem(
+            name=name,
+            category=category,
+            price=Decimal(price),
+            calories=calories,
+            protein=protein,
+            is_healthy_choice=healthy,
+            is_available=True,
+            stock_quantity=1_000_000,
+        )
+        for name, category, price, calories, protein, healthy in BENCH_MENU
+    ]
+    db.session.add_all(items)
+    db.session.commit()
+    return items
+
+
+class QueryCounter:
+    """Context manager counting SQL statements sent to the database."""
+
+    def __init__(self):
+        self.statements = []
+
+    def _before_execute(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(db.engine, "before_cursor_execute", self._before_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(db.engine, "before_cursor_execute", self._before_execute)
+        return False
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+def measure(func, repeat=5, setup=None):
+    """
+    Run func repeatedly and report the best wall time and the query count.
+
+    Args:
+        func: Callable to measure
+        repeat: Number of runs; the best one is reported
+        setup: Optional callable run (untimed, uncounted) before each run
+
+    Returns:
+        tuple: (best_ms, queries_per_call)
+    """
+    best = None
+    queries = 0
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with QueryCounter() as counter:
+            start = time.perf_counter()
+            func()
+            elapsed = (time.perf_counter() - start) * 1000
+        queries = counter.count
+        best = elapsed if best is None else min(best, elapsed)
+    return best, queries
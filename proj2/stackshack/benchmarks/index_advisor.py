@@ -0,0 +1,213 @@
+"""
+Index advisor for the hot query shapes.
+
+Captures every distinct SQL statement that benchmark scenarios or a pytest
+run send to the database, replays each one under EXPLAIN and flags full
+scans of large tables. Run from proj2/stackshack, e.g.:
+
+    python -m benchmarks.index_advisor bench_badges bench_gamification_batch
+    python -m benchmarks.index_advisor --pytest tests/rewardsTests
+
+Benchmark statements are explained against the benchmark's own seeded
+database. Test databases are gone once pytest finishes, so those statements
+are explained against a fresh schema. --database-url explains against a
+SQLite or MySQL stand-in instead, where tables with at least --min-rows rows
+count as large too.
+"""
+
+import argparse
+import importlib
+import re
+
+from flask import has_app_context
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Engine
+
+from benchmarks.common import create_bench_app
+from database.db import db
+
+# Tables that grow with users and orders; scanning them is always flagged
+GROWING_TABLES = {
+    "users",
+    "orders",
+    "order_items",
+    "transactions",
+    "receipts",
+    "points_transactions",
+    "points_checkpoints",
+    "user_badges",
+    "user_challenge_progress",
+    "user_stats",
+    "daily_bonuses",
+    "redemptions",
+    "coupons",
+    "punch_cards",
+    "shift_assignments",
+    "gamification_jobs",
+}
+
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+ALIAS = re.compile(r"\b(\w+) AS (\w+)\b")
+
+
+class StatementCapture:
+    """Context manager recording distinct statements sent by any engine."""
+
+    def __init__(self):
+        # statement -> [first parameters, executions, paramstyle]
+        self.statements = {}
+
+    def _before_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        entry = self.statements.get(statement)
+        if entry is None:
+            self.statements[statement] = [parameters, 1, conn.dialect.paramstyle]
+        else:
+            entry[1] += 1
+
+    def __enter__(self):
+        event.listen(Engine, "before_cursor_execute", self._before_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(Engine, "before_cursor_execute", self._before_execute)
+        return False
+
+
+def full_scans(connection, statement, parameters, paramstyle):
+    """
+    EXPLAIN a statement and list the tables it reads from start to end.
+
+    Returns:
+        list: (table name, plan detail) tuples
+    """
+    aliases = {alias: table for table, alias in ALIAS.findall(statement)}
+    dialect = connection.dialect.name
+
+    if dialect == "sqlite":
+        rows = connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + statement, parameters
+        ).all()
+        scans = []
+        for row in rows:
+            match = SQLITE_SCAN.match(row[-1])
+            if match:
+                scans.append((aliases.get(match.group(1), match.group(1)), row[-1]))
+        return scans
+
+    if dialect == "mysql":
+        if paramstyle == "qmark":
+            statement = statement.replace("%", "%%").replace("?", "%s")
+        rows = connection.exec_driver_sql("EXPLAIN " + statement, tuple(parameters))
+        return [
+            (
+                aliases.get(row["table"], row["table"]),
+                f"type=ALL rows={row['rows']}",
+            )
+            for row in rows.mappings()
+            if row["type"] == "ALL"
+        ]
+
+    raise ValueError(f"EXPLAIN is not supported for {dialect}")
+
+
+def large_tables(connection, min_rows):
+    """GROWING_TABLES plus every table holding at least min_rows rows"""
+    large = set(GROWING_TABLES)
+    for name in inspect(connection).get_table_names():
+        count = connection.exec_driver_sql(f"SELECT COUNT(*) FROM {name}").scalar()
+        if count >= min_rows:
+            large.add(name)
+    return large
+
+
+def advise(statements, connection, min_rows):
+    """
+    Explain captured statements and collect full scans of large tables.
+
+    Returns:
+        tuple: (list of findings sorted by executions, number of statements
+            that could not be explained). Each finding is a dict with table,
+            detail, statement and executions.
+    """
+    large = large_tables(connection, min_rows)
+    findings = []
+    skipped = 0
+    for statement, (parameters, executions, paramstyle) in statements.items():
+        if not statement.lstrip().upper().startswith(EXPLAINABLE):
+            continue
+        try:
+            scans = full_scans(connection, statement, parameters, paramstyle)
+        except Exception:
+            skipped += 1
+            continue
+        for table, detail in scans:
+            if table in large:
+                findings.append(
+                    {
+                        "table": table,
+                        "detail": detail,
+                        "statement": " ".join(statement.split()),
+                        "executions": executions,
+                    }
+                )
+    findings.sort(key=lambda finding: -finding["executions"])
+    return findings, skipped
+
+
+def capture(benchmarks, pytest_args):
+    """Run the benchmark modules' main() and pytest under one capture"""
+    with StatementCapture() as captured:
+        for name in benchmarks:
+            importlib.import_module(f"benchmarks.{name}").main()
+        if pytest_args:
+            import pytest
+
+            pytest.main(["-q", "-p", "no:cacheprovider", *pytest_args])
+    return captured.statements
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("benchmarks", nargs="*", help="e.g. bench_badges")
+    parser.add_argument(
+        "--pytest", nargs="+", default=[], help="test paths or pytest arguments"
+    )
+    parser.add_argument("--database-url", help="SQLite or MySQL stand-in to explain on")
+    parser.add_argument("--min-rows", type=int, default=1000)
+    args = parser.parse_args(argv)
+    if not args.benchmarks and not args.pytest:
+        parser.error("name at least one benchmark or --pytest path")
+
+    statements = capture(args.benchmarks, args.pytest)
+
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        if not has_app_context():
+            create_bench_app()
+        engine = db.engine
+
+    with engine.connect() as connection:
+        findings, skipped = advise(statements, connection, args.min_rows)
+
+    print(
+        f"\n{len(statements)} distinct statements captured, "
+        f"{skipped} could not be explained"
+    )
+    if not findings:
+        print("No full scans of large tables.")
+    for finding in findings:
+        print(
+            f"\n[{finding['table']}] {finding['detail']} "
+            f"({finding['executions']} executions)\n  {finding['statement'][:300]}"
+        )
+    return findings
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import os
 import secrets
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,6 +11,18 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SESSION_PROTECTION = "strong"
 
+    # Receipt PDF cache (default: <instance folder>/receipt_pdfs)
+    RECEIPT_PDF_DIR = os.environ.get("RECEIPT_PDF_DIR")
+    RECEIPT_PDF_PRERENDER = True
+    RECEIPT_EXPORT_WORKERS = 2  # PDF render processes per export request
+
+    # Keys the coupon code permutation; keep it stable and secret. There is no
+    # default: a key committed here would make every deployment's codes guessable
+    COUPON_CODE_KEY = os.environ.get("COUPON_CODE_KEY")
+
+    # Seconds a payment's Idempotency-Key keeps replaying its response
+    PAYMENT_IDEMPOTENCY_TTL = 24 * 60 * 60
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -38,6 +51,10 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"  # Use in-memory SQLite DB
     WTF_CSRF_ENABLED = False  # Disable forms CSRF for tests
     SECRET_KEY = "test-secret-key"  # Use a simple key for tests
+    RECEIPT_PDF_DIR = os.path.join(tempfile.gettempdir(), "stackshack-test-receipts")
+    RECEIPT_PDF_PRERENDER = False  # No background threads in tests
+    RECEIPT_EXPORT_WORKERS = 1
+    COUPON_CODE_KEY = "test-coupon-key"
 
 
 config = {
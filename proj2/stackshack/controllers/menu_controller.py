@@ -1,6 +1,7 @@
 from models.menu_item import MenuItem
 from database.db import db
 from flask_login import current_user
+from services.menu_catalog import MenuCatalog
 
 
 class MenuController:
@@ -68,6 +69,7 @@ class MenuController:
 
             db.session.add(item)
             db.session.commit()
+            MenuCatalog.invalidate()
             return True, "Item created successfully", item
         except Exception as e:
             db.session.rollback()
@@ -114,6 +116,7 @@ class MenuController:
                 item.image_url = image_url
 
             db.session.commit()
+            MenuCatalog.invalidate()
             return True, "Item updated successfully", item
         except Exception as e:
             db.session.rollback()
@@ -133,6 +136,7 @@ class MenuController:
 
             db.session.delete(item)
             db.session.commit()
+            MenuCatalog.invalidate()
             return True, "Item deleted successfully", None
         except Exception as e:
             db.session.rollback()
@@ -167,6 +171,7 @@ class MenuController:
 
             item.is_available = not item.is_available
             db.session.commit()
+            MenuCatalog.invalidate()
             status = "available" if item.is_available else "unavailable"
             return True, f"Item marked as {status}", item
         except Exception as e:
@@ -194,6 +199,7 @@ class MenuController:
 
             item.is_healthy_choice = not item.is_healthy_choice
             db.session.commit()
+            MenuCatalog.invalidate()
             status = (
                 "healthy choice" if item.is_healthy_choice else "not a healthy choice"
             )
@@ -275,6 +281,7 @@ class MenuController:
             item.is_available = item.stock_quantity > 0
 
             db.session.commit()
+            MenuCatalog.invalidate()
             return True, "Stock updated successfully", item
         except Exception as e:
             db.session.rollback()
@@ -1,118 +1,146 @@
+from typing import NamedTuple, Optional
+
+from sqlalchemy import insert
+
 from models.order import Order, OrderItem
-from models.menu_item import MenuItem
 from database.db import db
+from services.active_order_board import ActiveOrderBoard
+from services.menu_catalog import MenuCatalog
+from services.order_events import OrderEventHub
+from services.order_history_service import OrderHistoryService
+from services.stock_service import StockService
+
+
+class CartLine(NamedTuple):
+    """One menu item of a checkout, optionally grouped into a burger"""
+
+    item_id: int
+    quantity: int
+    burger_index: Optional[int] = None  # Which burger of the cart it belongs to
+    burger_name: Optional[str] = None  # Pre-defined burger name, if any
+
+    @classmethod
+    def from_cart(cls, cart):
+        """
+        Flatten a session cart (a list of burgers, each with items) into
+        cart lines, numbering burgers from 1.
+
+        Raises:
+            KeyError, TypeError, ValueError: The cart is malformed
+        """
+        return [
+            cls(
+                int(item["item_id"]),
+                int(item["quantity"]),
+                burger_index,
+                burger.get("name"),
+            )
+            for burger_index, burger in enumerate(cart, start=1)
+            for item in burger["items"]
+        ]
+
+    @classmethod
+    def coerce(cls, line):
+        """
+        Normalize a CartLine or a legacy (item_id, price, quantity, name
+        [, burger_index[, burger_name]]) tuple.
+        """
+        if not isinstance(line, cls):
+            item_id, _client_price, quantity, _client_name, *grouping = line
+            line = cls(item_id, quantity, *grouping)
+        return line._replace(item_id=int(line.item_id), quantity=int(line.quantity))
 
 
 class OrderController:
 
     @staticmethod
-    def get_user_orders(user_id):
-        """Retrieves all orders for a specific user."""
+    def get_user_orders(user_id, before=None):
+        """Retrieves one page of a user's orders, newest first."""
+        success, msg, page = OrderController.get_user_order_page(user_id, before)
+        return success, msg, page.orders if page else None
+
+    @staticmethod
+    def get_user_order_page(user_id, before=None):
+        """
+        Retrieves one page of a user's orders with their items grouped into
+        burgers. before is the next_cursor of the previous page.
+        """
         try:
-            orders = (
-                Order.query.filter_by(user_id=user_id)
-                .order_by(Order.ordered_at.desc())
-                .all()
+            page = OrderHistoryService.page(
+                Order.query.filter_by(user_id=user_id), before
             )
-            return True, "Orders retrieved successfully", orders
+            return True, "Orders retrieved successfully", page
+        except ValueError:
+            return False, "Invalid page cursor.", None
         except Exception as e:
             return False, f"Error retrieving orders: {str(e)}", None
 
     @staticmethod
-    def create_new_order(user_id, item_data):
+    def create_new_order(user_id, lines):
         """
-        Creates a new order for the specified user with the given items.
+        Creates a new order for the specified user from cart lines.
 
-        item_data: list of tuples:
-            - (item_id, price, quantity, name) - legacy format
-            - (item_id, price, quantity, name, burger_index) - with burger grouping
-            - (item_id, price, quantity, name, burger_index, burger_name) - with burger name
-        We IGNORE the client price & name and use DB values for safety.
+        lines: list of CartLine. Legacy (item_id, price, quantity, name
+            [, burger_index[, burger_name]]) tuples are still accepted.
+        We IGNORE any client price & name and use DB values for safety.
+
+        The menu items are resolved and locked in one query, stock is taken
+        with one UPDATE and the order items are written with one bulk insert,
+        so a checkout costs the same few round trips whatever the cart size.
         """
-        if not item_data:
+        if not lines:
             return False, "Order cannot be empty.", None
 
         try:
-            total_price = 0
-            new_order = Order(user_id=user_id, total_price=0, status="Pending")
-            db.session.add(new_order)
-            db.session.flush()  # Get order ID
+            lines = [line for line in map(CartLine.coerce, lines) if line.quantity > 0]
 
-            for item_tuple in item_data:
-                # Handle different formats
-                burger_index = None
-                burger_name = None
-
-                if len(item_tuple) == 6:
-                    # New format with burger_name
-                    (
-                        item_id,
-                        _client_price,
-                        quantity,
-                        _client_name,
-                        burger_index,
-                        burger_name,
-                    ) = item_tuple
-                elif len(item_tuple) == 5:
-                    # Format with burger_index only
-                    item_id, _client_price, quantity, _client_name, burger_index = (
-                        item_tuple
-                    )
-                else:
-                    # Legacy format
-                    item_id, _client_price, quantity, _client_name = item_tuple
-
-                quantity_int = int(quantity)
-                if quantity_int <= 0:
-                    continue
-
-                item_id_int = int(item_id)
-                menu_item = db.session.get(MenuItem, item_id_int)
-                if not menu_item:
-                    db.session.rollback()
-                    return False, f"Menu item {item_id_int} not found.", None
-
-                # Check stock
-                if menu_item.stock_quantity < quantity_int:
-                    db.session.rollback()
-                    return (
-                        False,
-                        f"Not enough stock for {menu_item.name}. "
-                        f"Available: {menu_item.stock_quantity}, requested: {quantity_int}.",
-                        None,
-                    )
-
-                price = float(menu_item.price)
-                name = menu_item.name
-
-                order_item = OrderItem(
-                    order_id=new_order.id,
-                    menu_item_id=menu_item.id,
-                    name=name,
-                    price=price,
-                    quantity=quantity_int,
-                    burger_index=burger_index,  # Track which burger this belongs to
-                    burger_name=burger_name,  # Store pre-defined burger name if available
+            # The same item can appear in several burgers
+            quantities = {}
+            for line in lines:
+                quantities[line.item_id] = (
+                    quantities.get(line.item_id, 0) + line.quantity
                 )
-                db.session.add(order_item)
 
-                # Decrement stock & update availability
-                menu_item.stock_quantity -= quantity_int
-                if menu_item.stock_quantity <= 0:
-                    menu_item.stock_quantity = 0
-                    menu_item.is_available = False  # hide from customer menus
-
-                total_price += price * quantity_int
+            # Lock and decrement stock for every item at once
+            menu_items, failures, sold_out = StockService.reserve(quantities)
+            if failures:
+                db.session.rollback()
+                return False, StockService.describe(failures), None
 
+            total_price = sum(
+                menu_items[line.item_id].price * line.quantity for line in lines
+            )
             if total_price == 0:
                 db.session.rollback()
                 return False, "Order cannot be empty.", None
 
-            new_order.total_price = total_price
-            new_order.original_total = (
-                total_price  # Store original total before any discounts
+            new_order = Order(
+                user_id=user_id,
+                total_price=total_price,
+                original_total=total_price,  # Store original total before any discounts
+                status="Pending",
             )
+            db.session.add(new_order)
+            db.session.flush()  # Get order ID
+
+            rows = [
+                {
+                    "order_id": new_order.id,
+                    "menu_item_id": line.item_id,
+                    "name": menu_items[line.item_id].name,
+                    "price": menu_items[line.item_id].price,
+                    "quantity": line.quantity,
+                    "burger_index": line.burger_index,
+                    "burger_name": line.burger_name,
+                }
+                for line in lines
+            ]
+            db.session.execute(insert(OrderItem), rows)
             db.session.commit()
+            if sold_out:
+                MenuCatalog.invalidate()
+            ActiveOrderBoard.record_order(new_order, rows)
+            OrderEventHub.publish_order(new_order)
             return True, f"Order #{new_order.id} placed successfully.", new_order
 
         except Exception as e:
@@ -1,6 +1,11 @@
+from sqlalchemy import select, update
+
 from models.order import Order
 from models.user import User
 from database.db import db
+from services.active_order_board import ActiveOrderBoard
+from services.order_events import OrderEventHub
+from services.order_history_service import OrderHistoryService
 
 
 class StatusController:
@@ -87,11 +92,142 @@ class StatusController:
 
             order.status = new_status
             db.session.commit()
+            ActiveOrderBoard.record_order(order)
+            OrderEventHub.publish_order(order)
             return True, f"Order status updated to {new_status}.", order
         except Exception as e:
             db.session.rollback()
             return False, f"Error updating order status: {str(e)}", None
 
+    @staticmethod
+    def bulk_update_status(updates):
+        """
+        Applies many status transitions at once.
+
+        updates: list of (order_id, new_status). Each one is validated like
+        in update_order_status. Valid ones are applied with one UPDATE per
+        source status, guarded by that status so a concurrent change is never
+        overwritten, and committed together. An order another writer already
+        moved to the requested status is reported as not updated and gets no
+        status event.
+
+        Returns:
+            tuple: (success, message, results) with one dict per order:
+                order_id, success, status and message
+        """
+        try:
+            requested = dict(updates)
+            current = {
+                row.id: row
+                for row in db.session.execute(
+                    select(Order.id, Order.status, Order.user_id).where(
+                        Order.id.in_(requested)
+                    )
+                )
+            }
+
+            results = {}
+            by_source = {}
+            for order_id, new_status in requested.items():
+                row = current.get(order_id)
+                if row is None:
+                    message = "Order not found."
+                elif row.status in ("Cancelled", "Delivered"):
+                    message = f"Cannot update a {row.status.lower()} order."
+                elif new_status != StatusController.STATUS_FLOW.get(row.status):
+                    message = (
+                        f"Invalid status transition from {row.status} "
+                        f"to {new_status}."
+                    )
+                else:
+                    by_source.setdefault(row.status, []).append(order_id)
+                    continue
+                results[order_id] = {
+                    "order_id": order_id,
+                    "success": False,
+                    "status": row.status if row is not None else None,
+                    "message": message,
+                }
+
+            changed = set()
+            for source, order_ids in by_source.items():
+                guarded = (
+                    update(Order)
+                    .where(Order.status == source)
+                    .values(status=StatusController.STATUS_FLOW[source])
+                    .execution_options(synchronize_session=False)
+                )
+
+                savepoint = db.session.begin_nested()
+                rowcount = db.session.execute(
+                    guarded.where(Order.id.in_(order_ids))
+                ).rowcount
+                if rowcount in (0, len(order_ids)):
+                    savepoint.commit()
+                    if rowcount:
+                        changed.update(order_ids)
+                    continue
+
+                # Some of these orders moved on since they were read; redo
+                # them one at a time to learn which ones this request changed
+                savepoint.rollback()
+                for order_id in order_ids:
+                    if db.session.execute(guarded.where(Order.id == order_id)).rowcount:
+                        changed.add(order_id)
+
+            lost = [
+                order_id
+                for order_ids in by_source.values()
+                for order_id in order_ids
+                if order_id not in changed
+            ]
+            # Only when some order moved on since it was read
+            now = (
+                dict(
+                    db.session.execute(
+                        select(Order.id, Order.status).where(Order.id.in_(lost))
+                    ).all()
+                )
+                if lost
+                else {}
+            )
+
+            applied = []
+            for source, order_ids in by_source.items():
+                target = StatusController.STATUS_FLOW[source]
+                for order_id in order_ids:
+                    ok = order_id in changed
+                    if ok:
+                        message = f"Order status updated to {target}."
+                    elif now.get(order_id) == target:
+                        message = f"Order was already moved to {target}."
+                    else:
+                        message = "Order status changed by someone else."
+                    results[order_id] = {
+                        "order_id": order_id,
+                        "success": ok,
+                        "status": target if ok else now.get(order_id),
+                        "message": message,
+                    }
+                    if ok:
+                        applied.append((order_id, current[order_id].user_id, target))
+
+            db.session.commit()
+
+            ActiveOrderBoard.record_statuses(
+                [(order_id, status) for order_id, _user_id, status in applied]
+            )
+            OrderEventHub.current().publish_many(applied)
+
+            return (
+                True,
+                f"Updated {len(applied)} of {len(requested)} orders.",
+                [results[order_id] for order_id in requested],
+            )
+        except Exception as e:
+            db.session.rollback()
+            return False, f"Error updating order statuses: {str(e)}", None
+
     @staticmethod
     def cancel_order(order_id, user_id):
         """Cancels an order if it hasn't been delivered yet."""
@@ -109,6 +245,8 @@ class StatusController:
 
             order.status = "Cancelled"
             db.session.commit()
+            ActiveOrderBoard.record_order(order)
+            OrderEventHub.publish_order(order)
             return True, "Order cancelled successfully.", order
         except Exception as e:
             db.session.rollback()
@@ -126,11 +264,22 @@ class StatusController:
             return False, f"Error retrieving order: {str(e)}", None
 
     @staticmethod
-    def get_all_orders_for_staff():
-        """Retrieves all orders for staff/admin management."""
+    def get_all_orders_for_staff(before=None):
+        """Retrieves one page of all orders for staff/admin management."""
+        success, msg, page = StatusController.get_staff_order_page(before)
+        return success, msg, page.orders if page else None
+
+    @staticmethod
+    def get_staff_order_page(before=None):
+        """
+        Retrieves one page of all orders with their items grouped into
+        burgers. before is the next_cursor of the previous page.
+        """
         try:
-            orders = Order.query.order_by(Order.ordered_at.desc()).all()
-            return True, "All orders retrieved successfully.", orders
+            page = OrderHistoryService.page(Order.query, before)
+            return True, "All orders retrieved successfully.", page
+        except ValueError:
+            return False, "Invalid page cursor.", None
         except Exception as e:
             return False, f"Error retrieving orders: {str(e)}", None
 
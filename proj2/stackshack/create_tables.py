@@ -22,6 +22,8 @@ def create_tables():
             PaymentMethod,
             CampusCard,
             Receipt,
+            PaymentRollup,
+            PaymentIdempotencyKey,
         )
         from models.gamification import (  # noqa: F401
             PointsTransaction,
@@ -33,6 +35,11 @@ def create_tables():
             PunchCard,
             Redemption,
             Coupon,
+            UserStats,
+            PointsCheckpoint,
+            GamificationJob,
+            LeaderboardScore,
+            CouponCodeCounter,
         )
         from models.shift import StaffProfile, Shift, ShiftAssignment  # noqa: F401
 
@@ -45,6 +52,8 @@ def create_tables():
         print("  - PaymentMethod")
         print("  - CampusCard")
         print("  - Receipt")
+        print("  - PaymentRollup")
+        print("  - PaymentIdempotencyKey")
         print("  - PointsTransaction")
         print("  - Badge")
         print("  - UserBadge")
@@ -54,6 +63,11 @@ def create_tables():
         print("  - PunchCard")
         print("  - Redemption")
         print("  - Coupon")
+        print("  - UserStats")
+        print("  - PointsCheckpoint")
+        print("  - GamificationJob")
+        print("  - LeaderboardScore")
+        print("  - CouponCodeCounter")
         print("  - StaffProfile")
         print("  - Shift")
         print("  - ShiftAssignment")
@@ -10,6 +10,12 @@ class PointsTransaction(db.Model):
     """Tracks all points earned and redeemed by users"""
 
     __tablename__ = "points_transactions"
+    __table_args__ = (
+        # Balance reads scan a user's ledger tail after a checkpoint id
+        db.Index("ix_points_transactions_user_id_id", "user_id", "id"),
+        # Points history pages read a user's ledger by date
+        db.Index("ix_points_transactions_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -105,6 +111,12 @@ class DailyBonus(db.Model):
     """Tracks daily bonus challenges - allows up to 2 per day"""
 
     __tablename__ = "daily_bonuses"
+    __table_args__ = (
+        db.Index("ix_daily_bonuses_bonus_date_is_active", "bonus_date", "is_active"),
+        db.UniqueConstraint(
+            "bonus_date", "condition", name="unique_daily_bonus_condition"
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     bonus_date = db.Column(
@@ -131,6 +143,11 @@ class WeeklyChallenge(db.Model):
     """Tracks weekly challenges"""
 
     __tablename__ = "weekly_challenges"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "week_start", "condition", name="unique_weekly_challenge_condition"
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     week_start = db.Column(db.Date, nullable=False)
@@ -159,6 +176,12 @@ class UserChallengeProgress(db.Model):
     """Tracks user progress on challenges"""
 
     __tablename__ = "user_challenge_progress"
+    __table_args__ = (
+        # One progress row per user per challenge; rows for the other kind of
+        # challenge hold NULL there, which unique indexes do not compare
+        db.Index("unique_user_challenge", "user_id", "challenge_id", unique=True),
+        db.Index("unique_user_daily_bonus", "user_id", "daily_bonus_id", unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -262,6 +285,9 @@ class Coupon(db.Model):
     """Tracks coupon codes generated from reward redemptions"""
 
     __tablename__ = "coupons"
+    __table_args__ = (
+        db.Index("ix_coupons_used_order_id_is_used", "used_order_id", "is_used"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -309,3 +335,169 @@ class Coupon(db.Model):
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "is_valid": self.is_valid(),
         }
+
+
+class UserStats(db.Model):
+    """Per-user behavioral counters, updated incrementally on every paid order"""
+
+    __tablename__ = "user_stats"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("users.id"), nullable=False, unique=True
+    )
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    lunch_orders = db.Column(db.Integer, nullable=False, default=0)  # 12-1 PM local
+    early_orders = db.Column(db.Integer, nullable=False, default=0)  # before 11 AM
+    late_orders = db.Column(db.Integer, nullable=False, default=0)  # after 8 PM
+    surprise_orders = db.Column(db.Integer, nullable=False, default=0)
+    sauces_tried = db.Column(db.JSON, nullable=False, default=list)  # lowercase names
+    patties_tried = db.Column(db.JSON, nullable=False, default=list)
+    burger_counts = db.Column(
+        db.JSON, nullable=False, default=dict
+    )  # burger name -> number of orders
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    user = db.relationship("User", backref=db.backref("stats", uselist=False))
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "order_count": self.order_count,
+            "lunch_orders": self.lunch_orders,
+            "early_orders": self.early_orders,
+            "late_orders": self.late_orders,
+            "surprise_orders": self.surprise_orders,
+            "sauces_tried": sorted(self.sauces_tried or []),
+            "patties_tried": sorted(self.patties_tried or []),
+            "burger_counts": dict(self.burger_counts or {}),
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class PointsCheckpoint(db.Model):
+    """Snapshot of a user's points balance as of a ledger transaction id"""
+
+    __tablename__ = "points_checkpoints"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "user_id", "last_transaction_id", name="unique_user_checkpoint"
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    last_transaction_id = db.Column(
+        db.Integer, nullable=False
+    )  # Highest points_transactions.id folded into balance
+    balance = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    user = db.relationship(
+        "User", backref=db.backref("points_checkpoints", lazy="dynamic")
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "last_transaction_id": self.last_transaction_id,
+            "balance": self.balance,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class GamificationJob(db.Model):
+    """Queued post-payment gamification work, one row per paid order"""
+
+    __tablename__ = "gamification_jobs"
+    __table_args__ = (
+        # Workers claim the oldest pending jobs first
+        db.Index("ix_gamification_jobs_status_id", "status", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(
+        db.Integer, db.ForeignKey("orders.id"), nullable=False, unique=True
+    )  # Idempotency key: an order is only ever processed once
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    status = db.Column(
+        db.String(20), nullable=False, default="pending"
+    )  # pending, processing, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    result = db.Column(db.JSON)  # Points, badges and challenges awarded
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+
+    order = db.relationship(
+        "Order", backref=db.backref("gamification_job", uselist=False)
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "order_id": self.order_id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "result": self.result,
+            "last_error": self.last_error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "completed_at": (
+                self.completed_at.isoformat() if self.completed_at else None
+            ),
+        }
+
+
+class LeaderboardScore(db.Model):
+    """Points a user earned in one leaderboard window, updated as points are earned"""
+
+    __tablename__ = "leaderboard_scores"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "period", "period_start", "user_id", name="unique_leaderboard_score"
+        ),
+        # Leaderboard snapshots read one window by score
+        db.Index(
+            "ix_leaderboard_scores_period_period_start_points",
+            "period",
+            "period_start",
+            "points",
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    period = db.Column(
+        db.String(10), nullable=False
+    )  # daily, weekly, monthly, all_time
+    period_start = db.Column(
+        db.Date, nullable=False
+    )  # UTC day, Monday or 1st of the month; 1970-01-01 for all_time
+    points = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "period": self.period,
+            "period_start": (
+                self.period_start.isoformat() if self.period_start else None
+            ),
+            "points": self.points,
+        }
+
+
+class CouponCodeCounter(db.Model):
+    """Next sequence number for coupon codes (a single row)"""
+
+    __tablename__ = "coupon_code_counter"
+
+    id = db.Column(db.Integer, primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False, default=0)
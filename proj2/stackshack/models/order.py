@@ -4,6 +4,12 @@ from datetime import datetime
 
 class Order(db.Model):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Order history and stats filter a user's orders by date
+        db.Index("ix_orders_user_id_ordered_at", "user_id", "ordered_at"),
+        # The active order board loads every order still in progress
+        db.Index("ix_orders_status_ordered_at", "status", "ordered_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -32,6 +38,10 @@ class Order(db.Model):
 
 class OrderItem(db.Model):
     __tablename__ = "order_items"
+    __table_args__ = (
+        # Item lookups and menu joins go through the order
+        db.Index("ix_order_items_order_id_menu_item_id", "order_id", "menu_item_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False)
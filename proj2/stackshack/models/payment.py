@@ -9,6 +9,9 @@ class Transaction(db.Model):
     """
 
     __tablename__ = "transactions"
+    __table_args__ = (
+        db.Index("ix_transactions_order_id_status", "order_id", "status"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     transaction_id = db.Column(db.String(50), unique=True, nullable=False)
@@ -114,11 +117,18 @@ class Receipt(db.Model):
     total_amount = db.Column(db.Numeric(10, 2), nullable=False)
     payment_method = db.Column(db.String(50), nullable=False)
 
-    # File storage (optional)
-    receipt_html = db.Column(db.Text, nullable=True)
+    # Items by burger, totals and payment details; rendered on demand
+    receipt_data = db.Column(db.JSON, nullable=True)
+
+    # File storage (optional). Only receipts issued before receipt_data have
+    # HTML, so it is loaded only when one of those is rendered
+    receipt_html = db.deferred(db.Column(db.Text, nullable=True))
     receipt_url = db.Column(db.String(255), nullable=True)
 
-    generated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Indexed for date-range exports
+    generated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, nullable=False, index=True
+    )
 
     # Relationships
     transaction = db.relationship("Transaction", back_populates="receipt")
@@ -146,6 +156,61 @@ class Receipt(db.Model):
         }
 
 
+class PaymentRollup(db.Model):
+    """
+    Transaction count and amount per hour, payment method and status,
+    maintained as transactions are written
+    """
+
+    __tablename__ = "payment_rollups"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "hour", "payment_method", "status", name="unique_payment_rollup"
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    hour = db.Column(db.DateTime, nullable=False)  # UTC, start of the hour
+    payment_method = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "hour": self.hour.isoformat() if self.hour else None,
+            "payment_method": self.payment_method,
+            "status": self.status,
+            "count": self.count,
+            "amount": float(self.amount),
+        }
+
+
+class PaymentIdempotencyKey(db.Model):
+    """
+    A client's Idempotency-Key for a payment and the response it got,
+    replayed to retries of the same request until it expires
+    """
+
+    __tablename__ = "payment_idempotency"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "user_id", "idempotency_key", name="unique_payment_idempotency_key"
+        ),
+        # For the cleanup job
+        db.Index("ix_payment_idempotency_expires_at", "expires_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    idempotency_key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)  # SHA-256 hex
+    status = db.Column(db.String(20), nullable=False)  # processing, completed
+    response_body = db.Column(db.Text, nullable=True)  # JSON, once completed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
 class PaymentMethod(db.Model):
     """
     Stores saved payment methods for users (dummy data only)
@@ -99,6 +99,8 @@ class ShiftAssignment(db.Model):
     # Ensure a user can only have one role per shift per day
     __table_args__ = (
         UniqueConstraint("user_id", "shift_id", "date", name="unique_user_shift_date"),
+        # Rosters list everyone on a shift for a date
+        db.Index("ix_shift_assignments_date_shift_id", "date", "shift_id"),
     )
 
     def to_dict(self):
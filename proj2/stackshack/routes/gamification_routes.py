@@ -4,16 +4,10 @@ Gamification routes for points, badges, tiers, and rewards.
 
 from flask import Blueprint, jsonify, request, render_template, session
 from flask_login import login_required, current_user
-from datetime import date, datetime, timedelta
+from datetime import date
 from services.gamification_service import GamificationService
-from models.gamification import (
-    Badge,
-    UserBadge,
-    DailyBonus,
-    WeeklyChallenge,
-    Redemption,
-    UserChallengeProgress,
-)
+from services.leaderboard_service import PERIODS, LeaderboardService
+from services.rewards_snapshot import RewardsSnapshot
 from models.order import Order
 from database.db import db
 
@@ -24,67 +18,21 @@ gamification_bp = Blueprint("gamification", __name__)
 @login_required
 def rewards_page():
     """Display the rewards and gamification page"""
-    # Recalculate points to ensure accuracy
-    # This ensures the displayed points match the actual sum of all transactions
-    points = GamificationService.get_user_points(current_user.id)
-    GamificationService.update_user_tier(current_user.id)
-
-    # Get user badges
-    user_badges = UserBadge.query.filter_by(user_id=current_user.id).all()
-
-    # Get daily bonuses (up to 2 per day)
-    today = date.today()
-    from services.challenge_service import ChallengeService
-
-    ChallengeService.generate_daily_challenges(today, max_challenges=2)
-    daily_bonuses = DailyBonus.query.filter_by(bonus_date=today, is_active=True).all()
-    daily_bonuses_data = []
-    for bonus in daily_bonuses:
-        progress = UserChallengeProgress.query.filter_by(
-            user_id=current_user.id, daily_bonus_id=bonus.id, completed=True
-        ).first()
-        daily_bonuses_data.append(
-            {"bonus": bonus.to_dict(), "completed": progress is not None}
-        )
-
-    # Get weekly challenges (up to 3 per week)
-    days_since_monday = today.weekday()
-    week_start = today - timedelta(days=days_since_monday)
-    ChallengeService.generate_weekly_challenges(week_start, max_challenges=3)
-    challenges = WeeklyChallenge.query.filter(
-        WeeklyChallenge.week_start <= today,
-        WeeklyChallenge.week_end >= today,
-        WeeklyChallenge.is_active,
-    ).all()
-    challenges_data = []
-    for challenge in challenges:
-        progress = UserChallengeProgress.query.filter_by(
-            user_id=current_user.id, challenge_id=challenge.id
-        ).first()
-        challenge_progress = None
-        if progress:
-            challenge_progress = {
-                "progress": progress.progress,
-                "target": progress.target,
-                "completed": progress.completed,
-            }
-        challenges_data.append(
-            {"challenge": challenge.to_dict(), "progress": challenge_progress}
-        )
+    # Points come from the ledger and the tier is refreshed when the
+    # snapshot is built; challenges come from the pre-generated calendar
+    snapshot = RewardsSnapshot.for_user(current_user.id)
 
     # Get available rewards
     rewards = GamificationService.REWARD_COSTS
 
     return render_template(
         "gamification/rewards.html",
-        points=points,
-        tier=current_user.tier or "Bronze",
-        tier_multiplier=GamificationService.TIER_MULTIPLIERS.get(
-            current_user.tier or "Bronze", 1.0
-        ),
-        badges=user_badges,
-        daily_bonuses=daily_bonuses_data,
-        weekly_challenges=challenges_data,
+        points=snapshot.points,
+        tier=snapshot.tier,
+        tier_multiplier=GamificationService.TIER_MULTIPLIERS.get(snapshot.tier, 1.0),
+        badges=snapshot.user_badges,
+        daily_bonuses=snapshot.daily_bonuses,
+        weekly_challenges=snapshot.weekly_challenges,
         rewards=rewards,
     )
 
@@ -111,21 +59,38 @@ def get_user_points():
 @gamification_bp.route("/api/points/verify", methods=["GET"])
 @login_required
 def verify_points():
-    """Verify points calculation by showing breakdown"""
-    from models.gamification import PointsTransaction
-
-    # Get all transactions
-    transactions = PointsTransaction.query.filter_by(user_id=current_user.id).all()
+    """
+    Verify points calculation by showing breakdown.
 
-    # Calculate breakdown by event type
-    breakdown = {}
-    total = 0
-    for trans in transactions:
-        event_type = trans.event_type
-        if event_type not in breakdown:
-            breakdown[event_type] = 0
-        breakdown[event_type] += trans.points
-        total += trans.points
+    Admins can pass ?scope=all to reconcile every user's cached total against
+    the ledger in bulk (add &fix=0 for a dry run, &full=1 to ignore checkpoints).
+    """
+    from models.gamification import PointsTransaction
+    from services.points_ledger_service import PointsLedgerService
+
+    if request.args.get("scope") == "all":
+        if current_user.role != "admin":
+            return jsonify({"error": "Admin access required"}), 403
+        result = PointsLedgerService.verify_balances(
+            fix=request.args.get("fix", "1") != "0",
+            use_checkpoints=request.args.get("full") != "1",
+        )
+        return jsonify(result)
+
+    # Breakdown by event type, summed in the database
+    rows = (
+        db.session.query(
+            PointsTransaction.event_type,
+            db.func.sum(PointsTransaction.points),
+            db.func.count(PointsTransaction.id),
+        )
+        .filter(PointsTransaction.user_id == current_user.id)
+        .group_by(PointsTransaction.event_type)
+        .all()
+    )
+    breakdown = {event_type: int(points or 0) for event_type, points, _ in rows}
+    total = sum(breakdown.values())
+    transaction_count = sum(count for _, _, count in rows)
 
     # Get current calculated total
     calculated_total = GamificationService.get_user_points(current_user.id)
@@ -136,7 +101,7 @@ def verify_points():
             "manual_sum": int(total),
             "breakdown": breakdown,
             "match": calculated_total == int(total),
-            "transaction_count": len(transactions),
+            "transaction_count": transaction_count,
         }
     )
 
@@ -203,36 +168,14 @@ def redeem_reward():
 @login_required
 def get_user_badges():
     """Get all badges earned by current user"""
-    user_badges = UserBadge.query.filter_by(user_id=current_user.id).all()
-
-    return jsonify({"badges": [ub.to_dict() for ub in user_badges]})
+    return jsonify({"badges": RewardsSnapshot.for_user(current_user.id).user_badges})
 
 
 @gamification_bp.route("/api/badges/all", methods=["GET"])
 @login_required
 def get_all_badges():
     """Get all possible badges in the system"""
-    all_badges = Badge.query.all()
-    user_badge_ids = {
-        ub.badge_id for ub in UserBadge.query.filter_by(user_id=current_user.id).all()
-    }
-
-    badges_list = []
-    for badge in all_badges:
-        badge_dict = badge.to_dict()
-        badge_dict["earned"] = badge.id in user_badge_ids
-        if badge_dict["earned"]:
-            user_badge = UserBadge.query.filter_by(
-                user_id=current_user.id, badge_id=badge.id
-            ).first()
-            badge_dict["earned_at"] = (
-                user_badge.earned_at.isoformat()
-                if user_badge and user_badge.earned_at
-                else None
-            )
-        badges_list.append(badge_dict)
-
-    return jsonify({"badges": badges_list})
+    return jsonify({"badges": RewardsSnapshot.for_user(current_user.id).badges})
 
 
 @gamification_bp.route("/api/badges/check", methods=["POST"])
@@ -259,6 +202,30 @@ def check_badges():
     )
 
 
+@gamification_bp.route("/api/order/<int:order_id>/rewards", methods=["GET"])
+@login_required
+def get_order_rewards(order_id):
+    """Poll the gamification job for a paid order and the rewards it earned"""
+    from models.gamification import GamificationJob
+
+    order = db.session.get(Order, order_id)
+    if not order or order.user_id != current_user.id:
+        return jsonify({"error": "Order not found"}), 404
+
+    job = GamificationJob.query.filter_by(order_id=order_id).first()
+    if not job:
+        return jsonify({"error": "No rewards queued for this order"}), 404
+
+    return jsonify(
+        {
+            "order_id": order_id,
+            "status": job.status,
+            "ready": job.status == "done",
+            "rewards": job.result if job.status == "done" else None,
+        }
+    )
+
+
 @gamification_bp.route("/api/tier", methods=["GET"])
 @login_required
 def get_user_tier():
@@ -286,90 +253,52 @@ def get_available_rewards():
 @login_required
 def get_daily_bonus():
     """Get today's daily bonuses (up to 2)"""
-    from services.challenge_service import ChallengeService
-
-    today = date.today()
-    ChallengeService.generate_daily_challenges(today, max_challenges=2)
-    daily_bonuses = DailyBonus.query.filter_by(bonus_date=today, is_active=True).all()
-
-    if not daily_bonuses:
-        return jsonify({"bonuses": []})
-
-    # Check if user completed each
-    from models.gamification import UserChallengeProgress
-
-    bonuses_data = []
-    for bonus in daily_bonuses:
-        progress = UserChallengeProgress.query.filter_by(
-            user_id=current_user.id, daily_bonus_id=bonus.id, completed=True
-        ).first()
-        bonuses_data.append(
-            {"bonus": bonus.to_dict(), "completed": progress is not None}
-        )
+    snapshot = RewardsSnapshot.for_user(current_user.id)
 
-    return jsonify({"bonuses": bonuses_data})
+    return jsonify({"bonuses": snapshot.daily_bonuses})
 
 
 @gamification_bp.route("/api/weekly-challenge", methods=["GET"])
 @login_required
 def get_weekly_challenge():
     """Get current weekly challenges (up to 3)"""
-    from services.challenge_service import ChallengeService
+    snapshot = RewardsSnapshot.for_user(current_user.id)
 
-    today = date.today()
-    days_since_monday = today.weekday()
-    week_start = today - timedelta(days=days_since_monday)
-    ChallengeService.generate_weekly_challenges(week_start, max_challenges=3)
-    challenges = WeeklyChallenge.query.filter(
-        WeeklyChallenge.week_start <= today,
-        WeeklyChallenge.week_end >= today,
-        WeeklyChallenge.is_active,
-    ).all()
-
-    if not challenges:
-        return jsonify({"challenges": []})
-
-    # Get user progress for each
-    from models.gamification import UserChallengeProgress
-
-    challenges_data = []
-    for challenge in challenges:
-        progress = UserChallengeProgress.query.filter_by(
-            user_id=current_user.id, challenge_id=challenge.id
-        ).first()
-
-        challenge_dict = challenge.to_dict()
-        if progress:
-            challenge_dict["progress"] = progress.progress
-            challenge_dict["target"] = progress.target
-            challenge_dict["completed"] = progress.completed
-        else:
-            challenge_dict["progress"] = 0
-            challenge_dict["target"] = 3  # Default
-            challenge_dict["completed"] = False
-
-        challenges_data.append(challenge_dict)
-
-    return jsonify({"challenges": challenges_data})
+    return jsonify({"challenges": snapshot.weekly_challenge_list()})
 
 
 @gamification_bp.route("/api/leaderboard", methods=["GET"])
 @login_required
 def get_leaderboard():
-    """Get monthly leaderboard"""
+    """
+    Get a page of the daily, weekly, monthly or all-time leaderboard, with
+    the current user's rank. month and year pick a past month.
+    """
+    window = request.args.get("window", "monthly")
     month = request.args.get("month", type=int)
     year = request.args.get("year", type=int)
+    page = request.args.get("page", 1, type=int)
     limit = request.args.get("limit", 5, type=int)
 
-    leaderboard = GamificationService.get_monthly_leaderboard(month, year, limit)
+    if window not in PERIODS:
+        return jsonify({"error": f"window must be one of {', '.join(PERIODS)}"}), 400
+    if not 1 <= limit <= 100 or page < 1:
+        return jsonify({"error": "limit must be 1-100 and page at least 1"}), 400
 
-    return jsonify(
-        {
-            "leaderboard": leaderboard,
-            "month": month or datetime.utcnow().month,
-            "year": year or datetime.utcnow().year,
-        }
+    start = None
+    if window == "monthly" and month and year:
+        try:
+            start = date(year, month, 1)
+        except ValueError:
+            return jsonify({"error": "Invalid month"}), 400
+
+    result = LeaderboardService.get_leaderboard(
+        window, start, page, limit, user_id=current_user.id
     )
+    first = date.fromisoformat(result["period_start"])
+    result["month"] = first.month if window == "monthly" else None
+    result["year"] = first.year if window == "monthly" else None
+    return jsonify(result)
 
 
 @gamification_bp.route("/api/review", methods=["POST"])
@@ -446,7 +375,10 @@ def apply_coupon():
     if not coupon_code or not order_id:
         return jsonify({"error": "coupon_code and order_id are required"}), 400
 
-    order = db.session.get(Order, order_id)
+    # Lock the order so two coupons cannot be applied to it in parallel
+    order = (
+        Order.query.filter_by(id=order_id).with_for_update().populate_existing().first()
+    )
     if not order or order.user_id != current_user.id:
         return jsonify({"error": "Order not found"}), 404
 
@@ -503,27 +435,6 @@ def apply_coupon():
 @login_required
 def get_redemption_history():
     """Get user's redemption history with coupons"""
-    from models.gamification import Coupon
-
-    redemptions = (
-        Redemption.query.filter_by(user_id=current_user.id)
-        .order_by(Redemption.redeemed_at.desc())
-        .all()
-    )
-
-    redemption_list = []
-    for redemption in redemptions:
-        redemption_dict = redemption.to_dict()
-
-        # Get associated coupon and refresh from database to get latest status
-        coupon = Coupon.query.filter_by(redemption_id=redemption.id).first()
-        if coupon:
-            # Refresh the coupon object to get latest is_used status
-            db.session.refresh(coupon)
-            redemption_dict["coupon"] = coupon.to_dict()
-        else:
-            redemption_dict["coupon"] = None
-
-        redemption_list.append(redemption_dict)
+    snapshot = RewardsSnapshot.for_user(current_user.id)
 
-    return jsonify({"redemptions": redemption_list})
+    return jsonify({"redemptions": snapshot.redemptions})
@@ -9,9 +9,10 @@ from flask import (
     session,
 )
 from flask_login import login_required, current_user
-from controllers.order_controller import OrderController
+from controllers.order_controller import CartLine, OrderController
 from controllers.menu_controller import MenuController
 from models.menu_item import MenuItem
+from services.order_history_service import OrderHistoryService, OrderPage
 
 VEGAN_INGREDIENT_NAMES = {
     # Buns
@@ -69,11 +70,30 @@ order_bp = Blueprint("order", __name__)
 @login_required
 def order_history():
     user_id = current_user.id
-    success, msg, orders = OrderController.get_user_orders(user_id)
+    success, msg, page = OrderController.get_user_order_page(
+        user_id, request.args.get("before")
+    )
+
+    # Infinite scroll asks for the next page as JSON with rendered rows
+    if request.args.get("format") == "json":
+        if not success:
+            return jsonify({"success": False, "message": msg}), 400
+        data = OrderHistoryService.to_dict(page)
+        data["success"] = True
+        data["html"] = render_template(
+            "orders/_history_rows.html", orders=page.orders, burgers=page.burgers
+        )
+        return jsonify(data), 200
+
     if not success:
         flash(msg, "error")
-        orders = []
-    return render_template("orders/history.html", orders=orders)
+        page = OrderPage([], {}, None)
+    return render_template(
+        "orders/history.html",
+        orders=page.orders,
+        burgers=page.burgers,
+        next_cursor=page.next_cursor,
+    )
 
 
 @order_bp.route("/ingredients/<category>")
@@ -243,24 +263,15 @@ def checkout_cart():
         return redirect(url_for("order.create_order_form"))
 
     # Flatten all burger items into a single order, tracking burger_index and burger_name
-    item_data = []
-    for burger_index, burger in enumerate(cart, start=1):
-        burger_name = burger.get("name")  # Get pre-defined burger name if exists
-        for item in burger["items"]:
-            item_data.append(
-                (
-                    item["item_id"],
-                    str(item["price"]),
-                    item["quantity"],
-                    item["name"],
-                    burger_index,  # Track which burger this item belongs to
-                    burger_name,  # Store pre-defined burger name
-                )
-            )
+    try:
+        lines = CartLine.from_cart(cart)
+    except (KeyError, TypeError, ValueError):
+        flash("Error creating order: invalid cart contents.", "error")
+        return redirect(url_for("order.view_cart"))
 
     # Create order
     user_id = current_user.id
-    success, msg, order = OrderController.create_new_order(user_id, item_data)
+    success, msg, order = OrderController.create_new_order(user_id, lines)
 
     if success:
         # Clear cart after successful order
@@ -286,8 +297,7 @@ def place_order():
 @login_required
 def add_predefined_burger():
     """Add a pre-defined burger to cart"""
-    from data_burgers import PREDEFINED_BURGERS
-    from models.menu_item import MenuItem
+    from services.burger_index import BurgerIndex
 
     burger_slug = request.form.get("burger_slug")
 
@@ -296,49 +306,35 @@ def add_predefined_burger():
         return redirect(url_for("auth.dashboard"))
 
     # Find burger definition
-    burger_def = None
-    for burger in PREDEFINED_BURGERS:
-        if burger["slug"] == burger_slug:
-            burger_def = burger
-            break
+    index = BurgerIndex.current()
+    burger_def = index.by_slug.get(burger_slug)
 
     if not burger_def:
         flash("Burger not found", "error")
         return redirect(url_for("auth.dashboard"))
 
-    # Build burger items for cart
-    burger_items = []
-    burger_total = 0.0
-
     # Check if all ingredients are available BEFORE adding to cart
-    out_of_stock_ingredients = []
-    for ingredient_name in burger_def["ingredients"]:
-        menu_item = MenuItem.query.filter_by(name=ingredient_name).first()
-        if not menu_item:
-            flash(
-                f"❌ Ingredient '{ingredient_name}' not available in our menu", "error"
-            )
-            return redirect(url_for("auth.dashboard"))
-
-        # Check stock
-        if menu_item.stock_quantity <= 0:
-            out_of_stock_ingredients.append(menu_item.name)
+    if burger_def.missing:
+        flash(
+            f"❌ Ingredient '{burger_def.missing[0]}' not available in our menu",
+            "error",
+        )
+        return redirect(url_for("auth.dashboard"))
 
     # If any ingredients are out of stock, show detailed message
+    out_of_stock_ingredients = index.out_of_stock(burger_def)
     if out_of_stock_ingredients:
         flash(
-            f"❌ Cannot add '{burger_def['name']}' - Out of stock: {', '.join(out_of_stock_ingredients)}",
+            f"❌ Cannot add '{burger_def.name}' - Out of stock: {', '.join(out_of_stock_ingredients)}",
             "error",
         )
         return redirect(url_for("auth.dashboard"))
 
     # Build burger items for cart (only if all items are in stock)
-    for ingredient_name in burger_def["ingredients"]:
-        menu_item = MenuItem.query.filter_by(name=ingredient_name).first()
-
+    burger_items = []
+    for item_id in burger_def.ingredient_ids:
+        menu_item = index.snapshot.get(item_id)
         price = float(menu_item.price)
-        burger_total += price
-
         burger_items.append(
             {
                 "item_id": str(menu_item.id),
@@ -348,6 +344,7 @@ def add_predefined_burger():
                 "item_total": price,
             }
         )
+    burger_total = burger_def.price
 
     # Initialize cart if not exists
     if "cart" not in session:
@@ -357,10 +354,10 @@ def add_predefined_burger():
     burger = {
         "items": burger_items,
         "total": burger_total,
-        "name": burger_def["name"],  # Store burger name for display
+        "name": burger_def.name,  # Store burger name for display
     }
     session["cart"].append(burger)
     session.modified = True
 
-    flash(f"🍔 {burger_def['name']} added to cart! (${burger_total:.2f})", "success")
+    flash(f"🍔 {burger_def.name} added to cart! (${burger_total:.2f})", "success")
     return redirect(url_for("order.view_cart"))
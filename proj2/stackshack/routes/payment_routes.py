@@ -3,11 +3,35 @@ Payment Routes
 API endpoints for payment processing
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+import secrets
+from datetime import date
+
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    send_file,
+    stream_with_context,
+    url_for,
+)
 from flask_login import login_required, current_user
 from controllers.payment_controller import PaymentController
 from models.payment import Receipt, Transaction
 from models.order import Order
+from services.receipt_export import FORMATS as EXPORT_FORMATS, ReceiptExport, day_range
+from services.payment_idempotency import (
+    MAX_KEY_LENGTH,
+    PaymentIdempotency,
+    fingerprint,
+)
+from services.payment_rollup_service import PaymentRollupService
+from services.receipt_pdf import ReceiptPdfCache
+from services.receipt_service import ReceiptService
 
 payment_bp = Blueprint("payment", __name__)
 
@@ -38,14 +62,31 @@ def checkout(order_id):
         "payment/checkout.html",
         order=order,
         campus_card=campus_card if success else None,
+        # One key per visit, so a double-submitted form pays once
+        idempotency_key=secrets.token_urlsafe(24),
     )
 
 
+def _payment_result(order_id, success, message, transaction):
+    """Flash a payment's outcome and redirect to its result page"""
+    if success:
+        flash(message, "success")
+        return redirect(
+            url_for("payment.payment_success", transaction_id=transaction["id"])
+        )
+    flash(message, "error")
+    return redirect(url_for("payment.payment_failed", order_id=order_id))
+
+
 @payment_bp.route("/process", methods=["POST"])
 @login_required
 def process_payment():
     """
     Process payment through dummy gateway
+
+    Requests carrying an Idempotency-Key header (or idempotency_key form
+    field) are processed once; retries with the same key replay the stored
+    outcome without reaching the gateway.
     """
     try:
         # Get form data
@@ -88,17 +129,45 @@ def process_payment():
                 {"wallet_provider": request.form.get("wallet_provider")}
             )
 
-        # Process payment
-        success, message, transaction = PaymentController.process_payment(payment_data)
+        idempotency_key = request.headers.get("Idempotency-Key") or request.form.get(
+            "idempotency_key"
+        )
+        claim = None
+        if idempotency_key:
+            if len(idempotency_key) > MAX_KEY_LENGTH:
+                flash("Invalid idempotency key", "error")
+                return redirect(url_for("order.order_history"))
+
+            claim = PaymentIdempotency.claim(
+                current_user.id, idempotency_key, fingerprint(payment_data)
+            )
+            if claim.state == "replay":
+                response = _payment_result(order_id, *claim.response)
+                response.headers["Idempotent-Replayed"] = "true"
+                return response
+            if claim.state == "in_progress":
+                flash("This payment is still being processed", "info")
+                return redirect(url_for("order.order_history"))
+            if claim.state == "mismatch":
+                flash("This payment key was already used for another payment", "error")
+                return redirect(url_for("order.order_history"))
 
-        if success:
-            flash(message, "success")
-            return redirect(
-                url_for("payment.payment_success", transaction_id=transaction["id"])
+        # Process payment
+        try:
+            success, message, transaction = PaymentController.process_payment(
+                payment_data
             )
-        else:
-            flash(message, "error")
-            return redirect(url_for("payment.payment_failed", order_id=order_id))
+        except Exception:
+            if claim:
+                PaymentIdempotency.release(claim.record_id)
+            raise
+
+        if claim and transaction is not None:
+            PaymentIdempotency.complete(claim.record_id, success, message, transaction)
+        elif claim:
+            # Rejected before reaching the gateway; a retry may succeed
+            PaymentIdempotency.release(claim.record_id)
+        return _payment_result(order_id, success, message, transaction)
 
     except Exception as e:
         flash(f"Payment processing error: {str(e)}", "error")
@@ -184,9 +253,9 @@ def view_receipt(receipt_id):
         flash("Unauthorized access", "error")
         return redirect(url_for("payment.payment_history"))
 
-    # Return the HTML receipt directly
-    if receipt.receipt_html:
-        return receipt.receipt_html
+    html = ReceiptService.render(receipt)
+    if html:
+        return html
     else:
         flash("Receipt not available", "error")
         return redirect(url_for("payment.payment_history"))
@@ -196,11 +265,8 @@ def view_receipt(receipt_id):
 @login_required
 def download_receipt(receipt_id):
     """
-    Download receipt as PDF
+    Download receipt as PDF, from the on-disk PDF cache
     """
-    from flask import Response
-    import io
-
     receipt = Receipt.query.get_or_404(receipt_id)
 
     # Verify belongs to current user
@@ -208,64 +274,30 @@ def download_receipt(receipt_id):
         flash("Unauthorized access", "error")
         return redirect(url_for("payment.payment_history"))
 
-    if not receipt.receipt_html:
-        flash("Receipt not available", "error")
-        return redirect(url_for("payment.payment_history"))
-
     try:
-        # Try to use weasyprint for better PDF quality
-        try:
-            from weasyprint import HTML
-
-            pdf_bytes = HTML(string=receipt.receipt_html).write_pdf()
-        except ImportError:
-            # Fallback to xhtml2pdf if weasyprint not available
-            try:
-                from xhtml2pdf import pisa
-
-                pdf_buffer = io.BytesIO()
-                pisa_status = pisa.CreatePDF(
-                    io.BytesIO(receipt.receipt_html.encode("utf-8")), dest=pdf_buffer
-                )
-                if pisa_status.err:
-                    raise Exception("PDF generation failed")
-                pdf_bytes = pdf_buffer.getvalue()
-            except ImportError:
-                # Final fallback: simple text-based PDF using reportlab
-                from reportlab.lib.pagesizes import letter
-                from reportlab.pdfgen import canvas
-                from reportlab.lib.units import inch
-
-                buffer = io.BytesIO()
-                p = canvas.Canvas(buffer, pagesize=letter)
-                width, height = letter
-
-                # Simple receipt layout
-                p.setFont("Helvetica-Bold", 20)
-                p.drawString(1 * inch, height - 1 * inch, "Stack Shack")
-                p.setFont("Helvetica-Bold", 16)
-                p.drawString(1 * inch, height - 1.5 * inch, "Payment Receipt")
-
-                p.setFont("Helvetica", 12)
-                y = height - 2 * inch
-                p.drawString(1 * inch, y, f"Receipt Number: {receipt.receipt_number}")
-                y -= 0.3 * inch
-                p.drawString(1 * inch, y, f"Order ID: {receipt.order_id}")
-                y -= 0.3 * inch
-                p.drawString(1 * inch, y, f"Amount: ${float(receipt.total_amount):.2f}")
-                y -= 0.3 * inch
-                p.drawString(1 * inch, y, f"Payment Method: {receipt.payment_method}")
-                y -= 0.3 * inch
-                p.drawString(1 * inch, y, f"Date: {receipt.generated_at}")
-
-                p.save()
-                pdf_bytes = buffer.getvalue()
-
-        # Create response with PDF
-        response = Response(pdf_bytes, mimetype="application/pdf")
-        response.headers["Content-Disposition"] = (
-            f"attachment; filename=receipt_{receipt.receipt_number}.pdf"
+        pdfs = ReceiptPdfCache.current()
+        etag = pdfs.key(receipt)
+
+        # The client already has this exact PDF; skip rendering entirely
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        path = pdfs.get(receipt)
+        if not path:
+            flash("Receipt not available", "error")
+            return redirect(url_for("payment.payment_history"))
+
+        response = send_file(
+            path,
+            mimetype="application/pdf",
+            as_attachment=True,
+            download_name=f"receipt_{receipt.receipt_number}.pdf",
+            etag=etag,
+            max_age=0,
         )
+        response.cache_control.private = True
         return response
 
     except Exception as e:
@@ -292,9 +324,9 @@ def receipt_view(order_id):
         flash("No receipt found for this order", "error")
         return redirect(url_for("order.order_history"))
 
-    # Return the HTML receipt directly
-    if receipt.receipt_html:
-        return receipt.receipt_html
+    html = ReceiptService.render(receipt)
+    if html:
+        return html
     else:
         flash("Receipt not available", "error")
         return redirect(url_for("order.order_history"))
@@ -455,31 +487,36 @@ def admin_dashboard():
         flash("Unauthorized access", "error")
         return redirect(url_for("home"))
 
-    # Get filter period from query params
+    # Get filter period from query params; custom takes from/to dates
     filter_period = request.args.get("period", "today")
+    custom_start = custom_end = None
+    if filter_period == "custom":
+        try:
+            first_day = date.fromisoformat(request.args["from"])
+            last_day = date.fromisoformat(
+                request.args.get("to") or request.args["from"]
+            )
+            custom_start, custom_end = day_range(first_day, last_day)
+        except (KeyError, ValueError):
+            flash("Invalid date range", "error")
+            return redirect(url_for("payment.admin_dashboard"))
 
     # Get statistics
-    stats = PaymentController.get_payment_statistics(filter_period=filter_period)
+    stats = PaymentController.get_payment_statistics(
+        filter_period=filter_period, start=custom_start, end=custom_end
+    )
 
     # Get recent transactions
     query = Transaction.query.order_by(Transaction.initiated_at.desc())
 
     # Apply time filter
-    if filter_period:
-        from datetime import datetime, timedelta
-
-        now = datetime.utcnow()
-        if filter_period == "today":
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif filter_period == "week":
-            start_date = now - timedelta(days=7)
-        elif filter_period == "month":
-            start_date = now - timedelta(days=30)
-        else:
-            start_date = None
-
-        if start_date:
-            query = query.filter(Transaction.initiated_at >= start_date)
+    start_date, end_date = PaymentRollupService.period_range(
+        filter_period, custom_start, custom_end
+    )
+    if start_date:
+        query = query.filter(Transaction.initiated_at >= start_date)
+    if end_date:
+        query = query.filter(Transaction.initiated_at < end_date)
 
     transactions = query.limit(50).all()
 
@@ -491,6 +528,43 @@ def admin_dashboard():
     )
 
 
+@payment_bp.route("/admin/receipts/export")
+@login_required
+def export_receipts():
+    """
+    Stream every receipt for a date range (admin only).
+
+    Query params: from and to (inclusive, YYYY-MM-DD) and format: zip of
+    PDFs (default), csv or ndjson of line items.
+    """
+    if current_user.role != "admin":
+        flash("Unauthorized access", "error")
+        return redirect(url_for("home"))
+
+    export_format = request.args.get("format", "zip")
+    try:
+        first_day = date.fromisoformat(request.args["from"])
+        last_day = date.fromisoformat(request.args.get("to") or request.args["from"])
+    except (KeyError, ValueError):
+        return jsonify({"success": False, "message": "Invalid date range"}), 400
+    if export_format not in EXPORT_FORMATS or last_day < first_day:
+        return jsonify({"success": False, "message": "Invalid export request"}), 400
+
+    start, end = day_range(first_day, last_day)
+    chunks = ReceiptExport.stream(
+        export_format, start, end, current_app.config["RECEIPT_EXPORT_WORKERS"]
+    )
+    response = Response(
+        stream_with_context(chunks), mimetype=EXPORT_FORMATS[export_format][0]
+    )
+    response.headers["Content-Disposition"] = (
+        "attachment; filename="
+        f"{ReceiptExport.filename(export_format, first_day, last_day)}"
+    )
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
 # API Endpoints (JSON)
 
 
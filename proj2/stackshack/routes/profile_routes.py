@@ -14,7 +14,12 @@ profile_bp = Blueprint("profile", __name__)
 @login_required
 def view_profile():
     """View user profile"""
-    return render_template("profile/profile.html", user=current_user)
+    from services.badge_engine import BadgeEngine
+
+    badge_progress = BadgeEngine.badge_progress(current_user.id)
+    return render_template(
+        "profile/profile.html", user=current_user, badge_progress=badge_progress
+    )
 
 
 @profile_bp.route("/profile/update-email", methods=["POST"])
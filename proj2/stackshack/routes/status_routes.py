@@ -1,6 +1,23 @@
-from flask import Blueprint, request, jsonify, render_template, flash, redirect, url_for
+from flask import (
+    Blueprint,
+    Response,
+    request,
+    jsonify,
+    render_template,
+    flash,
+    redirect,
+    url_for,
+)
 from flask_login import login_required, current_user
 from controllers.status_controller import StatusController
+from database.db import db
+from services.active_order_board import ActiveOrderBoard
+from services.order_events import OrderEventHub
+from services.order_history_service import (
+    OrderHistoryService,
+    OrderPage,
+    group_burgers,
+)
 
 status_bp = Blueprint("status", __name__)
 
@@ -56,6 +73,52 @@ def update_status():
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
 
 
+@status_bp.route("/update/bulk", methods=["POST"])
+@login_required
+def bulk_update_status():
+    """
+    Update the status of many orders at once (staff only).
+
+    Accepts {"updates": [{"order_id": 1, "status": "Ready for Pickup"}, ...]}
+    or {"order_ids": [1, 2, 3], "status": "Ready for Pickup"}.
+    """
+    try:
+        if not StatusController.is_staff(current_user.id):
+            return (
+                jsonify(
+                    {"success": False, "message": "Only staff can update order status."}
+                ),
+                403,
+            )
+
+        data = request.get_json(silent=True) or {}
+        updates = data.get("updates")
+        if updates is None and data.get("order_ids"):
+            updates = [
+                {"order_id": order_id, "status": data.get("status")}
+                for order_id in data["order_ids"]
+            ]
+        try:
+            updates = [
+                (int(update["order_id"]), update["status"]) for update in updates or []
+            ]
+        except (KeyError, TypeError, ValueError):
+            updates = None
+        if not updates or any(not status for _order_id, status in updates):
+            return (
+                jsonify({"success": False, "message": "Missing order_id or status"}),
+                400,
+            )
+
+        success, msg, results = StatusController.bulk_update_status(updates)
+        if not success:
+            return jsonify({"success": False, "message": msg}), 500
+
+        return jsonify({"success": True, "message": msg, "results": results}), 200
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
+
+
 @status_bp.route("/cancel/<int:order_id>", methods=["POST"])
 @login_required
 def cancel_order(order_id):
@@ -97,11 +160,6 @@ def manage_orders():
         flash("Access denied. Only staff can manage orders.", "error")
         return redirect(url_for("order.order_history"))
 
-    success, msg, orders = StatusController.get_all_orders_for_staff()
-    if not success:
-        flash(msg, "error")
-        orders = []
-
     status_flow = {
         "Pending": "Paid",
         "Paid": "Preparing",
@@ -111,11 +169,105 @@ def manage_orders():
         "Cancelled": None,
     }
 
+    # Orders still in progress come from the in-memory board; ?view=all
+    # pages through every order ever placed
+    if request.args.get("view") != "all":
+        board_version, orders = ActiveOrderBoard.current().snapshot()
+        return render_template(
+            "orders/history.html",
+            orders=orders,
+            burgers={order.id: group_burgers(order.items) for order in orders},
+            board_version=board_version,
+            manage_mode=True,
+            status_flow=status_flow,
+            page_title="Manage Orders",
+            header_title="Manage Active Orders",
+        )
+
+    success, msg, page = StatusController.get_staff_order_page(
+        request.args.get("before")
+    )
+
+    # Infinite scroll asks for the next page as JSON with rendered rows
+    if request.args.get("format") == "json":
+        if not success:
+            return jsonify({"success": False, "message": msg}), 400
+        data = OrderHistoryService.to_dict(page)
+        data["success"] = True
+        data["html"] = render_template(
+            "orders/_history_rows.html",
+            orders=page.orders,
+            burgers=page.burgers,
+            manage_mode=True,
+            status_flow=status_flow,
+        )
+        return jsonify(data), 200
+
+    if not success:
+        flash(msg, "error")
+        page = OrderPage([], {}, None)
+
     return render_template(
         "orders/history.html",
-        orders=orders,
+        orders=page.orders,
+        burgers=page.burgers,
+        next_cursor=page.next_cursor,
         manage_mode=True,
         status_flow=status_flow,
         page_title="Manage Orders",
         header_title="Manage All Orders",
     )
+
+
+@status_bp.route("/board", methods=["GET"])
+@login_required
+def active_board():
+    """Active orders as JSON, or only the changes since ?since=<version>."""
+    if not StatusController.is_staff(current_user.id):
+        return (
+            jsonify({"success": False, "message": "Only staff can view the board."}),
+            403,
+        )
+
+    since = request.args.get("since", type=int)
+    data = ActiveOrderBoard.current().to_dict(since)
+    data["success"] = True
+    return jsonify(data), 200
+
+
+@status_bp.route("/stream", methods=["GET"])
+@login_required
+def stream():
+    """
+    Server-Sent Events stream of order status changes.
+
+    Staff receive every order; customers only their own, optionally narrowed
+    with ?orders=1,2,3. Reconnecting clients resume after Last-Event-ID.
+    """
+    try:
+        order_ids = [
+            int(order_id)
+            for order_id in request.args.get("orders", "").split(",")
+            if order_id
+        ]
+        last_event_id = request.headers.get("Last-Event-ID") or request.args.get(
+            "last_event_id"
+        )
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({"success": False, "message": "Invalid stream arguments"}), 400
+
+    user_id = None if StatusController.is_staff(current_user.id) else current_user.id
+    hub = OrderEventHub.current()
+    if last_event_id is None:
+        # Replay anything published before the stream starts
+        last_event_id = hub.last_id
+
+    # The stream never queries; return the connection to the pool now
+    db.session.remove()
+
+    return Response(
+        hub.stream(user_id, order_ids, last_event_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,7 +1,7 @@
 from flask import Blueprint, jsonify
 from flask_login import login_required, current_user
-from models.menu_item import MenuItem
-from data_burgers import PREDEFINED_BURGERS
+from services.burger_index import BurgerIndex
+from services.menu_catalog import MenuCatalog, MenuEntry
 import random
 
 surprise_bp = Blueprint("surprise", __name__)
@@ -50,8 +50,8 @@ def surprise():
             prefs = ["no_preference"]
         return prefs
 
-    def to_dict(item: MenuItem):
-        """Convert MenuItem to dict"""
+    def to_dict(item: MenuEntry):
+        """Convert a menu entry to dict"""
         return {
             "id": item.id,
             "name": item.name,
@@ -65,6 +65,7 @@ def surprise():
 
     # Get user preferences
     user_prefs = get_user_preferences()
+    catalog = MenuCatalog.current()
 
     # Decide randomly: 50% chance to try pre-customized burger, 50% to build from ingredients
     # This ensures a good mix of both types
@@ -73,26 +74,17 @@ def surprise():
     # Try to get a pre-customized burger that matches user preferences
     if try_predefined:
         # Filter predefined burgers by user preferences and availability
-        matching_burgers = []
-        for burger_def in PREDEFINED_BURGERS:
-            # Check if burger matches user preferences
-            burger_tags = set(burger_def.get("dietary_tags", []))
-            user_tags = set(user_prefs)
-
-            # Match if any tag overlaps, or if user has no_preference
-            if "no_preference" in user_tags or burger_tags.intersection(user_tags):
-                # Check if all ingredients are available
-                all_available = True
-                for ingredient_name in burger_def["ingredients"]:
-                    menu_item = MenuItem.query.filter_by(
-                        name=ingredient_name, is_available=True
-                    ).first()
-                    if not menu_item or (menu_item.stock_quantity or 0) <= 0:
-                        all_available = False
-                        break
-
-                if all_available:
-                    matching_burgers.append(burger_def)
+        index = BurgerIndex.current()
+        if "no_preference" in user_prefs:
+            candidates = index.entries
+        else:
+            candidates = index.matching_any(user_prefs)
+        matching_burgers = [
+            entry
+            for entry in candidates
+            if not entry.missing
+            and not index.out_of_stock(entry, require_available=True)
+        ]
 
         # If we found matching pre-customized burgers, use one
         if matching_burgers:
@@ -106,29 +98,28 @@ def surprise():
             toppings = []
             sauces = []
 
-            for ingredient_name in chosen_burger["ingredients"]:
-                menu_item = MenuItem.query.filter_by(name=ingredient_name).first()
-                if menu_item:
-                    all_items.append(menu_item)
-                    category = (menu_item.category or "").lower()
-                    if category == "bun":
-                        bun = menu_item
-                    elif category == "patty":
-                        patty = menu_item
-                    elif category == "cheese":
-                        cheeses.append(menu_item)
-                    elif category == "topping":
-                        toppings.append(menu_item)
-                    elif category == "sauce":
-                        sauces.append(menu_item)
+            for item_id in chosen_burger.ingredient_ids:
+                menu_item = catalog.get(item_id)
+                all_items.append(menu_item)
+                category = (menu_item.category or "").lower()
+                if category == "bun":
+                    bun = menu_item
+                elif category == "patty":
+                    patty = menu_item
+                elif category == "cheese":
+                    cheeses.append(menu_item)
+                elif category == "topping":
+                    toppings.append(menu_item)
+                elif category == "sauce":
+                    sauces.append(menu_item)
 
             if bun and patty:
                 # Ensure we have at least one cheese, topping, and sauce
                 # If predefined burger is missing any, add from available items
                 if not cheeses:
-                    available_cheeses = MenuItem.query.filter_by(
-                        is_available=True, category="cheese"
-                    ).all()
+                    available_cheeses = catalog.in_category(
+                        "cheese", available_only=True
+                    )
                     if available_cheeses:
                         # Filter by user preferences if vegan
                         if (
@@ -145,17 +136,15 @@ def surprise():
                             all_items.append(cheeses[0])
 
                 if not toppings:
-                    available_toppings = MenuItem.query.filter_by(
-                        is_available=True, category="topping"
-                    ).all()
+                    available_toppings = catalog.in_category(
+                        "topping", available_only=True
+                    )
                     if available_toppings:
                         toppings.append(random.choice(available_toppings))
                         all_items.append(toppings[0])
 
                 if not sauces:
-                    available_sauces = MenuItem.query.filter_by(
-                        is_available=True, category="sauce"
-                    ).all()
+                    available_sauces = catalog.in_category("sauce", available_only=True)
                     if available_sauces:
                         sauces.append(random.choice(available_sauces))
                         all_items.append(sauces[0])
@@ -168,7 +157,7 @@ def surprise():
 
                     return jsonify(
                         {
-                            "burger_name": chosen_burger["name"],
+                            "burger_name": chosen_burger.name,
                             "bun": to_dict(bun),
                             "patty": to_dict(patty),
                             "cheeses": [to_dict(c) for c in cheeses],
@@ -182,7 +171,7 @@ def surprise():
                     )
 
     # Fall back to building from ingredients (original logic)
-    items = MenuItem.query.filter_by(is_available=True).all()
+    items = [item for item in catalog.items if item.is_available]
     if not items:
         return jsonify({"error": "No available ingredients"}), 404
 
@@ -204,7 +193,7 @@ def surprise():
         )
 
     # --- Apply user dietary preferences to ingredient selection ---
-    def is_veggie_patty(p: MenuItem) -> bool:
+    def is_veggie_patty(p: MenuEntry) -> bool:
         name_desc = ((p.name or "") + " " + (p.description or "")).lower()
         return (
             "veg" in name_desc
@@ -224,13 +213,7 @@ def surprise():
             cheeses = healthy_cheeses
         # If filtering removed all cheeses, keep original list to ensure we have at least one
         if not cheeses:
-            cheeses = [
-                c
-                for c in MenuItem.query.filter_by(
-                    is_available=True, category="cheese"
-                ).all()
-                if c
-            ]
+            cheeses = catalog.in_category("cheese", available_only=True)
 
     # Apply gluten-free preference
     if hasattr(current_user, "pref_gluten_free") and current_user.pref_gluten_free:
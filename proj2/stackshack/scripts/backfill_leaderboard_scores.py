@@ -0,0 +1,56 @@
+"""
+Backfill script for the leaderboard_scores table.
+Creates the table if needed and recomputes every daily, weekly, monthly and
+all-time score from the points ledger:
+
+    python scripts/backfill_leaderboard_scores.py
+
+Safe to re-run at any time.
+"""
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import from stackshack
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app
+from database.db import db
+from models.gamification import LeaderboardScore
+from services.leaderboard_service import LeaderboardService
+
+
+def backfill_leaderboard_scores():
+    """Rebuild leaderboard_scores from points_transactions"""
+    app = create_app("development")
+
+    with app.app_context():
+        print("=" * 80)
+        print("BACKFILLING LEADERBOARD SCORES")
+        print("=" * 80)
+
+        try:
+            LeaderboardScore.__table__.create(db.engine, checkfirst=True)
+            print("\n[+] leaderboard_scores table is present")
+
+            rows = LeaderboardService.rebuild()
+            db.session.commit()
+            print(f"  ✓ {rows} score rows written")
+
+            print("\n" + "=" * 80)
+            print("BACKFILL COMPLETE")
+            print("=" * 80)
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n[ERROR] Backfill failed: {str(e)}")
+            return False
+
+
+if __name__ == "__main__":
+    success = backfill_leaderboard_scores()
+    if success:
+        print("\n✓ Leaderboard backfill completed successfully!")
+    else:
+        print("\n✗ Backfill failed. Please check the error messages above.")
@@ -0,0 +1,64 @@
+"""
+Backfill script for the user_stats table.
+Creates the table if needed and rebuilds every user's badge counters
+from their order history. Safe to re-run at any time.
+"""
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import from stackshack
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app
+from database.db import db
+from models.gamification import UserStats
+from models.order import Order
+from services.user_stats_service import UserStatsService
+
+BATCH_SIZE = 200
+
+
+def backfill_user_stats():
+    """Rebuild UserStats for every user who has placed an order"""
+    app = create_app("development")
+
+    with app.app_context():
+        print("=" * 80)
+        print("BACKFILLING USER STATS")
+        print("=" * 80)
+
+        try:
+            UserStats.__table__.create(db.engine, checkfirst=True)
+            print("\n[+] user_stats table is present")
+
+            user_ids = [
+                user_id
+                for (user_id,) in db.session.query(Order.user_id).distinct().all()
+            ]
+            print(f"\n[+] Rebuilding stats for {len(user_ids)} users...")
+
+            for index, user_id in enumerate(user_ids, start=1):
+                UserStatsService.rebuild(user_id)
+                if index % BATCH_SIZE == 0:
+                    db.session.commit()
+                    print(f"  ✓ {index}/{len(user_ids)}")
+            db.session.commit()
+
+            print("\n" + "=" * 80)
+            print("BACKFILL COMPLETE")
+            print("=" * 80)
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n[ERROR] Backfill failed: {str(e)}")
+            return False
+
+
+if __name__ == "__main__":
+    success = backfill_user_stats()
+    if success:
+        print("\n✓ User stats backfill completed successfully!")
+    else:
+        print("\n✗ Backfill failed. Please check the error messages above.")
@@ -0,0 +1,149 @@
+"""
+Migration script for composite indexes on the hot query shapes.
+Creates the multi-column indexes declared on the models (orders by user and
+date, order items by order, ledgers by user and date, transactions by order
+and status, ...) and the unique indexes the code already relies on, such as
+one progress row per user per challenge. Unique indexes are skipped, with the offending keys
+listed, while duplicate rows exist. Safe to re-run at any time.
+"""
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import from stackshack
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import func, inspect
+
+from app import create_app
+from database.db import db
+from models.gamification import (
+    Coupon,
+    DailyBonus,
+    PointsTransaction,
+    UserBadge,
+    UserChallengeProgress,
+    WeeklyChallenge,
+)
+from models.order import Order, OrderItem
+from models.payment import Transaction
+from models.shift import ShiftAssignment
+
+MODELS = [
+    Order,
+    OrderItem,
+    PointsTransaction,
+    Transaction,
+    UserChallengeProgress,
+    Coupon,
+    ShiftAssignment,
+    DailyBonus,
+]
+
+# Uniqueness older databases may be missing, enforced as a unique index
+UNIQUE_KEYS = [
+    (UserBadge, "unique_user_badge", ("user_id", "badge_id")),
+    (DailyBonus, "unique_daily_bonus_condition", ("bonus_date", "condition")),
+    (
+        WeeklyChallenge,
+        "unique_weekly_challenge_condition",
+        ("week_start", "condition"),
+    ),
+]
+
+
+def duplicate_keys(table, columns):
+    """Key values that appear on more than one row (NULL keys never clash)"""
+    key = [table.c[name] for name in columns]
+    return (
+        db.session.query(*key)
+        .filter(*[column.isnot(None) for column in key])
+        .group_by(*key)
+        .having(func.count() > 1)
+        .all()
+    )
+
+
+def has_key(inspector, table_name, columns, unique=False):
+    """Whether an index or unique constraint already covers exactly columns"""
+    for index in inspector.get_indexes(table_name):
+        if tuple(index["column_names"]) == tuple(columns) and (
+            index["unique"] or not unique
+        ):
+            return True
+    for constraint in inspector.get_unique_constraints(table_name):
+        if tuple(constraint["column_names"]) == tuple(columns):
+            return True
+    return False
+
+
+def create_index(inspector, index):
+    """Create one index unless present; returns False if duplicates block it"""
+    table = index.table
+    columns = tuple(column.name for column in index.columns)
+    if has_key(inspector, table.name, columns, unique=index.unique):
+        print(f"  = {index.name} already present")
+        return True
+
+    if index.unique:
+        duplicates = duplicate_keys(table, columns)
+        if duplicates:
+            print(
+                f"  ! {index.name} skipped: {len(duplicates)} duplicate "
+                f"{columns} keys, e.g. {tuple(duplicates[0])}"
+            )
+            return False
+
+    index.create(db.engine)
+    print(f"  + {index.name} on {table.name} {columns}")
+    return True
+
+
+def migrate_composite_indexes():
+    """Create every composite index declared on the hot tables"""
+    app = create_app("development")
+
+    with app.app_context():
+        print("=" * 80)
+        print("MIGRATING COMPOSITE INDEXES")
+        print("=" * 80)
+
+        try:
+            inspector = inspect(db.engine)
+            complete = True
+
+            for model in MODELS:
+                print(f"\n[+] {model.__tablename__}")
+                for index in sorted(model.__table__.indexes, key=lambda i: i.name):
+                    if len(index.columns) > 1:
+                        complete &= create_index(inspector, index)
+
+            for model, name, columns in UNIQUE_KEYS:
+                print(f"\n[+] {model.__tablename__} uniqueness")
+                index = db.Index(
+                    name, *[model.__table__.c[c] for c in columns], unique=True
+                )
+                complete &= create_index(inspector, index)
+                # Keep the model's own UniqueConstraint as the declared schema
+                model.__table__.indexes.discard(index)
+
+            print("\n" + "=" * 80)
+            if complete:
+                print("MIGRATION COMPLETE")
+            else:
+                print("MIGRATION INCOMPLETE - remove the duplicates and re-run")
+            print("=" * 80)
+            return complete
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n[ERROR] Migration failed: {str(e)}")
+            return False
+
+
+if __name__ == "__main__":
+    success = migrate_composite_indexes()
+    if success:
+        print("\n✓ Composite index migration completed successfully!")
+    else:
+        print("\n✗ Migration failed. Please check the error messages above.")
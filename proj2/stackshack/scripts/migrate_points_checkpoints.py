@@ -0,0 +1,78 @@
+"""
+Migration script for checkpointed points balances.
+Creates the points_checkpoints table and the (user_id, id) index on
+points_transactions, writes an initial checkpoint for every user with a
+ledger, and reconciles users.total_points. Safe to re-run at any time.
+"""
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import from stackshack
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app
+from database.db import db
+from models.gamification import PointsCheckpoint, PointsTransaction
+from services.points_ledger_service import PointsLedgerService
+
+BATCH_SIZE = 200
+
+
+def migrate_points_checkpoints():
+    """Create checkpoint storage and seed one checkpoint per user"""
+    app = create_app("development")
+
+    with app.app_context():
+        print("=" * 80)
+        print("MIGRATING POINTS CHECKPOINTS")
+        print("=" * 80)
+
+        try:
+            PointsCheckpoint.__table__.create(db.engine, checkfirst=True)
+            print("\n[+] points_checkpoints table is present")
+
+            for index in PointsTransaction.__table__.indexes:
+                index.create(db.engine, checkfirst=True)
+            print("[+] points_transactions (user_id, id) index is present")
+
+            user_ids = [
+                user_id
+                for (user_id,) in db.session.query(PointsTransaction.user_id)
+                .distinct()
+                .all()
+            ]
+            print(f"\n[+] Writing checkpoints for {len(user_ids)} users...")
+
+            for position, user_id in enumerate(user_ids, start=1):
+                PointsLedgerService.write_checkpoint(
+                    user_id, PointsLedgerService.latest_checkpoint(user_id)
+                )
+                if position % BATCH_SIZE == 0:
+                    db.session.commit()
+                    print(f"  ✓ {position}/{len(user_ids)}")
+            db.session.commit()
+
+            result = PointsLedgerService.verify_balances()
+            print(
+                f"\n[+] Checked {result['checked']} users, "
+                f"fixed {len(result['mismatches'])} cached totals"
+            )
+
+            print("\n" + "=" * 80)
+            print("MIGRATION COMPLETE")
+            print("=" * 80)
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n[ERROR] Migration failed: {str(e)}")
+            return False
+
+
+if __name__ == "__main__":
+    success = migrate_points_checkpoints()
+    if success:
+        print("\n✓ Points checkpoint migration completed successfully!")
+    else:
+        print("\n✗ Migration failed. Please check the error messages above.")
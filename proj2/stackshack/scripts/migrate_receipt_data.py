@@ -0,0 +1,138 @@
+"""
+Migration script for structured receipts.
+Adds the receipt_data column to the receipts table, then rebuilds every
+receipt that only has stored HTML as structured data from its transaction
+and order items and clears the HTML, which is most of the table's size.
+Receipts whose transaction is gone keep their HTML. Also indexes
+generated_at for date-range exports. Safe to re-run.
+"""
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import from stackshack
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import inspect, text
+
+from app import create_app
+from database.db import db
+from models.order import OrderItem
+from models.payment import Receipt, Transaction
+from services.receipt_service import ReceiptService
+
+BATCH_SIZE = 500
+
+
+def add_column():
+    """Add receipts.receipt_data unless present"""
+    columns = [col["name"] for col in inspect(db.engine).get_columns("receipts")]
+    if "receipt_data" in columns:
+        print("  = receipt_data already present")
+        return
+    db.session.execute(text("ALTER TABLE receipts ADD COLUMN receipt_data JSON NULL"))
+    db.session.commit()
+    print("  + receipt_data on receipts")
+
+
+def add_index():
+    """Index receipts.generated_at unless present"""
+    index = next(
+        index
+        for index in Receipt.__table__.indexes
+        if [column.name for column in index.columns] == ["generated_at"]
+    )
+    existing = [i["name"] for i in inspect(db.engine).get_indexes("receipts")]
+    if index.name in existing:
+        print(f"  = {index.name} already present")
+        return
+    index.create(db.engine)
+    print(f"  + {index.name} on receipts (generated_at)")
+
+
+def convert_batch(after_id):
+    """
+    Convert up to BATCH_SIZE HTML-only receipts with id > after_id.
+
+    Returns:
+        tuple: (last receipt id seen or None when done, receipts converted)
+    """
+    receipts = (
+        Receipt.query.filter(Receipt.id > after_id, Receipt.receipt_data.is_(None))
+        .order_by(Receipt.id)
+        .limit(BATCH_SIZE)
+        .all()
+    )
+    if not receipts:
+        return None, 0
+
+    transactions = {
+        transaction.id: transaction
+        for transaction in Transaction.query.filter(
+            Transaction.id.in_({receipt.transaction_id for receipt in receipts})
+        )
+    }
+    items = {}
+    for item in (
+        OrderItem.query.filter(
+            OrderItem.order_id.in_({receipt.order_id for receipt in receipts})
+        )
+        .order_by(OrderItem.id)
+        .all()
+    ):
+        items.setdefault(item.order_id, []).append(item)
+
+    converted = 0
+    for receipt in receipts:
+        transaction = transactions.get(receipt.transaction_id)
+        if transaction is None:
+            continue
+        receipt.receipt_data = ReceiptService.build_data(
+            transaction, items.get(receipt.order_id, [])
+        )
+        receipt.receipt_html = None
+        converted += 1
+    db.session.commit()
+    return receipts[-1].id, converted
+
+
+def migrate_receipt_data():
+    """Add receipt_data and convert HTML-only receipts"""
+    app = create_app("development")
+
+    with app.app_context():
+        print("=" * 80)
+        print("MIGRATING RECEIPTS TO STRUCTURED DATA")
+        print("=" * 80)
+
+        try:
+            print("\n[+] receipts")
+            add_column()
+            add_index()
+
+            print("\n[+] Converting HTML-only receipts")
+            after_id, total = 0, 0
+            while True:
+                after_id, converted = convert_batch(after_id)
+                if after_id is None:
+                    break
+                total += converted
+                print(f"  ✓ {total} converted (through receipt {after_id})")
+
+            print("\n" + "=" * 80)
+            print(f"MIGRATION COMPLETE - {total} receipts converted")
+            print("=" * 80)
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n[ERROR] Migration failed: {str(e)}")
+            return False
+
+
+if __name__ == "__main__":
+    success = migrate_receipt_data()
+    if success:
+        print("\n✓ Receipt data migration completed successfully!")
+    else:
+        print("\n✗ Migration failed. Please check the error messages above.")
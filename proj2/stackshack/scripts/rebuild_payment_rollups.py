@@ -0,0 +1,75 @@
+"""
+Rebuild script for the payment_rollups table.
+Creates the table if needed and recomputes the hourly payment totals from
+the transactions table, either for everything or for a date range:
+
+    python scripts/rebuild_payment_rollups.py
+    python scripts/rebuild_payment_rollups.py --from 2024-03-01 --to 2024-03-31
+
+Safe to re-run at any time.
+"""
+
+import argparse
+import sys
+import os
+
+# Add the parent directory to the path so we can import from stackshack
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from datetime import date
+
+from app import create_app
+from database.db import db
+from models.payment import PaymentRollup
+from services.payment_rollup_service import PaymentRollupService
+from services.receipt_export import day_range
+
+
+def rebuild_payment_rollups(first_day=None, last_day=None):
+    """Recompute rollups for the inclusive date range, or for all time"""
+    app = create_app("development")
+
+    with app.app_context():
+        print("=" * 80)
+        print("REBUILDING PAYMENT ROLLUPS")
+        print("=" * 80)
+
+        try:
+            PaymentRollup.__table__.create(db.engine, checkfirst=True)
+            print("\n[+] payment_rollups table is present")
+
+            start = end = None
+            if first_day:
+                start, end = day_range(first_day, last_day or first_day)
+                print(
+                    f"\n[+] Rebuilding {start:%Y-%m-%d} to {end:%Y-%m-%d} (exclusive)"
+                )
+            else:
+                print("\n[+] Rebuilding all time")
+
+            rows = PaymentRollupService.rebuild(start, end)
+            db.session.commit()
+            print(f"  ✓ {rows} rollup rows written")
+
+            print("\n" + "=" * 80)
+            print("REBUILD COMPLETE")
+            print("=" * 80)
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n[ERROR] Rebuild failed: {str(e)}")
+            return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--from", dest="start", type=date.fromisoformat)
+    parser.add_argument("--to", dest="end", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    success = rebuild_payment_rollups(args.start, args.end)
+    if success:
+        print("\n✓ Payment rollup rebuild completed successfully!")
+    else:
+        print("\n✗ Rebuild failed. Please check the error messages above.")
@@ -0,0 +1,67 @@
+"""
+Replay script for gamification over historical orders.
+Runs every paid order through GamificationService.process_orders_batch in
+order-id chunks. Orders that were never awarded get their points, badges and
+challenges; already-awarded orders are re-checked for badges only, which
+applies badge rule changes to past orders. Safe to re-run at any time.
+"""
+
+import sys
+import os
+
+# Add the parent directory to the path so we can import from stackshack
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app
+from database.db import db
+from models.order import Order
+from services.gamification_service import GamificationService
+from services.user_stats_service import UNPAID_STATUSES
+
+BATCH_SIZE = 500
+
+
+def replay_gamification():
+    """Replay gamification for every paid order"""
+    app = create_app("development")
+
+    with app.app_context():
+        print("=" * 80)
+        print("REPLAYING GAMIFICATION")
+        print("=" * 80)
+
+        try:
+            order_ids = [
+                order_id
+                for (order_id,) in db.session.query(Order.id)
+                .filter(Order.status.notin_(UNPAID_STATUSES))
+                .order_by(Order.id)
+                .all()
+            ]
+            print(f"\n[+] Replaying {len(order_ids)} paid orders...")
+
+            awarded_points = 0
+            for start in range(0, len(order_ids), BATCH_SIZE):
+                chunk = order_ids[start : start + BATCH_SIZE]
+                results = GamificationService.process_orders_batch(chunk, replay=True)
+                awarded_points += sum(result["points"] for result in results.values())
+                print(f"  ✓ {start + len(chunk)}/{len(order_ids)}")
+
+            print(f"\n[+] Awarded {awarded_points} points")
+            print("\n" + "=" * 80)
+            print("REPLAY COMPLETE")
+            print("=" * 80)
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n[ERROR] Replay failed: {str(e)}")
+            return False
+
+
+if __name__ == "__main__":
+    success = replay_gamification()
+    if success:
+        print("\n✓ Gamification replay completed successfully!")
+    else:
+        print("\n✗ Replay failed. Please check the error messages above.")
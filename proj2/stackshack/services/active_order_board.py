@@ -0,0 +1,232 @@
+"""
+Active Order Board - In-memory working set of the orders staff still act on.
+
+Orders that are not Delivered or Cancelled are loaded with one query on the
+(status, ordered_at) index the first time the board is used in a process,
+then kept current by the controllers that change order status. Every change
+bumps a version number, so the manage page and kitchen displays can ask for
+just the orders that changed since the version they already have.
+
+The board lives in the app's extensions, one per process; it is re-seeded
+from the database after RESEED_AFTER seconds so changes made by other
+processes show up eventually.
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select
+
+from database.db import db
+from models.order import Order, OrderItem
+
+ACTIVE_STATUSES = ("Pending", "Paid", "Priority", "Preparing", "Ready for Pickup")
+RESEED_AFTER = 300  # seconds
+LOG_SIZE = 1000  # changes kept for delta requests
+
+BoardOrder = namedtuple(
+    "BoardOrder", ["id", "user_id", "status", "total_price", "ordered_at", "items"]
+)
+BoardItem = namedtuple(
+    "BoardItem", ["name", "quantity", "price", "burger_index", "burger_name"]
+)
+
+
+def _sort_key(order):
+    """Skip-the-queue orders first, then oldest first (undated ones first)"""
+    return (order.status != "Priority", order.ordered_at or datetime.min, order.id)
+
+
+def _board_item(item):
+    """BoardItem from an OrderItem or an order item row dict"""
+    if isinstance(item, dict):
+        return BoardItem(*(item.get(field) for field in BoardItem._fields))
+    return BoardItem(*(getattr(item, field) for field in BoardItem._fields))
+
+
+def to_dict(order):
+    """Compact JSON form of a board order"""
+    return {
+        "id": order.id,
+        "user_id": order.user_id,
+        "status": order.status,
+        "total_price": float(order.total_price),
+        "ordered_at": order.ordered_at.isoformat() if order.ordered_at else None,
+        "items": [
+            [item.burger_index, item.name, item.quantity] for item in order.items
+        ],
+    }
+
+
+class ActiveOrderBoard:
+    """Non-terminal orders, ordered by priority and age, with a change log"""
+
+    def __init__(self, version=0):
+        self.lock = threading.Lock()
+        self.orders = {}
+        self.version = version
+        # Delta requests older than this need a full snapshot
+        self.base_version = version
+        self.changes = deque(maxlen=LOG_SIZE)  # (version, order_id)
+        self.seeded_at = None
+
+    def seed(self):
+        """Load every active order and its items in one query"""
+        rows = db.session.execute(
+            select(
+                Order.id,
+                Order.user_id,
+                Order.status,
+                Order.total_price,
+                Order.ordered_at,
+                OrderItem.name,
+                OrderItem.quantity,
+                OrderItem.price,
+                OrderItem.burger_index,
+                OrderItem.burger_name,
+            )
+            .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+            .where(Order.status.in_(ACTIVE_STATUSES))
+            .order_by(Order.id, OrderItem.id)
+        ).all()
+
+        orders = {}
+        for row in rows:
+            order = orders.get(row[0])
+            if order is None:
+                order = orders[row[0]] = BoardOrder(*row[:5], [])
+            if row[5] is not None:
+                order.items.append(BoardItem(*row[5:]))
+
+        with self.lock:
+            self.orders = orders
+            self.version += 1
+            self.base_version = self.version
+            self.changes.clear()
+            self.seeded_at = time.monotonic()
+
+    def record(self, order, items=None):
+        """
+        Apply a committed order change: keep active orders, drop the rest.
+
+        Args:
+            order: The Order after its status change was committed
+            items: Its items, if at hand (OrderItems or row dicts); loaded
+                with one query when the order is new to the board
+        """
+        active = order.status in ACTIVE_STATUSES
+        with self.lock:
+            known = self.orders.get(order.id)
+        if active and items is None and known is None:
+            items = order.items.all()
+
+        with self.lock:
+            if active:
+                self.orders[order.id] = BoardOrder(
+                    order.id,
+                    order.user_id,
+                    order.status,
+                    order.total_price,
+                    order.ordered_at,
+                    (
+                        [_board_item(item) for item in items]
+                        if items is not None
+                        else known.items
+                    ),
+                )
+            elif self.orders.pop(order.id, None) is None:
+                return self.version
+            self.version += 1
+            self.changes.append((self.version, order.id))
+            return self.version
+
+    def apply_statuses(self, changes):
+        """
+        Apply committed status changes for orders already on the board.
+
+        Args:
+            changes: list of (order_id, status)
+        """
+        with self.lock:
+            for order_id, status in changes:
+                known = self.orders.get(order_id)
+                if known is None:
+                    # Not on this process's board; the next seed picks it up
+                    continue
+                if status in ACTIVE_STATUSES:
+                    self.orders[order_id] = known._replace(status=status)
+                else:
+                    del self.orders[order_id]
+                self.version += 1
+                self.changes.append((self.version, order_id))
+            return self.version
+
+    def snapshot(self):
+        """Every active order, by priority and age"""
+        with self.lock:
+            return self.version, sorted(self.orders.values(), key=_sort_key)
+
+    def to_dict(self, since=None):
+        """
+        JSON snapshot of the board, or only what changed since a version.
+
+        Returns:
+            dict: version and full (bool). A full snapshot lists every order
+                under orders; a delta lists changed orders under orders and
+                the ids that left the board under removed.
+        """
+        with self.lock:
+            oldest = self.changes[0][0] if self.changes else self.version + 1
+            if (
+                since is None
+                or since > self.version
+                or since < self.base_version
+                or since < oldest - 1
+            ):
+                orders = sorted(self.orders.values(), key=_sort_key)
+                return {
+                    "version": self.version,
+                    "full": True,
+                    "orders": [to_dict(order) for order in orders],
+                }
+
+            changed = {
+                order_id for version, order_id in self.changes if version > since
+            }
+            orders = sorted(
+                (self.orders[i] for i in changed if i in self.orders), key=_sort_key
+            )
+            return {
+                "version": self.version,
+                "full": False,
+                "orders": [to_dict(order) for order in orders],
+                "removed": sorted(i for i in changed if i not in self.orders),
+            }
+
+    @staticmethod
+    def current():
+        """Get this process's board, seeding it on first use or when stale"""
+        board = current_app.extensions.get("active_order_board")
+        if board is None:
+            board = ActiveOrderBoard()
+            current_app.extensions["active_order_board"] = board
+        if board.seeded_at is None or time.monotonic() - board.seeded_at > RESEED_AFTER:
+            board.seed()
+        return board
+
+    @staticmethod
+    def record_order(order, items=None):
+        """Apply an order change to the board if this process has one"""
+        board = current_app.extensions.get("active_order_board")
+        if board is not None and board.seeded_at is not None:
+            board.record(order, items)
+
+    @staticmethod
+    def record_statuses(changes):
+        """Apply (order_id, status) changes to the board if this process has one"""
+        board = current_app.extensions.get("active_order_board")
+        if board is not None and board.seeded_at is not None:
+            board.apply_statuses(changes)
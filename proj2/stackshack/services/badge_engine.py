@@ -0,0 +1,384 @@
+"""
+Badge Engine - Evaluates every badge rule for a user in a constant number of queries.
+
+The user's order history is read from their UserStats counters (distinct
+sauces and patties tried, order counts per local hour bucket, surprise-box
+orders, repeat burger counts), the badge catalog and the user's earned badges
+are preloaded once, and all rules are then evaluated in memory.
+"""
+
+from sqlalchemy import func
+
+from database.db import db
+from models.gamification import Badge, PointsTransaction, UserBadge
+from models.order import OrderItem
+from models.user import User
+from services.leaderboard_service import LeaderboardService
+from services.menu_catalog import MenuCatalog
+from services.rewards_snapshot import RewardsSnapshot
+from services.user_stats_service import UserStatsService
+
+VEGGIE_KEYWORDS = ["lettuce", "tomato", "onion", "pickles", "capsicum"]
+SPICY_KEYWORDS = ["spicy", "hot", "jalapeno", "pepper", "chili"]
+
+
+def _sauce_collector(history, current):
+    """Tried every available sauce"""
+    total = history["available_sauces"]
+    return total > 0 and len(history["sauces_tried"]) >= total
+
+
+def _veggie_champion(history, current):
+    """Ordered 4+ vegetables in this order"""
+    veggie_count = sum(
+        1
+        for name in current["item_names"]
+        if any(veg in name for veg in VEGGIE_KEYWORDS)
+    )
+    return veggie_count >= 4
+
+
+def _carnivore_king(history, current):
+    """Tried every available patty"""
+    total = history["available_patties"]
+    return total > 0 and len(history["patties_tried"]) >= total
+
+
+def _brave_soul(history, current):
+    """Ordered something spicy in this order"""
+    return any(
+        any(keyword in name for keyword in SPICY_KEYWORDS)
+        for name in current["item_names"]
+    )
+
+
+def _classic_lover(history, current):
+    """Ordered the same named burger 5+ times"""
+    burger_name = current["burger_name"]
+    if not burger_name:
+        return False
+    return history["burger_counts"].get(burger_name, 0) >= 5
+
+
+class BadgeEngine:
+    """Set-based badge evaluation over aggregated order history"""
+
+    # Every badge the engine knows about, in evaluation order.
+    # "check" receives (history, current_order) dicts and returns True when earned.
+    # "progress" maps history to (current, target), or is None for badges
+    # decided by a single order.
+    BADGE_RULES = [
+        {
+            "slug": "sauce_collector",
+            "name": "Sauce Collector",
+            "description": "Tried all sauces",
+            "badge_type": "ingredient",
+            "icon": "🏆",
+            "points": 50,
+            "check": _sauce_collector,
+            "progress": lambda history: (
+                len(history["sauces_tried"]),
+                history["available_sauces"],
+            ),
+        },
+        {
+            "slug": "veggie_champion",
+            "name": "Veggie Champion",
+            "description": "Ordered 4+ vegetables",
+            "badge_type": "ingredient",
+            "icon": "🏆",
+            "points": 75,
+            "check": _veggie_champion,
+            "progress": None,
+        },
+        {
+            "slug": "carnivore_king",
+            "name": "Carnivore King",
+            "description": "Tried all patty options",
+            "badge_type": "ingredient",
+            "icon": "🏆",
+            "points": 100,
+            "check": _carnivore_king,
+            "progress": lambda history: (
+                len(history["patties_tried"]),
+                history["available_patties"],
+            ),
+        },
+        {
+            "slug": "brave_soul",
+            "name": "Brave Soul",
+            "description": "Ordered spiciest ingredients",
+            "badge_type": "ingredient",
+            "icon": "🏆",
+            "points": 50,
+            "check": _brave_soul,
+            "progress": None,
+        },
+        {
+            "slug": "classic_lover",
+            "name": "Classic Lover",
+            "description": "Ordered same burger 5+ times",
+            "badge_type": "behavioral",
+            "icon": "🏆",
+            "points": 60,
+            "check": _classic_lover,
+            "progress": lambda history: (
+                max(history["burger_counts"].values(), default=0),
+                5,
+            ),
+        },
+        {
+            "slug": "lunch_rush_warrior",
+            "name": "Lunch Rush Warrior",
+            "description": "10 orders between 12-1 PM",
+            "badge_type": "behavioral",
+            "icon": "⭐",
+            "points": 100,
+            "check": lambda history, current: history["lunch_orders"] >= 10,
+            "progress": lambda history: (history["lunch_orders"], 10),
+        },
+        {
+            "slug": "early_bird",
+            "name": "Early Bird",
+            "description": "5 orders before 11 AM",
+            "badge_type": "behavioral",
+            "icon": "⭐",
+            "points": 75,
+            "check": lambda history, current: history["early_orders"] >= 5,
+            "progress": lambda history: (history["early_orders"], 5),
+        },
+        {
+            "slug": "late_night_snacker",
+            "name": "Late Night Snacker",
+            "description": "5 orders after 8 PM",
+            "badge_type": "behavioral",
+            "icon": "⭐",
+            "points": 75,
+            "check": lambda history, current: history["late_orders"] >= 5,
+            "progress": lambda history: (history["late_orders"], 5),
+        },
+        {
+            "slug": "stackshack_regular",
+            "name": "StackShack Regular",
+            "description": "20 total orders",
+            "badge_type": "behavioral",
+            "icon": "⭐",
+            "points": 150,
+            "check": lambda history, current: history["order_count"] >= 20,
+            "progress": lambda history: (history["order_count"], 20),
+        },
+        {
+            "slug": "century_club",
+            "name": "Century Club",
+            "description": "100 total orders",
+            "badge_type": "behavioral",
+            "icon": "⭐",
+            "points": 500,
+            "check": lambda history, current: history["order_count"] >= 100,
+            "progress": lambda history: (history["order_count"], 100),
+        },
+        {
+            "slug": "mystery_box_master",
+            "name": "Mystery Box Master",
+            "description": "5 surprise box orders",
+            "badge_type": "behavioral",
+            "icon": "⭐",
+            "points": 80,
+            "check": lambda history, current: history["surprise_orders"] >= 5,
+            "progress": lambda history: (history["surprise_orders"], 5),
+        },
+    ]
+
+    @staticmethod
+    def load_history(user_id):
+        """
+        Load a user's behavioral counters plus the catalog sizes rules compare to.
+
+        Counters come from the user's UserStats row and catalog sizes from the
+        cached menu, so this is one query regardless of how many orders the
+        user has.
+
+        Returns:
+            dict: UserStatsService.get_history fields plus available_sauces
+                and available_patties
+        """
+        return BadgeEngine.load_histories([user_id])[user_id]
+
+    @staticmethod
+    def load_histories(user_ids):
+        """
+        Load histories for many users in one query plus the menu catalog.
+
+        Returns:
+            dict: user_id -> history dict as returned by load_history
+        """
+        histories = UserStatsService.get_histories(user_ids)
+
+        # Size of the sauce and patty catalogs the "try them all" badges compare to
+        catalog = MenuCatalog.current()
+        available_sauces = len(catalog.in_category("sauce", available_only=True))
+        available_patties = len(catalog.in_category("patty", available_only=True))
+        for history in histories.values():
+            history["available_sauces"] = available_sauces
+            history["available_patties"] = available_patties
+
+        return histories
+
+    @staticmethod
+    def badge_progress(user_id):
+        """
+        Report progress toward every history-based badge for a user.
+
+        Returns:
+            list: dicts with slug, name, icon, current and target
+        """
+        history = BadgeEngine.load_history(user_id)
+        progress = []
+        for rule in BadgeEngine.BADGE_RULES:
+            if rule["progress"] is None:
+                continue
+            current, target = rule["progress"](history)
+            progress.append(
+                {
+                    "slug": rule["slug"],
+                    "name": rule["name"],
+                    "icon": rule["icon"],
+                    "current": min(current, target) if target else current,
+                    "target": target,
+                }
+            )
+        return progress
+
+    @staticmethod
+    def describe_order(order):
+        """
+        Collect the features of a single order used by per-order badge rules.
+
+        Returns:
+            dict: item_names (lowercased, one per order line) and burger_name
+                (burger name of the order's first line, if any)
+        """
+        items = (
+            OrderItem.query.filter(OrderItem.order_id == order.id)
+            .order_by(OrderItem.id)
+            .all()
+        )
+        return BadgeEngine.describe_items(items)
+
+    @staticmethod
+    def describe_items(items):
+        """
+        Same as describe_order, for an order's already-loaded OrderItems.
+
+        Args:
+            items: The order's OrderItem objects, ordered by id
+        """
+        return {
+            "item_names": [item.name.lower() for item in items],
+            "burger_name": items[0].burger_name if items else None,
+        }
+
+    @staticmethod
+    def load_catalog():
+        """
+        Load every badge the engine evaluates, creating any missing rows.
+
+        Returns:
+            dict: Badge objects keyed by slug
+        """
+        slugs = [rule["slug"] for rule in BadgeEngine.BADGE_RULES]
+        badges = {b.slug: b for b in Badge.query.filter(Badge.slug.in_(slugs)).all()}
+
+        missing = [
+            rule for rule in BadgeEngine.BADGE_RULES if rule["slug"] not in badges
+        ]
+        for rule in missing:
+            badge = Badge(
+                name=rule["name"],
+                slug=rule["slug"],
+                description=rule["description"],
+                badge_type=rule["badge_type"],
+                icon=rule["icon"],
+            )
+            db.session.add(badge)
+            badges[rule["slug"]] = badge
+        if missing:
+            db.session.flush()
+
+        return badges
+
+    @staticmethod
+    def evaluate(history, current, earned_slugs):
+        """
+        Evaluate all badge rules in memory.
+
+        Args:
+            history: Aggregates from load_history
+            current: Order features from describe_order
+            earned_slugs: Slugs the user already holds
+
+        Returns:
+            list: Rules newly satisfied, in BADGE_RULES order
+        """
+        return [
+            rule
+            for rule in BadgeEngine.BADGE_RULES
+            if rule["slug"] not in earned_slugs and rule["check"](history, current)
+        ]
+
+    @staticmethod
+    def grant_badges(user_id, order):
+        """
+        Check every badge for a user after an order and grant the new ones.
+
+        Badge points are written to the ledger and the cached total in the same
+        commit as the badges themselves.
+
+        Returns:
+            list: Newly earned Badge objects
+        """
+        user = db.session.get(User, user_id)
+        if not user:
+            return []
+
+        catalog = BadgeEngine.load_catalog()
+        earned_ids = {
+            badge_id
+            for (badge_id,) in db.session.query(UserBadge.badge_id).filter_by(
+                user_id=user_id
+            )
+        }
+        earned_slugs = {
+            slug for slug, badge in catalog.items() if badge.id in earned_ids
+        }
+
+        history = BadgeEngine.load_history(user_id)
+        current = BadgeEngine.describe_order(order)
+
+        newly_earned = []
+        awarded = 0
+        for rule in BadgeEngine.evaluate(history, current, earned_slugs):
+            badge = catalog[rule["slug"]]
+            db.session.add(
+                UserBadge(user_id=user_id, badge_id=badge.id, order_id=order.id)
+            )
+            if rule["points"] > 0:
+                db.session.add(
+                    PointsTransaction(
+                        user_id=user_id,
+                        points=rule["points"],
+                        event_type="badge_earned",
+                        description=f"Badge earned: {rule['name']}",
+                        order_id=order.id,
+                    )
+                )
+                awarded += rule["points"]
+            newly_earned.append(badge)
+
+        if awarded:
+            # Added in the database, so parallel requests add up
+            user.total_points = func.coalesce(User.total_points, 0) + awarded
+            LeaderboardService.record(user_id, awarded)
+        db.session.commit()
+        RewardsSnapshot.invalidate(user_id)
+        return newly_earned
@@ -0,0 +1,141 @@
+"""
+Burger Index - Predefined burgers resolved against the menu catalog.
+
+PREDEFINED_BURGERS is resolved once per menu catalog snapshot: every burger
+gets its ingredient ids, price, calories and protein, and burgers are indexed
+by slug and by dietary-tag bitmask. Recommendations, the surprise box and
+add-to-cart look burgers up here instead of scanning the list, and only check
+stock against the current snapshot.
+"""
+
+from collections import namedtuple
+from types import MappingProxyType
+
+from flask import current_app
+
+from data_burgers import PREDEFINED_BURGERS
+from services.menu_catalog import MenuCatalog
+
+DIETARY_TAGS = ("no_preference", "vegan", "gluten_free", "low_calorie", "high_protein")
+TAG_BITS = {tag: 1 << position for position, tag in enumerate(DIETARY_TAGS)}
+
+BurgerEntry = namedtuple(
+    "BurgerEntry",
+    [
+        "slug",
+        "name",
+        "description",
+        "ingredients",
+        "dietary_tags",
+        "image",
+        "mask",
+        "ingredient_ids",
+        "missing",
+        "price",
+        "calories",
+        "protein",
+    ],
+)
+
+
+def tag_mask(tags):
+    """Bitmask for a list of dietary tags (unknown tags are ignored)"""
+    mask = 0
+    for tag in tags:
+        mask |= TAG_BITS.get(tag, 0)
+    return mask
+
+
+def resolve(definition, snapshot):
+    """
+    Resolve a burger definition's ingredients against a menu snapshot.
+
+    Returns:
+        BurgerEntry: price, calories and protein are None when an ingredient
+            is missing from the menu; missing lists those ingredient names
+    """
+    menu_items = [snapshot.named(name) for name in definition["ingredients"]]
+    missing = tuple(
+        name
+        for name, menu_item in zip(definition["ingredients"], menu_items)
+        if menu_item is None
+    )
+    found = [menu_item for menu_item in menu_items if menu_item is not None]
+
+    return BurgerEntry(
+        slug=definition["slug"],
+        name=definition["name"],
+        description=definition["description"],
+        ingredients=tuple(definition["ingredients"]),
+        dietary_tags=tuple(definition["dietary_tags"]),
+        image=definition["image"],
+        mask=tag_mask(definition["dietary_tags"]),
+        ingredient_ids=tuple(menu_item.id for menu_item in found),
+        missing=missing,
+        price=None if missing else sum(float(item.price) for item in found),
+        calories=None if missing else sum(item.calories or 0 for item in found),
+        protein=None if missing else sum(item.protein or 0 for item in found),
+    )
+
+
+class BurgerIndex:
+    """Predefined burgers keyed by slug and dietary-tag mask"""
+
+    def __init__(self, snapshot, definitions=PREDEFINED_BURGERS):
+        self.snapshot = snapshot
+        self.entries = tuple(
+            resolve(definition, snapshot) for definition in definitions
+        )
+        self.by_slug = MappingProxyType({entry.slug: entry for entry in self.entries})
+
+        by_mask = {}
+        for entry in self.entries:
+            by_mask.setdefault(entry.mask, []).append(entry)
+        self.by_mask = MappingProxyType(
+            {mask: tuple(entries) for mask, entries in by_mask.items()}
+        )
+
+    def with_tags(self, tags):
+        """Burgers tagged with exactly these dietary tags, in definition order"""
+        return self.by_mask.get(tag_mask(tags), ())
+
+    def including(self, tags):
+        """Burgers tagged with at least all of these dietary tags"""
+        mask = tag_mask(tags)
+        return [entry for entry in self.entries if entry.mask & mask == mask]
+
+    def matching_any(self, tags):
+        """Burgers sharing at least one of these dietary tags"""
+        mask = tag_mask(tags)
+        return [entry for entry in self.entries if entry.mask & mask]
+
+    def out_of_stock(self, entry, require_available=False):
+        """
+        Ingredient names of an entry that cannot be served from current stock.
+
+        Args:
+            entry: A BurgerEntry from this index
+            require_available: Also treat items switched off on the menu as
+                out of stock
+        """
+        names = []
+        for item_id in entry.ingredient_ids:
+            menu_item = self.snapshot.get(item_id)
+            if (menu_item.stock_quantity or 0) <= 0 or (
+                require_available and not menu_item.is_available
+            ):
+                names.append(menu_item.name)
+        return names
+
+    @staticmethod
+    def current():
+        """
+        Get the index for the current menu snapshot, rebuilding it if the
+        catalog has changed since it was built.
+        """
+        snapshot = MenuCatalog.current()
+        index = current_app.extensions.get("burger_index")
+        if index is None or index.snapshot is not snapshot:
+            index = BurgerIndex(snapshot)
+            current_app.extensions["burger_index"] = index
+        return index
@@ -5,8 +5,8 @@ Handles logic for selecting and preparing personalized burger recommendations
 based on user dietary preferences.
 """
 
-from data_burgers import PREDEFINED_BURGERS
-from models.menu_item import MenuItem
+from services.burger_index import BurgerIndex, resolve
+from services.menu_catalog import MenuCatalog
 
 
 class BurgerRecommendationService:
@@ -53,9 +53,10 @@ class BurgerRecommendationService:
             float: Total price, or None if any ingredient not found
         """
         total_price = 0.0
+        catalog = MenuCatalog.current()
 
         for ingredient_name in ingredients:
-            menu_item = MenuItem.query.filter_by(name=ingredient_name).first()
+            menu_item = catalog.named(ingredient_name)
             if not menu_item:
                 # Ingredient not found in database
                 return None
@@ -74,36 +75,42 @@ class BurgerRecommendationService:
         Returns:
             Dict with burger data ready for template, or None if price calculation fails
         """
-        price = BurgerRecommendationService.calculate_burger_price(
-            burger_definition["ingredients"]
+        index = BurgerIndex.current()
+        return BurgerRecommendationService._burger_data(
+            resolve(burger_definition, index.snapshot), index
         )
 
-        if price is None:
+    @staticmethod
+    def _burger_data(entry, index):
+        """Template data for an indexed burger, or None if an ingredient is missing"""
+        if entry.missing:
             # Skip burgers with missing ingredients
             return None
 
-        # Check stock availability for all ingredients
-        out_of_stock_items = []
-        is_available = True
-
-        for ingredient_name in burger_definition["ingredients"]:
-            menu_item = MenuItem.query.filter_by(name=ingredient_name).first()
-            if menu_item and menu_item.stock_quantity <= 0:
-                out_of_stock_items.append(ingredient_name)
-                is_available = False
-
+        out_of_stock_items = index.out_of_stock(entry)
         return {
-            "name": burger_definition["name"],
-            "slug": burger_definition["slug"],
-            "description": burger_definition["description"],
-            "ingredients": burger_definition["ingredients"],
-            "dietary_tags": burger_definition["dietary_tags"],
-            "image": burger_definition["image"],
-            "price": price,
-            "is_available": is_available,
+            "name": entry.name,
+            "slug": entry.slug,
+            "description": entry.description,
+            "ingredients": list(entry.ingredients),
+            "dietary_tags": list(entry.dietary_tags),
+            "image": entry.image,
+            "price": entry.price,
+            "is_available": not out_of_stock_items,
             "out_of_stock_items": out_of_stock_items,
         }
 
+    @staticmethod
+    def _burgers_tagged(tags):
+        """Template data for every burger tagged with exactly these tags"""
+        index = BurgerIndex.current()
+        burgers = []
+        for entry in index.with_tags(tags):
+            burger_data = BurgerRecommendationService._burger_data(entry, index)
+            if burger_data:
+                burgers.append(burger_data)
+        return burgers
+
     @staticmethod
     def get_recommendations_for_user(user):
         """
@@ -155,15 +162,12 @@ class BurgerRecommendationService:
         sections = []
 
         # Always show vegan + gluten-free burgers
+        index = BurgerIndex.current()
         vegan_gf_burgers = []
-        for burger in PREDEFINED_BURGERS:
-            if (
-                "vegan" in burger["dietary_tags"]
-                and "gluten_free" in burger["dietary_tags"]
-            ):
-                burger_data = BurgerRecommendationService.prepare_burger_data(burger)
-                if burger_data:
-                    vegan_gf_burgers.append(burger_data)
+        for entry in index.including(["vegan", "gluten_free"]):
+            burger_data = BurgerRecommendationService._burger_data(entry, index)
+            if burger_data:
+                vegan_gf_burgers.append(burger_data)
 
         sections.append(
             {
@@ -175,14 +179,9 @@ class BurgerRecommendationService:
 
         # If they also have low_calorie, add low-calorie section
         if "low_calorie" in all_preferences:
-            low_cal_burgers = []
-            for burger in PREDEFINED_BURGERS:
-                if burger["dietary_tags"] == ["low_calorie"]:
-                    burger_data = BurgerRecommendationService.prepare_burger_data(
-                        burger
-                    )
-                    if burger_data:
-                        low_cal_burgers.append(burger_data)
+            low_cal_burgers = BurgerRecommendationService._burgers_tagged(
+                ["low_calorie"]
+            )
 
             if low_cal_burgers:
                 sections.append(
@@ -195,14 +194,7 @@ class BurgerRecommendationService:
 
         # If they also have high_protein, add high-protein section
         if "high_protein" in all_preferences:
-            hp_burgers = []
-            for burger in PREDEFINED_BURGERS:
-                if burger["dietary_tags"] == ["high_protein"]:
-                    burger_data = BurgerRecommendationService.prepare_burger_data(
-                        burger
-                    )
-                    if burger_data:
-                        hp_burgers.append(burger_data)
+            hp_burgers = BurgerRecommendationService._burgers_tagged(["high_protein"])
 
             if hp_burgers:
                 sections.append(
@@ -218,12 +210,7 @@ class BurgerRecommendationService:
     @staticmethod
     def _get_no_preference_recommendations():
         """Get top picks for users with no dietary preferences"""
-        burgers = []
-        for burger in PREDEFINED_BURGERS:
-            if burger["dietary_tags"] == ["no_preference"]:
-                burger_data = BurgerRecommendationService.prepare_burger_data(burger)
-                if burger_data:
-                    burgers.append(burger_data)
+        burgers = BurgerRecommendationService._burgers_tagged(["no_preference"])
 
         return [
             {
@@ -236,12 +223,7 @@ class BurgerRecommendationService:
     @staticmethod
     def _get_vegan_recommendations():
         """Get recommendations for vegan-only users"""
-        burgers = []
-        for burger in PREDEFINED_BURGERS:
-            if burger["dietary_tags"] == ["vegan"]:
-                burger_data = BurgerRecommendationService.prepare_burger_data(burger)
-                if burger_data:
-                    burgers.append(burger_data)
+        burgers = BurgerRecommendationService._burgers_tagged(["vegan"])
 
         return [
             {
@@ -254,12 +236,7 @@ class BurgerRecommendationService:
     @staticmethod
     def _get_gluten_free_recommendations():
         """Get recommendations for gluten-free-only users"""
-        burgers = []
-        for burger in PREDEFINED_BURGERS:
-            if burger["dietary_tags"] == ["gluten_free"]:
-                burger_data = BurgerRecommendationService.prepare_burger_data(burger)
-                if burger_data:
-                    burgers.append(burger_data)
+        burgers = BurgerRecommendationService._burgers_tagged(["gluten_free"])
 
         return [
             {
@@ -272,12 +249,7 @@ class BurgerRecommendationService:
     @staticmethod
     def _get_low_calorie_recommendations():
         """Get recommendations for low-calorie users"""
-        burgers = []
-        for burger in PREDEFINED_BURGERS:
-            if burger["dietary_tags"] == ["low_calorie"]:
-                burger_data = BurgerRecommendationService.prepare_burger_data(burger)
-                if burger_data:
-                    burgers.append(burger_data)
+        burgers = BurgerRecommendationService._burgers_tagged(["low_calorie"])
 
         return [
             {
@@ -290,12 +262,7 @@ class BurgerRecommendationService:
     @staticmethod
     def _get_high_protein_recommendations():
         """Get recommendations for high-protein users"""
-        burgers = []
-        for burger in PREDEFINED_BURGERS:
-            if burger["dietary_tags"] == ["high_protein"]:
-                burger_data = BurgerRecommendationService.prepare_burger_data(burger)
-                if burger_data:
-                    burgers.append(burger_data)
+        burgers = BurgerRecommendationService._burgers_tagged(["high_protein"])
 
         return [
             {
@@ -339,15 +306,7 @@ class BurgerRecommendationService:
         for pref in preferences:
             if pref in preference_config:
                 config = preference_config[pref]
-                burgers = []
-
-                for burger in PREDEFINED_BURGERS:
-                    if burger["dietary_tags"] == config["tags"]:
-                        burger_data = BurgerRecommendationService.prepare_burger_data(
-                            burger
-                        )
-                        if burger_data:
-                            burgers.append(burger_data)
+                burgers = BurgerRecommendationService._burgers_tagged(config["tags"])
 
                 if burgers:
                     sections.append(
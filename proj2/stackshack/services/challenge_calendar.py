@@ -0,0 +1,183 @@
+"""
+Challenge Calendar - Today's daily bonuses and this week's challenges, in memory.
+
+Challenges are generated ahead of time by the scheduler, which fills the
+next SCHEDULE_WEEKS weeks in one transaction and is safe to run repeatedly
+(e.g. nightly from cron). Run from the stackshack directory:
+    python -m services.challenge_calendar              # next 4 weeks
+    python -m services.challenge_calendar --weeks 8
+
+Read paths ask the calendar, which loads a day's bonuses or a week's
+challenges with one query the first time they are needed and keeps them for
+the rest of that day or week; nothing is generated on a read unless the
+scheduler has not covered the date yet. The calendar lives in the app's
+extensions, one per process, and is cleared whenever this process
+generates challenges.
+"""
+
+import argparse
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import date, timedelta
+
+from flask import current_app
+
+from database.db import db
+from models.gamification import DailyBonus, WeeklyChallenge
+
+MAX_ENTRIES = 16  # days and weeks kept per process
+
+
+class CalendarBonus(
+    namedtuple(
+        "CalendarBonus",
+        ["id", "bonus_date", "description", "condition", "points_reward", "is_active"],
+    )
+):
+    """A daily bonus, detached from any session"""
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "bonus_date": self.bonus_date.isoformat(),
+            "description": self.description,
+            "condition": self.condition,
+            "points_reward": self.points_reward,
+            "is_active": self.is_active,
+        }
+
+
+class CalendarChallenge(
+    namedtuple(
+        "CalendarChallenge",
+        [
+            "id",
+            "week_start",
+            "week_end",
+            "description",
+            "condition",
+            "points_reward",
+            "is_active",
+        ],
+    )
+):
+    """A weekly challenge, detached from any session"""
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "week_start": self.week_start.isoformat(),
+            "week_end": self.week_end.isoformat(),
+            "description": self.description,
+            "condition": self.condition,
+            "points_reward": self.points_reward,
+            "is_active": self.is_active,
+        }
+
+
+class ChallengeCalendar:
+    """Active challenges by day and by week, loaded once each"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # ("daily", day) or ("weekly", monday)
+
+    def get(self, key, load):
+        with self.lock:
+            if key in self.entries:
+                return self.entries[key]
+
+        value = load()
+        if not value:
+            # Not scheduled yet: generate this week and the rest of it
+            from services.challenge_service import ChallengeService
+
+            ChallengeService.schedule(key[1], weeks=1)
+            value = load()
+
+        with self.lock:
+            self.entries[key] = value
+            while len(self.entries) > MAX_ENTRIES:
+                self.entries.popitem(last=False)
+        return value
+
+    def daily(self, day):
+        """Active daily bonuses for a date"""
+
+        def load():
+            rows = (
+                db.session.query(
+                    *[DailyBonus.__table__.c[f] for f in CalendarBonus._fields]
+                )
+                .filter(DailyBonus.bonus_date == day, DailyBonus.is_active)
+                .order_by(DailyBonus.id)
+            )
+            return tuple(CalendarBonus(*row) for row in rows)
+
+        return self.get(("daily", day), load)
+
+    def weekly(self, day):
+        """Active weekly challenges running on a date"""
+
+        def load():
+            table = WeeklyChallenge.__table__
+            rows = (
+                db.session.query(*[table.c[f] for f in CalendarChallenge._fields])
+                .filter(
+                    WeeklyChallenge.week_start <= day,
+                    WeeklyChallenge.week_end >= day,
+                    WeeklyChallenge.is_active,
+                )
+                .order_by(WeeklyChallenge.id)
+            )
+            return tuple(CalendarChallenge(*row) for row in rows)
+
+        monday = day - timedelta(days=day.weekday())
+        return self.get(("weekly", monday), load)
+
+    @staticmethod
+    def current():
+        """Get this process's calendar"""
+        return current_app.extensions.setdefault(
+            "challenge_calendar", ChallengeCalendar()
+        )
+
+    @staticmethod
+    def daily_bonuses(day=None):
+        return ChallengeCalendar.current().daily(day or date.today())
+
+    @staticmethod
+    def weekly_challenges(day=None):
+        return ChallengeCalendar.current().weekly(day or date.today())
+
+    @staticmethod
+    def clear():
+        """Forget everything loaded, e.g. after challenges were generated"""
+        calendar = current_app.extensions.get("challenge_calendar")
+        if calendar is not None:
+            with calendar.lock:
+                calendar.entries.clear()
+
+
+def main():
+    from services.challenge_service import SCHEDULE_WEEKS, ChallengeService
+
+    parser = argparse.ArgumentParser(description="Generate challenges ahead of time")
+    parser.add_argument("--weeks", type=int, default=SCHEDULE_WEEKS)
+    parser.add_argument("--start", type=date.fromisoformat, default=None)
+    parser.add_argument("--config", default="development")
+    args = parser.parse_args()
+
+    from app import create_app
+
+    app = create_app(args.config)
+    with app.app_context():
+        daily, weekly = ChallengeService.schedule(args.start, args.weeks)
+        print(
+            f"Scheduled {daily} daily bonuses and {weekly} weekly challenges "
+            f"over {args.weeks} weeks"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Challenge Conditions - Compiled predicates for daily and weekly challenges.
+
+Every condition in ChallengeService.DAILY_CHALLENGES and WEEKLY_CHALLENGES is
+compiled once at import into a predicate over an order's features (item
+names, menu items per category, healthy flags, nutrition totals and local
+order time). An order is featurized once against the cached menu catalog and
+every active challenge is then checked against the same features.
+"""
+
+import pytz
+
+from services.challenge_service import ChallengeService
+from services.menu_catalog import MenuCatalog
+from services.user_stats_service import LOCAL_TZ
+
+
+def local_order_time(order):
+    """
+    Get an order's time in the restaurant's local timezone.
+
+    Returns:
+        datetime: Localized order time, or None if the order has no timestamp
+    """
+    if not order.ordered_at:
+        return None
+    if order.ordered_at.tzinfo is None:
+        return pytz.utc.localize(order.ordered_at).astimezone(LOCAL_TZ)
+    return order.ordered_at.astimezone(LOCAL_TZ)
+
+
+def featurize(order, items=None, menu_items=None):
+    """
+    Describe an order once for every challenge predicate.
+
+    Args:
+        order: The Order being evaluated
+        items: The order's OrderItems (loaded from the order if omitted)
+        menu_items: Optional mapping menu_item_id -> menu item; defaults to
+            the cached menu catalog
+
+    Returns:
+        dict: names (lowercased item names), categories (category -> set of
+            menu item names), healthy_categories, healthy_count, all_healthy,
+            calories, protein, total, hour, minute, weekday, is_surprise
+    """
+    if items is None:
+        items = order.items.all()
+    if menu_items is None:
+        menu_items = MenuCatalog.current().by_id
+
+    categories = {}
+    healthy_categories = set()
+    healthy_count = 0
+    all_healthy = True
+    calories = 0
+    protein = 0
+    for item in items:
+        menu_item = menu_items.get(item.menu_item_id)
+        if not menu_item:
+            continue
+        category = menu_item.category.lower()
+        categories.setdefault(category, set()).add(menu_item.name.lower())
+        quantity = item.quantity or 1
+        calories += (menu_item.calories or 0) * quantity
+        protein += float(menu_item.protein or 0) * quantity
+        if menu_item.is_healthy_choice:
+            healthy_categories.add(category)
+            healthy_count += 1
+        else:
+            all_healthy = False
+
+    order_time = local_order_time(order)
+    total = order.original_total if order.original_total else order.total_price
+
+    return {
+        "names": [item.name.lower() for item in items],
+        "categories": categories,
+        "healthy_categories": healthy_categories,
+        "healthy_count": healthy_count,
+        "all_healthy": all_healthy,
+        "calories": calories,
+        "protein": protein,
+        "total": float(total or 0),
+        "hour": order_time.hour if order_time else None,
+        "minute": order_time.minute if order_time else None,
+        "weekday": order_time.weekday() if order_time else None,
+        "is_surprise": any(
+            item.burger_name and "surprise" in item.burger_name.lower()
+            for item in items
+        ),
+    }
+
+
+# Predicate builders. Each returns a function of an order's features.
+
+
+def _name_has(*alternatives, exclude=()):
+    """Some item name contains every word of one of the alternatives"""
+    alternatives = [(alt,) if isinstance(alt, str) else alt for alt in alternatives]
+
+    def predicate(features):
+        return any(
+            any(all(word in name for word in alt) for alt in alternatives)
+            and not any(word in name for word in exclude)
+            for name in features["names"]
+        )
+
+    return predicate
+
+
+def _category_has(category, *keywords):
+    """Some menu item of the category contains one of the keywords"""
+
+    def predicate(features):
+        return any(
+            keyword in name
+            for name in features["categories"].get(category, ())
+            for keyword in keywords
+        )
+
+    return predicate
+
+
+def _category_count(category, minimum):
+    """At least `minimum` distinct menu items of the category"""
+    return lambda features: len(features["categories"].get(category, ())) >= minimum
+
+
+def _healthy_in(category):
+    """A healthy-choice menu item of the category"""
+    return lambda features: category in features["healthy_categories"]
+
+
+def _hour_in(start, end):
+    """Ordered between start (inclusive) and end (exclusive) local hours"""
+
+    def predicate(features):
+        return features["hour"] is not None and start <= features["hour"] < end
+
+    return predicate
+
+
+def _at(hour, minute):
+    """Ordered at exactly hour:minute local time"""
+    return lambda features: features["hour"] == hour and features["minute"] == minute
+
+
+def _weekday_in(*weekdays):
+    """Ordered on one of the given local weekdays (Monday is 0)"""
+    return lambda features: features["weekday"] in weekdays
+
+
+def _all(*predicates):
+    return lambda features: all(predicate(features) for predicate in predicates)
+
+
+def _not(predicate):
+    return lambda features: not predicate(features)
+
+
+def _always(features):
+    return True
+
+
+def _never(features):
+    return False
+
+
+DAILY_RULES = {
+    # Buns
+    "keto_bun": _name_has("keto"),
+    "sesame_bun": _name_has("sesame"),
+    "veggie_bun": _name_has("beetroot", "carrot"),
+    "wheat_bun": _name_has("wheat"),
+    "plain_bun": _name_has(("plain", "bun")),
+    # Cheese
+    "any_cheese": _category_count("cheese", 1),
+    "cheddar_cheese": _name_has("cheddar"),
+    "swiss_cheese": _name_has("swiss"),
+    "two_cheeses": _category_count("cheese", 2),
+    "parmesan_cheese": _name_has("parmesan"),
+    # Patties
+    "beef_patty": _category_has("patty", "beef"),
+    "chicken_patty": _name_has("chicken"),
+    "veg_patty": _category_has("patty", "veg"),
+    "pork_patty": _name_has("pork"),
+    "healthy_patty": _category_has("patty", "low-calorie beef", "mixed veg"),
+    # Sauces
+    "green_sauce": _name_has(("green", "sauce")),
+    "mayo": _name_has("mayo"),
+    "mustard": _name_has("mustard"),
+    "tomato_sauce": _name_has(("tomato", "sauce")),
+    "two_sauces": _category_count("sauce", 2),
+    "all_sauces": _category_count("sauce", 4),
+    # Toppings
+    "pickles": _name_has("pickle"),
+    "tomato": _name_has("tomato", exclude=("sauce",)),
+    "lettuce": _name_has("lettuce"),
+    "onion": _name_has("onion"),
+    "capsicum": _name_has("capsicum"),
+    "three_toppings": _category_count("topping", 3),
+    "all_toppings": _category_count("topping", 5),
+    # Time and behaviour
+    "before_11am": _hour_in(0, 11),
+    "between_2_4pm": _hour_in(14, 16),
+    "after_8pm": _hour_in(20, 24),
+    "lunch_rush": _hour_in(12, 13),
+    "exact_222": _at(14, 22),
+    "surprise_burger": lambda features: features["is_surprise"],
+    "all_healthy": lambda features: features["all_healthy"],
+}
+
+# Weekly challenges count qualifying orders. Conditions that depend on other
+# orders (distinct days, streaks, never-repeat) count every order, as before.
+WEEKLY_RULES = {
+    # Buns
+    "three_different_buns": _category_count("bun", 1),
+    "three_healthy_buns": _healthy_in("bun"),
+    "premium_buns": _category_has("bun", "keto", "sesame"),
+    # Cheese
+    "all_cheeses": _category_count("cheese", 1),
+    "no_cheese_three": _not(_category_count("cheese", 1)),
+    "cheese_every_order": _category_count("cheese", 1),
+    # Patties
+    "four_patties": _category_count("patty", 1),
+    "three_meat_patties": _category_has("patty", "beef", "chicken", "pork"),
+    "three_veg_patties": _category_has("patty", "veg"),
+    "three_healthy_patties": DAILY_RULES["healthy_patty"],
+    # Sauces
+    "all_four_sauces": _category_count("sauce", 1),
+    "three_sauce_combos": _category_count("sauce", 2),
+    "green_sauce_three": DAILY_RULES["green_sauce"],
+    # Toppings
+    "all_five_toppings": _category_count("topping", 1),
+    "fresh_combo_three": _all(
+        DAILY_RULES["lettuce"], DAILY_RULES["tomato"], DAILY_RULES["capsicum"]
+    ),
+    "pickles_four": DAILY_RULES["pickles"],
+    "four_toppings_three": _category_count("topping", 4),
+    # Frequency
+    "weekend_both": _weekday_in(5, 6),
+    "four_weekdays": _weekday_in(0, 1, 2, 3, 4),
+    # Health and budget
+    "all_healthy_three": DAILY_RULES["all_healthy"],
+    "low_cal_three": lambda features: 0 < features["calories"] < 500,
+    "high_protein_three": lambda features: features["protein"] >= 30,
+    "budget_three": lambda features: features["total"] < 10,
+    "premium_combo_two": _all(
+        DAILY_RULES["keto_bun"],
+        DAILY_RULES["cheddar_cheese"],
+        DAILY_RULES["beef_patty"],
+    ),
+    "healthy_streak": lambda features: features["healthy_count"] >= 3,
+    "classic_combo_three": _all(
+        DAILY_RULES["plain_bun"],
+        DAILY_RULES["beef_patty"],
+        _name_has("american"),
+    ),
+    "budget_week_three": lambda features: features["total"] < 12,
+    "premium_week_three": lambda features: features["total"] >= 18,
+    # Special
+    "three_surprises": DAILY_RULES["surprise_burger"],
+}
+
+
+def compile_conditions(definitions, rules, default):
+    """
+    Map every defined challenge condition to its predicate.
+
+    Args:
+        definitions: ChallengeService.DAILY_CHALLENGES or WEEKLY_CHALLENGES
+        rules: condition -> predicate
+        default: Predicate for conditions without a rule
+
+    Returns:
+        dict: condition -> predicate
+    """
+    return {
+        definition["condition"]: rules.get(definition["condition"], default)
+        for definition in definitions.values()
+    }
+
+
+DAILY_PREDICATES = compile_conditions(
+    ChallengeService.DAILY_CHALLENGES, DAILY_RULES, _never
+)
+WEEKLY_PREDICATES = compile_conditions(
+    ChallengeService.WEEKLY_CHALLENGES, WEEKLY_RULES, _always
+)
+
+
+def daily_met(condition, features):
+    """Check a daily bonus condition against an order's features"""
+    return DAILY_PREDICATES.get(condition, _never)(features)
+
+
+def weekly_counts(condition, features):
+    """Check whether an order counts towards a weekly challenge"""
+    return WEEKLY_PREDICATES.get(condition, _always)(features)
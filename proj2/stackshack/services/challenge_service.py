@@ -1,12 +1,24 @@
 """
 Challenge Service - Manages daily and weekly challenge generation and checking.
+
+Challenges are generated weeks ahead by the scheduler
+(python -m services.challenge_calendar); reads go through ChallengeCalendar.
 """
 
 import random
-from datetime import date, timedelta
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
 from models.gamification import DailyBonus, WeeklyChallenge
 from database.db import db
 
+DAILY_PER_DAY = 2
+WEEKLY_PER_WEEK = 3
+SCHEDULE_WEEKS = 4  # weeks generated ahead by the scheduler
+
 
 class ChallengeService:
     """Service for managing challenge generation and validation"""
@@ -554,156 +566,140 @@ class ChallengeService:
     }
 
     @staticmethod
-    def generate_daily_challenges(today=None, max_challenges=2):
+    def week_start(day):
+        """Monday of the week a date falls in"""
+        return day - timedelta(days=day.weekday())
+
+    @staticmethod
+    def schedule(start=None, weeks=SCHEDULE_WEEKS):
+        """
+        Generate daily bonuses (2 per day) and weekly challenges (3 per week)
+        from start to the end of the weeks-th week, in one transaction.
+
+        Days and weeks that already have their challenges are left alone, so
+        re-running only fills gaps. The unique (date, condition) keys stop two
+        schedulers racing into duplicates; the loser re-reads and fills
+        whatever is still missing.
+
+        Returns:
+            tuple: (daily bonuses created, weekly challenges created)
+        """
+        start = start or date.today()
+        first_week = ChallengeService.week_start(start)
+        end = first_week + timedelta(weeks=weeks)
+        days = [start + timedelta(days=n) for n in range((end - start).days)]
+        week_starts = [first_week + timedelta(weeks=n) for n in range(weeks)]
+        return ChallengeService._generate(days, week_starts)
+
+    @staticmethod
+    def generate_daily_challenges(today=None, max_challenges=DAILY_PER_DAY):
         """Generate up to 2 random daily challenges for a given date"""
         if today is None:
             today = date.today()
 
-        # Check existing challenges for today
-        existing = DailyBonus.query.filter_by(bonus_date=today, is_active=True).all()
-        existing_count = len(existing)
-
-        if existing_count >= max_challenges:
-            return existing  # Already have max challenges
-
-        # Get available challenge keys
-        available_challenges = list(ChallengeService.DAILY_CHALLENGES.keys())
-
-        # Remove challenges that already exist today
-        existing_conditions = [db.condition for db in existing]
-        existing_conditions_flat = existing_conditions
-
-        # Select random challenges
-        challenges_to_create = max_challenges - existing_count
-        selected_keys = random.sample(
-            available_challenges, min(challenges_to_create, len(available_challenges))
-        )
-
-        created = []
-        for key in selected_keys:
-            challenge_def = ChallengeService.DAILY_CHALLENGES[key]
-
-            # Check if this condition already exists today
-            if challenge_def["condition"] in existing_conditions_flat:
-                continue
-
-            # Double-check that this condition doesn't already exist (race condition protection)
-            existing_with_condition = DailyBonus.query.filter_by(
-                bonus_date=today, condition=challenge_def["condition"], is_active=True
-            ).first()
-
-            if existing_with_condition:
-                existing_conditions_flat.append(challenge_def["condition"])
-                continue
-
-            try:
-                bonus = DailyBonus(
-                    bonus_date=today,
-                    description=challenge_def["description"],
-                    condition=challenge_def["condition"],
-                    points_reward=challenge_def["points"],
-                    is_active=True,
-                )
-                db.session.add(bonus)
-                created.append(bonus)
-                existing_conditions_flat.append(challenge_def["condition"])
-            except Exception as e:
-                # Handle any database errors (e.g., unique constraint still exists)
-                db.session.rollback()
-                print(f"Warning: Could not create daily bonus {key}: {e}")
-                continue
-
-        if created:
-            try:
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                print(f"Warning: Could not commit daily bonuses: {e}")
-
-        # Return all challenges for today
+        ChallengeService._generate([today], [], daily_per_day=max_challenges)
         return DailyBonus.query.filter_by(bonus_date=today, is_active=True).all()
 
     @staticmethod
-    def generate_weekly_challenges(week_start=None, max_challenges=3):
+    def generate_weekly_challenges(week_start=None, max_challenges=WEEKLY_PER_WEEK):
         """Generate up to 3 random weekly challenges for a given week"""
         if week_start is None:
-            today = date.today()
-            days_since_monday = today.weekday()
-            week_start = today - timedelta(days=days_since_monday)
-
-        week_end = week_start + timedelta(days=6)
+            week_start = ChallengeService.week_start(date.today())
 
-        # Check existing challenges for this week
-        existing = WeeklyChallenge.query.filter(
+        ChallengeService._generate([], [week_start], weekly_per_week=max_challenges)
+        return WeeklyChallenge.query.filter(
             WeeklyChallenge.week_start == week_start,
-            WeeklyChallenge.week_end == week_end,
+            WeeklyChallenge.week_end == week_start + timedelta(days=6),
             WeeklyChallenge.is_active,
         ).all()
-        existing_count = len(existing)
-
-        if existing_count >= max_challenges:
-            return existing  # Already have max challenges
-
-        # Get available challenge keys
-        available_challenges = list(ChallengeService.WEEKLY_CHALLENGES.keys())
-
-        # Remove challenges that already exist this week
-        existing_conditions = [ch.condition for ch in existing]
-
-        # Select random challenges
-        challenges_to_create = max_challenges - existing_count
-        selected_keys = random.sample(
-            available_challenges, min(challenges_to_create, len(available_challenges))
-        )
 
-        created = []
-        for key in selected_keys:
-            challenge_def = ChallengeService.WEEKLY_CHALLENGES[key]
-
-            # Check if this condition already exists this week
-            if challenge_def["condition"] in existing_conditions:
-                continue
-
-            # Double-check that this condition doesn't already exist (race condition protection)
-            existing_with_condition = WeeklyChallenge.query.filter(
-                WeeklyChallenge.week_start == week_start,
-                WeeklyChallenge.week_end == week_end,
-                WeeklyChallenge.condition == challenge_def["condition"],
-                WeeklyChallenge.is_active,
-            ).first()
-
-            if existing_with_condition:
-                existing_conditions.append(challenge_def["condition"])
-                continue
-
-            try:
-                challenge = WeeklyChallenge(
-                    week_start=week_start,
-                    week_end=week_end,
-                    description=challenge_def["description"],
-                    condition=challenge_def["condition"],
-                    points_reward=challenge_def["points"],
-                    is_active=True,
-                )
-                db.session.add(challenge)
-                created.append(challenge)
-                existing_conditions.append(challenge_def["condition"])
-            except Exception as e:
-                # Handle any database errors
-                db.session.rollback()
-                print(f"Warning: Could not create weekly challenge {key}: {e}")
-                continue
-
-        if created:
+    @staticmethod
+    def _generate(
+        days,
+        week_starts,
+        daily_per_day=DAILY_PER_DAY,
+        weekly_per_week=WEEKLY_PER_WEEK,
+    ):
+        """Insert whatever challenges the days and weeks are missing, in one commit"""
+        from services.challenge_calendar import ChallengeCalendar
+
+        for attempt in range(2):
+            daily_rows = ChallengeService._missing(
+                DailyBonus,
+                DailyBonus.bonus_date,
+                days,
+                ChallengeService.DAILY_CHALLENGES,
+                daily_per_day,
+                lambda day: {"bonus_date": day},
+            )
+            weekly_rows = ChallengeService._missing(
+                WeeklyChallenge,
+                WeeklyChallenge.week_start,
+                week_starts,
+                ChallengeService.WEEKLY_CHALLENGES,
+                weekly_per_week,
+                lambda monday: {
+                    "week_start": monday,
+                    "week_end": monday + timedelta(days=6),
+                },
+            )
+            if not daily_rows and not weekly_rows:
+                return 0, 0
             try:
+                if daily_rows:
+                    db.session.execute(insert(DailyBonus), daily_rows)
+                if weekly_rows:
+                    db.session.execute(insert(WeeklyChallenge), weekly_rows)
                 db.session.commit()
-            except Exception as e:
+                break
+            except IntegrityError:
+                # Another process filled some of the same slots first
                 db.session.rollback()
-                print(f"Warning: Could not commit weekly challenges: {e}")
+                if attempt:
+                    raise
 
-        # Return all challenges for this week
-        return WeeklyChallenge.query.filter(
-            WeeklyChallenge.week_start == week_start,
-            WeeklyChallenge.week_end == week_end,
-            WeeklyChallenge.is_active,
-        ).all()
+        ChallengeCalendar.clear()
+        return len(daily_rows), len(weekly_rows)
+
+    @staticmethod
+    def _missing(model, key_column, keys, definitions, per_key, key_fields):
+        """
+        Rows to insert so every key (date or week start) has per_key active
+        challenges, each with a condition not yet used for that key. Existing
+        rows for all keys are read with one query.
+        """
+        if not keys:
+            return []
+
+        used = defaultdict(set)
+        active = defaultdict(int)
+        for key, condition, is_active in db.session.query(
+            key_column, model.condition, model.is_active
+        ).filter(key_column.between(min(keys), max(keys))):
+            used[key].add(condition)
+            if is_active:
+                active[key] += 1
+
+        now = datetime.utcnow()
+        rows = []
+        for key in keys:
+            wanted = per_key - active[key]
+            if wanted <= 0:
+                continue
+            available = [
+                definition
+                for definition in definitions.values()
+                if definition["condition"] not in used[key]
+            ]
+            for definition in random.sample(available, min(wanted, len(available))):
+                rows.append(
+                    {
+                        **key_fields(key),
+                        "description": definition["description"],
+                        "condition": definition["condition"],
+                        "points_reward": definition["points"],
+                        "is_active": True,
+                        "created_at": now,
+                    }
+                )
+        return rows
@@ -0,0 +1,353 @@
+"""
+Gamification Batch Service - Awards points, badges and challenges for many orders.
+
+Orders, their items, users, badge history, today's challenges and existing
+challenge progress are all loaded with a fixed number of queries, and menu
+items come from the cached menu catalog. Every order is then evaluated in memory and the new
+ledger, badge and progress rows are written with bulk inserts in one commit.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime
+
+from sqlalchemy import bindparam, func, insert, or_, update
+
+from database.db import db
+from models.gamification import (
+    PointsTransaction,
+    UserBadge,
+    UserChallengeProgress,
+)
+from models.order import Order, OrderItem
+from models.user import User
+from services.badge_engine import BadgeEngine
+from services.challenge_calendar import ChallengeCalendar
+from services.challenge_conditions import daily_met, featurize
+from services.leaderboard_service import LeaderboardService
+from services.menu_catalog import MenuCatalog
+from services.rewards_snapshot import RewardsSnapshot
+from services.points_ledger_service import PointsLedgerService
+from services.user_stats_service import UNPAID_STATUSES
+
+
+class GamificationBatchService:
+    """Set-based post-payment gamification for a batch of orders"""
+
+    @staticmethod
+    def load_orders(order_ids):
+        """
+        Load orders with their items in two queries.
+
+        Returns:
+            tuple: (orders sorted by id, dict order_id -> OrderItems by id,
+                menu_item_id -> MenuEntry mapping from the menu catalog)
+        """
+        orders = Order.query.filter(Order.id.in_(order_ids)).order_by(Order.id).all()
+        found_ids = [order.id for order in orders]
+
+        items_by_order = defaultdict(list)
+        for item in (
+            OrderItem.query.filter(OrderItem.order_id.in_(found_ids))
+            .order_by(OrderItem.id)
+            .all()
+        ):
+            items_by_order[item.order_id].append(item)
+
+        menu_items = MenuCatalog.current().by_id
+
+        return orders, items_by_order, menu_items
+
+    @staticmethod
+    def load_challenges(user_ids, today):
+        """
+        Load today's daily bonuses, this week's challenges and users' progress.
+
+        Returns:
+            tuple: (daily bonuses, weekly challenges,
+                dict (user_id, "daily"|"weekly", id) -> UserChallengeProgress)
+        """
+        daily_bonuses = ChallengeCalendar.daily_bonuses(today)
+        challenges = ChallengeCalendar.weekly_challenges(today)
+
+        progress = {}
+        rows = UserChallengeProgress.query.filter(
+            UserChallengeProgress.user_id.in_(user_ids),
+            or_(
+                UserChallengeProgress.daily_bonus_id.in_([b.id for b in daily_bonuses]),
+                UserChallengeProgress.challenge_id.in_([c.id for c in challenges]),
+            ),
+        ).order_by(UserChallengeProgress.id)
+        for row in rows:
+            if row.daily_bonus_id is not None:
+                key = (row.user_id, "daily", row.daily_bonus_id)
+            else:
+                key = (row.user_id, "weekly", row.challenge_id)
+            progress.setdefault(key, row)
+
+        return daily_bonuses, challenges, progress
+
+    @staticmethod
+    def process(order_ids, replay=False, today=None):
+        """
+        Award gamification for a batch of paid orders in one commit.
+
+        Orders that already have purchase points are skipped, so a batch can
+        be retried safely. With replay=True those orders are re-evaluated for
+        badges only, which is how badge rule changes are applied to history.
+
+        Args:
+            order_ids: IDs of orders to process
+            replay: Re-run badge rules for already-awarded orders
+            today: Date whose daily/weekly challenges apply (defaults to today)
+
+        Returns:
+            dict: order_id -> points (int), breakdown (event_type -> points),
+                badges (list of name/slug/icon dicts), tier (str)
+        """
+        from services.gamification_service import GamificationService
+
+        order_ids = list(order_ids)
+        if not order_ids:
+            return {}
+        today = today or date.today()
+        now = datetime.utcnow()
+
+        owners = dict(
+            db.session.query(Order.id, Order.user_id).filter(
+                Order.id.in_(order_ids), Order.status.notin_(UNPAID_STATUSES)
+            )
+        )
+        awarded = {
+            order_id
+            for (order_id,) in db.session.query(PointsTransaction.order_id).filter(
+                PointsTransaction.order_id.in_(list(owners)),
+                PointsTransaction.event_type == "purchase",
+            )
+        }
+        if not replay:
+            owners = {
+                order_id: user_id
+                for order_id, user_id in owners.items()
+                if order_id not in awarded
+            }
+        if not owners:
+            return {}
+
+        user_ids = sorted(set(owners.values()))
+        tiers = {
+            user_id: tier or "Bronze"
+            for user_id, tier in db.session.query(User.id, User.tier).filter(
+                User.id.in_(user_ids)
+            )
+        }
+        balances = PointsLedgerService.ledger_balances(user_ids)
+        earned_points = defaultdict(int)
+
+        # Steps that may commit run first: a commit expires every loaded object
+        histories = BadgeEngine.load_histories(user_ids)
+        daily_bonuses, challenges, progress = GamificationBatchService.load_challenges(
+            user_ids, today
+        )
+
+        catalog = BadgeEngine.load_catalog()
+        slug_by_badge_id = {badge.id: slug for slug, badge in catalog.items()}
+        earned_slugs = defaultdict(set)
+        for user_id, badge_id in db.session.query(
+            UserBadge.user_id, UserBadge.badge_id
+        ).filter(UserBadge.user_id.in_(user_ids)):
+            if badge_id in slug_by_badge_id:
+                earned_slugs[user_id].add(slug_by_badge_id[badge_id])
+
+        orders, items_by_order, menu_items = GamificationBatchService.load_orders(
+            list(owners)
+        )
+        weekly_targets = {
+            challenge.id: GamificationService._weekly_target(challenge)
+            for challenge in challenges
+        }
+        ledger_rows = []
+        badge_rows = []
+        new_progress = []  # Transient rows, bulk inserted at the end
+        results = {}
+
+        for order in orders:
+            user_id = order.user_id
+            if user_id not in tiers:
+                continue
+            items = items_by_order.get(order.id, [])
+            earned = []  # (event_type, points, description)
+            badges = []
+            first_pass = order.id not in awarded
+
+            # Purchase points: 10 per $1 of the pre-coupon total, tier multiplied
+            if first_pass:
+                order_total = float(
+                    order.original_total if order.original_total else order.total_price
+                )
+                multiplier = GamificationService.TIER_MULTIPLIERS.get(
+                    tiers[user_id], 1.0
+                )
+                earned.append(
+                    (
+                        "purchase",
+                        int(int(order_total * 10) * multiplier),
+                        f"Purchase: ${order_total:.2f}",
+                    )
+                )
+
+            # Badges
+            current = BadgeEngine.describe_items(items)
+            for rule in BadgeEngine.evaluate(
+                histories[user_id], current, earned_slugs[user_id]
+            ):
+                badge = catalog[rule["slug"]]
+                badge_rows.append(
+                    {
+                        "user_id": user_id,
+                        "badge_id": badge.id,
+                        "order_id": order.id,
+                        "earned_at": now,
+                    }
+                )
+                earned_slugs[user_id].add(rule["slug"])
+                if rule["points"] > 0:
+                    earned.append(
+                        (
+                            "badge_earned",
+                            rule["points"],
+                            f"Badge earned: {rule['name']}",
+                        )
+                    )
+                badges.append(
+                    {"name": badge.name, "slug": badge.slug, "icon": badge.icon}
+                )
+
+            if first_pass:
+                # Daily bonuses
+                features = featurize(order, items, menu_items)
+                for bonus in daily_bonuses:
+                    row = progress.get((user_id, "daily", bonus.id))
+                    if row is not None and row.completed:
+                        continue
+                    if not daily_met(bonus.condition, features):
+                        continue
+                    if row is None:
+                        row = UserChallengeProgress(
+                            user_id=user_id,
+                            daily_bonus_id=bonus.id,
+                            progress=1,
+                            target=1,
+                        )
+                        new_progress.append(row)
+                        progress[(user_id, "daily", bonus.id)] = row
+                    row.completed = True
+                    row.completed_at = now
+                    earned.append(
+                        ("daily_bonus", bonus.points_reward, bonus.description)
+                    )
+
+                # Weekly challenges
+                for challenge in challenges:
+                    row = progress.get((user_id, "weekly", challenge.id))
+                    if row is None:
+                        row = UserChallengeProgress(
+                            user_id=user_id,
+                            challenge_id=challenge.id,
+                            progress=0,
+                            target=weekly_targets[challenge.id],
+                            completed=False,
+                        )
+                        new_progress.append(row)
+                        progress[(user_id, "weekly", challenge.id)] = row
+                    if row.completed:
+                        continue
+                    updated = GamificationService._update_weekly_progress(
+                        challenge, row, features
+                    )
+                    if updated and row.progress >= row.target:
+                        row.completed = True
+                        row.completed_at = now
+                        earned.append(
+                            (
+                                "weekly_challenge",
+                                challenge.points_reward,
+                                challenge.description,
+                            )
+                        )
+
+            breakdown = defaultdict(int)
+            for event_type, points, description in earned:
+                ledger_rows.append(
+                    {
+                        "user_id": user_id,
+                        "points": points,
+                        "event_type": event_type,
+                        "description": description,
+                        "order_id": order.id,
+                        "created_at": now,
+                    }
+                )
+                breakdown[event_type] += points
+
+            # Tier follows the running balance, as it would order by order
+            balances[user_id] = balances.get(user_id, 0) + sum(breakdown.values())
+            earned_points[user_id] += sum(breakdown.values())
+            tiers[user_id] = GamificationService.tier_for_points(balances[user_id])
+
+            results[order.id] = {
+                "points": sum(breakdown.values()),
+                "breakdown": dict(breakdown),
+                "badges": badges,
+                "tier": tiers[user_id],
+            }
+
+        if ledger_rows:
+            db.session.execute(insert(PointsTransaction), ledger_rows)
+            LeaderboardService.record_many(
+                [
+                    (row["user_id"], row["points"], row["created_at"])
+                    for row in ledger_rows
+                ]
+            )
+        if badge_rows:
+            db.session.execute(insert(UserBadge), badge_rows)
+        if new_progress:
+            # Core insert: rows mix daily and weekly keys, which the ORM bulk
+            # path would split into one statement per distinct NULL pattern
+            db.session.execute(
+                UserChallengeProgress.__table__.insert(),
+                [
+                    {
+                        "user_id": row.user_id,
+                        "challenge_id": row.challenge_id,
+                        "daily_bonus_id": row.daily_bonus_id,
+                        "progress": row.progress,
+                        "target": row.target,
+                        "completed": row.completed,
+                        "completed_at": row.completed_at,
+                        "created_at": now,
+                    }
+                    for row in new_progress
+                ],
+            )
+
+        # Cached totals and tiers, one executemany for every user in the batch;
+        # totals are incremented in the database so parallel requests add up
+        users = User.__table__
+        db.session.execute(
+            update(users)
+            .where(users.c.id == bindparam("user_id"))
+            .values(
+                total_points=func.coalesce(users.c.total_points, 0)
+                + bindparam("earned"),
+                tier=bindparam("new_tier"),
+            ),
+            [
+                {"user_id": user_id, "earned": earned_points[user_id], "new_tier": tier}
+                for user_id, tier in tiers.items()
+            ],
+        )
+        db.session.commit()
+        RewardsSnapshot.invalidate(*user_ids)
+
+        return results
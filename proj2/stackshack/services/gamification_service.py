@@ -4,24 +4,24 @@ Gamification Service - Handles points, badges, tiers, and rewards.
 
 from models.gamification import (
     PointsTransaction,
-    Badge,
-    UserBadge,
-    DailyBonus,
-    WeeklyChallenge,
     UserChallengeProgress,
     Redemption,
     Coupon,
 )
-from models.user import User
 from models.order import Order
-from models.menu_item import MenuItem
+from models.user import User
+from services.challenge_calendar import ChallengeCalendar
+from services.challenge_conditions import daily_met, featurize, weekly_counts
+from services.coupon_codes import CouponCodes
+from services.leaderboard_service import LeaderboardService
+from services.menu_catalog import MenuCatalog
+from services.rewards_snapshot import RewardsSnapshot
+from services.user_stats_service import UNPAID_STATUSES
 from datetime import date
 from database.db import db
 from datetime import datetime, timedelta
-from sqlalchemy import func
-import secrets
-import pytz
-import string
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm.attributes import set_committed_value
 
 
 class GamificationService:
@@ -44,30 +44,28 @@ class GamificationService:
     def get_user_points(user_id):
         """
         Get current total points for a user.
-        Always recalculates from transactions to ensure accuracy.
+        Reads the ledger (latest checkpoint plus newer transactions) and
+        repairs the cached users.total_points if it has drifted.
         """
+        from services.points_ledger_service import PointsLedgerService
+
         user = db.session.get(User, user_id)
         if not user:
             return 0
 
-        # Always recalculate from transactions to ensure accuracy
-        # This sums all points transactions (positive for earned, negative for redeemed)
-        total = (
-            db.session.query(func.sum(PointsTransaction.points))
-            .filter_by(user_id=user_id)
-            .scalar()
-        )
-
-        # Handle None result (no transactions yet)
-        if total is None:
-            total = 0
+        total = PointsLedgerService.get_balance(user_id)
 
-        # Update cached value
+        # Update cached value, unless another request changed it meanwhile
         if user.total_points != total:
-            user.total_points = total
+            db.session.execute(
+                update(User)
+                .where(User.id == user_id, User.total_points == user.total_points)
+                .values(total_points=total)
+                .execution_options(synchronize_session=False)
+            )
             db.session.commit()
 
-        return int(total)
+        return total
 
     @staticmethod
     def earn_points(
@@ -111,26 +109,18 @@ class GamificationService:
         )
         db.session.add(transaction)
 
-        # Update cached total
-        user.total_points = (user.total_points or 0) + points
+        # Update cached total in the database, so parallel requests add up
+        user.total_points = func.coalesce(User.total_points, 0) + points
+        LeaderboardService.record(user_id, points)
         db.session.commit()
+        RewardsSnapshot.invalidate(user_id)
 
         return True, f"Earned {points} points!", points
 
     @staticmethod
     def generate_coupon_code():
         """Generate a unique coupon code in format SHACK-XXXXXX"""
-        while True:
-            # Generate 6 random alphanumeric characters
-            random_part = "".join(
-                secrets.choice(string.ascii_uppercase + string.digits) for _ in range(6)
-            )
-            coupon_code = f"SHACK-{random_part}"
-
-            # Check if code already exists
-            existing = Coupon.query.filter_by(coupon_code=coupon_code).first()
-            if not existing:
-                return coupon_code
+        return CouponCodes.generate(1)[0]
 
     @staticmethod
     def redeem_reward(reward_type, user_id, order_id=None):
@@ -149,6 +139,7 @@ class GamificationService:
             return False, "Invalid reward type", None
 
         cost = GamificationService.REWARD_COSTS[reward_type]
+        # Also repairs a drifted cached total, so it runs before any lock
         current_points = GamificationService.get_user_points(user_id)
 
         if current_points < cost:
@@ -162,6 +153,25 @@ class GamificationService:
         if not user:
             return False, "User not found", None
 
+        # Spend the points only if the cached total still covers them. The
+        # UPDATE locks the user row until commit, so parallel redemptions by
+        # the same user queue here and each sees the previous one's spend;
+        # databases without row locks (SQLite) are kept safe by the WHERE
+        spent = db.session.execute(
+            update(User)
+            .where(User.id == user_id, User.total_points >= cost)
+            .values(total_points=User.total_points - cost)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not spent:
+            db.session.rollback()
+            current_points = GamificationService.get_user_points(user_id)
+            return (
+                False,
+                f"Insufficient points. Need {cost}, have {current_points}",
+                None,
+            )
+
         # Create redemption record
         redemption = Redemption(
             user_id=user_id,
@@ -173,7 +183,8 @@ class GamificationService:
         db.session.add(redemption)
         db.session.flush()  # Get redemption ID
 
-        # Generate unique coupon code
+        # Generate unique coupon code (after the user row: bulk issuance
+        # takes the same locks in the same order)
         coupon_code = GamificationService.generate_coupon_code()
 
         # Create coupon (expires in 90 days)
@@ -196,10 +207,8 @@ class GamificationService:
             order_id=order_id,
         )
         db.session.add(transaction)
-
-        # Update cached total
-        user.total_points = (user.total_points or 0) - cost
         db.session.commit()
+        RewardsSnapshot.invalidate(user_id)
 
         return (
             True,
@@ -207,6 +216,27 @@ class GamificationService:
             coupon_code,
         )
 
+    @staticmethod
+    def _coupon_problem(coupon, user_id, order_id=None):
+        """Why a fetched coupon cannot be used by this user, or None"""
+        if not coupon:
+            return "Invalid coupon code"
+
+        if coupon.user_id != user_id:
+            return "This coupon does not belong to you"
+
+        if coupon.is_used:
+            return "This coupon has already been used"
+
+        if not coupon.is_valid():
+            return "This coupon has expired"
+
+        # Check if coupon is already applied to this order
+        if order_id and coupon.used_order_id == order_id:
+            return "This coupon is already applied to this order"
+
+        return None
+
     @staticmethod
     def validate_coupon(coupon_code, user_id, order_id=None):
         """
@@ -222,21 +252,9 @@ class GamificationService:
         """
         coupon = Coupon.query.filter_by(coupon_code=coupon_code.upper()).first()
 
-        if not coupon:
-            return False, "Invalid coupon code", None
-
-        if coupon.user_id != user_id:
-            return False, "This coupon does not belong to you", None
-
-        if coupon.is_used:
-            return False, "This coupon has already been used", None
-
-        if not coupon.is_valid():
-            return False, "This coupon has expired", None
-
-        # Check if coupon is already applied to this order
-        if order_id and coupon.used_order_id == order_id:
-            return False, "This coupon is already applied to this order", None
+        problem = GamificationService._coupon_problem(coupon, user_id, order_id)
+        if problem:
+            return False, problem, None
 
         return True, "Coupon is valid", coupon.to_dict()
 
@@ -245,6 +263,12 @@ class GamificationService:
         """
         Apply a coupon to an order and calculate discount.
 
+        The coupon is fetched once, locked, and claimed for the order with a
+        conditional UPDATE, so parallel requests cannot apply one coupon to
+        two orders. A coupon claimed by another order that is still unpaid
+        (pending, or cancelled) moves to this one, and that order's discount
+        is undone; consume_coupon decides which order finally uses it.
+
         Args:
             coupon_code: The coupon code
             user_id: User ID
@@ -253,16 +277,57 @@ class GamificationService:
         Returns:
             tuple: (success, message, discount_amount, coupon_dict)
         """
-        success, message, coupon_dict = GamificationService.validate_coupon(
-            coupon_code, user_id, order.id
+        coupon = (
+            Coupon.query.filter_by(coupon_code=coupon_code.upper())
+            .with_for_update()
+            .populate_existing()
+            .first()
         )
 
-        if not success:
-            return False, message, 0, None
-
-        coupon = Coupon.query.filter_by(coupon_code=coupon_code.upper()).first()
+        problem = GamificationService._coupon_problem(coupon, user_id, order.id)
+        if problem:
+            return False, problem, 0, None
+
+        previous_order_id = coupon.used_order_id
+        claimed = db.session.execute(
+            update(Coupon)
+            .filter_by(id=coupon.id, is_used=False)
+            .where(
+                or_(
+                    Coupon.used_order_id.is_(None),
+                    Coupon.used_order_id.in_(
+                        select(Order.id).where(
+                            Order.status.in_(UNPAID_STATUSES), Order.id != order.id
+                        )
+                    ),
+                )
+            )
+            .values(used_order_id=order.id)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not claimed:
+            db.session.rollback()
+            return False, "This coupon is already applied to another order", 0, None
+        # Keep the loaded coupon in step without writing the column again
+        set_committed_value(coupon, "used_order_id", order.id)
+
+        if previous_order_id is not None:
+            # The order the coupon left pays full price and joins the queue again
+            db.session.execute(
+                update(Order)
+                .where(
+                    Order.id == previous_order_id,
+                    Order.status.in_(["Pending", "Priority"]),
+                )
+                .values(
+                    total_price=func.coalesce(Order.original_total, Order.total_price),
+                    status="Pending",
+                )
+                .execution_options(synchronize_session=False)
+            )
 
         reward_type = coupon.reward_type
+        catalog = MenuCatalog.current()
 
         # Calculate discount based on reward type
         discount_amount = 0.0
@@ -273,7 +338,7 @@ class GamificationService:
             order_items = order.items.all()
             for item in order_items:
                 if item.menu_item_id:
-                    menu_item = db.session.get(MenuItem, item.menu_item_id)
+                    menu_item = catalog.get(item.menu_item_id)
                     if menu_item and menu_item.category.lower() == "topping":
                         discount_amount += float(item.price) * item.quantity
             discount_description = "Free topping applied"
@@ -284,7 +349,7 @@ class GamificationService:
             sauces_found = []
             for item in order_items:
                 if item.menu_item_id:
-                    menu_item = db.session.get(MenuItem, item.menu_item_id)
+                    menu_item = catalog.get(item.menu_item_id)
                     if menu_item and menu_item.category.lower() == "sauce":
                         # Remove cost of all sauces (premium or regular)
                         item_discount = float(item.price) * item.quantity
@@ -309,7 +374,7 @@ class GamificationService:
             order_items = order.items.all()
             for item in order_items:
                 if item.menu_item_id:
-                    menu_item = db.session.get(MenuItem, item.menu_item_id)
+                    menu_item = catalog.get(item.menu_item_id)
                     if menu_item and menu_item.category.lower() == "patty":
                         discount_amount += float(item.price) * item.quantity
             discount_description = "Free patty upgrade applied"
@@ -325,18 +390,43 @@ class GamificationService:
             discount_amount = min(5.0, float(order.total_price))
             discount_description = "$5 discount applied"
 
-        # Store the order ID this coupon is being applied to (but don't mark as used yet)
-        # This prevents applying the same coupon multiple times to the same order
-        coupon.used_order_id = order.id
+        # The coupon is marked used when the order is paid
+        coupon_dict = coupon.to_dict()
         db.session.commit()
+        RewardsSnapshot.invalidate(user_id)
 
-        return True, discount_description, discount_amount, coupon.to_dict()
+        return True, discount_description, discount_amount, coupon_dict
+
+    @staticmethod
+    def consume_coupon(order):
+        """
+        Mark the coupon applied to a paid order as used.
+
+        One conditional UPDATE, so a coupon is consumed at most once even when
+        the payment is processed twice in parallel.
+
+        Returns:
+            bool: Whether a coupon was consumed
+        """
+        consumed = db.session.execute(
+            update(Coupon)
+            .filter_by(used_order_id=order.id, is_used=False)
+            .values(is_used=True, used_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if consumed:
+            RewardsSnapshot.invalidate(order.user_id)
+        return bool(consumed)
 
     @staticmethod
     def check_and_grant_badges(user_id, order):
         """
         Check if user qualifies for any badges based on order and grant them.
 
+        All rules are evaluated by BadgeEngine against aggregated order
+        history, so the query count does not grow with the user's orders.
+
         Args:
             user_id: User ID
             order: Order object
@@ -344,303 +434,18 @@ class GamificationService:
         Returns:
             list: List of newly earned badges
         """
-        newly_earned = []
-        user = db.session.get(User, user_id)
-        if not user:
-            return newly_earned
-
-        # Get order items
-        order_items = order.items.all()
-        [item.name.lower() for item in order_items]
-        categories = set()
-        for item in order_items:
-            if item.menu_item_id:
-                menu_item = db.session.get(MenuItem, item.menu_item_id)
-                if menu_item:
-                    categories.add(menu_item.category.lower())
-
-        # Get user's order history for behavioral badges
-        all_orders = Order.query.filter_by(user_id=user_id).all()
-        order_count = len(all_orders)
-
-        # Check ingredient explorer badges
-        badges_to_check = [
-            ("sauce_collector", "Sauce Collector", "Tried all sauces", "ingredient"),
-            (
-                "veggie_champion",
-                "Veggie Champion",
-                "Ordered 4+ vegetables",
-                "ingredient",
-            ),
-            (
-                "carnivore_king",
-                "Carnivore King",
-                "Tried all patty options",
-                "ingredient",
-            ),
-            ("brave_soul", "Brave Soul", "Ordered spiciest ingredients", "ingredient"),
-            (
-                "classic_lover",
-                "Classic Lover",
-                "Ordered same burger 5+ times",
-                "behavioral",
-            ),
-        ]
-
-        for slug, name, desc, badge_type in badges_to_check:
-            badge = Badge.query.filter_by(slug=slug).first()
-            if not badge:
-                # Create badge if it doesn't exist
-                badge = Badge(
-                    name=name,
-                    slug=slug,
-                    description=desc,
-                    badge_type=badge_type,
-                    icon="🏆",
-                )
-                db.session.add(badge)
-                db.session.flush()
+        from services.badge_engine import BadgeEngine
 
-            # Check if user already has this badge
-            existing = UserBadge.query.filter_by(
-                user_id=user_id, badge_id=badge.id
-            ).first()
-            if existing:
-                continue
-
-            # Check badge conditions
-            earned = False
-            if slug == "sauce_collector":
-                # Check if user has tried all sauces
-                all_sauces = MenuItem.query.filter_by(
-                    category="sauce", is_available=True
-                ).all()
-                user_sauces = set()
-                for o in all_orders:
-                    for item in o.items.all():
-                        if item.menu_item_id:
-                            mi = db.session.get(MenuItem, item.menu_item_id)
-                            if mi and mi.category.lower() == "sauce":
-                                user_sauces.add(mi.name.lower())
-                if len(user_sauces) >= len(all_sauces) and len(all_sauces) > 0:
-                    earned = True
-
-            elif slug == "veggie_champion":
-                # Check if ordered 4+ vegetables (toppings)
-                veggie_count = sum(
-                    1
-                    for item in order_items
-                    if any(
-                        veg in item.name.lower()
-                        for veg in ["lettuce", "tomato", "onion", "pickles", "capsicum"]
-                    )
-                )
-                if veggie_count >= 4:
-                    earned = True
-
-            elif slug == "carnivore_king":
-                # Check if tried all patty types
-                all_patties = MenuItem.query.filter_by(
-                    category="patty", is_available=True
-                ).all()
-                user_patties = set()
-                for o in all_orders:
-                    for item in o.items.all():
-                        if item.menu_item_id:
-                            mi = db.session.get(MenuItem, item.menu_item_id)
-                            if mi and mi.category.lower() == "patty":
-                                user_patties.add(mi.name.lower())
-                if len(user_patties) >= len(all_patties) and len(all_patties) > 0:
-                    earned = True
-
-            elif slug == "brave_soul":
-                # Check for spiciest ingredients (heuristic: look for spicy keywords)
-                spicy_keywords = ["spicy", "hot", "jalapeno", "pepper", "chili"]
-                has_spicy = any(
-                    any(keyword in item.name.lower() for keyword in spicy_keywords)
-                    for item in order_items
-                )
-                if has_spicy:
-                    earned = True
+        return BadgeEngine.grant_badges(user_id, order)
 
-            elif slug == "classic_lover":
-                # Check if same burger ordered 5+ times
-                burger_name = (
-                    order.items.first().burger_name if order.items.first() else None
-                )
-                if burger_name:
-                    same_burger_count = sum(
-                        1
-                        for o in all_orders
-                        if o.items.first()
-                        and o.items.first().burger_name == burger_name
-                    )
-                    if same_burger_count >= 5:
-                        earned = True
-
-            if earned:
-                user_badge = UserBadge(
-                    user_id=user_id, badge_id=badge.id, order_id=order.id
-                )
-                db.session.add(user_badge)
-                newly_earned.append(badge)
-
-                # Award points for earning badge
-                badge_points_map = {
-                    "sauce_collector": 50,
-                    "veggie_champion": 75,
-                    "carnivore_king": 100,
-                    "brave_soul": 50,
-                    "classic_lover": 60,
-                }
-                points_reward = badge_points_map.get(slug, 0)
-                if points_reward > 0:
-                    GamificationService.earn_points(
-                        "badge_earned",
-                        user_id,
-                        points_reward,
-                        f"Badge earned: {name}",
-                        order.id,
-                        apply_multiplier=False,
-                    )
-
-        # Check behavioral badges
-        behavioral_badges = [
-            (
-                "lunch_rush_warrior",
-                "Lunch Rush Warrior",
-                "10 orders between 12-1 PM",
-                12,
-                13,
-            ),
-            ("early_bird", "Early Bird", "5 orders before 11 AM", 0, 11),
-            ("late_night_snacker", "Late Night Snacker", "5 orders after 8 PM", 20, 24),
-            ("stackshack_regular", "StackShack Regular", "20 total orders", None, None),
-            ("century_club", "Century Club", "100 total orders", None, None),
-            (
-                "mystery_box_master",
-                "Mystery Box Master",
-                "5 surprise box orders",
-                None,
-                None,
-            ),
-        ]
-
-        for slug, name, desc, hour_start, hour_end in behavioral_badges:
-            badge = Badge.query.filter_by(slug=slug).first()
-            if not badge:
-                badge = Badge(
-                    name=name,
-                    slug=slug,
-                    description=desc,
-                    badge_type="behavioral",
-                    icon="⭐",
-                )
-                db.session.add(badge)
-                db.session.flush()
-
-            existing = UserBadge.query.filter_by(
-                user_id=user_id, badge_id=badge.id
-            ).first()
-            if existing:
-                continue
-
-            earned = False
-            # Convert UTC to local time for time-based badge checks
-            # Using US/Eastern timezone - adjust to your server's timezone
-            local_tz = pytz.timezone("US/Eastern")
-
-            if slug == "lunch_rush_warrior":
-                lunch_orders = []
-                for o in all_orders:
-                    if o.ordered_at:
-                        # Convert UTC to local time
-                        if o.ordered_at.tzinfo is None:
-                            # Assume UTC if timezone-naive
-                            utc_time = pytz.utc.localize(o.ordered_at)
-                        else:
-                            utc_time = o.ordered_at.astimezone(pytz.utc)
-                        local_time = utc_time.astimezone(local_tz)
-                        if 12 <= local_time.hour < 13:
-                            lunch_orders.append(o)
-                if len(lunch_orders) >= 10:
-                    earned = True
-            elif slug == "early_bird":
-                early_orders = []
-                for o in all_orders:
-                    if o.ordered_at:
-                        # Convert UTC to local time
-                        if o.ordered_at.tzinfo is None:
-                            utc_time = pytz.utc.localize(o.ordered_at)
-                        else:
-                            utc_time = o.ordered_at.astimezone(pytz.utc)
-                        local_time = utc_time.astimezone(local_tz)
-                        if local_time.hour < 11:
-                            early_orders.append(o)
-                if len(early_orders) >= 5:
-                    earned = True
-            elif slug == "late_night_snacker":
-                late_orders = []
-                for o in all_orders:
-                    if o.ordered_at:
-                        # Convert UTC to local time
-                        if o.ordered_at.tzinfo is None:
-                            utc_time = pytz.utc.localize(o.ordered_at)
-                        else:
-                            utc_time = o.ordered_at.astimezone(pytz.utc)
-                        local_time = utc_time.astimezone(local_tz)
-                        if local_time.hour >= 20:  # 8 PM local time
-                            late_orders.append(o)
-                if len(late_orders) >= 5:
-                    earned = True
-            elif slug == "stackshack_regular":
-                if order_count >= 20:
-                    earned = True
-            elif slug == "century_club":
-                if order_count >= 100:
-                    earned = True
-            elif slug == "mystery_box_master":
-                # Check for surprise box orders (orders with "surprise" in burger name)
-                surprise_orders = [
-                    o
-                    for o in all_orders
-                    if any(
-                        item.burger_name and "surprise" in item.burger_name.lower()
-                        for item in o.items.all()
-                    )
-                ]
-                if len(surprise_orders) >= 5:
-                    earned = True
-
-            if earned:
-                user_badge = UserBadge(
-                    user_id=user_id, badge_id=badge.id, order_id=order.id
-                )
-                db.session.add(user_badge)
-                newly_earned.append(badge)
-
-                # Award points for earning badge
-                badge_points_map = {
-                    "lunch_rush_warrior": 100,
-                    "early_bird": 75,
-                    "late_night_snacker": 75,
-                    "stackshack_regular": 150,
-                    "century_club": 500,
-                    "mystery_box_master": 80,
-                }
-                points_reward = badge_points_map.get(slug, 0)
-                if points_reward > 0:
-                    GamificationService.earn_points(
-                        "badge_earned",
-                        user_id,
-                        points_reward,
-                        f"Badge earned: {name}",
-                        order.id,
-                        apply_multiplier=False,
-                    )
-
-        db.session.commit()
-        return newly_earned
+    @staticmethod
+    def tier_for_points(total_points):
+        """Get the tier a points balance qualifies for"""
+        if total_points >= 1501:
+            return "Gold"
+        if total_points >= 501:
+            return "Silver"
+        return "Bronze"
 
     @staticmethod
     def update_user_tier(user_id):
@@ -656,13 +461,7 @@ class GamificationService:
 
         total_points = GamificationService.get_user_points(user_id)
         old_tier = user.tier
-
-        if total_points >= 1501:
-            new_tier = "Gold"
-        elif total_points >= 501:
-            new_tier = "Silver"
-        else:
-            new_tier = "Bronze"
+        new_tier = GamificationService.tier_for_points(total_points)
 
         if new_tier != old_tier:
             user.tier = new_tier
@@ -716,39 +515,31 @@ class GamificationService:
         return total_points_earned, breakdown
 
     @staticmethod
-    def check_daily_bonus(user_id, order):
-        """Check and award ALL daily bonuses for today if conditions are met (max 2 per day)."""
-        from services.challenge_service import ChallengeService
+    def process_orders_batch(order_ids, replay=False, today=None):
+        """
+        Award points, badges and challenges for many paid orders at once.
 
-        today = date.today()
+        Loads everything in a constant number of queries and writes all rows
+        in one commit. See GamificationBatchService.process.
 
-        # Generate daily challenges if they don't exist
-        ChallengeService.generate_daily_challenges(today, max_challenges=2)
+        Returns:
+            dict: order_id -> rewards summary for each order processed
+        """
+        from services.gamification_batch_service import GamificationBatchService
 
-        # Get all daily bonuses for today
-        daily_bonuses = DailyBonus.query.filter_by(
-            bonus_date=today, is_active=True
-        ).all()
+        return GamificationBatchService.process(order_ids, replay=replay, today=today)
+
+    @staticmethod
+    def check_daily_bonus(user_id, order):
+        """Check and award ALL daily bonuses for today if conditions are met (max 2 per day)."""
+        # Today's daily bonuses, generated ahead by the scheduler
+        daily_bonuses = ChallengeCalendar.daily_bonuses()
 
         if not daily_bonuses:
             return False, None
 
         completed_bonuses = []
-        order_items = order.items.all()
-
-        # Get order time in local timezone for time-based challenges
-        local_tz = pytz.timezone("US/Eastern")
-        if order.ordered_at:
-            if order.ordered_at.tzinfo is None:
-                order_time = pytz.utc.localize(order.ordered_at).astimezone(local_tz)
-            else:
-                order_time = order.ordered_at.astimezone(local_tz)
-            order_hour = order_time.hour
-            order_minute = order_time.minute
-        else:
-            order_time = None
-            order_hour = None
-            order_minute = None
+        features = featurize(order)
 
         for daily_bonus in daily_bonuses:
             # Check if user already completed this bonus today
@@ -759,15 +550,7 @@ class GamificationService:
             if progress:
                 continue  # Skip already completed bonuses
 
-            # Check condition
-            condition_met = GamificationService._check_daily_condition(
-                daily_bonus.condition,
-                order_items,
-                order,
-                order_time,
-                order_hour,
-                order_minute,
-            )
+            condition_met = daily_met(daily_bonus.condition, features)
 
             if condition_met:
                 progress = UserChallengeProgress.query.filter_by(
@@ -801,6 +584,7 @@ class GamificationService:
 
         if completed_bonuses:
             db.session.commit()
+            RewardsSnapshot.invalidate(user_id)
             return True, (
                 completed_bonuses[0]
                 if len(completed_bonuses) == 1
@@ -809,164 +593,17 @@ class GamificationService:
 
         return False, None
 
-    @staticmethod
-    def _check_daily_condition(
-        condition, order_items, order, order_time, order_hour, order_minute
-    ):
-        """Check if a daily challenge condition is met"""
-        condition.lower()
-        order_item_names = [item.name.lower() for item in order_items]
-
-        # Get menu items for category checking
-        menu_items_by_category = {}
-        for item in order_items:
-            if item.menu_item_id:
-                mi = db.session.get(MenuItem, item.menu_item_id)
-                if mi:
-                    cat = mi.category.lower()
-                    if cat not in menu_items_by_category:
-                        menu_items_by_category[cat] = []
-                    menu_items_by_category[cat].append(mi.name.lower())
-
-        # Bun conditions
-        if condition == "keto_bun":
-            return any("keto" in name for name in order_item_names)
-        elif condition == "sesame_bun":
-            return any(
-                "sesame" in name or "black sesame" in name for name in order_item_names
-            )
-        elif condition == "veggie_bun":
-            return any(
-                "beetroot" in name or "carrot" in name for name in order_item_names
-            )
-        elif condition == "wheat_bun":
-            return any(
-                "wheat" in name or "honeywheat" in name for name in order_item_names
-            )
-        elif condition == "plain_bun":
-            return any("plain" in name and "bun" in name for name in order_item_names)
-
-        # Cheese conditions
-        elif condition == "any_cheese":
-            return "cheese" in menu_items_by_category.get("cheese", [])
-        elif condition == "cheddar_cheese":
-            return any("cheddar" in name for name in order_item_names)
-        elif condition == "swiss_cheese":
-            return any("swiss" in name for name in order_item_names)
-        elif condition == "two_cheeses":
-            cheeses = menu_items_by_category.get("cheese", [])
-            return len(set(cheeses)) >= 2
-        elif condition == "parmesan_cheese":
-            return any("parmesan" in name for name in order_item_names)
-
-        # Patty conditions
-        elif condition == "beef_patty":
-            patties = menu_items_by_category.get("patty", [])
-            return any("beef" in name or "low-calorie beef" in name for name in patties)
-        elif condition == "chicken_patty":
-            return any("chicken" in name for name in order_item_names)
-        elif condition == "veg_patty":
-            patties = menu_items_by_category.get("patty", [])
-            return any("veg" in name or "mixed veg" in name for name in patties)
-        elif condition == "pork_patty":
-            return any("pork" in name for name in order_item_names)
-        elif condition == "healthy_patty":
-            patties = menu_items_by_category.get("patty", [])
-            return any(
-                "low-calorie beef" in name or "mixed veg" in name for name in patties
-            )
-
-        # Sauce conditions
-        elif condition == "green_sauce":
-            return any("green" in name and "sauce" in name for name in order_item_names)
-        elif condition == "mayo":
-            return any("mayo" in name for name in order_item_names)
-        elif condition == "mustard":
-            return any("mustard" in name for name in order_item_names)
-        elif condition == "tomato_sauce":
-            return any(
-                "tomato" in name and "sauce" in name for name in order_item_names
-            )
-        elif condition == "two_sauces":
-            sauces = menu_items_by_category.get("sauce", [])
-            return len(set(sauces)) >= 2
-        elif condition == "all_sauces":
-            sauces = menu_items_by_category.get("sauce", [])
-            return len(set(sauces)) >= 4  # Assuming 4 sauces total
-
-        # Topping conditions
-        elif condition == "pickles":
-            return any("pickle" in name for name in order_item_names)
-        elif condition == "tomato":
-            return any(
-                "tomato" in name and "sauce" not in name for name in order_item_names
-            )
-        elif condition == "lettuce":
-            return any("lettuce" in name for name in order_item_names)
-        elif condition == "onion":
-            return any("onion" in name for name in order_item_names)
-        elif condition == "capsicum":
-            return any("capsicum" in name for name in order_item_names)
-        elif condition == "three_toppings":
-            toppings = menu_items_by_category.get("topping", [])
-            return len(set(toppings)) >= 3
-        elif condition == "all_toppings":
-            toppings = menu_items_by_category.get("topping", [])
-            return len(set(toppings)) >= 5  # Assuming 5 toppings total
-
-        # Behavioral/Time conditions
-        elif condition == "before_11am" and order_hour is not None:
-            return order_hour < 11
-        elif condition == "between_2_4pm" and order_hour is not None:
-            return 14 <= order_hour < 16
-        elif condition == "after_8pm" and order_hour is not None:
-            return order_hour >= 20
-        elif condition == "lunch_rush" and order_hour is not None:
-            return order_hour == 12
-        elif (
-            condition == "exact_222"
-            and order_hour is not None
-            and order_minute is not None
-        ):
-            return order_hour == 14 and order_minute == 22
-        elif condition == "surprise_burger":
-            # Check if order was from surprise box (would need to track this)
-            return False  # Placeholder
-        elif condition == "all_healthy":
-            # Check if all items are healthy
-            for item in order_items:
-                if item.menu_item_id:
-                    mi = db.session.get(MenuItem, item.menu_item_id)
-                    if mi and not mi.is_healthy_choice:
-                        return False
-            return True
-
-        return False
-
     @staticmethod
     def check_weekly_challenge(user_id, order):
         """Check and update ALL weekly challenge progress (max 3 per week)."""
-        from services.challenge_service import ChallengeService
-
-        today = date.today()
-        days_since_monday = today.weekday()
-        week_start = today - timedelta(days=days_since_monday)
-        week_end = week_start + timedelta(days=6)
-
-        # Generate weekly challenges if they don't exist
-        ChallengeService.generate_weekly_challenges(week_start, max_challenges=3)
-
-        # Find all current week's challenges
-        challenges = WeeklyChallenge.query.filter(
-            WeeklyChallenge.week_start <= today,
-            WeeklyChallenge.week_end >= today,
-            WeeklyChallenge.is_active,
-        ).all()
+        # This week's challenges, generated ahead by the scheduler
+        challenges = ChallengeCalendar.weekly_challenges()
 
         if not challenges:
             return False, None
 
         completed_challenges = []
+        features = featurize(order)
 
         for challenge in challenges:
             # Get or create progress
@@ -974,18 +611,7 @@ class GamificationService:
                 user_id=user_id, challenge_id=challenge.id
             ).first()
 
-            # Get target from challenge definition
-            challenge_def = ChallengeService.WEEKLY_CHALLENGES.get(
-                next(
-                    (
-                        k
-                        for k, v in ChallengeService.WEEKLY_CHALLENGES.items()
-                        if v["condition"] == challenge.condition
-                    ),
-                    None,
-                )
-            )
-            target = challenge_def["target"] if challenge_def else 3
+            target = GamificationService._weekly_target(challenge)
 
             if not progress:
                 progress = UserChallengeProgress(
@@ -1002,7 +628,7 @@ class GamificationService:
 
             # Update progress based on condition
             progress_updated = GamificationService._update_weekly_progress(
-                challenge, progress, order, user_id, week_start, week_end
+                challenge, progress, features
             )
 
             if (
@@ -1023,60 +649,34 @@ class GamificationService:
                 )
                 completed_challenges.append(challenge)
 
+        db.session.commit()
+        RewardsSnapshot.invalidate(user_id)
         if completed_challenges:
-            db.session.commit()
             return True, (
                 completed_challenges[0]
                 if len(completed_challenges) == 1
                 else completed_challenges
             )
 
-        db.session.commit()
         return True, None
 
     @staticmethod
-    def _update_weekly_progress(
-        challenge, progress, order, user_id, week_start, week_end
-    ):
-        """Update weekly challenge progress based on condition"""
-        condition = challenge.condition
-        order_items = order.items.all()
-
-        # Get menu items by category
-        menu_items_by_category = {}
-        for item in order_items:
-            if item.menu_item_id:
-                mi = db.session.get(MenuItem, item.menu_item_id)
-                if mi:
-                    cat = mi.category.lower()
-                    if cat not in menu_items_by_category:
-                        menu_items_by_category[cat] = set()
-                    menu_items_by_category[cat].add(mi.name.lower())
-
-        # Simple progress updates - most challenges increment by 1 per qualifying order
-        # More complex challenges would need additional logic
-        if (
-            condition.startswith("three_")
-            or condition.startswith("four_")
-            or condition.startswith("five_")
-        ):
-            # Most challenges: increment if condition met in this order
-            progress.progress += 1
-            return True
-        elif "all_" in condition:
-            # "All" challenges: check if all items of that type are present
-            if "buns" in condition:
-                buns = menu_items_by_category.get("bun", set())
-                if len(buns) >= 3:
-                    progress.progress += 1
-                    return True
-            # Similar for other "all" conditions
-            progress.progress += 1
-            return True
-        else:
-            # Default: increment progress
-            progress.progress += 1
-            return True
+    def _weekly_target(challenge):
+        """Get a weekly challenge's target from its definition (default 3)"""
+        from services.challenge_service import ChallengeService
+
+        for challenge_def in ChallengeService.WEEKLY_CHALLENGES.values():
+            if challenge_def["condition"] == challenge.condition:
+                return challenge_def["target"]
+        return 3
+
+    @staticmethod
+    def _update_weekly_progress(challenge, progress, features):
+        """Count the order towards a weekly challenge if it qualifies"""
+        if not weekly_counts(challenge.condition, features):
+            return False
+        progress.progress += 1
+        return True
 
     @staticmethod
     def get_monthly_leaderboard(month=None, year=None, limit=5):
@@ -1086,37 +686,6 @@ class GamificationService:
             month = now.month
             year = now.year
 
-        start_date = datetime(year, month, 1)
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1)
-        else:
-            end_date = datetime(year, month + 1, 1)
-
-        # Get top point earners for the month
-        top_earners = (
-            db.session.query(
-                User.id,
-                User.username,
-                func.sum(PointsTransaction.points).label("total_points"),
-            )
-            .join(PointsTransaction, User.id == PointsTransaction.user_id)
-            .filter(
-                PointsTransaction.created_at >= start_date,
-                PointsTransaction.created_at < end_date,
-                PointsTransaction.points > 0,
-            )
-            .group_by(User.id, User.username)
-            .order_by(func.sum(PointsTransaction.points).desc())
-            .limit(limit)
-            .all()
-        )
-
-        return [
-            {
-                "user_id": user_id,
-                "username": username,
-                "points": int(total_points) if total_points else 0,
-                "rank": idx + 1,
-            }
-            for idx, (user_id, username, total_points) in enumerate(top_earners)
-        ]
+        return LeaderboardService.get_leaderboard(
+            "monthly", date(year, month, 1), limit=limit
+        )["leaderboard"]
@@ -0,0 +1,258 @@
+"""
+Gamification Worker - Processes post-payment gamification off the request path.
+
+Payment enqueues one GamificationJob per paid order in the same commit as
+the payment itself. This worker claims pending jobs in batches and awards
+points, badges, daily bonuses, weekly challenges and tier changes for the
+whole batch with GamificationService.process_orders_batch.
+
+Run from the stackshack directory:
+    python -m services.gamification_worker            # poll forever
+    python -m services.gamification_worker --once     # drain one batch and exit
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_
+
+from database.db import db
+from models.gamification import Badge, GamificationJob, PointsTransaction, UserBadge
+from models.order import Order
+from models.user import User
+
+# Jobs claimed per pass
+BATCH_SIZE = 50
+
+# Seconds to sleep when the queue is empty
+POLL_INTERVAL = 2.0
+
+# A failing job is retried this many times before it is marked failed
+MAX_ATTEMPTS = 3
+
+# A job stuck in "processing" this long (worker crashed) is claimed again
+STALE_AFTER = timedelta(minutes=10)
+
+
+class GamificationWorker:
+    """DB-backed job queue for post-payment gamification"""
+
+    @staticmethod
+    def enqueue(order):
+        """
+        Queue gamification for a paid order.
+
+        The job is added to the current session and committed by the caller,
+        so it lands atomically with the payment. Enqueuing an order twice is
+        a no-op.
+
+        Returns:
+            GamificationJob: The new or existing job
+        """
+        existing = GamificationJob.query.filter_by(order_id=order.id).first()
+        if existing:
+            return existing
+
+        job = GamificationJob(order_id=order.id, user_id=order.user_id)
+        db.session.add(job)
+        return job
+
+    @staticmethod
+    def claim_batch(limit=BATCH_SIZE, now=None):
+        """
+        Claim up to `limit` runnable jobs, oldest first.
+
+        Rows are locked with SKIP LOCKED where the database supports it, so
+        several workers can drain the queue side by side.
+
+        Returns:
+            list: Claimed GamificationJob objects, already committed as processing
+        """
+        now = now or datetime.utcnow()
+        jobs = (
+            GamificationJob.query.filter(
+                or_(
+                    GamificationJob.status == "pending",
+                    (GamificationJob.status == "processing")
+                    & (GamificationJob.started_at < now - STALE_AFTER),
+                )
+            )
+            .order_by(GamificationJob.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+        for job in jobs:
+            job.status = "processing"
+            job.started_at = now
+            job.attempts = (job.attempts or 0) + 1
+        db.session.commit()
+        return jobs
+
+    @staticmethod
+    def order_rewards(order_id):
+        """
+        Summarize what an order earned, read back from the ledger.
+
+        Returns:
+            dict: points (int), breakdown (event_type -> points),
+                badges (list of badge dicts), tier (str or None)
+        """
+        rows = (
+            db.session.query(
+                PointsTransaction.event_type, func.sum(PointsTransaction.points)
+            )
+            .filter(PointsTransaction.order_id == order_id)
+            .group_by(PointsTransaction.event_type)
+            .all()
+        )
+        breakdown = {event_type: int(points or 0) for event_type, points in rows}
+
+        badges = (
+            db.session.query(Badge)
+            .join(UserBadge, UserBadge.badge_id == Badge.id)
+            .filter(UserBadge.order_id == order_id)
+            .order_by(UserBadge.id)
+            .all()
+        )
+
+        tier = (
+            db.session.query(User.tier)
+            .join(Order, Order.user_id == User.id)
+            .filter(Order.id == order_id)
+            .scalar()
+        )
+
+        return {
+            "points": sum(breakdown.values()),
+            "breakdown": breakdown,
+            "badges": [
+                {"name": badge.name, "slug": badge.slug, "icon": badge.icon}
+                for badge in badges
+            ],
+            "tier": tier,
+        }
+
+    @staticmethod
+    def _finish(job, results):
+        """Mark a job done with the rewards its order earned (not committed)"""
+        job.result = results.get(job.order_id) or GamificationWorker.order_rewards(
+            job.order_id
+        )
+        job.status = "done"
+        job.last_error = None
+        job.completed_at = datetime.utcnow()
+
+    @staticmethod
+    def process_job(job):
+        """
+        Process a single claimed job and record its outcome.
+
+        The batch service skips orders that already have purchase points, so
+        a job re-claimed after a crash does not pay out twice.
+
+        Returns:
+            bool: True if the job finished successfully
+        """
+        from services.gamification_service import GamificationService
+
+        job_id = job.id
+        order_id = job.order_id
+        try:
+            if not db.session.get(Order, order_id):
+                raise ValueError(f"Order {order_id} not found")
+
+            results = GamificationService.process_orders_batch([order_id])
+            GamificationWorker._finish(db.session.get(GamificationJob, job_id), results)
+            db.session.commit()
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(GamificationJob, job_id)
+            job.status = "failed" if job.attempts >= MAX_ATTEMPTS else "pending"
+            job.last_error = str(e)
+            db.session.commit()
+            print(f"Gamification job {job_id} (order {order_id}) failed: {e}")
+            return False
+
+    @staticmethod
+    def run_once(limit=BATCH_SIZE):
+        """
+        Claim one batch of jobs and process all their orders in one pass.
+
+        If the batch fails as a whole, its jobs are retried one at a time so a
+        single bad order cannot hold back the rest.
+
+        Returns:
+            dict: claimed, done and failed counts
+        """
+        from services.gamification_service import GamificationService
+
+        jobs = GamificationWorker.claim_batch(limit)
+        if not jobs:
+            return {"claimed": 0, "done": 0, "failed": 0}
+
+        job_ids = [job.id for job in jobs]
+        try:
+            results = GamificationService.process_orders_batch(
+                [job.order_id for job in jobs]
+            )
+            for job in jobs:
+                GamificationWorker._finish(job, results)
+            db.session.commit()
+            done = len(jobs)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Gamification batch failed, retrying jobs one by one: {e}")
+            done = sum(
+                1
+                for job_id in job_ids
+                if GamificationWorker.process_job(
+                    db.session.get(GamificationJob, job_id)
+                )
+            )
+
+        return {"claimed": len(jobs), "done": done, "failed": len(jobs) - done}
+
+    @staticmethod
+    def run(limit=BATCH_SIZE, poll_interval=POLL_INTERVAL, once=False):
+        """Process batches until stopped, sleeping while the queue is empty"""
+        while True:
+            stats = GamificationWorker.run_once(limit)
+            if stats["claimed"]:
+                print(
+                    f"Processed {stats['claimed']} jobs "
+                    f"({stats['done']} done, {stats['failed']} failed)"
+                )
+            if once:
+                return stats
+            if stats["claimed"] < limit:
+                time.sleep(poll_interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the gamification worker")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument(
+        "--once", action="store_true", help="Process one batch and exit"
+    )
+    parser.add_argument("--config", default="development")
+    args = parser.parse_args()
+
+    from app import create_app
+
+    app = create_app(args.config)
+    with app.app_context():
+        print("Gamification worker started")
+        try:
+            GamificationWorker.run(args.batch_size, args.poll_interval, args.once)
+        except KeyboardInterrupt:
+            print("Gamification worker stopped")
+
+
+if __name__ == "__main__":
+    main()
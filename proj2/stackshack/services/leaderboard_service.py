@@ -0,0 +1,308 @@
+"""
+Leaderboard Service - Incrementally maintained leaderboards by time window.
+
+Points earned are added to a leaderboard_scores row per user for the day,
+week, month and all time they fall in, in the same commit as the ledger row,
+so no leaderboard ever sums the points ledger. Each process keeps a sorted
+snapshot per window, built from that table with one query: paging is a
+slice, ties share a rank (1, 2, 2, 4) and a user's rank is a binary search.
+
+A snapshot is rebuilt once it is MAX_AGE seconds old, or MIN_REFRESH seconds
+after this process recorded points in its window. Windows are UTC.
+
+Rebuild the table from the ledger with scripts/backfill_leaderboard_scores.py.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import (
+    Date,
+    DateTime,
+    Integer,
+    String,
+    bindparam,
+    delete,
+    exists,
+    func,
+    literal,
+    select,
+)
+from sqlalchemy.exc import IntegrityError
+
+from database.db import db
+from models.gamification import LeaderboardScore, PointsTransaction
+from models.user import User
+
+PERIODS = ("daily", "weekly", "monthly", "all_time")
+ALL_TIME = date(1970, 1, 1)
+
+PAGE_SIZE = 10
+MAX_AGE = 60  # seconds before a snapshot is rebuilt regardless
+MIN_REFRESH = 1  # seconds between rebuilds of a window with local writes
+MAX_WINDOWS = 32  # snapshots kept per process
+
+
+def period_start(period, moment):
+    """
+    First day of the window a datetime or date falls in.
+
+    Raises:
+        ValueError: Unknown period
+    """
+    day = moment.date() if isinstance(moment, datetime) else moment
+    if period == "daily":
+        return day
+    if period == "weekly":
+        return day - timedelta(days=day.weekday())
+    if period == "monthly":
+        return day.replace(day=1)
+    if period == "all_time":
+        return ALL_TIME
+    raise ValueError(f"Unknown leaderboard period: {period}")
+
+
+class LeaderboardSnapshot:
+    """One window's scores, highest first, ties broken by user id"""
+
+    def __init__(self, entries):
+        self.entries = entries  # [(user_id, username, points)]
+        self.negated = [-points for _user_id, _username, points in entries]
+        self.points = {user_id: points for user_id, _username, points in entries}
+        self.built_at = time.monotonic()
+
+    def rank_for(self, points):
+        """Competition rank of a score: 1 + users with strictly more points"""
+        return bisect_left(self.negated, -points) + 1
+
+    def rank(self, user_id):
+        """
+        Returns:
+            dict: rank and points, or None if the user scored nothing
+        """
+        points = self.points.get(user_id)
+        if points is None:
+            return None
+        return {"rank": self.rank_for(points), "points": points}
+
+    def page(self, page=1, limit=PAGE_SIZE):
+        offset = (max(page, 1) - 1) * limit
+        return [
+            {
+                "user_id": user_id,
+                "username": username,
+                "points": points,
+                "rank": self.rank_for(points),
+            }
+            for user_id, username, points in self.entries[offset : offset + limit]
+        ]
+
+
+class LeaderboardCache:
+    """Per-process snapshots by (period, period_start)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshots = OrderedDict()
+        self.dirty = set()
+
+    def get(self, key):
+        with self.lock:
+            snapshot = self.snapshots.get(key)
+            if snapshot is not None:
+                self.snapshots.move_to_end(key)
+                age = time.monotonic() - snapshot.built_at
+                if age < (MIN_REFRESH if key in self.dirty else MAX_AGE):
+                    return snapshot
+
+        snapshot = LeaderboardService.load(*key)
+        with self.lock:
+            self.snapshots[key] = snapshot
+            self.snapshots.move_to_end(key)
+            self.dirty.discard(key)
+            while len(self.snapshots) > MAX_WINDOWS:
+                old, _snapshot = self.snapshots.popitem(last=False)
+                self.dirty.discard(old)
+        return snapshot
+
+    def mark_dirty(self, keys):
+        with self.lock:
+            self.dirty.update(keys)
+
+
+class LeaderboardService:
+    """Maintain leaderboard_scores and read leaderboards from snapshots"""
+
+    @staticmethod
+    def record(user_id, points, at=None):
+        """Add earned points to the user's windows; the caller commits"""
+        LeaderboardService.record_many([(user_id, points, at)])
+
+    @staticmethod
+    def record_many(earned):
+        """
+        Add earned points to every window they fall in, for many users at
+        once. Redemptions (negative points) do not lower a score.
+
+        Call before the caller commits so scores land with the ledger rows.
+
+        Args:
+            earned: list of (user_id, points, at); at defaults to now
+        """
+        now = datetime.utcnow()
+        deltas = defaultdict(int)
+        for user_id, points, at in earned:
+            if points <= 0:
+                continue
+            for period in PERIODS:
+                deltas[(user_id, period, period_start(period, at or now))] += points
+        if not deltas:
+            return
+
+        table = LeaderboardScore.__table__
+        rows = [
+            {
+                "b_user_id": user_id,
+                "b_period": period,
+                "b_period_start": start,
+                "b_points": points,
+                "b_now": now,
+            }
+            for (user_id, period, start), points in deltas.items()
+        ]
+        key = (
+            table.c.user_id == bindparam("b_user_id"),
+            table.c.period == bindparam("b_period"),
+            table.c.period_start == bindparam("b_period_start"),
+        )
+        # Two executemany statements whatever the batch size: create the
+        # missing rows at zero, then add every delta
+        create = table.insert().from_select(
+            ["user_id", "period", "period_start", "points", "updated_at"],
+            select(
+                bindparam("b_user_id", type_=Integer),
+                bindparam("b_period", type_=String),
+                bindparam("b_period_start", type_=Date),
+                literal(0),
+                bindparam("b_now", type_=DateTime),
+            ).where(~exists().where(*key)),
+        )
+        increment = (
+            table.update()
+            .where(*key)
+            .values(points=table.c.points + bindparam("b_points"), updated_at=now)
+        )
+
+        try:
+            with db.session.begin_nested():
+                db.session.execute(create, rows)
+        except IntegrityError:
+            # Another writer created some of these rows first; they are
+            # visible now, so only the rest are inserted
+            db.session.execute(create, rows)
+        db.session.execute(increment, rows)
+
+        cache = current_app.extensions.get("leaderboards")
+        if cache is not None:
+            cache.mark_dirty({(period, start) for _u, period, start in deltas})
+
+    @staticmethod
+    def load(period, start):
+        """Build a window's snapshot with one query"""
+        rows = db.session.execute(
+            select(LeaderboardScore.user_id, User.username, LeaderboardScore.points)
+            .join(User, User.id == LeaderboardScore.user_id)
+            .where(
+                LeaderboardScore.period == period,
+                LeaderboardScore.period_start == start,
+                LeaderboardScore.points > 0,
+            )
+            .order_by(LeaderboardScore.points.desc(), LeaderboardScore.user_id)
+        ).all()
+        return LeaderboardSnapshot([tuple(row) for row in rows])
+
+    @staticmethod
+    def snapshot(period, start=None):
+        """
+        A window's snapshot; start is any date in the window (default: now).
+
+        Raises:
+            ValueError: Unknown period
+        """
+        key = (period, period_start(period, start or datetime.utcnow()))
+        cache = current_app.extensions.setdefault("leaderboards", LeaderboardCache())
+        return cache.get(key)
+
+    @staticmethod
+    def get_leaderboard(
+        period="monthly", start=None, page=1, limit=PAGE_SIZE, user_id=None
+    ):
+        """
+        One page of a leaderboard, and the user's own standing.
+
+        Returns:
+            dict: period, period_start, page, total (users ranked),
+                leaderboard (list of user_id, username, points, rank) and,
+                when user_id is given, me (rank and points, or None)
+        """
+        first = period_start(period, start or datetime.utcnow())
+        snapshot = LeaderboardService.snapshot(period, first)
+        result = {
+            "period": period,
+            "period_start": first.isoformat(),
+            "page": max(page, 1),
+            "total": len(snapshot.entries),
+            "leaderboard": snapshot.page(page, limit),
+        }
+        if user_id is not None:
+            result["me"] = snapshot.rank(user_id)
+        return result
+
+    @staticmethod
+    def rebuild():
+        """
+        Recompute every window from the points ledger. Does not commit.
+
+        Returns:
+            int: Score rows written
+        """
+        db.session.execute(delete(LeaderboardScore))
+
+        day = func.date(PointsTransaction.created_at)
+        daily = db.session.execute(
+            select(PointsTransaction.user_id, day, func.sum(PointsTransaction.points))
+            .where(PointsTransaction.points > 0)
+            .group_by(PointsTransaction.user_id, day)
+        )
+
+        scores = defaultdict(int)
+        for user_id, bucket_day, points in daily:
+            if isinstance(bucket_day, str):
+                bucket_day = date.fromisoformat(bucket_day[:10])
+            for period in PERIODS:
+                scores[(user_id, period, period_start(period, bucket_day))] += int(
+                    points
+                )
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                "user_id": user_id,
+                "period": period,
+                "period_start": start,
+                "points": points,
+                "updated_at": now,
+            }
+            for (user_id, period, start), points in scores.items()
+        ]
+        if rows:
+            db.session.execute(LeaderboardScore.__table__.insert(), rows)
+
+        cache = current_app.extensions.get("leaderboards")
+        if cache is not None:
+            cache.mark_dirty(set(cache.snapshots))
+        return len(rows)
@@ -0,0 +1,133 @@
+"""
+Menu Catalog - Cached, read-only snapshot of the menu.
+
+The menu is a few dozen rows and changes rarely, but recommendations, the
+surprise box, predefined burgers, coupon discounts and badge checks used to
+look items up one query at a time. They now read a snapshot indexed by id,
+name and category that is built with one query and shared by the whole
+process. A request keeps the snapshot it started with, so it sees one
+consistent menu.
+
+MenuController bumps the catalog version after every committed write, and
+OrderController does when an order sells an item out. Other processes cannot
+see that bump, so a snapshot is also rebuilt once it is MAX_AGE seconds old.
+"""
+
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from flask import current_app, g, has_request_context
+
+from models.menu_item import MenuItem
+
+# Seconds before a snapshot is rebuilt even without a local write
+MAX_AGE = 60
+
+MenuEntry = namedtuple(
+    "MenuEntry",
+    [
+        "id",
+        "name",
+        "category",
+        "description",
+        "price",
+        "calories",
+        "protein",
+        "is_available",
+        "is_healthy_choice",
+        "image_url",
+        "stock_quantity",
+        "low_stock_threshold",
+    ],
+)
+
+
+class MenuSnapshot:
+    """An immutable view of every menu item at one catalog version"""
+
+    def __init__(self, version, entries):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.items = tuple(sorted(entries, key=lambda entry: entry.id))
+
+        by_name = {}
+        by_category = {}
+        for entry in self.items:
+            by_name.setdefault(entry.name, entry)
+            by_category.setdefault((entry.category or "").lower(), []).append(entry)
+
+        self.by_id = MappingProxyType({entry.id: entry for entry in self.items})
+        self.by_name = MappingProxyType(by_name)
+        self.by_category = MappingProxyType(
+            {category: tuple(entries) for category, entries in by_category.items()}
+        )
+
+    def get(self, item_id):
+        """Look up an item by id (None if missing)"""
+        return self.by_id.get(item_id)
+
+    def named(self, name):
+        """Look up an item by exact name (None if missing)"""
+        return self.by_name.get(name)
+
+    def in_category(self, category, available_only=False):
+        """Items of a category (case-insensitive), optionally only available ones"""
+        entries = self.by_category.get(category.lower(), ())
+        if available_only:
+            return [entry for entry in entries if entry.is_available]
+        return list(entries)
+
+
+class MenuCatalog:
+    """Process-wide, request-pinned cache of the menu"""
+
+    @staticmethod
+    def _state():
+        return current_app.extensions.setdefault(
+            "menu_catalog", {"version": 0, "snapshot": None}
+        )
+
+    @staticmethod
+    def build(version):
+        """Load every menu item into a new snapshot with one query"""
+        entries = [
+            MenuEntry(**{field: getattr(item, field) for field in MenuEntry._fields})
+            for item in MenuItem.query.all()
+        ]
+        return MenuSnapshot(version, entries)
+
+    @staticmethod
+    def current():
+        """
+        Get the current menu snapshot, building it if needed.
+
+        Returns:
+            MenuSnapshot: The snapshot pinned to this request, or the
+                process-wide one outside a request
+        """
+        if has_request_context() and "menu_catalog" in g:
+            return g.menu_catalog
+
+        state = MenuCatalog._state()
+        snapshot = state["snapshot"]
+        if (
+            snapshot is None
+            or snapshot.version != state["version"]
+            or time.monotonic() - snapshot.built_at > MAX_AGE
+        ):
+            snapshot = MenuCatalog.build(state["version"])
+            state["snapshot"] = snapshot
+
+        if has_request_context():
+            g.menu_catalog = snapshot
+        return snapshot
+
+    @staticmethod
+    def invalidate():
+        """Drop the snapshot after a committed menu write"""
+        state = MenuCatalog._state()
+        state["version"] += 1
+        state["snapshot"] = None
+        if has_request_context():
+            g.pop("menu_catalog", None)
@@ -0,0 +1,158 @@
+"""
+Order Events - In-process publish/subscribe hub for order status changes.
+
+Controllers publish an event after committing a status change; each open
+Server-Sent Events stream holds a subscription with its own queue. Streams
+never touch the database, so an open stream costs a thread and a queue but
+no connection. Recent events are kept in a ring buffer so a reconnecting
+client can resume from its Last-Event-ID.
+
+The hub lives in the app's extensions, so events only reach streams served
+by the same process.
+"""
+
+import json
+import queue
+import threading
+from collections import deque
+
+from flask import current_app
+
+HEARTBEAT = 15  # seconds between keep-alive comments on an idle stream
+BUFFER_SIZE = 500  # events kept for Last-Event-ID resume
+QUEUE_SIZE = 100  # undelivered events before a slow stream is dropped
+RETRY_MS = 3000  # client reconnect delay
+
+
+class Subscription:
+    """One open stream: which events it wants and where they are queued"""
+
+    def __init__(self, user_id=None, order_ids=None):
+        self.user_id = user_id  # None for staff, who see every order
+        self.order_ids = set(order_ids) if order_ids else None
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+
+    def wants(self, event):
+        if self.user_id is not None and event["user_id"] != self.user_id:
+            return False
+        return self.order_ids is None or event["order_id"] in self.order_ids
+
+
+def format_event(event):
+    """Server-Sent Events frame for one event"""
+    return f"id: {event['id']}\nevent: order_status\ndata: {json.dumps(event)}\n\n"
+
+
+class OrderEventHub:
+    """Fan order status events out to subscribed streams"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_id = 0
+        self.buffer = deque(maxlen=BUFFER_SIZE)
+        self.subscriptions = set()
+
+    def publish(self, order_id, user_id, status):
+        """Record an event and queue it for every interested stream"""
+        return self.publish_many([(order_id, user_id, status)])[0]
+
+    def publish_many(self, changes):
+        """
+        Record a batch of (order_id, user_id, status) events under one lock
+        and queue them for every interested stream in one pass.
+        """
+        with self.lock:
+            events = []
+            for order_id, user_id, status in changes:
+                self.last_id += 1
+                events.append(
+                    {
+                        "id": self.last_id,
+                        "order_id": order_id,
+                        "user_id": user_id,
+                        "status": status,
+                    }
+                )
+            self.buffer.extend(events)
+            subscriptions = list(self.subscriptions)
+
+        for subscription in subscriptions:
+            for event in events:
+                if subscription.wants(event):
+                    try:
+                        subscription.queue.put_nowait(event)
+                    except queue.Full:
+                        # The client reconnects and resumes from Last-Event-ID
+                        subscription.overflowed = True
+        return events
+
+    def subscribe(self, user_id=None, order_ids=None):
+        """Open a subscription; pass user_id=None for every order"""
+        subscription = Subscription(user_id, order_ids)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def replay(self, subscription, last_event_id):
+        """Buffered events after last_event_id that the subscription wants"""
+        with self.lock:
+            events = list(self.buffer)
+        return [
+            event
+            for event in events
+            if event["id"] > last_event_id and subscription.wants(event)
+        ]
+
+    def stream(
+        self, user_id=None, order_ids=None, last_event_id=None, heartbeat=HEARTBEAT
+    ):
+        """
+        Generate the Server-Sent Events body for a new subscription.
+
+        Replays missed events when last_event_id is given (sending a reset
+        event if some already left the buffer), then waits on the
+        subscription's queue, sending a comment every heartbeat seconds so
+        proxies keep the connection open. Unsubscribes when the client goes
+        away or falls too far behind.
+        """
+        # Subscribe before replaying so nothing published in between is lost
+        subscription = self.subscribe(user_id, order_ids)
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            sent = 0
+            if last_event_id is not None:
+                with self.lock:
+                    oldest = self.buffer[0]["id"] if self.buffer else self.last_id + 1
+                if last_event_id < oldest - 1:
+                    # Events were missed for good; the client starts over
+                    yield "event: reset\ndata: {}\n\n"
+                for event in self.replay(subscription, last_event_id):
+                    sent = event["id"]
+                    yield format_event(event)
+
+            while not subscription.overflowed:
+                try:
+                    event = subscription.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                # Already replayed from the buffer
+                if event["id"] > sent:
+                    yield format_event(event)
+        finally:
+            self.unsubscribe(subscription)
+
+    @staticmethod
+    def current():
+        """Get this process's hub"""
+        return current_app.extensions.setdefault("order_events", OrderEventHub())
+
+    @staticmethod
+    def publish_order(order):
+        """Publish an order's committed status"""
+        return OrderEventHub.current().publish(order.id, order.user_id, order.status)
@@ -0,0 +1,139 @@
+"""
+Order History Service - Keyset-paginated order lists for customers and staff.
+
+Pages run newest first on (ordered_at, id) and continue from a cursor naming
+the last order already shown, so every page costs the same two queries: one
+for the orders and one IN query for all of their items, which are grouped
+into burgers here instead of in the template.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+from models.order import Order, OrderItem
+
+PAGE_SIZE = 25
+
+OrderPage = namedtuple("OrderPage", ["orders", "burgers", "next_cursor"])
+BurgerGroup = namedtuple("BurgerGroup", ["burger_index", "title", "items"])
+
+
+def encode_cursor(order):
+    """Cursor for the page after this order"""
+    return f"{order.ordered_at.isoformat()}_{order.id}"
+
+
+def decode_cursor(cursor):
+    """
+    Split a cursor back into (ordered_at, id).
+
+    Raises:
+        ValueError: The cursor is malformed
+    """
+    ordered_at, _, order_id = cursor.rpartition("_")
+    return datetime.fromisoformat(ordered_at), int(order_id)
+
+
+def group_burgers(items):
+    """
+    Group an order's items by burger_index, in burger order.
+
+    Items without a burger_index form burger 0. Burgers without a
+    pre-defined name are titled "Custom Burger #n", counting only those.
+    """
+    by_index = {}
+    for item in items:
+        by_index.setdefault(item.burger_index or 0, []).append(item)
+
+    groups = []
+    custom = 0
+    for burger_index in sorted(by_index):
+        burger_items = by_index[burger_index]
+        title = burger_items[0].burger_name
+        if not title:
+            custom += 1
+            title = f"Custom Burger #{custom}"
+        groups.append(BurgerGroup(burger_index, title, burger_items))
+    return groups
+
+
+class OrderHistoryService:
+    """Cursor pages of orders with their items grouped into burgers"""
+
+    @staticmethod
+    def page(query, before=None, limit=PAGE_SIZE):
+        """
+        Fetch one page of orders from an Order query.
+
+        Args:
+            query: Order query with any filters already applied
+            before: Cursor from a previous page, or None for the newest orders
+            limit: Orders per page
+
+        Returns:
+            OrderPage: orders, burgers (dict order id -> list of BurgerGroup)
+                and next_cursor (None on the last page)
+
+        Raises:
+            ValueError: before is not a valid cursor
+        """
+        if before:
+            ordered_at, order_id = decode_cursor(before)
+            query = query.filter(
+                or_(
+                    Order.ordered_at < ordered_at,
+                    and_(Order.ordered_at == ordered_at, Order.id < order_id),
+                )
+            )
+
+        # One extra row tells whether another page follows
+        orders = (
+            query.order_by(Order.ordered_at.desc(), Order.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+        next_cursor = encode_cursor(orders[limit - 1]) if len(orders) > limit else None
+        orders = orders[:limit]
+
+        items_by_order = {order.id: [] for order in orders}
+        if orders:
+            for item in (
+                OrderItem.query.filter(OrderItem.order_id.in_(items_by_order))
+                .order_by(OrderItem.order_id, OrderItem.id)
+                .all()
+            ):
+                items_by_order[item.order_id].append(item)
+
+        burgers = {
+            order_id: group_burgers(items) for order_id, items in items_by_order.items()
+        }
+        return OrderPage(orders, burgers, next_cursor)
+
+    @staticmethod
+    def to_dict(page):
+        """JSON-ready form of a page for infinite scroll"""
+        return {
+            "orders": [
+                {
+                    "id": order.id,
+                    "user_id": order.user_id,
+                    "total_price": float(order.total_price),
+                    "status": order.status,
+                    "ordered_at": (
+                        order.ordered_at.isoformat() if order.ordered_at else None
+                    ),
+                    "burgers": [
+                        {
+                            "burger_index": group.burger_index,
+                            "title": group.title,
+                            "items": [item.to_dict() for item in group.items],
+                        }
+                        for group in page.burgers[order.id]
+                    ],
+                }
+                for order in page.orders
+            ],
+            "next_cursor": page.next_cursor,
+        }
@@ -0,0 +1,184 @@
+"""
+Payment Idempotency - Replay payment responses to retried requests.
+
+A client sends an Idempotency-Key with each payment (the checkout page
+renders one per visit). The first request with a key claims it by inserting
+a payment_idempotency row; the (user, key) unique constraint lets only one
+request win. The winner runs the payment and stores its response on the
+row, or releases the key if the request was rejected before reaching the
+gateway. A retry with the same key gets the stored response without reaching
+the gateway or gamification, or is told the payment is still in progress
+while the first request runs.
+
+Keys expire after PAYMENT_IDEMPOTENCY_TTL seconds. Expired keys are ignored
+on lookup and deleted by `python -m services.payment_idempotency`, which is
+meant to run from cron.
+"""
+
+import argparse
+import hashlib
+import json
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, delete, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from database.db import db
+from models.payment import PaymentIdempotencyKey
+
+MAX_KEY_LENGTH = 255
+PROCESSING_TIMEOUT = 300  # seconds before a claim left by a crash is taken over
+FINGERPRINT_FIELDS = ("order_id", "payment_method", "amount")
+
+# state: new (run the payment), replay, in_progress or mismatch (the key was
+# used for a different payment); response is (success, message, transaction)
+Claim = namedtuple("Claim", ["state", "record_id", "response"])
+
+
+def fingerprint(payment_data):
+    """SHA-256 of the fields that make two payment requests the same"""
+    fields = {field: payment_data.get(field) for field in FINGERPRINT_FIELDS}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+
+class PaymentIdempotency:
+    """Claim, complete and expire payment idempotency keys"""
+
+    @staticmethod
+    def claim(user_id, key, request_hash, now=None):
+        """
+        Claim a key for a payment, or report what an earlier request did.
+
+        A new claim is committed before returning, so parallel requests with
+        the same key see it.
+
+        Returns:
+            Claim
+        """
+        now = now or datetime.utcnow()
+        expires_at = now + timedelta(
+            seconds=current_app.config["PAYMENT_IDEMPOTENCY_TTL"]
+        )
+
+        for _attempt in range(2):
+            record = PaymentIdempotencyKey(
+                user_id=user_id,
+                idempotency_key=key,
+                request_hash=request_hash,
+                status="processing",
+                created_at=now,
+                expires_at=expires_at,
+            )
+            db.session.add(record)
+            try:
+                db.session.commit()
+                return Claim("new", record.id, None)
+            except IntegrityError:
+                db.session.rollback()
+
+            existing = PaymentIdempotencyKey.query.filter_by(
+                user_id=user_id, idempotency_key=key
+            ).first()
+            if existing is None:
+                # Deleted by the cleanup job in between; claim it afresh
+                continue
+
+            if existing.expires_at > now:
+                if existing.request_hash != request_hash:
+                    return Claim("mismatch", existing.id, None)
+                if existing.status == "completed":
+                    body = json.loads(existing.response_body)
+                    return Claim(
+                        "replay",
+                        existing.id,
+                        (body["success"], body["message"], body["transaction"]),
+                    )
+
+            # Take over an expired key, or a claim whose request died; the
+            # order's existing-transaction check still guards the charge
+            taken = db.session.execute(
+                update(PaymentIdempotencyKey)
+                .where(
+                    PaymentIdempotencyKey.id == existing.id,
+                    or_(
+                        PaymentIdempotencyKey.expires_at <= now,
+                        and_(
+                            PaymentIdempotencyKey.status == "processing",
+                            PaymentIdempotencyKey.created_at
+                            <= now - timedelta(seconds=PROCESSING_TIMEOUT),
+                        ),
+                    ),
+                )
+                .values(
+                    request_hash=request_hash,
+                    status="processing",
+                    response_body=None,
+                    created_at=now,
+                    expires_at=expires_at,
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            if taken:
+                return Claim("new", existing.id, None)
+            return Claim("in_progress", existing.id, None)
+
+        return Claim("in_progress", None, None)
+
+    @staticmethod
+    def complete(record_id, success, message, transaction):
+        """Store the response of a claimed payment for replay"""
+        body = json.dumps(
+            {"success": success, "message": message, "transaction": transaction}
+        )
+        db.session.execute(
+            update(PaymentIdempotencyKey)
+            .where(PaymentIdempotencyKey.id == record_id)
+            .values(status="completed", response_body=body)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+    @staticmethod
+    def release(record_id):
+        """Drop a claim whose request failed without a response, so it can retry"""
+        db.session.rollback()
+        db.session.execute(
+            delete(PaymentIdempotencyKey).where(PaymentIdempotencyKey.id == record_id)
+        )
+        db.session.commit()
+
+    @staticmethod
+    def cleanup(now=None):
+        """
+        Delete expired keys.
+
+        Returns:
+            int: Number of keys deleted
+        """
+        deleted = db.session.execute(
+            delete(PaymentIdempotencyKey).where(
+                PaymentIdempotencyKey.expires_at <= (now or datetime.utcnow())
+            )
+        ).rowcount
+        db.session.commit()
+        return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete expired payment keys")
+    parser.add_argument("--config", default="development")
+    args = parser.parse_args()
+
+    from app import create_app
+
+    app = create_app(args.config)
+    with app.app_context():
+        deleted = PaymentIdempotency.cleanup()
+        print(f"Deleted {deleted} expired payment idempotency keys")
+
+
+if __name__ == "__main__":
+    main()
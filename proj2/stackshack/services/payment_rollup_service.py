@@ -0,0 +1,226 @@
+"""
+Payment Rollup Service - Hourly payment totals for payment statistics.
+
+Every transaction is folded into the payment_rollups row for its hour,
+payment method and status in the same commit that writes it. Statistics for
+a day, a week or a month are then one GROUP BY over at most a few thousand
+rollup rows instead of loading every transaction, and the same query gives
+the dashboard its hourly revenue series. Ranges are resolved to whole hours.
+
+Rebuild the table from transactions with scripts/rebuild_payment_rollups.py.
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import delete, extract, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from database.db import db
+from models.payment import PaymentRollup, Transaction
+
+STATUSES = ("success", "failed", "pending")
+
+
+def hour_bucket(moment):
+    """Start of the hour a datetime falls in"""
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+class PaymentRollupService:
+    """Maintain and query PaymentRollup rows"""
+
+    @staticmethod
+    def period_range(filter_period, start=None, end=None, now=None):
+        """
+        (start, end) for a statistics period; either may be None (open).
+
+        Args:
+            filter_period: 'today', 'week', 'month', 'custom' (uses start
+                and end) or anything else for all time
+        """
+        now = now or datetime.utcnow()
+        if filter_period == "today":
+            return now.replace(hour=0, minute=0, second=0, microsecond=0), None
+        if filter_period == "week":
+            return now - timedelta(days=7), None
+        if filter_period == "month":
+            return now - timedelta(days=30), None
+        if filter_period == "custom":
+            return start, end
+        return None, None
+
+    @staticmethod
+    def record(transaction):
+        """
+        Fold a new transaction into its hour's rollup.
+
+        Call after adding the transaction and before the caller commits, so
+        the rollup lands in the same database transaction.
+        """
+        key = (
+            PaymentRollup.hour == hour_bucket(transaction.initiated_at),
+            PaymentRollup.payment_method == transaction.payment_method,
+            PaymentRollup.status == transaction.status,
+        )
+        amount = Decimal(str(transaction.amount))
+        increment = (
+            update(PaymentRollup)
+            .where(*key)
+            .values(count=PaymentRollup.count + 1, amount=PaymentRollup.amount + amount)
+            .execution_options(synchronize_session=False)
+        )
+        if db.session.execute(increment).rowcount:
+            return
+
+        try:
+            with db.session.begin_nested():
+                db.session.add(
+                    PaymentRollup(
+                        hour=hour_bucket(transaction.initiated_at),
+                        payment_method=transaction.payment_method,
+                        status=transaction.status,
+                        count=1,
+                        amount=amount,
+                    )
+                )
+        except IntegrityError:
+            # Another payment created this hour's row first
+            db.session.execute(increment)
+
+    @staticmethod
+    def totals(start=None, end=None):
+        """
+        Counts and amounts by status, and successful revenue by hour.
+
+        One grouped query over the rollups.
+
+        Returns:
+            tuple: (by_status, hourly) where by_status maps status to
+                (count, amount) and hourly is a list of dicts with hour,
+                count and amount, one per hour from start (when given) to
+                end or now, empty hours included
+        """
+        query = select(
+            PaymentRollup.hour,
+            PaymentRollup.status,
+            func.sum(PaymentRollup.count),
+            func.sum(PaymentRollup.amount),
+        ).group_by(PaymentRollup.hour, PaymentRollup.status)
+        if start is not None:
+            query = query.where(PaymentRollup.hour >= hour_bucket(start))
+        if end is not None:
+            query = query.where(PaymentRollup.hour < end)
+
+        by_status = {}
+        revenue = {}
+        for hour, status, count, amount in db.session.execute(query):
+            total_count, total_amount = by_status.get(status, (0, 0.0))
+            by_status[status] = (total_count + count, total_amount + float(amount))
+            if status == "success":
+                revenue[hour] = (count, float(amount))
+
+        hours = sorted(revenue)
+        if start is not None:
+            hour = hour_bucket(start)
+            last = hour_bucket(end or datetime.utcnow())
+            hours = []
+            while hour <= last:
+                hours.append(hour)
+                hour += timedelta(hours=1)
+        hourly = [
+            {
+                "hour": hour.isoformat(),
+                "count": revenue.get(hour, (0, 0.0))[0],
+                "amount": revenue.get(hour, (0, 0.0))[1],
+            }
+            for hour in hours
+        ]
+        return by_status, hourly
+
+    @staticmethod
+    def user_totals(user_id, start=None, end=None):
+        """
+        A single user's counts and amounts by status, grouped in SQL from
+        their transactions (rollups are not kept per user).
+
+        Returns:
+            dict: status -> (count, amount)
+        """
+        query = (
+            select(
+                Transaction.status,
+                func.count(Transaction.id),
+                func.coalesce(func.sum(Transaction.amount), 0),
+            )
+            .where(Transaction.user_id == user_id)
+            .group_by(Transaction.status)
+        )
+        if start is not None:
+            query = query.where(Transaction.initiated_at >= start)
+        if end is not None:
+            query = query.where(Transaction.initiated_at < end)
+        return {
+            status: (count, float(amount))
+            for status, count, amount in db.session.execute(query)
+        }
+
+    @staticmethod
+    def rebuild(start=None, end=None):
+        """
+        Recompute rollups from transactions, for whole hours in [start, end)
+        or for everything. Does not commit.
+
+        Returns:
+            int: Rollup rows written
+        """
+        start = hour_bucket(start) if start else None
+        end = hour_bucket(end) if end else None
+
+        clear = delete(PaymentRollup)
+        if start is not None:
+            clear = clear.where(PaymentRollup.hour >= start)
+        if end is not None:
+            clear = clear.where(PaymentRollup.hour < end)
+        db.session.execute(clear)
+
+        # Grouped by UTC (day, hour), as dialects disagree on truncating dates
+        day = func.date(Transaction.initiated_at)
+        hour = extract("hour", Transaction.initiated_at)
+        query = select(
+            day,
+            hour,
+            Transaction.payment_method,
+            Transaction.status,
+            func.count(Transaction.id),
+            func.coalesce(func.sum(Transaction.amount), 0),
+        ).group_by(day, hour, Transaction.payment_method, Transaction.status)
+        if start is not None:
+            query = query.where(Transaction.initiated_at >= start)
+        if end is not None:
+            query = query.where(Transaction.initiated_at < end)
+
+        rows = []
+        for (
+            bucket_day,
+            bucket_hour,
+            method,
+            status,
+            count,
+            amount,
+        ) in db.session.execute(query):
+            if isinstance(bucket_day, str):
+                bucket_day = date.fromisoformat(bucket_day[:10])
+            rows.append(
+                {
+                    "hour": datetime.combine(bucket_day, datetime.min.time())
+                    + timedelta(hours=int(bucket_hour)),
+                    "payment_method": method,
+                    "status": status,
+                    "count": count,
+                    "amount": Decimal(str(amount)),
+                }
+            )
+        if rows:
+            db.session.execute(PaymentRollup.__table__.insert(), rows)
+        return len(rows)
@@ -0,0 +1,229 @@
+"""
+Points Ledger Service - Reads and reconciles point balances from the ledger.
+
+A user's balance is their latest checkpoint plus the sum of ledger rows
+written after it, so reads only touch the tail of the ledger instead of the
+user's whole history.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+
+from database.db import db
+from models.gamification import PointsCheckpoint, PointsTransaction
+from models.user import User
+
+# Write a new checkpoint once this many rows have accumulated after the last one
+CHECKPOINT_INTERVAL = 100
+
+# Rows younger than this are never folded into a checkpoint, so a transaction
+# that is still uncommitted when the checkpoint is taken cannot be skipped
+CHECKPOINT_GRACE = timedelta(minutes=5)
+
+
+class PointsLedgerService:
+    """Service for checkpointed balance reads and bulk reconciliation"""
+
+    @staticmethod
+    def latest_checkpoint(user_id):
+        """Get the user's most recent checkpoint, or None"""
+        return (
+            PointsCheckpoint.query.filter_by(user_id=user_id)
+            .order_by(PointsCheckpoint.last_transaction_id.desc())
+            .first()
+        )
+
+    @staticmethod
+    def get_balance(user_id):
+        """
+        Get a user's points balance from the ledger.
+
+        Reads the latest checkpoint and sums only the rows after it. When the
+        tail has grown past CHECKPOINT_INTERVAL rows a new checkpoint is
+        written and committed.
+
+        Returns:
+            int: Current balance
+        """
+        checkpoint = PointsLedgerService.latest_checkpoint(user_id)
+        after_id = checkpoint.last_transaction_id if checkpoint else 0
+        base = checkpoint.balance if checkpoint else 0
+
+        tail_sum, tail_count = (
+            db.session.query(
+                func.coalesce(func.sum(PointsTransaction.points), 0),
+                func.count(PointsTransaction.id),
+            )
+            .filter(
+                PointsTransaction.user_id == user_id, PointsTransaction.id > after_id
+            )
+            .one()
+        )
+
+        if tail_count >= CHECKPOINT_INTERVAL:
+            if PointsLedgerService.write_checkpoint(user_id, checkpoint):
+                try:
+                    db.session.commit()
+                except IntegrityError:
+                    # Another request wrote the same checkpoint first
+                    db.session.rollback()
+
+        return int(base + tail_sum)
+
+    @staticmethod
+    def write_checkpoint(user_id, previous=None, now=None):
+        """
+        Fold settled ledger rows after the previous checkpoint into a new one.
+
+        Args:
+            user_id: User ID
+            previous: The user's latest PointsCheckpoint, if any
+            now: Reference time for CHECKPOINT_GRACE (defaults to utcnow)
+
+        Returns:
+            PointsCheckpoint: The new row (added, not committed), or None if
+                there was nothing settled to fold
+        """
+        after_id = previous.last_transaction_id if previous else 0
+        base = previous.balance if previous else 0
+        cutoff = (now or datetime.utcnow()) - CHECKPOINT_GRACE
+
+        tail = [PointsTransaction.user_id == user_id, PointsTransaction.id > after_id]
+
+        # Stop at the first recent row so no id below the checkpoint is left out
+        first_recent_id = (
+            db.session.query(func.min(PointsTransaction.id))
+            .filter(*tail, PointsTransaction.created_at > cutoff)
+            .scalar()
+        )
+        if first_recent_id is not None:
+            tail.append(PointsTransaction.id < first_recent_id)
+
+        settled_sum, last_id = (
+            db.session.query(
+                func.coalesce(func.sum(PointsTransaction.points), 0),
+                func.max(PointsTransaction.id),
+            )
+            .filter(*tail)
+            .one()
+        )
+        if last_id is None:
+            return None
+
+        checkpoint = PointsCheckpoint(
+            user_id=user_id,
+            last_transaction_id=last_id,
+            balance=int(base + settled_sum),
+        )
+        db.session.add(checkpoint)
+        return checkpoint
+
+    @staticmethod
+    def ledger_balances(user_ids=None, use_checkpoints=True):
+        """
+        Compute ledger balances for many users with grouped queries.
+
+        Args:
+            user_ids: Optional list of user IDs (defaults to all users)
+            use_checkpoints: When False, sum every ledger row; use this to
+                audit the checkpoints themselves
+
+        Returns:
+            dict: user_id -> balance, for users with any ledger rows
+        """
+        balances = {}
+        tail_filter = []
+        if user_ids is not None:
+            tail_filter.append(PointsTransaction.user_id.in_(user_ids))
+
+        if not use_checkpoints:
+            rows = (
+                db.session.query(
+                    PointsTransaction.user_id, func.sum(PointsTransaction.points)
+                )
+                .filter(*tail_filter)
+                .group_by(PointsTransaction.user_id)
+                .all()
+            )
+            return {user_id: int(total or 0) for user_id, total in rows}
+
+        # Latest checkpoint per user
+        latest = db.session.query(
+            PointsCheckpoint.user_id.label("user_id"),
+            func.max(PointsCheckpoint.last_transaction_id).label("last_id"),
+        )
+        if user_ids is not None:
+            latest = latest.filter(PointsCheckpoint.user_id.in_(user_ids))
+        latest = latest.group_by(PointsCheckpoint.user_id).subquery()
+
+        checkpoints = (
+            db.session.query(PointsCheckpoint.user_id, PointsCheckpoint.balance)
+            .join(
+                latest,
+                (latest.c.user_id == PointsCheckpoint.user_id)
+                & (latest.c.last_id == PointsCheckpoint.last_transaction_id),
+            )
+            .all()
+        )
+        for user_id, balance in checkpoints:
+            balances[user_id] = int(balance)
+
+        # Ledger rows after each user's checkpoint
+        tails = (
+            db.session.query(
+                PointsTransaction.user_id, func.sum(PointsTransaction.points)
+            )
+            .outerjoin(latest, latest.c.user_id == PointsTransaction.user_id)
+            .filter(
+                *tail_filter,
+                PointsTransaction.id > func.coalesce(latest.c.last_id, 0),
+            )
+            .group_by(PointsTransaction.user_id)
+            .all()
+        )
+        for user_id, total in tails:
+            balances[user_id] = balances.get(user_id, 0) + int(total or 0)
+
+        return balances
+
+    @staticmethod
+    def verify_balances(user_ids=None, fix=True, use_checkpoints=True):
+        """
+        Reconcile cached users.total_points against the ledger in bulk.
+
+        Args:
+            user_ids: Optional list of user IDs (defaults to all users)
+            fix: Whether to write corrected totals back to users
+            use_checkpoints: Passed to ledger_balances
+
+        Returns:
+            dict: checked (int), mismatches (list of dicts with user_id,
+                cached, ledger), fixed (bool)
+        """
+        balances = PointsLedgerService.ledger_balances(user_ids, use_checkpoints)
+
+        users = db.session.query(User.id, User.total_points)
+        if user_ids is not None:
+            users = users.filter(User.id.in_(user_ids))
+        users = users.all()
+
+        mismatches = [
+            {"user_id": user_id, "cached": cached, "ledger": balances.get(user_id, 0)}
+            for user_id, cached in users
+            if cached != balances.get(user_id, 0)
+        ]
+
+        if fix and mismatches:
+            db.session.execute(
+                update(User),
+                [{"id": m["user_id"], "total_points": m["ledger"]} for m in mismatches],
+            )
+            db.session.commit()
+
+        return {
+            "checked": len(users),
+            "mismatches": mismatches,
+            "fixed": bool(fix and mismatches),
+        }
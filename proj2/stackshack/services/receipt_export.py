@@ -0,0 +1,213 @@
+"""
+Receipt Export - Streaming exports of a date range of receipts for finance.
+
+An export is a generator of byte chunks, so a month of receipts goes out as
+it is read instead of being built in memory first:
+
+    zip     one PDF per receipt, from the receipt PDF cache; missing PDFs
+            are rendered in a worker pool with a bounded queue
+    csv     one row per receipt line item
+    ndjson  the same rows as JSON lines
+
+Rows come from a server-side cursor in READ_BATCH chunks; the line item
+formats read receipts, transactions and order items in one joined query.
+
+From the stackshack directory:
+    python -m services.receipt_export --from 2024-03-01 --to 2024-03-31 \\
+        --format csv --output march.csv
+"""
+
+import argparse
+import csv
+import io
+import json
+import shutil
+import sys
+import zipfile
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+from database.db import db
+from models.order import OrderItem
+from models.payment import Receipt, Transaction
+from services.receipt_pdf import WORKERS, ReceiptPdfCache, receipts_between
+
+READ_BATCH = 1000  # line item rows per cursor round trip
+FLUSH_ROWS = 500  # csv/ndjson rows per chunk sent
+
+# format -> (mimetype, file extension)
+FORMATS = {
+    "zip": ("application/zip", "zip"),
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+LINE_ITEM_FIELDS = [
+    "receipt_number",
+    "generated_at",
+    "order_id",
+    "transaction_id",
+    "payment_method",
+    "receipt_total",
+    "burger_index",
+    "burger_name",
+    "item",
+    "quantity",
+    "unit_price",
+    "amount",
+]
+
+
+class _Chunks(io.RawIOBase):
+    """Write-only, unseekable sink that hands written bytes back as chunks"""
+
+    def __init__(self):
+        self.parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+class ReceiptExport:
+    """Generators of export chunks for receipts generated in [start, end)"""
+
+    @staticmethod
+    def line_items(start, end):
+        """Dicts of LINE_ITEM_FIELDS, by receipt then item"""
+        rows = db.session.execute(
+            select(
+                Receipt.receipt_number,
+                Receipt.generated_at,
+                Receipt.order_id,
+                Transaction.transaction_id,
+                Receipt.payment_method,
+                Receipt.total_amount,
+                OrderItem.burger_index,
+                OrderItem.burger_name,
+                OrderItem.name,
+                OrderItem.quantity,
+                OrderItem.price,
+            )
+            .join(Transaction, Transaction.id == Receipt.transaction_id)
+            .join(OrderItem, OrderItem.order_id == Receipt.order_id)
+            .where(Receipt.generated_at >= start, Receipt.generated_at < end)
+            .order_by(Receipt.id, OrderItem.id)
+            .execution_options(yield_per=READ_BATCH)
+        )
+        for row in rows:
+            yield dict(
+                zip(LINE_ITEM_FIELDS, (*row, row.price * row.quantity)),
+            )
+
+    @staticmethod
+    def csv_chunks(start, end):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, LINE_ITEM_FIELDS)
+        writer.writeheader()
+        for n, row in enumerate(ReceiptExport.line_items(start, end), 1):
+            writer.writerow(row)
+            if n % FLUSH_ROWS == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def ndjson_chunks(start, end):
+        lines = []
+        for row in ReceiptExport.line_items(start, end):
+            lines.append(json.dumps(row, default=_json_default))
+            if len(lines) == FLUSH_ROWS:
+                yield ("\n".join(lines) + "\n").encode("utf-8")
+                lines.clear()
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+    @staticmethod
+    def zip_chunks(start, end, workers=WORKERS):
+        """
+        A ZIP of receipt PDFs, one entry per chunk. The archive is written
+        without seeking, so entries go out as soon as they are added.
+        """
+        sink = _Chunks()
+        pdfs = ReceiptPdfCache.current()
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as archive:
+            for receipt_number, path in pdfs.files(
+                receipts_between(start, end), workers
+            ):
+                with open(path, "rb") as pdf:
+                    with archive.open(f"receipt_{receipt_number}.pdf", "w") as entry:
+                        shutil.copyfileobj(pdf, entry)
+                yield sink.drain()
+        yield sink.drain()
+
+    @staticmethod
+    def stream(export_format, start, end, workers=WORKERS):
+        """
+        Chunks of an export.
+
+        Raises:
+            ValueError: Unknown format
+        """
+        if export_format == "zip":
+            return ReceiptExport.zip_chunks(start, end, workers)
+        if export_format == "csv":
+            return ReceiptExport.csv_chunks(start, end)
+        if export_format == "ndjson":
+            return ReceiptExport.ndjson_chunks(start, end)
+        raise ValueError(f"Unknown export format: {export_format}")
+
+    @staticmethod
+    def filename(export_format, first_day, last_day):
+        return f"receipts_{first_day}_{last_day}.{FORMATS[export_format][1]}"
+
+
+def day_range(first_day, last_day):
+    """[start, end) datetimes covering two inclusive dates"""
+    start = datetime.combine(first_day, datetime.min.time())
+    return start, datetime.combine(last_day, datetime.min.time()) + timedelta(days=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export receipts for a date range")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, required=True)
+    parser.add_argument(
+        "--to", dest="end", type=date.fromisoformat, help="Inclusive (default: --from)"
+    )
+    parser.add_argument("--format", choices=sorted(FORMATS), default="zip")
+    parser.add_argument("--output", help="File to write (default: stdout)")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--config", default="development")
+    args = parser.parse_args()
+
+    from app import create_app
+
+    app = create_app(args.config)
+    with app.app_context():
+        start, end = day_range(args.start, args.end or args.start)
+        chunks = ReceiptExport.stream(args.format, start, end, args.workers)
+        out = open(args.output, "wb") if args.output else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if args.output:
+                out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Receipt PDFs - Content-addressed PDF cache for receipt downloads.
+
+Turning a receipt into a PDF costs hundreds of milliseconds of CPU, so each
+receipt is rendered once and kept on local disk as
+<receipt number>-<version>.pdf, where the version hashes the receipt
+template and the PDF backend. Changing either gives every receipt a new file
+name and ETag instead of serving a stale PDF.
+
+A paid order's PDF is pre-rendered on a background thread right after
+payment. Downloads are sent straight from the file and answer If-None-Match
+with 304. The backend (WeasyPrint, then xhtml2pdf, then a plain reportlab
+summary) is picked once per process, not on every download.
+
+Bulk-render a date range in a process pool from the stackshack directory:
+    python -m services.receipt_pdf --from 2024-03-01 --to 2024-03-31
+"""
+
+import argparse
+import hashlib
+import importlib
+import io
+import os
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from flask import current_app
+from sqlalchemy.orm import undefer
+
+from models.payment import Receipt
+from services.receipt_service import ReceiptService
+
+TEMPLATE = "payment/receipt.html"
+
+# Processes for bulk rendering, and jobs queued per process at a time
+WORKERS = os.cpu_count() or 1
+IN_FLIGHT_PER_WORKER = 4
+
+# Receipts read per round trip when bulk rendering
+READ_BATCH = 200
+
+# What the plain reportlab backend prints, and what a worker process needs
+# besides the HTML
+ReceiptSummary = namedtuple(
+    "ReceiptSummary",
+    ["receipt_number", "order_id", "total_amount", "payment_method", "generated_at"],
+)
+
+
+def _weasyprint(html, summary):
+    from weasyprint import HTML
+
+    return HTML(string=html).write_pdf()
+
+
+def _xhtml2pdf(html, summary):
+    from xhtml2pdf import pisa
+
+    buffer = io.BytesIO()
+    status = pisa.CreatePDF(io.BytesIO(html.encode("utf-8")), dest=buffer)
+    if status.err:
+        raise RuntimeError("PDF generation failed")
+    return buffer.getvalue()
+
+
+def _reportlab(html, summary):
+    """Simple text-based receipt; the HTML layout is not reproduced"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+
+    p.setFont("Helvetica-Bold", 20)
+    p.drawString(1 * inch, height - 1 * inch, "Stack Shack")
+    p.setFont("Helvetica-Bold", 16)
+    p.drawString(1 * inch, height - 1.5 * inch, "Payment Receipt")
+
+    p.setFont("Helvetica", 12)
+    y = height - 2 * inch
+    for line in (
+        f"Receipt Number: {summary.receipt_number}",
+        f"Order ID: {summary.order_id}",
+        f"Amount: ${float(summary.total_amount):.2f}",
+        f"Payment Method: {summary.payment_method}",
+        f"Date: {summary.generated_at}",
+    ):
+        p.drawString(1 * inch, y, line)
+        y -= 0.3 * inch
+
+    p.save()
+    return buffer.getvalue()
+
+
+# In order of preference: (name, module that must import, renderer)
+BACKENDS = [
+    ("weasyprint", "weasyprint", _weasyprint),
+    ("xhtml2pdf", "xhtml2pdf", _xhtml2pdf),
+    ("reportlab", "reportlab", _reportlab),
+]
+RENDERERS = {name: render for name, _module, render in BACKENDS}
+
+
+@lru_cache(maxsize=None)
+def select_backend():
+    """Name of the best PDF backend that imports here, probed once per process"""
+    for name, module, _render in BACKENDS:
+        try:
+            importlib.import_module(module)
+        except (ImportError, OSError):
+            # WeasyPrint raises OSError when its system libraries are missing
+            continue
+        return name
+    return None
+
+
+def summarize(receipt):
+    return ReceiptSummary(
+        receipt.receipt_number,
+        receipt.order_id,
+        receipt.total_amount,
+        receipt.payment_method,
+        receipt.generated_at,
+    )
+
+
+def write_pdf(path, html, summary, backend):
+    """
+    Render a receipt PDF to path unless it is already there.
+
+    The file is written under a temporary name and renamed into place, so a
+    concurrent reader never sees half a PDF.
+    """
+    if os.path.exists(path):
+        return path
+    if backend is None:
+        raise RuntimeError("No PDF backend installed")
+
+    data = RENDERERS[backend](html, summary)
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return path
+
+
+def _prerender(path, html, summary, backend):
+    try:
+        write_pdf(path, html, summary, backend)
+    except Exception as e:
+        print(f"Error pre-rendering receipt {summary.receipt_number}: {str(e)}")
+
+
+def receipts_between(start, end):
+    """
+    Receipts generated in [start, end), oldest first, streamed from a
+    server-side cursor READ_BATCH rows at a time. Legacy HTML is loaded with
+    the row, since no other query may run while the cursor is open.
+    """
+    return (
+        Receipt.query.options(undefer(Receipt.receipt_html))
+        .filter(Receipt.generated_at >= start, Receipt.generated_at < end)
+        .order_by(Receipt.id)
+        .yield_per(READ_BATCH)
+    )
+
+
+def _numbered(path, html, summary, backend):
+    return summary.receipt_number, write_pdf(path, html, summary, backend)
+
+
+class ReceiptPdfCache:
+    """Receipt PDFs on local disk, named by receipt number and version"""
+
+    def __init__(self, directory, backend, template_source):
+        self.directory = directory
+        self.backend = backend
+        self.version = hashlib.sha256(
+            f"{backend}\n{template_source}".encode("utf-8")
+        ).hexdigest()[:12]
+        self.lock = threading.Lock()
+        self.executor = None
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, receipt):
+        """File name stem and ETag for a receipt"""
+        return f"{receipt.receipt_number}-{self.version}"
+
+    def path(self, receipt):
+        return os.path.join(self.directory, f"{self.key(receipt)}.pdf")
+
+    def job(self, receipt):
+        """
+        Everything write_pdf needs for a receipt, without the database.
+
+        Returns:
+            tuple: (path, html, summary, backend), or None if the receipt
+                has no content
+        """
+        html = ReceiptService.render(receipt)
+        if not html:
+            return None
+        return self.path(receipt), html, summarize(receipt), self.backend
+
+    def get(self, receipt):
+        """Path of the receipt's PDF, rendering it now on a miss; None if empty"""
+        path = self.path(receipt)
+        if os.path.exists(path):
+            return path
+        job = self.job(receipt)
+        return write_pdf(*job) if job else None
+
+    def prerender(self, receipt):
+        """Render the receipt's PDF on a background thread if it is missing"""
+        if os.path.exists(self.path(receipt)):
+            return None
+        # The HTML needs the app, so only the PDF is left to the thread
+        job = self.job(receipt)
+        if job is None:
+            return None
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="receipt-pdf"
+                )
+        return self.executor.submit(_prerender, *job)
+
+    def render_range(self, start, end, workers=WORKERS):
+        """
+        Render every missing PDF for receipts generated in [start, end).
+
+        Receipts are read in batches and their PDFs rendered by files().
+
+        Returns:
+            int: PDFs rendered
+        """
+        missing = (
+            receipt
+            for receipt in receipts_between(start, end)
+            if not os.path.exists(self.path(receipt))
+        )
+        return sum(1 for _entry in self.files(missing, workers))
+
+    def files(self, receipts, workers=WORKERS):
+        """
+        (receipt_number, path) for each receipt that has content.
+
+        Cached PDFs are yielded as they are reached; missing ones are
+        rendered in a pool of worker processes with at most
+        IN_FLIGHT_PER_WORKER jobs per process queued, so memory stays flat
+        however many receipts are streamed in. workers=1 renders inline.
+        """
+        if workers <= 1:
+            for receipt in receipts:
+                path = self.get(receipt)
+                if path:
+                    yield receipt.receipt_number, path
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for receipt in receipts:
+                path = self.path(receipt)
+                if os.path.exists(path):
+                    yield receipt.receipt_number, path
+                    continue
+                job = self.job(receipt)
+                if job is None:
+                    continue
+                pending.add(executor.submit(_numbered, *job))
+                if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in as_completed(pending):
+                yield future.result()
+
+    @staticmethod
+    def current():
+        """Get this process's PDF cache"""
+        pdfs = current_app.extensions.get("receipt_pdfs")
+        if pdfs is None:
+            env = current_app.jinja_env
+            source, _filename, _uptodate = env.loader.get_source(env, TEMPLATE)
+            pdfs = current_app.extensions.setdefault(
+                "receipt_pdfs",
+                ReceiptPdfCache(
+                    current_app.config.get("RECEIPT_PDF_DIR")
+                    or os.path.join(current_app.instance_path, "receipt_pdfs"),
+                    select_backend(),
+                    source,
+                ),
+            )
+        return pdfs
+
+    @staticmethod
+    def prerender_receipt(receipt):
+        """Queue a new receipt's PDF unless pre-rendering is turned off"""
+        if not current_app.config.get("RECEIPT_PDF_PRERENDER", True):
+            return None
+        try:
+            return ReceiptPdfCache.current().prerender(receipt)
+        except Exception as e:
+            print(f"Error queueing receipt PDF: {str(e)}")
+            return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render receipt PDFs")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, required=True)
+    parser.add_argument(
+        "--to", dest="end", type=date.fromisoformat, help="Inclusive (default: --from)"
+    )
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--config", default="development")
+    args = parser.parse_args()
+
+    from app import create_app
+
+    app = create_app(args.config)
+    with app.app_context():
+        pdfs = ReceiptPdfCache.current()
+        start = datetime.combine(args.start, datetime.min.time())
+        end = datetime.combine(args.end or args.start, datetime.min.time())
+        print(f"Rendering receipt PDFs with {pdfs.backend} into {pdfs.directory}")
+        rendered = pdfs.render_range(start, end + timedelta(days=1), args.workers)
+        print(f"Rendered {rendered} receipt PDFs")
+
+
+if __name__ == "__main__":
+    main()
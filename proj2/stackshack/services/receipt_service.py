@@ -0,0 +1,138 @@
+"""
+Receipt Service - Structured receipt data, rendered on demand.
+
+A receipt stores what it says (items grouped by burger, totals and payment
+details) as a small JSON payload instead of a full HTML document, so issuing
+one at payment time is a few hundred bytes rather than a page of markup. The
+page is rendered from payment/receipt.html when someone opens it; Jinja
+compiles the template once per process, and the rendered HTML is kept in an
+LRU keyed by receipt number because a receipt never changes once issued.
+
+Receipts issued before this only have receipt_html. That column is deferred,
+so it is loaded only when one of those receipts is rendered.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from decimal import Decimal
+
+from flask import current_app
+
+from services.order_history_service import group_burgers
+
+RENDER_CACHE_SIZE = 256  # rendered receipts kept per process
+TAX_RATE = Decimal("0.00")  # No tax for now, but the receipt shows it if set
+
+
+def _money(amount):
+    return f"{Decimal(amount):.2f}"
+
+
+class ReceiptCache:
+    """Least-recently-used map of receipt number -> rendered HTML"""
+
+    def __init__(self, size=RENDER_CACHE_SIZE):
+        self.lock = threading.Lock()
+        self.size = size
+        self.pages = OrderedDict()
+
+    def get(self, receipt_number):
+        with self.lock:
+            html = self.pages.get(receipt_number)
+            if html is not None:
+                self.pages.move_to_end(receipt_number)
+            return html
+
+    def put(self, receipt_number, html):
+        with self.lock:
+            self.pages[receipt_number] = html
+            self.pages.move_to_end(receipt_number)
+            while len(self.pages) > self.size:
+                self.pages.popitem(last=False)
+
+
+class ReceiptService:
+    """Build receipt payloads and render them as HTML"""
+
+    @staticmethod
+    def build_data(transaction, items):
+        """
+        Receipt payload for a successful transaction.
+
+        Args:
+            transaction: The committed Transaction
+            items: The order's OrderItems
+
+        Returns:
+            dict: JSON-serialisable receipt data; amounts are strings with
+                two decimals so nothing is lost to floats
+        """
+        burgers = []
+        subtotal = Decimal("0")
+        for group in group_burgers(items):
+            lines = []
+            burger_total = Decimal("0")
+            for item in group.items:
+                amount = Decimal(item.price) * item.quantity
+                burger_total += amount
+                lines.append([item.name, item.quantity, _money(amount)])
+            subtotal += burger_total
+            burgers.append(
+                {"title": group.title, "lines": lines, "total": _money(burger_total)}
+            )
+
+        return {
+            "transaction_id": transaction.transaction_id,
+            "order_id": transaction.order_id,
+            "completed_at": (
+                transaction.completed_at.isoformat()
+                if transaction.completed_at
+                else None
+            ),
+            "payment_method": transaction.payment_method,
+            "payment_provider": transaction.payment_provider,
+            "masked_card": transaction.masked_card,
+            "burgers": burgers,
+            "subtotal": _money(subtotal),
+            "tax_rate": str(TAX_RATE),
+            "tax": _money(subtotal * TAX_RATE),
+            "total": _money(transaction.amount),
+        }
+
+    @staticmethod
+    def render(receipt):
+        """
+        HTML for a receipt, from the cache when it was rendered before.
+
+        Returns:
+            str: The receipt page, or None if the receipt has neither data
+                nor legacy HTML
+        """
+        cache = ReceiptService.cache()
+        html = cache.get(receipt.receipt_number)
+        if html is not None:
+            return html
+
+        if receipt.receipt_data is not None:
+            data = receipt.receipt_data
+            completed_at = data.get("completed_at")
+            html = current_app.jinja_env.get_template("payment/receipt.html").render(
+                receipt=data,
+                completed_at=(
+                    datetime.fromisoformat(completed_at) if completed_at else None
+                ),
+                tax_rate=Decimal(data.get("tax_rate") or 0),
+            )
+        else:
+            html = receipt.receipt_html
+            if html is None:
+                return None
+
+        cache.put(receipt.receipt_number, html)
+        return html
+
+    @staticmethod
+    def cache():
+        """Get this process's rendered receipt cache"""
+        return current_app.extensions.setdefault("receipt_cache", ReceiptCache())
@@ -0,0 +1,268 @@
+"""
+Rewards Snapshot - Everything the rewards page shows for one user.
+
+The rewards page and its JSON endpoints (daily bonus, weekly challenges,
+badges, redemptions) all read from one snapshot, built with one query per
+table: progress rows for every current challenge are fetched with a single
+IN query, as are the user's badges and the coupons of all their redemptions.
+
+Snapshots are cached per user in the app's extensions until the next
+gamification write for that user, which calls RewardsSnapshot.invalidate
+after committing. They also expire at midnight, when today's bonuses and
+coupon validity change, and after MAX_AGE seconds so writes made by other
+processes show up.
+"""
+
+import threading
+import time
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import or_
+
+from database.db import db
+from models.gamification import (
+    Badge,
+    Coupon,
+    Redemption,
+    UserBadge,
+    UserChallengeProgress,
+)
+from models.user import User
+from services.challenge_calendar import ChallengeCalendar
+
+MAX_AGE = 60  # seconds before a cached snapshot is rebuilt regardless
+MAX_USERS = 1000  # snapshots kept per process
+DEFAULT_WEEKLY_TARGET = 3
+
+
+class RewardsSnapshot:
+    """One user's points, challenges, badges and redemptions as plain data"""
+
+    def __init__(
+        self,
+        user_id,
+        day,
+        points,
+        tier,
+        daily_bonuses,
+        weekly_challenges,
+        badges,
+        user_badges,
+        redemptions,
+    ):
+        self.user_id = user_id
+        self.day = day
+        self.points = points
+        self.tier = tier
+        self.daily_bonuses = daily_bonuses  # [{"bonus", "completed"}]
+        self.weekly_challenges = weekly_challenges  # [{"challenge", "progress"}]
+        self.badges = badges  # every badge, with earned, earned_at and progress
+        self.user_badges = user_badges  # UserBadge dicts, badge included
+        self.redemptions = redemptions  # newest first, coupon included
+        self.built_at = time.monotonic()
+
+    def weekly_challenge_list(self):
+        """Weekly challenges flattened for /api/weekly-challenge"""
+        challenges = []
+        for entry in self.weekly_challenges:
+            challenge = dict(entry["challenge"])
+            progress = entry["progress"] or {
+                "progress": 0,
+                "target": DEFAULT_WEEKLY_TARGET,
+                "completed": False,
+            }
+            challenge.update(progress)
+            challenges.append(challenge)
+        return challenges
+
+    @staticmethod
+    def build(user_id, today=None):
+        """
+        Load a user's rewards with one query per table.
+
+        The points balance comes from the ledger and the tier is brought up
+        to date, as the rewards page always did.
+        """
+        from services.badge_engine import BadgeEngine
+        from services.gamification_service import GamificationService
+
+        today = today or date.today()
+        points = GamificationService.get_user_points(user_id)
+        _success, _message, tier = GamificationService.update_user_tier(user_id)
+        user = db.session.get(User, user_id)
+        tier = tier or (user.tier if user else None) or "Bronze"
+        # Steps that may commit run first: a commit expires every loaded object
+        progress_by_slug = {p["slug"]: p for p in BadgeEngine.badge_progress(user_id)}
+
+        bonuses = ChallengeCalendar.daily_bonuses(today)
+        challenges = ChallengeCalendar.weekly_challenges(today)
+
+        progress_by_bonus = {}
+        progress_by_challenge = {}
+        if bonuses or challenges:
+            rows = UserChallengeProgress.query.filter(
+                UserChallengeProgress.user_id == user_id,
+                or_(
+                    UserChallengeProgress.daily_bonus_id.in_([b.id for b in bonuses]),
+                    UserChallengeProgress.challenge_id.in_([c.id for c in challenges]),
+                ),
+            ).all()
+            for row in rows:
+                if row.daily_bonus_id is not None:
+                    progress_by_bonus[row.daily_bonus_id] = row
+                else:
+                    progress_by_challenge[row.challenge_id] = row
+
+        daily_bonuses = []
+        for bonus in bonuses:
+            progress = progress_by_bonus.get(bonus.id)
+            daily_bonuses.append(
+                {
+                    "bonus": bonus.to_dict(),
+                    "completed": progress is not None and bool(progress.completed),
+                }
+            )
+
+        weekly_challenges = []
+        for challenge in challenges:
+            progress = progress_by_challenge.get(challenge.id)
+            weekly_challenges.append(
+                {
+                    "challenge": challenge.to_dict(),
+                    "progress": (
+                        {
+                            "progress": progress.progress,
+                            "target": progress.target,
+                            "completed": progress.completed,
+                        }
+                        if progress
+                        else None
+                    ),
+                }
+            )
+
+        all_badges = Badge.query.all()
+        badges_by_id = {badge.id: badge for badge in all_badges}
+        earned = UserBadge.query.filter_by(user_id=user_id).all()
+        earned_by_badge = {user_badge.badge_id: user_badge for user_badge in earned}
+
+        badges = []
+        for badge in all_badges:
+            badge_dict = badge.to_dict()
+            user_badge = earned_by_badge.get(badge.id)
+            badge_dict["earned"] = user_badge is not None
+            progress = progress_by_slug.get(badge.slug)
+            badge_dict["progress"] = (
+                {"current": progress["current"], "target": progress["target"]}
+                if progress
+                else None
+            )
+            if user_badge is not None:
+                badge_dict["earned_at"] = (
+                    user_badge.earned_at.isoformat() if user_badge.earned_at else None
+                )
+            badges.append(badge_dict)
+
+        user_badges = []
+        for user_badge in earned:
+            badge = badges_by_id.get(user_badge.badge_id)
+            user_badges.append(
+                {
+                    "id": user_badge.id,
+                    "user_id": user_badge.user_id,
+                    "badge_id": user_badge.badge_id,
+                    "badge": badge.to_dict() if badge else None,
+                    "earned_at": (
+                        user_badge.earned_at.isoformat()
+                        if user_badge.earned_at
+                        else None
+                    ),
+                    "order_id": user_badge.order_id,
+                }
+            )
+
+        redemption_rows = (
+            Redemption.query.filter_by(user_id=user_id)
+            .order_by(Redemption.redeemed_at.desc())
+            .all()
+        )
+        coupons = {}
+        if redemption_rows:
+            coupons = {
+                coupon.redemption_id: coupon
+                for coupon in Coupon.query.filter(
+                    Coupon.redemption_id.in_([r.id for r in redemption_rows])
+                )
+            }
+        redemptions = []
+        for redemption in redemption_rows:
+            redemption_dict = redemption.to_dict()
+            coupon = coupons.get(redemption.id)
+            redemption_dict["coupon"] = coupon.to_dict() if coupon else None
+            redemptions.append(redemption_dict)
+
+        return RewardsSnapshot(
+            user_id,
+            today,
+            points,
+            tier,
+            daily_bonuses,
+            weekly_challenges,
+            badges,
+            user_badges,
+            redemptions,
+        )
+
+    @staticmethod
+    def for_user(user_id):
+        """Get a user's snapshot from this process's cache, building it if needed"""
+        cache = current_app.extensions.setdefault("rewards_snapshots", RewardsCache())
+        return cache.get(user_id)
+
+    @staticmethod
+    def invalidate(*user_ids):
+        """Drop cached snapshots after a gamification write for these users"""
+        cache = current_app.extensions.get("rewards_snapshots")
+        if cache is not None:
+            cache.discard(user_ids)
+
+
+class RewardsCache:
+    """Per-process snapshots by user id, least recently used dropped first"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshots = {}
+        # Bumped on every invalidation, so a build that raced a write is not
+        # cached over it
+        self.versions = {}
+
+    def get(self, user_id):
+        today = date.today()
+        with self.lock:
+            snapshot = self.snapshots.pop(user_id, None)
+            if (
+                snapshot is not None
+                and snapshot.day == today
+                and time.monotonic() - snapshot.built_at < MAX_AGE
+            ):
+                self.snapshots[user_id] = snapshot
+                return snapshot
+            version = self.versions.get(user_id, 0)
+
+        snapshot = RewardsSnapshot.build(user_id, today)
+        with self.lock:
+            if self.versions.get(user_id, 0) == version:
+                self.snapshots[user_id] = snapshot
+                while len(self.snapshots) > MAX_USERS:
+                    del self.snapshots[next(iter(self.snapshots))]
+        return snapshot
+
+    def discard(self, user_ids):
+        with self.lock:
+            if len(self.versions) > 10 * MAX_USERS:
+                self.versions.clear()
+            for user_id in user_ids:
+                self.snapshots.pop(user_id, None)
+                self.versions[user_id] = self.versions.get(user_id, 0) + 1
@@ -0,0 +1,137 @@
+"""
+Stock Service - Atomic stock reservation for checkout.
+
+All requested menu items are locked with one SELECT ... FOR UPDATE in id
+order, so concurrent checkouts queue behind each other in the same order and
+cannot deadlock. All decrements are then one conditional UPDATE whose rows
+only change while enough stock is left, which also keeps databases without
+row locks (SQLite) from overselling.
+"""
+
+from sqlalchemy import case, select, update
+
+from database.db import db
+from models.menu_item import MenuItem
+
+
+def _failure(item_id, menu_item, requested, available=None):
+    """Failure entry for an item that is missing or short of stock"""
+    if available is None and menu_item is not None:
+        available = menu_item.stock_quantity
+    return {
+        "item_id": item_id,
+        "name": menu_item.name if menu_item is not None else None,
+        "available": available or 0,
+        "requested": requested,
+    }
+
+
+class StockService:
+    """Reserve menu item stock inside the caller's transaction"""
+
+    @staticmethod
+    def reserve(quantities):
+        """
+        Reserve stock for every requested item, or report what is short.
+
+        Runs in the caller's transaction: the caller commits on success and
+        must roll back when anything failed, since some decrements may already
+        have been applied.
+
+        Args:
+            quantities: dict menu_item_id -> quantity requested
+
+        Returns:
+            tuple: (dict menu_item_id -> locked MenuItem,
+                list of failures, list of item ids that are now sold out).
+                Each failure is a dict with item_id, name, available and
+                requested; name is None for ids missing from the menu.
+        """
+        item_ids = sorted(quantities)
+        if not item_ids:
+            return {}, [], []
+        menu_items = {
+            item.id: item
+            for item in MenuItem.query.filter(MenuItem.id.in_(item_ids))
+            .order_by(MenuItem.id)
+            .with_for_update()
+            .populate_existing()
+        }
+
+        failures = [
+            _failure(item_id, menu_items.get(item_id), quantities[item_id])
+            for item_id in item_ids
+            if item_id not in menu_items
+            or (menu_items[item_id].stock_quantity or 0) < quantities[item_id]
+        ]
+        if failures:
+            return menu_items, failures, []
+
+        # One UPDATE for every item; each row only changes while enough stock
+        # is left, so rowcount tells whether any of them lost a race
+        quantity = case(quantities, value=MenuItem.id)
+        remaining = MenuItem.stock_quantity - quantity
+        result = db.session.execute(
+            update(MenuItem)
+            .where(MenuItem.id.in_(item_ids), MenuItem.stock_quantity >= quantity)
+            .values(
+                stock_quantity=remaining,
+                # Hide sold-out items from customer menus
+                is_available=case((remaining <= 0, False), else_=MenuItem.is_available),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != len(item_ids):
+            # Lost a race on a database without row locks; the caller rolls
+            # back, so report whichever items are now short
+            available = dict(
+                db.session.execute(
+                    select(MenuItem.id, MenuItem.stock_quantity).where(
+                        MenuItem.id.in_(item_ids)
+                    )
+                ).all()
+            )
+            short = [
+                item_id
+                for item_id in item_ids
+                if (available.get(item_id) or 0) < quantities[item_id]
+            ]
+            failures = [
+                _failure(
+                    item_id,
+                    menu_items[item_id],
+                    quantities[item_id],
+                    available.get(item_id),
+                )
+                for item_id in short or item_ids
+            ]
+
+        sold_out = (
+            []
+            if failures
+            else [
+                item_id
+                for item_id in item_ids
+                if menu_items[item_id].stock_quantity - quantities[item_id] <= 0
+            ]
+        )
+
+        for item in menu_items.values():
+            db.session.expire(item, ["stock_quantity", "is_available"])
+
+        return menu_items, failures, sold_out
+
+    @staticmethod
+    def describe(failures):
+        """Human-readable message for reservation failures"""
+        messages = []
+        for failure in failures:
+            if failure["name"] is None:
+                messages.append(f"Menu item {failure['item_id']} not found.")
+            else:
+                messages.append(
+                    f"Not enough stock for {failure['name']}. "
+                    f"Available: {failure['available']}, "
+                    f"requested: {failure['requested']}."
+                )
+        return " ".join(messages)
@@ -0,0 +1,279 @@
+"""
+User Stats Service - Maintains per-user behavioral counters for badges.
+
+Counters are updated incrementally when an order is paid, so badge checks and
+progress displays read a single row instead of rescanning order history.
+"""
+
+from datetime import date, datetime
+
+import pytz
+from sqlalchemy import distinct, extract, func
+
+from database.db import db
+from models.gamification import UserStats
+from models.menu_item import MenuItem
+from models.order import Order, OrderItem
+
+# Time-based badges are judged in restaurant local time
+LOCAL_TZ = pytz.timezone("US/Eastern")
+
+# Orders in these states have not been paid for and never count toward stats;
+# a skip_queue coupon marks an order Priority before it is paid
+UNPAID_STATUSES = ["Pending", "Priority", "Cancelled"]
+
+
+class UserStatsService:
+    """Service for reading and maintaining UserStats rows"""
+
+    @staticmethod
+    def local_hour(utc_day, utc_hour):
+        """
+        Convert a UTC (day, hour) bucket into the restaurant's local hour.
+
+        Args:
+            utc_day: date, or ISO date string as returned by SQLite
+            utc_hour: Hour of day in UTC (0-23)
+
+        Returns:
+            int: Hour of day in LOCAL_TZ
+        """
+        if isinstance(utc_day, str):
+            utc_day = date.fromisoformat(utc_day[:10])
+        utc_time = pytz.utc.localize(
+            datetime(utc_day.year, utc_day.month, utc_day.day, int(utc_hour))
+        )
+        return utc_time.astimezone(LOCAL_TZ).hour
+
+    @staticmethod
+    def _count_hour(counters, hour, count):
+        """Add count orders placed at local hour to the time-of-day counters."""
+        if hour == 12:
+            counters["lunch_orders"] += count
+        if hour < 11:
+            counters["early_orders"] += count
+        if hour >= 20:
+            counters["late_orders"] += count
+
+    @staticmethod
+    def aggregate_history(user_id):
+        """
+        Compute a user's counters from scratch with grouped queries.
+
+        Issues four queries regardless of how many orders the user has.
+
+        Returns:
+            dict: order_count, lunch_orders, early_orders, late_orders,
+                surprise_orders, sauces_tried, patties_tried, burger_counts
+        """
+        history = {
+            "order_count": 0,
+            "lunch_orders": 0,
+            "early_orders": 0,
+            "late_orders": 0,
+            "surprise_orders": 0,
+            "sauces_tried": set(),
+            "patties_tried": set(),
+            "burger_counts": {},
+        }
+        paid = [Order.user_id == user_id, Order.status.notin_(UNPAID_STATUSES)]
+
+        # Order counts grouped by UTC (day, hour) so DST is handled per bucket
+        utc_day = func.date(Order.ordered_at)
+        utc_hour = extract("hour", Order.ordered_at)
+        buckets = (
+            db.session.query(utc_day, utc_hour, func.count(Order.id))
+            .filter(*paid)
+            .group_by(utc_day, utc_hour)
+            .all()
+        )
+        for day, hour, count in buckets:
+            history["order_count"] += count
+            if day is not None and hour is not None:
+                hour = UserStatsService.local_hour(day, hour)
+                UserStatsService._count_hour(history, hour, count)
+
+        # Distinct sauces and patties the user has ever ordered
+        category = func.lower(MenuItem.category)
+        tried = (
+            db.session.query(category, func.lower(MenuItem.name))
+            .join(OrderItem, OrderItem.menu_item_id == MenuItem.id)
+            .join(Order, Order.id == OrderItem.order_id)
+            .filter(*paid, category.in_(["sauce", "patty"]))
+            .distinct()
+            .all()
+        )
+        for cat, name in tried:
+            key = "sauces_tried" if cat == "sauce" else "patties_tried"
+            history[key].add(name)
+
+        # Orders per named burger (surprise-box burgers included)
+        burger_counts = (
+            db.session.query(OrderItem.burger_name, func.count(distinct(Order.id)))
+            .join(Order, Order.id == OrderItem.order_id)
+            .filter(*paid, OrderItem.burger_name.isnot(None))
+            .group_by(OrderItem.burger_name)
+            .all()
+        )
+        history["burger_counts"] = {name: count for name, count in burger_counts}
+
+        history["surprise_orders"] = (
+            db.session.query(func.count(distinct(Order.id)))
+            .join(OrderItem, OrderItem.order_id == Order.id)
+            .filter(*paid, func.lower(OrderItem.burger_name).like("%surprise%"))
+            .scalar()
+            or 0
+        )
+
+        return history
+
+    @staticmethod
+    def order_features(order):
+        """
+        Extract what a single order contributes to its user's counters.
+
+        Returns:
+            dict: local_hour, sauces, patties, burger_names, is_surprise
+        """
+        rows = (
+            db.session.query(OrderItem.burger_name, MenuItem.category, MenuItem.name)
+            .outerjoin(MenuItem, MenuItem.id == OrderItem.menu_item_id)
+            .filter(OrderItem.order_id == order.id)
+            .all()
+        )
+
+        features = {
+            "local_hour": None,
+            "sauces": set(),
+            "patties": set(),
+            "burger_names": set(),
+            "is_surprise": False,
+        }
+        if order.ordered_at:
+            features["local_hour"] = UserStatsService.local_hour(
+                order.ordered_at.date(), order.ordered_at.hour
+            )
+        for burger_name, category, name in rows:
+            if burger_name:
+                features["burger_names"].add(burger_name)
+                if "surprise" in burger_name.lower():
+                    features["is_surprise"] = True
+            if category and category.lower() == "sauce":
+                features["sauces"].add(name.lower())
+            elif category and category.lower() == "patty":
+                features["patties"].add(name.lower())
+        return features
+
+    @staticmethod
+    def rebuild(user_id):
+        """
+        Recompute a user's stats row from their full order history.
+
+        Returns:
+            UserStats: The (possibly new) row, added to the session but not committed
+        """
+        history = UserStatsService.aggregate_history(user_id)
+        stats = UserStats.query.filter_by(user_id=user_id).first()
+        if stats is None:
+            stats = UserStats(user_id=user_id)
+            db.session.add(stats)
+
+        stats.order_count = history["order_count"]
+        stats.lunch_orders = history["lunch_orders"]
+        stats.early_orders = history["early_orders"]
+        stats.late_orders = history["late_orders"]
+        stats.surprise_orders = history["surprise_orders"]
+        stats.sauces_tried = sorted(history["sauces_tried"])
+        stats.patties_tried = sorted(history["patties_tried"])
+        stats.burger_counts = history["burger_counts"]
+        return stats
+
+    @staticmethod
+    def record_order(order):
+        """
+        Fold a newly paid order into its user's stats.
+
+        Call after the order's status has been set to a paid state and before
+        the caller commits, so the counters land in the same transaction.
+
+        Returns:
+            UserStats: The updated row (not committed)
+        """
+        # Lock the row so parallel payments by the same user merge their JSON
+        # counters one after another instead of overwriting each other
+        stats = (
+            UserStats.query.filter_by(user_id=order.user_id)
+            .with_for_update()
+            .populate_existing()
+            .first()
+        )
+        if stats is None:
+            # First paid order since stats were introduced: the rebuild already
+            # sees this order because the session autoflushes before querying
+            return UserStatsService.rebuild(order.user_id)
+
+        features = UserStatsService.order_features(order)
+        counters = {"lunch_orders": 0, "early_orders": 0, "late_orders": 0}
+        if features["local_hour"] is not None:
+            UserStatsService._count_hour(counters, features["local_hour"], 1)
+
+        # Integer counters are added in the database, so parallel payments add up
+        stats.order_count = UserStats.order_count + 1
+        for column, count in counters.items():
+            if count:
+                setattr(stats, column, getattr(UserStats, column) + count)
+        if features["is_surprise"]:
+            stats.surprise_orders = UserStats.surprise_orders + 1
+
+        # JSON columns are reassigned so SQLAlchemy sees the change
+        stats.sauces_tried = sorted(set(stats.sauces_tried or []) | features["sauces"])
+        stats.patties_tried = sorted(
+            set(stats.patties_tried or []) | features["patties"]
+        )
+        burger_counts = dict(stats.burger_counts or {})
+        for name in features["burger_names"]:
+            burger_counts[name] = burger_counts.get(name, 0) + 1
+        stats.burger_counts = burger_counts
+        return stats
+
+    @staticmethod
+    def get_history(user_id):
+        """
+        Get a user's counters, rebuilding them once if no row exists yet.
+
+        Returns:
+            dict: Same shape as aggregate_history
+        """
+        return UserStatsService.get_histories([user_id])[user_id]
+
+    @staticmethod
+    def get_histories(user_ids):
+        """
+        Get counters for many users with one query, rebuilding missing rows.
+
+        Returns:
+            dict: user_id -> dict shaped like aggregate_history
+        """
+        rows = {
+            stats.user_id: stats
+            for stats in UserStats.query.filter(UserStats.user_id.in_(user_ids))
+        }
+        missing = [user_id for user_id in user_ids if user_id not in rows]
+        for user_id in missing:
+            rows[user_id] = UserStatsService.rebuild(user_id)
+        if missing:
+            db.session.commit()
+
+        return {
+            user_id: {
+                "order_count": stats.order_count or 0,
+                "lunch_orders": stats.lunch_orders or 0,
+                "early_orders": stats.early_orders or 0,
+                "late_orders": stats.late_orders or 0,
+                "surprise_orders": stats.surprise_orders or 0,
+                "sauces_tried": set(stats.sauces_tried or []),
+                "patties_tried": set(stats.patties_tried or []),
+                "burger_counts": dict(stats.burger_counts or {}),
+            }
+            for user_id, stats in rows.items()
+        }
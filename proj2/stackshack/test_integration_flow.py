@@ -108,8 +108,7 @@ Process:
         - Update order.status = "Paid"
         - Generate Receipt:
           * Create Receipt record
-          * Generate HTML receipt
-          * Store receipt_html in DB
+          * Store receipt_data (items by burger, totals, payment)
         - Commit transaction & receipt
         - Return: (True, "Payment successful", transaction_dict)
 
@@ -140,12 +139,12 @@ Step 7: VIEW/DOWNLOAD RECEIPT
 Option A - View Receipt in Browser:
   Route: GET /payment/receipt/view/<order_id>
   - Loads Receipt from DB
-  - Renders receipt_html in new tab
+  - Renders payment/receipt.html from receipt_data (cached by receipt number)
 
 Option B - Download PDF Receipt:
   Route: GET /payment/receipt/<receipt_id>/download
   Controller: Uses xhtml2pdf/weasyprint
-  - Loads Receipt.receipt_html
+  - Renders the receipt HTML
   - Converts to PDF
   - Returns as downloadable file
 
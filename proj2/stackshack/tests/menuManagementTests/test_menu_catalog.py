@@ -0,0 +1,84 @@
+from flask_login import login_user
+
+from controllers.menu_controller import MenuController
+from services import menu_catalog
+from services.burger_recommendations import BurgerRecommendationService
+from services.menu_catalog import MenuCatalog
+from tests.query_counter import count_queries
+
+
+class TestMenuCatalog:
+    """Test the cached menu snapshot"""
+
+    def test_snapshot_indexes(self, app, multiple_menu_items):
+        """Test lookups by id, name and category"""
+        catalog = MenuCatalog.current()
+        beef = multiple_menu_items[1]
+
+        assert catalog.get(beef.id).name == "Beef Patty"
+        assert catalog.named("Beef Patty").id == beef.id
+        assert catalog.named("beef patty") is None
+        assert [p.name for p in catalog.in_category("PATTY")] == [
+            "Beef Patty",
+            "Turkey Patty",
+        ]
+        assert [p.name for p in catalog.in_category("patty", available_only=True)] == [
+            "Beef Patty"
+        ]
+
+    def test_snapshot_is_cached(self, app, multiple_menu_items):
+        """Test repeated reads issue no queries"""
+        first = MenuCatalog.current()
+
+        assert count_queries(MenuCatalog.current)[0] == 0
+        assert MenuCatalog.current() is first
+
+    def test_controller_write_rebuilds(self, app, admin_user, multiple_menu_items):
+        """Test a committed MenuController write bumps the version"""
+        before = MenuCatalog.current()
+        item_id = multiple_menu_items[0].id
+
+        with app.test_request_context():
+            login_user(admin_user)
+            MenuController.update_item(item_id, price=2.25)
+            MenuController.update_stock(multiple_menu_items[3].id, 0)
+
+        after = MenuCatalog.current()
+        assert after.version > before.version
+        assert float(after.get(item_id).price) == 2.25
+        assert after.named("Lettuce").is_available is False
+
+    def test_request_keeps_one_snapshot(self, app, multiple_menu_items):
+        """Test a request keeps its snapshot until a write in that request"""
+        with app.test_request_context():
+            pinned = MenuCatalog.current()
+            MenuCatalog._state()["snapshot"] = None
+            assert MenuCatalog.current() is pinned
+
+            MenuCatalog.invalidate()
+            assert MenuCatalog.current() is not pinned
+
+    def test_snapshot_expires(self, app, multiple_menu_items, monkeypatch):
+        """Test snapshots are rebuilt after MAX_AGE without a local write"""
+        first = MenuCatalog.current()
+        monkeypatch.setattr(menu_catalog, "MAX_AGE", -1)
+
+        assert MenuCatalog.current() is not first
+
+    def test_recommendations_read_snapshot(self, app, multiple_menu_items):
+        """Test burger pricing issues no queries once the snapshot is built"""
+        burger = {
+            "name": "Test",
+            "slug": "test",
+            "description": "",
+            "ingredients": ["Sesame Bun", "Beef Patty", "Lettuce"],
+            "dietary_tags": ["no_preference"],
+            "image": "",
+        }
+        MenuCatalog.current()
+
+        count, result = count_queries(
+            lambda: BurgerRecommendationService.prepare_burger_data(burger)
+        )
+        assert count == 0
+        assert result["price"] == 5.5
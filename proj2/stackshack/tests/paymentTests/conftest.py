@@ -5,6 +5,7 @@ Fixtures for payment tests.
 import pytest
 import sys
 import os
+from datetime import datetime
 from decimal import Decimal
 
 # Add parent directory to path to import app modules
@@ -13,7 +14,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../.
 from app import create_app
 from database.db import db
 from models.user import User
-from models.order import Order
+from models.order import Order, OrderItem
+from models.payment import Transaction
 
 
 @pytest.fixture(scope="function")
@@ -92,3 +94,50 @@ def authenticated_client(client, app, test_user):
             with app.test_request_context():
                 login_user(user)
             yield client
+
+
+@pytest.fixture(scope="function")
+def paid_order(app, test_user):
+    """A two-burger order with a successful transaction: (order, transaction)."""
+    order = Order(user_id=test_user, total_price=Decimal("13.50"), status="Paid")
+    db.session.add(order)
+    db.session.flush()
+    db.session.add_all(
+        [
+            OrderItem(
+                order_id=order.id,
+                name="Bun",
+                price=Decimal("1.50"),
+                quantity=2,
+                burger_index=1,
+            ),
+            OrderItem(
+                order_id=order.id,
+                name="Patty <Double>",
+                price=Decimal("5.00"),
+                quantity=1,
+                burger_index=1,
+            ),
+            OrderItem(
+                order_id=order.id,
+                name="Patty",
+                price=Decimal("5.50"),
+                quantity=1,
+                burger_index=2,
+                burger_name="Classic",
+            ),
+        ]
+    )
+    transaction = Transaction(
+        transaction_id="TXN0123456789ABCDEF",
+        order_id=order.id,
+        user_id=test_user,
+        amount=Decimal("13.50"),
+        payment_method="campus_card",
+        masked_card="****1234",
+        status="success",
+        completed_at=datetime(2024, 3, 11, 12, 30),
+    )
+    db.session.add(transaction)
+    db.session.commit()
+    return order, transaction
@@ -0,0 +1,185 @@
+"""
+Tests for Idempotency-Key handling on /payment/process.
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from database.db import db
+from models.order import Order
+from models.payment import PaymentIdempotencyKey, Transaction
+from services import payment_idempotency
+from services.payment_idempotency import PaymentIdempotency, fingerprint
+
+PAYMENT = {"order_id": 1, "payment_method": "wallet", "amount": 15.0}
+
+
+def _gateway(success=True):
+    """Patch the gateway with one that approves (or declines) every payment"""
+    gateway = patch("controllers.payment_controller.PaymentGatewayService")
+    mock_gateway = gateway.start()
+    instance = MagicMock()
+    mock_gateway.return_value = instance
+    instance.process_payment.side_effect = lambda data: {
+        "success": success,
+        "message": "Payment successful" if success else "Payment declined",
+        "transaction_id": f"TXN-{instance.process_payment.call_count}",
+        "payment_method": "wallet",
+        "status": "success" if success else "failed",
+    }
+    return gateway, instance
+
+
+class TestPaymentIdempotency:
+    """Test cases for PaymentIdempotency."""
+
+    def test_claim_then_replay(self, app, test_user):
+        """Test a completed key replays its response and others are refused."""
+        request_hash = fingerprint(PAYMENT)
+
+        first = PaymentIdempotency.claim(test_user, "key-1", request_hash)
+        assert first.state == "new"
+        assert (
+            PaymentIdempotency.claim(test_user, "key-1", request_hash).state
+            == "in_progress"
+        )
+
+        PaymentIdempotency.complete(first.record_id, True, "Paid", {"id": 7})
+        replay = PaymentIdempotency.claim(test_user, "key-1", request_hash)
+        other = PaymentIdempotency.claim(
+            test_user, "key-1", fingerprint(dict(PAYMENT, amount=1.0))
+        )
+
+        assert replay.state == "replay"
+        assert replay.response == (True, "Paid", {"id": 7})
+        assert other.state == "mismatch"
+
+    def test_stale_and_expired_claims_are_taken_over(self, app, test_user):
+        """Test a claim left by a crash, or an expired key, can be reused."""
+        request_hash = fingerprint(PAYMENT)
+        start = datetime(2024, 5, 1, 12, 0)
+        stuck = PaymentIdempotency.claim(test_user, "stuck", request_hash, now=start)
+        done = PaymentIdempotency.claim(test_user, "done", request_hash, now=start)
+        PaymentIdempotency.complete(done.record_id, True, "Paid", {"id": 1})
+
+        later = start + timedelta(seconds=payment_idempotency.PROCESSING_TIMEOUT)
+        retaken = PaymentIdempotency.claim(test_user, "stuck", request_hash, now=later)
+        assert retaken == (stuck.state, stuck.record_id, None)
+        assert (
+            PaymentIdempotency.claim(test_user, "done", request_hash, now=later).state
+            == "replay"
+        )
+
+        expired = start + timedelta(seconds=app.config["PAYMENT_IDEMPOTENCY_TTL"])
+        reused = PaymentIdempotency.claim(
+            test_user, "done", fingerprint(dict(PAYMENT, amount=1.0)), now=expired
+        )
+        assert reused.state == "new"
+
+    def test_cleanup_deletes_expired_keys(self, app, test_user):
+        """Test the cleanup job removes only keys past their TTL."""
+        request_hash = fingerprint(PAYMENT)
+        now = datetime.utcnow()
+        ttl = timedelta(seconds=app.config["PAYMENT_IDEMPOTENCY_TTL"])
+        PaymentIdempotency.claim(test_user, "old", request_hash, now=now - ttl)
+        PaymentIdempotency.claim(test_user, "new", request_hash, now=now)
+
+        assert PaymentIdempotency.cleanup(now) == 1
+        assert [
+            key for (key,) in db.session.query(PaymentIdempotencyKey.idempotency_key)
+        ] == ["new"]
+
+
+class TestProcessRoute:
+    """Test cases for idempotent POST /payment/process."""
+
+    def login(self, client, username="testuser", password="testpassword123"):
+        return client.post(
+            "/auth/login",
+            data={"username": username, "password": password},
+            follow_redirects=True,
+        )
+
+    def pay(self, client, order_id, key=None, amount="15.00", form_key=None):
+        data = {
+            "order_id": order_id,
+            "payment_method": "wallet",
+            "amount": amount,
+            "wallet_provider": "paypal",
+        }
+        if form_key:
+            data["idempotency_key"] = form_key
+        headers = {"Idempotency-Key": key} if key else {}
+        return client.post("/payment/process", data=data, headers=headers)
+
+    def test_retry_is_replayed(self, client, app, test_user, sample_order):
+        """Test a retried payment reaches the gateway and gamification once."""
+        self.login(client)
+        gateway, instance = _gateway()
+        try:
+            with patch(
+                "controllers.payment_controller.GamificationWorker.enqueue"
+            ) as enqueue:
+                first = self.pay(client, sample_order, key="retry-1")
+                second = self.pay(client, sample_order, key="retry-1")
+        finally:
+            gateway.stop()
+
+        assert instance.process_payment.call_count == 1
+        assert enqueue.call_count == 1
+        assert first.status_code == second.status_code == 302
+        assert second.location == first.location
+        assert "/payment/success/" in second.location
+        assert second.headers["Idempotent-Replayed"] == "true"
+        assert "Idempotent-Replayed" not in first.headers
+        assert Transaction.query.filter_by(order_id=sample_order).count() == 1
+
+    def test_declines_are_replayed(self, client, app, test_user, sample_order):
+        """Test a declined payment is replayed from the form field's key."""
+        self.login(client)
+        gateway, instance = _gateway(success=False)
+        try:
+            first = self.pay(client, sample_order, form_key="form-1")
+            second = self.pay(client, sample_order, form_key="form-1")
+        finally:
+            gateway.stop()
+
+        assert instance.process_payment.call_count == 1
+        assert "/payment/failed/" in first.location
+        assert second.location == first.location
+
+    def test_key_reused_for_other_payment(self, client, app, test_user, sample_order):
+        """Test a key cannot be replayed for a different amount."""
+        self.login(client)
+        gateway, instance = _gateway()
+        try:
+            self.pay(client, sample_order, key="reused")
+            response = self.pay(client, sample_order, key="reused", amount="1.00")
+        finally:
+            gateway.stop()
+
+        assert instance.process_payment.call_count == 1
+        assert response.location == "/orders/history"
+
+    def test_rejected_payment_releases_key(self, client, app, test_user, sample_order):
+        """Test a request refused before the gateway can be retried."""
+        self.login(client)
+        with app.app_context():
+            db.session.get(Order, sample_order).user_id = test_user + 1
+            db.session.commit()
+
+        self.pay(client, sample_order, key="refused")
+
+        assert PaymentIdempotencyKey.query.count() == 0
+
+    def test_checkout_renders_key(self, client, app, test_user, sample_order):
+        """Test each checkout visit gets its own key in every payment form."""
+        self.login(client)
+
+        first = client.get(f"/payment/checkout/{sample_order}").data.decode()
+        second = client.get(f"/payment/checkout/{sample_order}").data.decode()
+
+        key = first.split('name="idempotency_key" value="', 1)[1].split('"', 1)[0]
+        assert len(key) >= 24
+        assert first.count(key) >= 2
+        assert key not in second
@@ -0,0 +1,145 @@
+"""
+Tests for hourly payment rollups and the statistics read from them.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+
+from controllers.payment_controller import PaymentController
+from database.db import db
+from models.payment import PaymentRollup, Transaction
+from models.user import User
+from services.payment_rollup_service import PaymentRollupService
+from tests.query_counter import count_queries
+
+NOON = datetime(2024, 3, 11, 12, 0)
+
+
+def _pay(order_id, user_id, amount, status="success", at=NOON, method="card"):
+    """Write a transaction the way the payment controller does"""
+    transaction = Transaction(
+        transaction_id=f"TXN{Transaction.query.count():06d}",
+        order_id=order_id,
+        user_id=user_id,
+        amount=Decimal(amount),
+        payment_method=method,
+        status=status,
+        initiated_at=at,
+    )
+    db.session.add(transaction)
+    PaymentRollupService.record(transaction)
+    db.session.commit()
+    return transaction
+
+
+class TestPaymentRollups:
+    """Test cases for PaymentRollupService."""
+
+    def test_record_folds_into_hour_bucket(self, app, test_user, sample_order):
+        """Test transactions in one hour share a row per method and status."""
+        _pay(sample_order, test_user, "5.00")
+        _pay(sample_order, test_user, "7.50", at=NOON.replace(minute=59))
+        _pay(sample_order, test_user, "3.00", status="failed")
+        _pay(sample_order, test_user, "4.00", at=NOON.replace(hour=13))
+
+        rows = {
+            (row.hour, row.status): (row.count, row.amount)
+            for row in PaymentRollup.query.all()
+        }
+        assert rows == {
+            (NOON, "success"): (2, Decimal("12.50")),
+            (NOON, "failed"): (1, Decimal("3.00")),
+            (NOON.replace(hour=13), "success"): (1, Decimal("4.00")),
+        }
+
+    def test_rebuild_matches_incremental(self, app, test_user, sample_order):
+        """Test a rebuild from transactions reproduces the rollups."""
+        _pay(sample_order, test_user, "5.00")
+        _pay(sample_order, test_user, "2.25", method="wallet")
+        _pay(sample_order, test_user, "3.00", status="failed", at=NOON.replace(hour=9))
+        incremental = sorted(
+            tuple(row.to_dict().values()) for row in PaymentRollup.query
+        )
+
+        assert PaymentRollupService.rebuild() == 3
+        db.session.commit()
+
+        rebuilt = sorted(tuple(row.to_dict().values()) for row in PaymentRollup.query)
+        assert rebuilt == incremental
+
+    def test_statistics_from_one_grouped_query(self, app, test_user, sample_order):
+        """Test a custom range is answered from rollups with an hourly series."""
+        _pay(sample_order, test_user, "5.00")
+        _pay(sample_order, test_user, "3.00", status="failed")
+        _pay(sample_order, test_user, "4.00", at=NOON.replace(hour=14))
+        _pay(sample_order, test_user, "9.00", at=datetime(2024, 3, 12, 12))
+
+        count, stats = count_queries(
+            lambda: PaymentController.get_payment_statistics(
+                filter_period="custom",
+                start=NOON,
+                end=NOON.replace(hour=15),
+            )
+        )
+
+        assert count == 1
+        assert stats["total_transactions"] == 3
+        assert (stats["successful"], stats["failed"]) == (2, 1)
+        assert stats["total_amount"] == 9.0
+        assert [bucket["amount"] for bucket in stats["hourly"]] == [
+            5.0,
+            0.0,
+            4.0,
+            0.0,
+        ]
+
+    def test_user_statistics(self, app, test_user, sample_order):
+        """Test per-user statistics are grouped from that user's transactions."""
+        other = User(username="other", email="other@example.com", role="customer")
+        other.set_password("password123")
+        db.session.add(other)
+        db.session.commit()
+        _pay(sample_order, test_user, "5.00")
+        _pay(sample_order, other.id, "8.00")
+
+        stats = PaymentController.get_payment_statistics(user_id=test_user)
+
+        assert stats["total_transactions"] == 1
+        assert stats["total_amount"] == 5.0
+        assert stats["hourly"] == []
+
+
+class TestDashboardRange:
+    """Test cases for the dashboard's custom range."""
+
+    def login_staff(self, client):
+        staff = User(username="staff1", email="staff@example.com", role="staff")
+        staff.set_password("staffpass123")
+        db.session.add(staff)
+        db.session.commit()
+        client.post(
+            "/auth/login",
+            data={"username": "staff1", "password": "staffpass123"},
+            follow_redirects=True,
+        )
+
+    def test_custom_range(self, client, app, test_user, sample_order):
+        """Test a custom range shows its totals and hourly revenue."""
+        _pay(sample_order, test_user, "5.00")
+        self.login_staff(client)
+
+        response = client.get(
+            "/payment/admin/dashboard?period=custom&from=2024-03-11&to=2024-03-11"
+        )
+
+        assert response.status_code == 200
+        assert b"Hourly Revenue" in response.data
+        assert b"$5.00" in response.data
+
+    def test_bad_custom_range(self, client, app):
+        """Test a malformed range redirects back to the dashboard."""
+        self.login_staff(client)
+
+        response = client.get("/payment/admin/dashboard?period=custom&from=soon")
+
+        assert response.status_code == 302
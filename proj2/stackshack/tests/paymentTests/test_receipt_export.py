@@ -0,0 +1,145 @@
+"""
+Tests for streaming receipt exports.
+"""
+
+import csv
+import io
+import json
+import zipfile
+from datetime import date, datetime
+
+import pytest
+
+from controllers.payment_controller import PaymentController
+from database.db import db
+from models.payment import Transaction
+from models.user import User
+from services.receipt_export import ReceiptExport, day_range
+
+MARCH = day_range(date(2024, 3, 1), date(2024, 3, 31))
+
+
+@pytest.fixture
+def receipts(app, paid_order, tmp_path):
+    """Two receipts in March 2024 and one in April, PDFs under tmp_path"""
+    app.config["RECEIPT_PDF_DIR"] = str(tmp_path)
+    order, transaction = paid_order
+    second = Transaction(
+        transaction_id="TXNSECOND",
+        order_id=order.id,
+        user_id=order.user_id,
+        amount=transaction.amount,
+        payment_method="card",
+        status="success",
+        completed_at=transaction.completed_at,
+    )
+    third = Transaction(
+        transaction_id="TXNTHIRD",
+        order_id=order.id,
+        user_id=order.user_id,
+        amount=transaction.amount,
+        payment_method="card",
+        status="success",
+        completed_at=transaction.completed_at,
+    )
+    db.session.add_all([second, third])
+    db.session.flush()
+
+    numbers = []
+    for txn, generated_at in (
+        (transaction, datetime(2024, 3, 1, 9, 0)),
+        (second, datetime(2024, 3, 31, 23, 59)),
+        (third, datetime(2024, 4, 1, 0, 0)),
+    ):
+        receipt = PaymentController._generate_receipt(txn, order)
+        receipt.generated_at = generated_at
+        db.session.add(receipt)
+        numbers.append(receipt.receipt_number)
+    db.session.commit()
+    return numbers
+
+
+class TestReceiptExport:
+    """Test cases for ReceiptExport."""
+
+    def test_csv_line_items(self, app, receipts):
+        """Test the CSV has one row per line item for receipts in range."""
+        chunks = ReceiptExport.stream("csv", *MARCH)
+        rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+
+        assert len(rows) == 2 * 3
+        assert {row["receipt_number"] for row in rows} == set(receipts[:2])
+        assert rows[0]["item"] == "Bun"
+        assert (rows[0]["quantity"], rows[0]["amount"]) == ("2", "3.00")
+        assert rows[0]["transaction_id"] == "TXN0123456789ABCDEF"
+
+    def test_ndjson_line_items(self, app, receipts):
+        """Test NDJSON lines carry the same fields."""
+        body = b"".join(ReceiptExport.stream("ndjson", *MARCH)).decode()
+        rows = [json.loads(line) for line in body.splitlines()]
+
+        assert len(rows) == 6
+        assert rows[2]["burger_name"] == "Classic"
+        assert rows[2]["generated_at"] == "2024-03-01T09:00:00"
+
+    def test_zip_streams_one_pdf_per_receipt(self, app, receipts):
+        """Test the ZIP is produced entry by entry and holds valid PDFs."""
+        chunks = list(ReceiptExport.stream("zip", *MARCH, workers=1))
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+
+        assert len(chunks) == 3  # one per receipt, then the central directory
+        assert archive.namelist() == [f"receipt_{n}.pdf" for n in receipts[:2]]
+        assert archive.read(archive.namelist()[0]).startswith(b"%PDF-")
+
+    def test_unknown_format(self, app):
+        """Test unknown formats are rejected."""
+        with pytest.raises(ValueError):
+            ReceiptExport.stream("xlsx", *MARCH)
+
+
+class TestReceiptExportRoute:
+    """Test cases for /payment/admin/receipts/export."""
+
+    def login_admin(self, client):
+        admin = User(username="admin1", email="admin@example.com", role="admin")
+        admin.set_password("adminpass123")
+        db.session.add(admin)
+        db.session.commit()
+        client.post(
+            "/auth/login",
+            data={"username": "admin1", "password": "adminpass123"},
+            follow_redirects=True,
+        )
+
+    def test_admin_export(self, client, app, receipts):
+        """Test admins get a streamed attachment."""
+        self.login_admin(client)
+
+        response = client.get(
+            "/payment/admin/receipts/export?from=2024-03-01&to=2024-03-31&format=csv"
+        )
+
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.mimetype == "text/csv"
+        assert "receipts_2024-03-01_2024-03-31.csv" in (
+            response.headers["Content-Disposition"]
+        )
+        assert response.data.decode().count("\n") == 1 + 6
+
+    def test_bad_range(self, client, app):
+        """Test malformed or reversed ranges are rejected."""
+        self.login_admin(client)
+
+        url = "/payment/admin/receipts/export"
+        assert client.get(f"{url}?from=March").status_code == 400
+        assert client.get(f"{url}?from=2024-03-02&to=2024-03-01").status_code == 400
+        assert client.get(f"{url}?from=2024-03-01&format=xlsx").status_code == 400
+
+    def test_customers_denied(self, authenticated_client):
+        """Test non-admins are redirected."""
+        response = authenticated_client.get(
+            "/payment/admin/receipts/export?from=2024-03-01"
+        )
+
+        assert response.status_code == 302
@@ -0,0 +1,108 @@
+"""
+Tests for the on-disk receipt PDF cache.
+"""
+
+import os
+from datetime import datetime
+
+import pytest
+
+from controllers.payment_controller import PaymentController
+from database.db import db
+from models.payment import Receipt
+from services import receipt_pdf
+from services.receipt_pdf import ReceiptPdfCache, select_backend
+
+
+@pytest.fixture
+def receipt(app, paid_order, tmp_path):
+    """A stored receipt, with PDFs cached under tmp_path"""
+    app.config["RECEIPT_PDF_DIR"] = str(tmp_path)
+    order, transaction = paid_order
+    db.session.add(PaymentController._generate_receipt(transaction, order))
+    db.session.commit()
+    return Receipt.query.one()
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Count PDF renders by the selected backend"""
+    calls = []
+    backend = select_backend()
+    render = receipt_pdf.RENDERERS[backend]
+
+    def counting(html, summary):
+        calls.append(summary.receipt_number)
+        return render(html, summary)
+
+    monkeypatch.setitem(receipt_pdf.RENDERERS, backend, counting)
+    return calls
+
+
+class TestReceiptPdfCache:
+    """Test cases for ReceiptPdfCache."""
+
+    def test_rendered_once_per_version(self, app, receipt, renders):
+        """Test a receipt PDF is rendered on the first request only."""
+        pdfs = ReceiptPdfCache.current()
+
+        path = pdfs.get(receipt)
+        assert pdfs.get(receipt) == path
+        assert renders == [receipt.receipt_number]
+        assert os.path.basename(path) == f"{pdfs.key(receipt)}.pdf"
+        with open(path, "rb") as f:
+            assert f.read(5) == b"%PDF-"
+
+    def test_version_follows_template_and_backend(self, tmp_path):
+        """Test changing the template or backend changes every key."""
+        base = ReceiptPdfCache(str(tmp_path), "reportlab", "<html>")
+
+        assert ReceiptPdfCache(str(tmp_path), "reportlab", "<html>").version == (
+            base.version
+        )
+        assert ReceiptPdfCache(str(tmp_path), "reportlab", "<html2>").version != (
+            base.version
+        )
+        assert ReceiptPdfCache(str(tmp_path), "xhtml2pdf", "<html>").version != (
+            base.version
+        )
+
+    def test_prerender_in_background(self, app, receipt, renders):
+        """Test pre-rendering writes the PDF off the calling thread."""
+        pdfs = ReceiptPdfCache.current()
+
+        pdfs.prerender(receipt).result(timeout=30)
+
+        assert os.path.exists(pdfs.path(receipt))
+        assert pdfs.prerender(receipt) is None
+        assert renders == [receipt.receipt_number]
+
+    def test_render_range(self, app, receipt, renders):
+        """Test bulk rendering covers the date range and skips cached PDFs."""
+        pdfs = ReceiptPdfCache.current()
+        day = receipt.generated_at.replace(hour=0, minute=0, second=0)
+        before = datetime(2000, 1, 1)
+
+        assert pdfs.render_range(before, before, workers=1) == 0
+        assert pdfs.render_range(day, day.replace(year=day.year + 1), workers=1) == 1
+        assert pdfs.render_range(day, day.replace(year=day.year + 1), workers=1) == 0
+
+
+class TestReceiptDownload:
+    """Test cases for the receipt download route."""
+
+    def test_etag_and_not_modified(self, authenticated_client, app, receipt, renders):
+        """Test downloads carry an ETag and revalidate with 304."""
+        url = f"/payment/receipt/{receipt.id}/download"
+
+        response = authenticated_client.get(url)
+        etag = response.headers["ETag"]
+        response.close()
+        again = authenticated_client.get(url, headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.mimetype == "application/pdf"
+        assert "private" in response.headers["Cache-Control"]
+        assert again.status_code == 304
+        assert again.headers["ETag"] == etag
+        assert renders == [receipt.receipt_number]
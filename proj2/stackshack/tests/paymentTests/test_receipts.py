@@ -0,0 +1,101 @@
+"""
+Tests for structured receipts rendered on demand.
+"""
+
+from decimal import Decimal
+
+from controllers.payment_controller import PaymentController
+from database.db import db
+from models.payment import Receipt
+from services.receipt_service import ReceiptCache, ReceiptService
+from tests.query_counter import capture_queries
+
+
+class TestReceiptService:
+    """Test cases for ReceiptService."""
+
+    def test_receipt_stores_structured_data(self, app, paid_order):
+        """Test a new receipt has data grouped by burger and no HTML."""
+        order, transaction = paid_order
+
+        receipt = PaymentController._generate_receipt(transaction, order)
+
+        assert receipt.receipt_html is None
+        data = receipt.receipt_data
+        assert [burger["title"] for burger in data["burgers"]] == [
+            "Custom Burger #1",
+            "Classic",
+        ]
+        assert data["burgers"][0]["lines"] == [
+            ["Bun", 2, "3.00"],
+            ["Patty <Double>", 1, "5.00"],
+        ]
+        assert data["burgers"][0]["total"] == "8.00"
+        assert (data["subtotal"], data["total"]) == ("13.50", "13.50")
+
+    def test_render_is_cached_by_receipt_number(self, app, paid_order):
+        """Test rendering escapes item names and is served from the cache."""
+        order, transaction = paid_order
+        db.session.add(PaymentController._generate_receipt(transaction, order))
+        db.session.commit()
+        receipt = Receipt.query.one()
+
+        html = ReceiptService.render(receipt)
+        statements, again = capture_queries(lambda: ReceiptService.render(receipt))
+
+        assert "Patty &lt;Double&gt;" in html
+        assert "Classic Total:" in html
+        assert "Mar 11, 2024 12:30 PM" in html
+        assert "$13.50" in html
+        assert again is html
+        assert statements == []
+
+    def test_legacy_receipt_html_is_deferred(self, app, test_user, paid_order):
+        """Test HTML-only receipts still render but are not loaded by queries."""
+        order, transaction = paid_order
+        db.session.add(
+            Receipt(
+                transaction_id=transaction.id,
+                receipt_number="RCPTLEGACY",
+                order_id=order.id,
+                user_id=test_user,
+                total_amount=Decimal("13.50"),
+                payment_method="card",
+                receipt_html="<html>legacy</html>",
+            )
+        )
+        db.session.commit()
+        db.session.expunge_all()
+
+        statements, receipt = capture_queries(lambda: Receipt.query.one())
+        assert "receipt_html" not in statements[0]
+        assert ReceiptService.render(receipt) == "<html>legacy</html>"
+
+    def test_cache_evicts_least_recently_used(self):
+        """Test the cache keeps only the most recently used receipts."""
+        cache = ReceiptCache(size=2)
+        cache.put("A", "a")
+        cache.put("B", "b")
+        cache.get("A")
+        cache.put("C", "c")
+
+        assert cache.get("B") is None
+        assert (cache.get("A"), cache.get("C")) == ("a", "c")
+
+
+class TestReceiptRoutes:
+    """Test cases for the receipt pages."""
+
+    def test_view_receipt_by_order(self, authenticated_client, app, paid_order):
+        """Test the receipt page is rendered from the stored data."""
+        with app.app_context():
+            order, transaction = paid_order
+            db.session.add(PaymentController._generate_receipt(transaction, order))
+            db.session.commit()
+            order_id = order.id
+
+        response = authenticated_client.get(f"/payment/receipt/order/{order_id}")
+
+        assert response.status_code == 200
+        assert b"TOTAL PAID:" in response.data
+        assert b"Custom Burger #1" in response.data
@@ -0,0 +1,146 @@
+"""
+Tests for keyset-paginated order history.
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from controllers.order_controller import OrderController
+from database.db import db
+from models.order import Order, OrderItem
+from services.order_history_service import OrderHistoryService, group_burgers
+from tests.query_counter import count_queries
+
+START = datetime(2024, 3, 11, 12, 0)
+
+
+def _seed_orders(user_id, count, items_per_order=3):
+    """Orders one minute apart, with pairs sharing a timestamp to test ties"""
+    for n in range(count):
+        order = Order(
+            user_id=user_id,
+            total_price=Decimal("5.00"),
+            status="Paid",
+            ordered_at=START + timedelta(minutes=n // 2),
+        )
+        db.session.add(order)
+        db.session.flush()
+        for position in range(items_per_order):
+            db.session.add(
+                OrderItem(
+                    order_id=order.id,
+                    name=f"Item {position}",
+                    price=Decimal("1.00"),
+                    quantity=1,
+                    burger_index=position % 2 + 1,
+                )
+            )
+    db.session.commit()
+
+
+class TestOrderHistoryService:
+    """Test cases for OrderHistoryService."""
+
+    def test_page_costs_two_queries(self, app, test_user):
+        """Test a full page loads orders and items in two queries."""
+        with app.app_context():
+            _seed_orders(test_user, 60)
+            db.session.expunge_all()
+
+            count, page = count_queries(
+                lambda: OrderHistoryService.page(
+                    Order.query.filter_by(user_id=test_user)
+                )
+            )
+
+            assert count == 2
+            assert len(page.orders) == 25
+            assert page.next_cursor is not None
+            assert all(len(page.burgers[order.id]) == 2 for order in page.orders)
+
+    def test_cursor_walks_every_order_once(self, app, test_user):
+        """Test following cursors visits each order once, newest first."""
+        with app.app_context():
+            _seed_orders(test_user, 60)
+            query = Order.query.filter_by(user_id=test_user)
+
+            seen = []
+            cursor = None
+            while True:
+                page = OrderHistoryService.page(query, cursor, limit=7)
+                seen.extend(page.orders)
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+
+            assert len({order.id for order in seen}) == len(seen) == 60
+            keys = [(order.ordered_at, order.id) for order in seen]
+            assert keys == sorted(keys, reverse=True)
+
+    def test_invalid_cursor(self, app, test_user):
+        """Test a malformed cursor is reported, not raised."""
+        with app.app_context():
+            success, message, page = OrderController.get_user_order_page(
+                test_user, "not-a-cursor"
+            )
+
+            assert success is False
+            assert message == "Invalid page cursor."
+            assert page is None
+            with pytest.raises(ValueError):
+                OrderHistoryService.page(Order.query, "2024-03-11_x")
+
+    def test_group_burgers_titles(self):
+        """Test unnamed burgers are numbered and named ones keep their name."""
+        items = [
+            OrderItem(name="Bun", burger_index=2),
+            OrderItem(name="Patty", burger_index=1, burger_name="Classic"),
+            OrderItem(name="Cheese", burger_index=3),
+            OrderItem(name="Fries", burger_index=None),
+        ]
+
+        groups = group_burgers(items)
+
+        assert [group.burger_index for group in groups] == [0, 1, 2, 3]
+        assert [group.title for group in groups] == [
+            "Custom Burger #1",
+            "Classic",
+            "Custom Burger #2",
+            "Custom Burger #3",
+        ]
+
+
+class TestOrderHistoryRoutes:
+    """Test cases for the paginated history pages."""
+
+    def test_history_json_pages(self, authenticated_client, app, test_user):
+        """Test infinite scroll JSON returns rendered rows and a cursor."""
+        with app.app_context():
+            _seed_orders(test_user, 30)
+
+        response = authenticated_client.get("/orders/history")
+        assert response.status_code == 200
+        assert b"Load older orders" in response.data
+
+        response = authenticated_client.get("/orders/history?format=json")
+        data = response.get_json()
+        assert data["success"] is True
+        assert len(data["orders"]) == 25
+        assert data["orders"][0]["burgers"][0]["title"] == "Custom Burger #1"
+
+        response = authenticated_client.get(
+            f"/orders/history?format=json&before={data['next_cursor']}"
+        )
+        data = response.get_json()
+        assert len(data["orders"]) == 5
+        assert data["next_cursor"] is None
+        assert data["html"].count("<tr>") == 5
+
+    def test_history_json_bad_cursor(self, authenticated_client):
+        """Test a bad cursor is a 400 for infinite scroll."""
+        response = authenticated_client.get("/orders/history?format=json&before=x")
+
+        assert response.status_code == 400
+        assert response.get_json()["success"] is False
@@ -0,0 +1,224 @@
+"""
+Tests for atomic stock reservation at checkout.
+"""
+
+import threading
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from config import TestingConfig, config
+from controllers.order_controller import CartLine, OrderController
+from database.db import db
+from models.menu_item import MenuItem
+from models.order import Order, OrderItem
+from models.user import User
+from services.stock_service import StockService
+from tests.query_counter import count_queries
+
+CHECKOUTS = 50
+STOCK = 20
+
+
+def _menu_item(name, stock, price="2.00"):
+    item = MenuItem(
+        name=name,
+        category="patty",
+        price=price,
+        stock_quantity=stock,
+        is_available=True,
+    )
+    db.session.add(item)
+    db.session.commit()
+    return item.id
+
+
+class TestStockService:
+    """Test cases for StockService.reserve."""
+
+    def test_reserve_decrements_and_marks_sold_out(self, app):
+        """Test stock is decremented and sold-out items are hidden."""
+        with app.app_context():
+            beef = _menu_item("Beef", 5)
+            bun = _menu_item("Bun", 2)
+
+            menu_items, failures, sold_out = StockService.reserve({beef: 3, bun: 2})
+            db.session.commit()
+
+            assert failures == []
+            assert sold_out == [bun]
+            assert set(menu_items) == {beef, bun}
+            assert db.session.get(MenuItem, beef).stock_quantity == 2
+            assert db.session.get(MenuItem, bun).is_available is False
+
+    def test_reserve_reports_every_failure(self, app):
+        """Test all short and unknown items are reported and nothing changes."""
+        with app.app_context():
+            beef = _menu_item("Beef", 1)
+            bun = _menu_item("Bun", 10)
+            cheese = _menu_item("Cheese", 0)
+
+            _menu_items, failures, _sold_out = StockService.reserve(
+                {beef: 2, bun: 1, cheese: 1, 9999: 1}
+            )
+            db.session.rollback()
+
+            assert [f["item_id"] for f in failures] == [beef, cheese, 9999]
+            assert failures[0] == {
+                "item_id": beef,
+                "name": "Beef",
+                "available": 1,
+                "requested": 2,
+            }
+            message = StockService.describe(failures)
+            assert "Not enough stock for Beef. Available: 1, requested: 2." in message
+            assert "Menu item 9999 not found." in message
+            assert db.session.get(MenuItem, bun).stock_quantity == 10
+
+    def test_order_aggregates_repeated_items(self, app, test_user):
+        """Test an item used in two burgers is checked against its total."""
+        with app.app_context():
+            beef = _menu_item("Beef", 3)
+            item_data = [(beef, 0, 2, "Beef", 1), (beef, 0, 2, "Beef", 2)]
+
+            success, message, _order = OrderController.create_new_order(
+                test_user, item_data
+            )
+
+            assert success is False
+            assert "Available: 3, requested: 4" in message
+            assert db.session.get(MenuItem, beef).stock_quantity == 3
+            assert Order.query.count() == 0
+
+
+class TestCheckout:
+    """Test cases for the cart checkout path."""
+
+    def test_cart_lines_from_session_cart(self):
+        """Test a session cart flattens into numbered, typed lines."""
+        cart = [
+            {"items": [{"item_id": "3", "quantity": "2", "price": 1, "name": "x"}]},
+            {"name": "Classic", "items": [{"item_id": 4, "quantity": 1}]},
+        ]
+
+        assert CartLine.from_cart(cart) == [
+            CartLine(3, 2, 1, None),
+            CartLine(4, 1, 2, "Classic"),
+        ]
+        with pytest.raises(ValueError):
+            CartLine.from_cart([{"items": [{"item_id": "abc", "quantity": 1}]}])
+
+    def test_large_cart_costs_a_few_round_trips(self, app, test_user):
+        """Test 5 burgers of 8 ingredients are written with a fixed few queries."""
+        with app.app_context():
+            item_ids = [_menu_item(f"Item {n}", 100) for n in range(8)]
+            lines = [
+                CartLine(item_id, 1, burger_index, f"Burger {burger_index}")
+                for burger_index in range(1, 6)
+                for item_id in item_ids
+            ]
+
+            count, (success, _message, order) = count_queries(
+                lambda: OrderController.create_new_order(test_user, lines)
+            )
+
+            assert success is True
+            assert count <= 5
+            assert order.items.count() == 40
+            assert float(order.total_price) == 80.0
+            assert float(order.original_total) == 80.0
+            assert {item.burger_index for item in order.items} == {1, 2, 3, 4, 5}
+            assert all(
+                db.session.get(MenuItem, item_id).stock_quantity == 95
+                for item_id in item_ids
+            )
+
+
+@pytest.fixture
+def file_app(tmp_path, monkeypatch, request):
+    """App on a file-backed SQLite database shared by several threads."""
+    stress_config = type(
+        "StressConfig",
+        (TestingConfig,),
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'stress.db'}",
+            "SQLALCHEMY_ENGINE_OPTIONS": {"connect_args": {"timeout": 30}},
+        },
+    )
+    monkeypatch.setitem(config, "stress", stress_config)
+    app = create_app("stress")
+    app.config["STRESS_MODE"] = request.param
+
+    with app.app_context():
+        if request.param == "immediate":
+            # Take the write lock when the transaction starts, the closest
+            # SQLite gets to SELECT ... FOR UPDATE
+            @event.listens_for(db.engine, "connect")
+            def _connect(dbapi_connection, connection_record):
+                dbapi_connection.isolation_level = None
+
+            @event.listens_for(db.engine, "begin")
+            def _begin(connection):
+                connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.mark.parametrize("file_app", ["deferred", "immediate"], indirect=True)
+def test_parallel_checkouts_never_oversell(file_app):
+    """Test 50 parallel checkouts of a 20-unit item sell at most 20 units."""
+    with file_app.app_context():
+        user = User(username="stress")
+        user.set_password("stress")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        bun = _menu_item("Bun", STOCK * 10)
+        patty = _menu_item("Patty", STOCK)
+
+    barrier = threading.Barrier(CHECKOUTS)
+    results = []
+
+    def checkout(position):
+        # Half the threads list the items in the opposite order
+        item_data = [(bun, 0, 1, "Bun", 1), (patty, 0, 1, "Patty", 1)]
+        if position % 2:
+            item_data.reverse()
+        with file_app.app_context():
+            barrier.wait()
+            success, message, _order = OrderController.create_new_order(
+                user_id, item_data
+            )
+            results.append((success, message))
+            db.session.remove()
+
+    threads = [threading.Thread(target=checkout, args=(i,)) for i in range(CHECKOUTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with file_app.app_context():
+        sold = (
+            db.session.query(db.func.sum(OrderItem.quantity))
+            .filter(OrderItem.menu_item_id == patty)
+            .scalar()
+            or 0
+        )
+        remaining = db.session.get(MenuItem, patty).stock_quantity
+        succeeded = sum(1 for success, _message in results if success)
+
+        assert len(results) == CHECKOUTS
+        assert remaining >= 0
+        assert sold == succeeded <= STOCK
+        assert sold + remaining == STOCK
+        assert db.session.get(MenuItem, bun).stock_quantity == STOCK * 10 - sold
+        if file_app.config["STRESS_MODE"] == "immediate":
+            # Writers are serialized, so every unit sells and no more
+            assert succeeded == STOCK
+            assert db.session.get(MenuItem, patty).is_available is False
@@ -0,0 +1,38 @@
+"""
+Helpers for tests that check how many SQL statements a call sends.
+"""
+
+from sqlalchemy import event
+
+from database.db import db
+
+
+def capture_queries(func):
+    """
+    Run func and record the SQL statements it sends to the database.
+
+    Returns:
+        tuple: (list of statements, func's return value)
+    """
+    statements = []
+
+    def before(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before)
+    try:
+        result = func()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before)
+    return statements, result
+
+
+def count_queries(func):
+    """
+    Run func and count the SQL statements it sends to the database.
+
+    Returns:
+        tuple: (number of statements, func's return value)
+    """
+    statements, result = capture_queries(func)
+    return len(statements), result
@@ -0,0 +1,203 @@
+"""
+Test cases for the set-based badge engine.
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from database.db import db
+from models.gamification import Badge, PointsTransaction, UserBadge
+from models.menu_item import MenuItem
+from models.order import Order, OrderItem
+from models.user import User
+from services.badge_engine import BadgeEngine
+from services.leaderboard_service import LeaderboardService
+from services.user_stats_service import UserStatsService
+from services.gamification_service import GamificationService
+from tests.query_counter import count_queries
+
+
+def _place_order(user_id, items, ordered_at=None, burger_name=None):
+    """Create an order containing the given MenuItems."""
+    order = Order(
+        user_id=user_id,
+        total_price=Decimal("10.00"),
+        status="Paid",
+        ordered_at=ordered_at or datetime.utcnow(),
+    )
+    db.session.add(order)
+    db.session.flush()
+    for item in items:
+        db.session.add(
+            OrderItem(
+                order_id=order.id,
+                menu_item_id=item.id,
+                name=item.name,
+                price=item.price,
+                quantity=1,
+                burger_index=1,
+                burger_name=burger_name,
+            )
+        )
+    db.session.commit()
+    return order
+
+
+class TestLocalHour:
+    """Test cases for UTC bucket to local hour conversion."""
+
+    def test_winter_offset(self):
+        """Test EST is UTC-5."""
+        assert UserStatsService.local_hour(date(2024, 1, 15), 17) == 12
+
+    def test_summer_offset(self):
+        """Test EDT is UTC-4."""
+        assert UserStatsService.local_hour(date(2024, 7, 15), 16) == 12
+
+    def test_sqlite_string_day(self):
+        """Test SQLite date strings are accepted."""
+        assert UserStatsService.local_hour("2024-01-15", "17") == 12
+
+
+class TestLoadHistory:
+    """Test cases for aggregated history loading."""
+
+    def test_empty_history(self, app, test_user):
+        """Test a user with no orders."""
+        with app.app_context():
+            history = BadgeEngine.load_history(test_user)
+            assert history["order_count"] == 0
+            assert history["sauces_tried"] == set()
+            assert history["burger_counts"] == {}
+
+    def test_hour_buckets(self, app, test_user, sample_menu_items):
+        """Test orders are bucketed by local hour."""
+        with app.app_context():
+            bun = db.session.get(MenuItem, sample_menu_items[0])
+            # 17:30 UTC in January is 12:30 EST (lunch)
+            for day in range(3):
+                _place_order(test_user, [bun], datetime(2024, 1, 10 + day, 17, 30))
+            # 13:00 UTC in January is 08:00 EST (early)
+            _place_order(test_user, [bun], datetime(2024, 1, 20, 13, 0))
+            # 02:00 UTC is 21:00 EST the previous day (late)
+            _place_order(test_user, [bun], datetime(2024, 1, 21, 2, 0))
+
+            history = BadgeEngine.load_history(test_user)
+            assert history["order_count"] == 5
+            assert history["lunch_orders"] == 3
+            assert history["early_orders"] == 1
+            assert history["late_orders"] == 1
+
+    def test_distinct_ingredients_and_burgers(self, app, test_user, sample_menu_items):
+        """Test distinct sauces/patties and repeat burger counts."""
+        with app.app_context():
+            patty = db.session.get(MenuItem, sample_menu_items[1])
+            sauce = db.session.get(MenuItem, sample_menu_items[4])
+            for _ in range(2):
+                _place_order(test_user, [patty, sauce], burger_name="Classic")
+            _place_order(test_user, [patty], burger_name="Surprise Box Burger")
+
+            history = BadgeEngine.load_history(test_user)
+            assert history["sauces_tried"] == {"ketchup"}
+            assert history["patties_tried"] == {"beef patty"}
+            assert history["burger_counts"] == {
+                "Classic": 2,
+                "Surprise Box Burger": 1,
+            }
+            assert history["surprise_orders"] == 1
+            assert history["available_sauces"] == 1
+            assert history["available_patties"] == 1
+
+
+class TestGrantBadges:
+    """Test cases for granting badges through the engine."""
+
+    def test_creates_badge_catalog(self, app, test_user, sample_order):
+        """Test missing badge rows are created once."""
+        with app.app_context():
+            order = db.session.get(Order, sample_order)
+            GamificationService.check_and_grant_badges(test_user, order)
+            assert Badge.query.count() == len(BadgeEngine.BADGE_RULES)
+
+            GamificationService.check_and_grant_badges(test_user, order)
+            assert Badge.query.count() == len(BadgeEngine.BADGE_RULES)
+
+    def test_collectors_awarded_with_points(self, app, test_user, sample_menu_items):
+        """Test sauce and patty collectors are granted with their points."""
+        with app.app_context():
+            patty = db.session.get(MenuItem, sample_menu_items[1])
+            sauce = db.session.get(MenuItem, sample_menu_items[4])
+            order = _place_order(test_user, [patty, sauce])
+
+            with patch.object(
+                LeaderboardService, "record", wraps=LeaderboardService.record
+            ) as record:
+                earned = GamificationService.check_and_grant_badges(test_user, order)
+            recorded = [call.args for call in record.call_args_list]
+            slugs = {badge.slug for badge in earned}
+            assert {"sauce_collector", "carnivore_king"} <= slugs
+
+            points = (
+                db.session.query(db.func.sum(PointsTransaction.points))
+                .filter_by(user_id=test_user, event_type="badge_earned")
+                .scalar()
+            )
+            assert points == 150
+            assert db.session.get(User, test_user).total_points == 150
+            assert recorded == [(test_user, 150)]
+
+    def test_badges_not_granted_twice(self, app, test_user, sample_menu_items):
+        """Test an earned badge is skipped on later orders."""
+        with app.app_context():
+            sauce = db.session.get(MenuItem, sample_menu_items[4])
+            first = _place_order(test_user, [sauce])
+            second = _place_order(test_user, [sauce])
+
+            assert GamificationService.check_and_grant_badges(test_user, first)
+            earned = GamificationService.check_and_grant_badges(test_user, second)
+            assert "sauce_collector" not in {badge.slug for badge in earned}
+            assert UserBadge.query.filter_by(user_id=test_user).count() == 1
+
+    def test_regular_and_classic_lover(self, app, test_user, sample_menu_items):
+        """Test order-count and repeat-burger badges."""
+        with app.app_context():
+            bun = db.session.get(MenuItem, sample_menu_items[0])
+            start = datetime(2024, 3, 1, 15, 0)
+            order = None
+            for i in range(20):
+                order = _place_order(
+                    test_user, [bun], start + timedelta(days=i), burger_name="Classic"
+                )
+
+            earned = GamificationService.check_and_grant_badges(test_user, order)
+            slugs = {badge.slug for badge in earned}
+            assert "stackshack_regular" in slugs
+            assert "classic_lover" in slugs
+            assert "century_club" not in slugs
+
+    def test_unknown_user(self, app, sample_order):
+        """Test no badges for a missing user."""
+        with app.app_context():
+            order = db.session.get(Order, sample_order)
+            assert GamificationService.check_and_grant_badges(9999, order) == []
+
+    def test_query_count_is_flat(self, app, test_user, sample_menu_items):
+        """Test query count does not grow with order history."""
+        with app.app_context():
+            items = [db.session.get(MenuItem, i) for i in sample_menu_items]
+
+            order = None
+            for _ in range(5):
+                order = _place_order(test_user, items)
+            small, _badges = count_queries(
+                lambda: BadgeEngine.grant_badges(test_user, order)
+            )
+
+            for _ in range(45):
+                order = _place_order(test_user, items)
+            large, _badges = count_queries(
+                lambda: BadgeEngine.grant_badges(test_user, order)
+            )
+
+            assert large <= small
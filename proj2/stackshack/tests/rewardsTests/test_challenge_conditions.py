@@ -0,0 +1,142 @@
+"""
+Test cases for compiled challenge conditions.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+
+from database.db import db
+from models.menu_item import MenuItem
+from models.order import Order, OrderItem
+from services.challenge_conditions import (
+    DAILY_PREDICATES,
+    WEEKLY_PREDICATES,
+    daily_met,
+    featurize,
+    weekly_counts,
+)
+from services.challenge_service import ChallengeService
+from tests.query_counter import capture_queries
+
+
+def _order(user_id, item_ids, ordered_at=datetime(2024, 3, 13, 17, 0), total="10"):
+    """Create an order for the given menu item ids (17:00 UTC is 1pm local)."""
+    order = Order(
+        user_id=user_id,
+        total_price=Decimal(total),
+        status="Paid",
+        ordered_at=ordered_at,
+    )
+    db.session.add(order)
+    db.session.flush()
+    for item_id in item_ids:
+        item = db.session.get(MenuItem, item_id)
+        db.session.add(
+            OrderItem(
+                order_id=order.id,
+                menu_item_id=item.id,
+                name=item.name,
+                price=item.price,
+                quantity=1,
+            )
+        )
+    db.session.commit()
+    return order
+
+
+class TestCompiledConditions:
+    """Test cases for the compiled daily and weekly predicates."""
+
+    def test_every_challenge_is_compiled(self):
+        """Test each defined challenge has a predicate."""
+        for definition in ChallengeService.DAILY_CHALLENGES.values():
+            assert definition["condition"] in DAILY_PREDICATES
+        for definition in ChallengeService.WEEKLY_CHALLENGES.values():
+            assert definition["condition"] in WEEKLY_PREDICATES
+
+    def test_featurize(self, app, test_user, sample_menu_items):
+        """Test names, categories, health and local time are collected."""
+        with app.app_context():
+            bun, patty, cheese, lettuce = sample_menu_items[:4]
+            order = _order(test_user, [bun, patty, cheese, lettuce])
+
+            features = featurize(order)
+
+            assert features["names"] == [
+                "classic bun",
+                "beef patty",
+                "cheddar cheese",
+                "lettuce",
+            ]
+            assert features["categories"]["patty"] == {"beef patty"}
+            assert features["healthy_categories"] == {"bun", "topping"}
+            assert features["healthy_count"] == 2
+            assert features["all_healthy"] is False
+            assert features["hour"] == 13
+            assert features["total"] == 10.0
+
+    def test_daily_conditions(self, app, test_user, sample_menu_items):
+        """Test daily predicates against one featurized order."""
+        with app.app_context():
+            bun, patty, cheese, lettuce, ketchup, pickles = sample_menu_items
+            features = featurize(
+                _order(test_user, [bun, patty, cheese, lettuce, pickles])
+            )
+
+            assert daily_met("beef_patty", features)
+            assert daily_met("cheddar_cheese", features)
+            assert daily_met("any_cheese", features)
+            assert daily_met("pickles", features)
+            assert not daily_met("two_cheeses", features)
+            assert not daily_met("keto_bun", features)
+            assert not daily_met("lunch_rush", features)
+            assert not daily_met("three_toppings", features)
+            assert not daily_met("unknown_condition", features)
+
+    def test_time_conditions(self, app, test_user, sample_menu_items):
+        """Test time predicates use the local order time."""
+        with app.app_context():
+            lunch = featurize(
+                _order(test_user, [sample_menu_items[0]], datetime(2024, 3, 13, 16, 30))
+            )
+            late = featurize(
+                _order(test_user, [sample_menu_items[0]], datetime(2024, 3, 14, 1, 0))
+            )
+
+            assert daily_met("lunch_rush", lunch)
+            assert not daily_met("after_8pm", lunch)
+            assert daily_met("after_8pm", late)
+
+    def test_weekly_conditions(self, app, test_user, sample_menu_items):
+        """Test weekly predicates count only qualifying orders."""
+        with app.app_context():
+            bun, patty, cheese, lettuce, ketchup, pickles = sample_menu_items
+            healthy = featurize(_order(test_user, [bun, lettuce, ketchup, pickles]))
+            cheesy = featurize(_order(test_user, [bun, patty, cheese], total="20"))
+
+            assert weekly_counts("all_healthy_three", healthy)
+            assert not weekly_counts("all_healthy_three", cheesy)
+            assert weekly_counts("no_cheese_three", healthy)
+            assert weekly_counts("cheese_every_order", cheesy)
+            assert weekly_counts("premium_week_three", cheesy)
+            assert not weekly_counts("budget_three", cheesy)
+            # Conditions spanning several orders count every order
+            assert weekly_counts("three_orders", healthy)
+            assert weekly_counts("unknown_condition", healthy)
+
+    def test_featurize_uses_preloaded_menu_items(
+        self, app, test_user, sample_menu_items
+    ):
+        """Test no query is issued when the caller passes the menu items."""
+        with app.app_context():
+            order = _order(test_user, sample_menu_items[:2])
+            items = order.items.all()
+            menu_items = {
+                item.id: item
+                for item in MenuItem.query.filter(MenuItem.id.in_(sample_menu_items))
+            }
+            statements, _features = capture_queries(
+                lambda: featurize(order, items, menu_items)
+            )
+
+            assert statements == []
@@ -0,0 +1,189 @@
+"""
+Test cases for counter-based coupon codes and bulk issuance.
+"""
+
+import re
+from datetime import date, timedelta
+
+import pytest
+
+from database.db import db
+from models.gamification import Coupon, CouponCodeCounter, Redemption
+from models.user import User
+from services import coupon_codes
+from services.coupon_codes import CouponCodeCipher, CouponCodes
+from services.gamification_service import GamificationService
+from tests.query_counter import count_queries
+
+CODE = re.compile(r"^SHACK-[A-Z0-9]{6}$")
+
+
+def _users(count, first=0):
+    """Users named promoN.., sharing one password hash, returning their ids"""
+    users = [
+        User(username=f"promo{n}", email=f"promo{n}@example.com")
+        for n in range(first, first + count)
+    ]
+    users[0].set_password("testpassword123")
+    for user in users[1:]:
+        user.password = users[0].password
+    db.session.add_all(users)
+    db.session.commit()
+    return [user.id for user in users]
+
+
+class TestCouponCodeCipher:
+    """Test cases for CouponCodeCipher."""
+
+    def test_round_trip_and_format(self):
+        """Test codes match SHACK-XXXXXX and decode to their number."""
+        cipher = CouponCodeCipher("test-key")
+
+        for number in (0, 1, 2, 12345, coupon_codes.SPACE - 1):
+            code = cipher.encode(number)
+            assert CODE.match(code)
+            assert cipher.decode(code) == number
+            assert cipher.decode(code.lower()) == number
+
+    def test_distinct_and_unordered(self):
+        """Test consecutive numbers give distinct, unrelated codes."""
+        cipher = CouponCodeCipher("test-key")
+
+        codes = [cipher.encode(number) for number in range(20000)]
+
+        assert len(set(codes)) == len(codes)
+        assert codes != sorted(codes)
+        assert cipher.encode(0) != CouponCodeCipher("other-key").encode(0)
+
+    def test_rejects_bad_input(self):
+        """Test numbers outside the space and malformed codes are refused."""
+        cipher = CouponCodeCipher("test-key")
+
+        with pytest.raises(ValueError):
+            cipher.encode(coupon_codes.SPACE)
+        with pytest.raises(ValueError):
+            cipher.encode(-1)
+        for code in ("SHACK-12345", "SHACK-ABC!EF", "PROMO-ABCDEF"):
+            with pytest.raises(ValueError):
+                cipher.decode(code)
+
+
+class TestCouponCodes:
+    """Test cases for CouponCodes."""
+
+    def test_reserve_advances_counter(self, app):
+        """Test blocks never overlap and the counter row is created once."""
+        with app.app_context():
+            first = CouponCodes.reserve(5)
+            second = CouponCodes.reserve(3)
+            db.session.commit()
+
+            assert list(first) == [0, 1, 2, 3, 4]
+            assert list(second) == [5, 6, 7]
+            assert db.session.query(CouponCodeCounter).count() == 1
+
+    def test_cipher_requires_key(self, app):
+        """Test codes are refused rather than issued under a missing key."""
+        with app.app_context():
+            app.config["COUPON_CODE_KEY"] = None
+
+            with pytest.raises(RuntimeError):
+                CouponCodes.generate(1)
+
+    def test_generate_skips_existing_codes(self, app, test_user):
+        """Test a code already issued (e.g. a legacy random code) is skipped."""
+        with app.app_context():
+            clash = CouponCodes.cipher().encode(1)
+            redemption = Redemption(
+                user_id=test_user, reward_type="free_topping", points_cost=100
+            )
+            db.session.add(redemption)
+            db.session.flush()
+            db.session.add(
+                Coupon(
+                    user_id=test_user,
+                    redemption_id=redemption.id,
+                    coupon_code=clash,
+                    reward_type="free_topping",
+                    expiry_date=date.today() + timedelta(days=90),
+                )
+            )
+            db.session.commit()
+
+            codes = CouponCodes.generate(3)
+
+            assert len(set(codes)) == 3
+            assert clash not in codes
+            assert codes[0] == CouponCodes.cipher().encode(0)
+
+    def test_redeem_reward_uses_counter(self, app, test_user):
+        """Test redemptions still get unique, well-formed codes."""
+        with app.app_context():
+            GamificationService.earn_points("purchase", test_user, 500, "Order")
+
+            _ok, _message, first = GamificationService.redeem_reward(
+                "free_topping", test_user
+            )
+            _ok, _message, second = GamificationService.redeem_reward(
+                "free_topping", test_user
+            )
+
+            assert CODE.match(first) and CODE.match(second)
+            assert first != second
+
+
+class TestIssue:
+    """Test cases for bulk promotion coupons."""
+
+    def test_issue_bulk_with_constant_queries(self, app):
+        """Test a promotion's query count does not grow with its size."""
+        with app.app_context():
+            small = _users(3)
+            large = _users(1000, first=3)
+            # The first reservation also creates the counter row
+            CouponCodes.reserve(1)
+            db.session.commit()
+
+            small_count, _codes = count_queries(
+                lambda: CouponCodes.issue(small, "free_topping", "Promotion: spring")
+            )
+            large_count, codes = count_queries(
+                lambda: CouponCodes.issue(large, "free_topping", "Promotion: summer")
+            )
+
+            assert large_count == small_count
+            assert len(set(codes)) == len(large)
+            coupons = db.session.query(Coupon).filter(Coupon.user_id.in_(large)).all()
+            assert len(coupons) == len(large)
+            assert {coupon.coupon_code for coupon in coupons} == set(codes)
+            assert all(coupon.redemption.points_cost == 0 for coupon in coupons[:5])
+
+    def test_issue_links_each_coupon_to_its_user(self, app):
+        """Test repeat recipients get one redemption and coupon per entry."""
+        with app.app_context():
+            first, second = _users(2)
+            expiry = date.today() + timedelta(days=7)
+
+            codes = CouponCodes.issue(
+                [first, second, first], "skip_queue", "Promotion: launch", expiry
+            )
+
+            coupons = {
+                coupon.coupon_code: coupon for coupon in db.session.query(Coupon)
+            }
+            assert [coupons[code].user_id for code in codes] == [first, second, first]
+            assert all(
+                coupon.redemption.user_id == coupon.user_id
+                and coupon.expiry_date == expiry
+                for coupon in coupons.values()
+            )
+            assert len({coupon.redemption_id for coupon in coupons.values()}) == 3
+
+    def test_issue_rejects_unknown_reward(self, app):
+        """Test unknown reward types are refused before anything is written."""
+        with app.app_context():
+            with pytest.raises(ValueError):
+                CouponCodes.issue(_users(1), "free_burger", "Promotion: nope")
+
+            assert db.session.query(Redemption).count() == 0
+            assert CouponCodes.issue([], "free_topping", "Promotion: empty") == []
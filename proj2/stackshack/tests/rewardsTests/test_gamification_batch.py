@@ -0,0 +1,235 @@
+"""
+Test cases for batch gamification processing.
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from database.db import db
+from models.gamification import (
+    DailyBonus,
+    PointsTransaction,
+    UserBadge,
+    UserChallengeProgress,
+    WeeklyChallenge,
+)
+from models.menu_item import MenuItem
+from models.order import Order, OrderItem
+from models.user import User
+from services.gamification_service import GamificationService
+from services.user_stats_service import UserStatsService
+from tests.query_counter import count_queries
+
+TODAY = date(2024, 3, 13)  # A Wednesday
+
+
+def _paid_order(user_id, item_ids, total="10.00", status="Paid"):
+    """Create an order for the given menu item ids and fold it into stats."""
+    order = Order(
+        user_id=user_id,
+        total_price=Decimal(total),
+        original_total=Decimal(total),
+        status=status,
+        ordered_at=datetime(2024, 3, 13, 17, 0),
+    )
+    db.session.add(order)
+    db.session.flush()
+    for item_id in item_ids:
+        item = db.session.get(MenuItem, item_id)
+        db.session.add(
+            OrderItem(
+                order_id=order.id,
+                menu_item_id=item.id,
+                name=item.name,
+                price=item.price,
+                quantity=1,
+            )
+        )
+    if status == "Paid":
+        UserStatsService.record_order(order)
+    db.session.commit()
+    return order.id
+
+
+def _seed_challenges():
+    """Create today's daily bonuses and this week's challenges up front."""
+    week_start = TODAY - timedelta(days=TODAY.weekday())
+    week_end = week_start + timedelta(days=6)
+    db.session.add_all(
+        [
+            DailyBonus(
+                bonus_date=TODAY,
+                description="Beef day",
+                condition="beef_patty",
+                points_reward=40,
+            ),
+            DailyBonus(
+                bonus_date=TODAY,
+                description="Keto day",
+                condition="keto_bun",
+                points_reward=40,
+            ),
+        ]
+        + [
+            WeeklyChallenge(
+                week_start=week_start,
+                week_end=week_end,
+                description=f"Weekly {condition}",
+                condition=condition,
+                points_reward=150,
+            )
+            for condition in (
+                "three_different_buns",
+                "three_healthy_buns",
+                "three_different_patties",
+            )
+        ]
+    )
+    db.session.commit()
+
+
+class TestProcessOrdersBatch:
+    """Test cases for GamificationService.process_orders_batch."""
+
+    def test_awards_points_for_many_users(
+        self, app, test_user, silver_user, sample_menu_items
+    ):
+        """Test purchase points use each user's tier multiplier."""
+        with app.app_context():
+            _seed_challenges()
+            bun = sample_menu_items[0]
+            bronze_order = _paid_order(test_user, [bun])
+            silver_order = _paid_order(silver_user, [bun])
+
+            results = GamificationService.process_orders_batch(
+                [bronze_order, silver_order], today=TODAY
+            )
+
+            assert results[bronze_order]["breakdown"]["purchase"] == 100
+            assert results[silver_order]["breakdown"]["purchase"] == 120
+            assert "badge_earned" not in results[bronze_order]["breakdown"]
+
+    def test_totals_match_ledger(self, app, test_user, sample_menu_items):
+        """Test cached totals equal the ledger after a batch."""
+        with app.app_context():
+            _seed_challenges()
+            order_ids = [
+                _paid_order(test_user, [sample_menu_items[0], sample_menu_items[1]])
+                for _ in range(3)
+            ]
+
+            results = GamificationService.process_orders_batch(order_ids)
+
+            ledger = (
+                db.session.query(db.func.sum(PointsTransaction.points))
+                .filter_by(user_id=test_user)
+                .scalar()
+            )
+            assert db.session.get(User, test_user).total_points == ledger
+            assert sum(r["points"] for r in results.values()) == ledger
+
+    def test_badges_daily_and_weekly(self, app, test_user, sample_menu_items):
+        """Test badges, daily bonuses and weekly progress are written."""
+        with app.app_context():
+            _seed_challenges()
+            bun, patty = sample_menu_items[0], sample_menu_items[1]
+            first = _paid_order(test_user, [bun, patty])
+            second = _paid_order(test_user, [bun, patty])
+            third = _paid_order(test_user, [bun, patty])
+
+            results = GamificationService.process_orders_batch(
+                [first, second, third], today=TODAY
+            )
+
+            # Only patty on the menu: Carnivore King on the first order only
+            assert results[first]["breakdown"]["badge_earned"] == 100
+            assert "badge_earned" not in results[second]["breakdown"]
+            assert UserBadge.query.filter_by(user_id=test_user).count() == 1
+
+            # Beef daily bonus once per day
+            assert results[first]["breakdown"]["daily_bonus"] == 40
+            assert "daily_bonus" not in results[second]["breakdown"]
+
+            # Every weekly challenge completes on the third order
+            assert results[third]["breakdown"]["weekly_challenge"] == 450
+            weekly = UserChallengeProgress.query.filter(
+                UserChallengeProgress.user_id == test_user,
+                UserChallengeProgress.challenge_id.isnot(None),
+            ).all()
+            assert len(weekly) == 3
+            assert all(row.completed and row.progress == 3 for row in weekly)
+
+    def test_tier_follows_running_balance(self, app, test_user, sample_menu_items):
+        """Test a tier upgrade mid-batch raises later orders' multiplier."""
+        with app.app_context():
+            _seed_challenges()
+            db.session.add(
+                PointsTransaction(user_id=test_user, points=450, event_type="bonus")
+            )
+            db.session.commit()
+            bun = sample_menu_items[0]
+            first = _paid_order(test_user, [bun])
+            second = _paid_order(test_user, [bun])
+
+            results = GamificationService.process_orders_batch(
+                [first, second], today=TODAY
+            )
+
+            assert results[first]["breakdown"]["purchase"] == 100
+            assert results[first]["tier"] == "Silver"
+            assert results[second]["breakdown"]["purchase"] == 120
+            assert db.session.get(User, test_user).tier == "Silver"
+
+    def test_skips_unpaid_and_awarded_orders(self, app, test_user, sample_menu_items):
+        """Test a second run awards nothing and unpaid orders are ignored."""
+        with app.app_context():
+            _seed_challenges()
+            paid = _paid_order(test_user, [sample_menu_items[0]])
+            pending = _paid_order(test_user, [sample_menu_items[0]], status="Pending")
+
+            results = GamificationService.process_orders_batch([paid, pending])
+            assert list(results) == [paid]
+
+            assert GamificationService.process_orders_batch([paid, pending]) == {}
+            assert PointsTransaction.query.filter_by(event_type="purchase").count() == 1
+
+    def test_replay_grants_badges_only(self, app, test_user, sample_menu_items):
+        """Test replay evaluates badges for already-awarded orders."""
+        with app.app_context():
+            _seed_challenges()
+            order_id = _paid_order(test_user, [sample_menu_items[1]])
+            GamificationService.process_orders_batch([order_id], today=TODAY)
+
+            # Simulate a badge rule change by forgetting the earned badge
+            UserBadge.query.delete()
+            db.session.commit()
+
+            results = GamificationService.process_orders_batch(
+                [order_id], replay=True, today=TODAY
+            )
+            assert results[order_id]["breakdown"] == {"badge_earned": 100}
+            assert PointsTransaction.query.filter_by(event_type="purchase").count() == 1
+
+    def test_query_count_is_flat(self, app, test_user, silver_user, sample_menu_items):
+        """Test the query count does not grow with the batch size."""
+        with app.app_context():
+            _seed_challenges()
+            GamificationService.process_orders_batch(
+                [_paid_order(test_user, [sample_menu_items[0]])], today=TODAY
+            )
+
+            item_ids = [sample_menu_items[0], sample_menu_items[3]]
+            small = [_paid_order(test_user, item_ids) for _ in range(2)]
+            large = [
+                _paid_order(user_id, item_ids)
+                for user_id in (test_user, silver_user)
+                for _ in range(10)
+            ]
+
+            small_count, _result = count_queries(
+                lambda: GamificationService.process_orders_batch(small, today=TODAY)
+            )
+            large_count, _result = count_queries(
+                lambda: GamificationService.process_orders_batch(large, today=TODAY)
+            )
+            assert large_count <= small_count
@@ -0,0 +1,163 @@
+"""
+Test cases for the post-payment gamification job queue.
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from controllers.payment_controller import PaymentController
+from database.db import db
+from models.gamification import GamificationJob, PointsTransaction
+from models.order import Order
+from services.gamification_worker import GamificationWorker, MAX_ATTEMPTS
+
+
+def _pay(order_id, user_id):
+    """Pay for an order through PaymentController with a mocked gateway."""
+    with patch("controllers.payment_controller.PaymentGatewayService") as gateway:
+        gateway.return_value.process_payment.return_value = {
+            "success": True,
+            "transaction_id": f"TXN-JOB-{order_id}",
+            "payment_method": "wallet",
+            "status": "success",
+            "message": "Payment successful",
+        }
+        return PaymentController.process_payment(
+            {
+                "order_id": order_id,
+                "user_id": user_id,
+                "amount": 10.0,
+                "payment_method": "wallet",
+            }
+        )
+
+
+def _enqueue_paid(order_id):
+    """Mark an order paid and queue it, as payment would."""
+    order = db.session.get(Order, order_id)
+    order.status = "Paid"
+    GamificationWorker.enqueue(order)
+    db.session.commit()
+
+
+def _purchase_points(order_id):
+    return PointsTransaction.query.filter_by(
+        order_id=order_id, event_type="purchase"
+    ).count()
+
+
+class TestGamificationQueue:
+    """Test cases for enqueueing and processing gamification jobs."""
+
+    def test_payment_enqueues_without_awarding(self, app, test_user, sample_order):
+        """Test checkout commits a pending job and awards nothing inline."""
+        with app.test_request_context():
+            success, _message, _transaction = _pay(sample_order, test_user)
+
+            assert success is True
+            job = GamificationJob.query.filter_by(order_id=sample_order).one()
+            assert job.status == "pending"
+            assert _purchase_points(sample_order) == 0
+
+    def test_enqueue_is_idempotent(self, app, sample_order):
+        """Test enqueuing the same order twice keeps one job."""
+        with app.app_context():
+            order = db.session.get(Order, sample_order)
+            first = GamificationWorker.enqueue(order)
+            db.session.commit()
+            second = GamificationWorker.enqueue(order)
+            db.session.commit()
+
+            assert first.id == second.id
+            assert GamificationJob.query.count() == 1
+
+    def test_run_once_awards_points(self, app, test_user, sample_order):
+        """Test the worker awards points and stores the result."""
+        with app.test_request_context():
+            _pay(sample_order, test_user)
+
+            stats = GamificationWorker.run_once()
+            assert stats == {"claimed": 1, "done": 1, "failed": 0}
+
+            job = GamificationJob.query.filter_by(order_id=sample_order).one()
+            assert job.status == "done"
+            assert job.result["breakdown"]["purchase"] == 100
+            assert job.result["points"] >= 100
+            assert _purchase_points(sample_order) == 1
+
+    def test_already_awarded_order_not_paid_twice(self, app, test_user, sample_order):
+        """Test a re-claimed job does not award purchase points again."""
+        with app.app_context():
+            _enqueue_paid(sample_order)
+            GamificationWorker.run_once()
+
+            job = GamificationJob.query.filter_by(order_id=sample_order).one()
+            job.status = "pending"
+            db.session.commit()
+            GamificationWorker.run_once()
+
+            assert _purchase_points(sample_order) == 1
+
+    def test_failed_job_is_retried_then_failed(self, app, sample_order):
+        """Test errors put the job back until MAX_ATTEMPTS is reached."""
+        with app.app_context():
+            GamificationWorker.enqueue(db.session.get(Order, sample_order))
+            db.session.commit()
+
+            with patch(
+                "services.gamification_service.GamificationService."
+                "process_orders_batch",
+                side_effect=RuntimeError("boom"),
+            ):
+                for _ in range(MAX_ATTEMPTS):
+                    GamificationWorker.run_once()
+
+            job = GamificationJob.query.filter_by(order_id=sample_order).one()
+            assert job.status == "failed"
+            assert job.attempts == MAX_ATTEMPTS
+            assert job.last_error == "boom"
+
+    def test_stale_processing_job_is_reclaimed(self, app, sample_order):
+        """Test a job abandoned mid-processing is claimed again."""
+        with app.app_context():
+            GamificationWorker.enqueue(db.session.get(Order, sample_order))
+            db.session.commit()
+            assert len(GamificationWorker.claim_batch()) == 1
+            assert GamificationWorker.claim_batch() == []
+
+            later = datetime.utcnow() + timedelta(hours=1)
+            assert len(GamificationWorker.claim_batch(now=later)) == 1
+
+
+class TestOrderRewardsRoute:
+    """Test cases for polling an order's rewards."""
+
+    def login(self, client):
+        return client.post(
+            "/auth/login",
+            data={"username": "testuser", "password": "testpassword123"},
+            follow_redirects=True,
+        )
+
+    def test_rewards_pending_then_ready(self, client, app, test_user, sample_order):
+        """Test the endpoint reports pending until the worker has run."""
+        with app.app_context():
+            _enqueue_paid(sample_order)
+
+        self.login(client)
+        response = client.get(f"/gamification/api/order/{sample_order}/rewards")
+        assert response.status_code == 200
+        assert response.get_json()["ready"] is False
+
+        with app.app_context():
+            GamificationWorker.run_once()
+
+        data = client.get(f"/gamification/api/order/{sample_order}/rewards").get_json()
+        assert data["ready"] is True
+        assert data["rewards"]["breakdown"]["purchase"] == 100
+
+    def test_rewards_unknown_order(self, client, app, test_user):
+        """Test polling an order with no job returns 404."""
+        self.login(client)
+        response = client.get("/gamification/api/order/9999/rewards")
+        assert response.status_code == 404
@@ -0,0 +1,214 @@
+"""
+Test cases for the incrementally maintained leaderboards.
+"""
+
+from datetime import date, datetime
+
+from database.db import db
+from models.gamification import LeaderboardScore, PointsTransaction
+from models.user import User
+from services.gamification_service import GamificationService
+from services.leaderboard_service import LeaderboardService, period_start
+from tests.query_counter import count_queries
+
+
+def _users(count):
+    """Users named player0..playerN, returning their ids"""
+    users = [
+        User(username=f"player{n}", email=f"player{n}@example.com")
+        for n in range(count)
+    ]
+    for user in users:
+        user.set_password("testpassword123")
+    db.session.add_all(users)
+    db.session.commit()
+    return [user.id for user in users]
+
+
+class TestLeaderboardService:
+    """Test cases for LeaderboardService."""
+
+    def test_period_start(self):
+        """Test each window starts on its UTC day, Monday or 1st."""
+        moment = datetime(2024, 3, 14, 23, 30)  # a Thursday
+
+        assert period_start("daily", moment) == date(2024, 3, 14)
+        assert period_start("weekly", moment) == date(2024, 3, 11)
+        assert period_start("monthly", moment) == date(2024, 3, 1)
+        assert period_start("all_time", moment) == date(1970, 1, 1)
+
+    def test_earn_points_updates_every_window(self, app, test_user):
+        """Test earned points land in all four windows and redemptions don't."""
+        with app.app_context():
+            GamificationService.earn_points("review", test_user, 40)
+            GamificationService.earn_points("review", test_user, 10)
+            GamificationService.earn_points("redeem", test_user, -30)
+
+            scores = LeaderboardScore.query.filter_by(user_id=test_user).all()
+            assert sorted(score.period for score in scores) == [
+                "all_time",
+                "daily",
+                "monthly",
+                "weekly",
+            ]
+            assert {score.points for score in scores} == {50}
+
+    def test_ties_share_a_rank_and_pages(self, app):
+        """Test equal scores share a rank and pages continue the ranking."""
+        with app.app_context():
+            ids = _users(5)
+            for user_id, points in zip(ids, [30, 50, 30, 10, 50]):
+                LeaderboardService.record(user_id, points)
+            db.session.commit()
+
+            first = LeaderboardService.get_leaderboard("weekly", limit=3)
+            second = LeaderboardService.get_leaderboard("weekly", page=2, limit=3)
+
+            assert first["total"] == 5
+            assert [(e["user_id"], e["rank"]) for e in first["leaderboard"]] == [
+                (ids[1], 1),
+                (ids[4], 1),
+                (ids[0], 3),
+            ]
+            assert [(e["user_id"], e["rank"]) for e in second["leaderboard"]] == [
+                (ids[2], 3),
+                (ids[3], 5),
+            ]
+
+    def test_my_rank(self, app, test_user):
+        """Test a user's own rank, and None for users who scored nothing."""
+        with app.app_context():
+            ids = _users(3)
+            for user_id, points in zip(ids, [100, 20, 60]):
+                LeaderboardService.record(user_id, points)
+            db.session.commit()
+
+            board = LeaderboardService.get_leaderboard("daily", user_id=ids[1])
+            nobody = LeaderboardService.get_leaderboard("daily", user_id=test_user)
+
+            assert board["me"] == {"rank": 3, "points": 20}
+            assert nobody["me"] is None
+
+    def test_reads_come_from_the_snapshot(self, app):
+        """Test repeat reads skip the database until points are recorded."""
+        with app.app_context():
+            ids = _users(2)
+            LeaderboardService.record(ids[0], 10)
+            db.session.commit()
+            LeaderboardService.get_leaderboard("all_time")
+
+            count, _board = count_queries(
+                lambda: LeaderboardService.get_leaderboard("all_time", user_id=ids[0])
+            )
+            assert count == 0
+
+            LeaderboardService.record(ids[1], 20)
+            db.session.commit()
+            snapshot = LeaderboardService.snapshot("all_time")
+            snapshot.built_at -= 5  # past MIN_REFRESH
+
+            board = LeaderboardService.get_leaderboard("all_time", user_id=ids[0])
+            assert board["me"] == {"rank": 2, "points": 10}
+
+    def test_record_many_batches(self, app):
+        """Test a batch for many users costs the same few statements."""
+        with app.app_context():
+            ids = _users(20)
+            earned = [(user_id, 5, None) for user_id in ids]
+
+            first, _result = count_queries(
+                lambda: LeaderboardService.record_many(earned)
+            )
+            repeat, _result = count_queries(
+                lambda: LeaderboardService.record_many(earned + earned)
+            )
+
+            # Savepoint, insert missing rows, release, executemany update
+            assert first == repeat == 4
+            assert {
+                score.points
+                for score in LeaderboardScore.query.filter_by(period="daily")
+            } == {15}
+
+    def test_rebuild_matches_incremental(self, app):
+        """Test rebuilding from the ledger gives the same scores."""
+        with app.app_context():
+            ids = _users(2)
+            moments = [datetime(2024, 2, 29, 9), datetime(2024, 3, 4, 9)]
+            for user_id in ids:
+                for moment in moments:
+                    db.session.add(
+                        PointsTransaction(
+                            user_id=user_id,
+                            points=25,
+                            event_type="review",
+                            created_at=moment,
+                        )
+                    )
+                    LeaderboardService.record(user_id, 25, moment)
+            db.session.commit()
+
+            def scores():
+                return sorted(
+                    (s.user_id, s.period, s.period_start, s.points)
+                    for s in LeaderboardScore.query.all()
+                )
+
+            incremental = scores()
+            LeaderboardService.rebuild()
+            db.session.commit()
+
+            assert scores() == incremental
+            assert len(incremental) == 2 * (2 + 2 + 2 + 1)
+
+    def test_monthly_leaderboard_for_past_month(self, app):
+        """Test get_monthly_leaderboard reads the requested month's window."""
+        with app.app_context():
+            ids = _users(2)
+            LeaderboardService.record(ids[0], 70, datetime(2024, 3, 5))
+            LeaderboardService.record(ids[1], 90, datetime(2024, 4, 5))
+            db.session.commit()
+
+            march = GamificationService.get_monthly_leaderboard(3, 2024)
+
+            assert [(e["username"], e["points"], e["rank"]) for e in march] == [
+                ("player0", 70, 1)
+            ]
+
+
+class TestLeaderboardRoute:
+    """Test cases for /gamification/api/leaderboard."""
+
+    def test_windows_and_me(self, authenticated_client, app, test_user):
+        """Test the endpoint pages a window and includes the user's rank."""
+        with app.app_context():
+            GamificationService.earn_points("review", test_user, 15)
+
+        data = authenticated_client.get(
+            "/gamification/api/leaderboard?window=weekly&limit=10"
+        ).get_json()
+
+        assert data["period"] == "weekly"
+        assert data["total"] == 1
+        assert data["me"] == {"rank": 1, "points": 15}
+        assert data["leaderboard"][0]["username"] == "testuser"
+        assert data["month"] is None
+
+        data = authenticated_client.get(
+            "/gamification/api/leaderboard?month=1&year=2020"
+        ).get_json()
+        assert (data["month"], data["year"], data["leaderboard"]) == (1, 2020, [])
+
+    def test_bad_arguments(self, authenticated_client):
+        """Test unknown windows and out-of-range limits are rejected."""
+        for query in (
+            "window=yearly",
+            "limit=0",
+            "limit=500",
+            "page=0",
+            "month=13&year=2024",
+        ):
+            response = authenticated_client.get(
+                f"/gamification/api/leaderboard?{query}"
+            )
+            assert response.status_code == 400
@@ -0,0 +1,124 @@
+"""
+Test cases for checkpointed points balances and bulk reconciliation.
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from database.db import db
+from models.gamification import PointsCheckpoint, PointsTransaction
+from models.user import User
+from services.gamification_service import GamificationService
+from services.points_ledger_service import PointsLedgerService
+
+
+def _ledger(user_id, points_list, created_at=None):
+    """Write one ledger row per entry in points_list."""
+    created_at = created_at or datetime.utcnow() - timedelta(hours=1)
+    for points in points_list:
+        db.session.add(
+            PointsTransaction(
+                user_id=user_id,
+                points=points,
+                event_type="order",
+                created_at=created_at,
+            )
+        )
+    db.session.commit()
+
+
+class TestPointsLedgerService:
+    """Test cases for PointsLedgerService."""
+
+    def test_balance_without_checkpoint(self, app, test_user):
+        """Test balance sums the whole ledger when no checkpoint exists."""
+        with app.app_context():
+            _ledger(test_user, [100, 50, -30])
+            assert PointsLedgerService.get_balance(test_user) == 120
+
+    def test_balance_uses_checkpoint_and_tail(self, app, test_user):
+        """Test balance is checkpoint plus rows after it."""
+        with app.app_context():
+            _ledger(test_user, [100, 50])
+            checkpoint = PointsLedgerService.write_checkpoint(test_user)
+            db.session.commit()
+            assert checkpoint.balance == 150
+
+            _ledger(test_user, [25])
+            assert PointsLedgerService.get_balance(test_user) == 175
+
+    def test_checkpoint_written_after_interval(self, app, test_user):
+        """Test a long tail causes a new checkpoint on read."""
+        with app.app_context():
+            with patch("services.points_ledger_service.CHECKPOINT_INTERVAL", 3):
+                _ledger(test_user, [10, 10, 10, 10])
+                assert PointsLedgerService.get_balance(test_user) == 40
+
+            checkpoint = PointsLedgerService.latest_checkpoint(test_user)
+            assert checkpoint is not None
+            assert checkpoint.balance == 40
+
+    def test_checkpoint_skips_recent_rows(self, app, test_user):
+        """Test rows inside the grace window are left in the tail."""
+        with app.app_context():
+            _ledger(test_user, [100])
+            _ledger(test_user, [5], created_at=datetime.utcnow())
+
+            checkpoint = PointsLedgerService.write_checkpoint(test_user)
+            db.session.commit()
+            assert checkpoint.balance == 100
+            assert PointsLedgerService.get_balance(test_user) == 105
+
+    def test_checkpoint_nothing_settled(self, app, test_user):
+        """Test no checkpoint is written for an empty ledger."""
+        with app.app_context():
+            assert PointsLedgerService.write_checkpoint(test_user) is None
+            assert PointsCheckpoint.query.count() == 0
+
+    def test_verify_balances_fixes_drift(self, app, test_user, silver_user):
+        """Test bulk verify corrects cached totals for every user."""
+        with app.app_context():
+            _ledger(test_user, [100, 20])
+            _ledger(silver_user, [300])
+            PointsLedgerService.write_checkpoint(silver_user)
+            _ledger(silver_user, [50])
+
+            result = PointsLedgerService.verify_balances()
+            assert result["checked"] == 2
+            assert result["fixed"] is True
+            assert {m["user_id"]: m["ledger"] for m in result["mismatches"]} == {
+                test_user: 120,
+                silver_user: 350,
+            }
+
+            assert db.session.get(User, test_user).total_points == 120
+            assert db.session.get(User, silver_user).total_points == 350
+
+    def test_verify_balances_dry_run(self, app, test_user):
+        """Test verify with fix=False reports without writing."""
+        with app.app_context():
+            _ledger(test_user, [80])
+
+            result = PointsLedgerService.verify_balances(fix=False)
+            assert result["fixed"] is False
+            assert len(result["mismatches"]) == 1
+            assert db.session.get(User, test_user).total_points == 0
+
+    def test_full_audit_matches_checkpointed(self, app, test_user):
+        """Test balances agree with and without checkpoints."""
+        with app.app_context():
+            _ledger(test_user, [10, 20, 30])
+            PointsLedgerService.write_checkpoint(test_user)
+            _ledger(test_user, [40])
+
+            assert PointsLedgerService.ledger_balances() == {test_user: 100}
+            assert PointsLedgerService.ledger_balances(use_checkpoints=False) == {
+                test_user: 100
+            }
+
+    def test_get_user_points_repairs_cache(self, app, test_user):
+        """Test GamificationService.get_user_points syncs total_points."""
+        with app.app_context():
+            _ledger(test_user, [70])
+            assert GamificationService.get_user_points(test_user) == 70
+            assert db.session.get(User, test_user).total_points == 70
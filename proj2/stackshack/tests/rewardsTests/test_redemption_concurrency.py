@@ -0,0 +1,284 @@
+"""
+Tests for race-free point redemption and coupon consumption.
+"""
+
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from config import TestingConfig, config
+from database.db import db
+from models.gamification import Coupon, PointsTransaction, Redemption
+from models.order import Order
+from models.user import User
+from services.coupon_codes import CouponCodes
+from services.gamification_service import GamificationService
+from services.points_ledger_service import PointsLedgerService
+
+REQUESTS = 100
+COST = GamificationService.REWARD_COSTS["free_topping"]
+AFFORDABLE = 10  # redemptions the starting balance pays for
+
+
+def _order(user_id, status="Pending"):
+    order = Order(
+        user_id=user_id,
+        total_price=Decimal("10.00"),
+        original_total=Decimal("10.00"),
+        status=status,
+    )
+    db.session.add(order)
+    db.session.commit()
+    return order.id
+
+
+def _coupon(user_id, code="SHACK-RACE01"):
+    redemption = Redemption(
+        user_id=user_id, reward_type="five_dollar_off", points_cost=0
+    )
+    db.session.add(redemption)
+    db.session.flush()
+    db.session.add(
+        Coupon(
+            user_id=user_id,
+            redemption_id=redemption.id,
+            coupon_code=code,
+            reward_type="five_dollar_off",
+            expiry_date=date.today() + timedelta(days=30),
+        )
+    )
+    db.session.commit()
+    return code
+
+
+class TestCouponClaims:
+    """Test cases for applying and consuming coupons."""
+
+    def test_coupon_applies_to_one_order(self, app, test_user):
+        """Test a coupon applied to a paid order is refused for another."""
+        with app.app_context():
+            code = _coupon(test_user)
+            first = db.session.get(Order, _order(test_user))
+            second = db.session.get(Order, _order(test_user))
+
+            ok, _message, discount, coupon = GamificationService.apply_coupon(
+                code, test_user, first
+            )
+            assert ok and discount == 5.0
+            assert coupon["used_order_id"] == first.id
+            first.status = "Paid"
+            db.session.commit()
+
+            ok, message, _discount, _dict = GamificationService.apply_coupon(
+                code, test_user, second
+            )
+            assert not ok
+            assert message == "This coupon is already applied to another order"
+
+    def test_abandoned_order_releases_coupon(self, app, test_user):
+        """Test a coupon left on an unpaid order moves to the next one."""
+        with app.app_context():
+            code = _coupon(test_user)
+            first_id = _order(test_user)
+            GamificationService.apply_coupon(
+                code, test_user, db.session.get(Order, first_id)
+            )
+            # The route takes the discount off the order's total
+            db.session.get(Order, first_id).total_price = Decimal("5.00")
+            db.session.commit()
+
+            second = db.session.get(Order, _order(test_user))
+            ok, _message, _discount, coupon = GamificationService.apply_coupon(
+                code, test_user, second
+            )
+
+            assert ok
+            assert coupon["used_order_id"] == second.id
+            first = db.session.get(Order, first_id)
+            db.session.refresh(first)
+            assert first.total_price == Decimal("10.00")
+            assert GamificationService.consume_coupon(first) is False
+            assert GamificationService.consume_coupon(second) is True
+
+    def test_cancelled_order_releases_coupon(self, app, test_user):
+        """Test a coupon on a cancelled order can be applied again."""
+        with app.app_context():
+            code = _coupon(test_user)
+            first_id = _order(test_user)
+            GamificationService.apply_coupon(
+                code, test_user, db.session.get(Order, first_id)
+            )
+            db.session.get(Order, first_id).status = "Cancelled"
+            db.session.commit()
+
+            second = db.session.get(Order, _order(test_user))
+            ok, _message, _discount, coupon = GamificationService.apply_coupon(
+                code, test_user, second
+            )
+
+            assert ok
+            assert coupon["used_order_id"] == second.id
+
+    def test_consume_coupon_once(self, app, test_user):
+        """Test a paid order's coupon is marked used exactly once."""
+        with app.app_context():
+            code = _coupon(test_user)
+            order = db.session.get(Order, _order(test_user))
+            GamificationService.apply_coupon(code, test_user, order)
+
+            assert GamificationService.consume_coupon(order) is True
+            assert GamificationService.consume_coupon(order) is False
+            coupon = Coupon.query.filter_by(coupon_code=code).one()
+            assert coupon.is_used is True
+            assert coupon.used_order_id == order.id
+
+    def test_earn_points_adds_to_stale_total(self, app, test_user):
+        """Test points are added in the database, not over a stale value."""
+        with app.app_context():
+            user = db.session.get(User, test_user)
+            assert user.total_points == 0
+            # Another request spends behind this session's back
+            db.session.execute(
+                User.__table__.update()
+                .where(User.__table__.c.id == test_user)
+                .values(total_points=50)
+            )
+
+            GamificationService.earn_points("review", test_user, 10)
+
+            assert db.session.get(User, test_user).total_points == 60
+
+
+@pytest.fixture
+def file_app(tmp_path, monkeypatch, request):
+    """App on a file-backed SQLite database shared by several threads."""
+    stress_config = type(
+        "StressConfig",
+        (TestingConfig,),
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'stress.db'}",
+            "SQLALCHEMY_ENGINE_OPTIONS": {"connect_args": {"timeout": 30}},
+        },
+    )
+    monkeypatch.setitem(config, "stress", stress_config)
+    app = create_app("stress")
+    app.config["STRESS_MODE"] = request.param
+
+    with app.app_context():
+        if request.param == "immediate":
+            # Take the write lock when the transaction starts, the closest
+            # SQLite gets to row locks
+            @event.listens_for(db.engine, "connect")
+            def _connect(dbapi_connection, connection_record):
+                dbapi_connection.isolation_level = None
+
+            @event.listens_for(db.engine, "begin")
+            def _begin(connection):
+                connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+        db.create_all()
+        user = User(username="stress")
+        user.set_password("stress")
+        db.session.add(user)
+        db.session.commit()
+        app.config["STRESS_USER"] = user.id
+        # The counter row exists in any deployment that has issued a coupon
+        CouponCodes.reserve(1)
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+def _in_parallel(app, work):
+    """Run work(position) in REQUESTS threads released together"""
+    barrier = threading.Barrier(REQUESTS)
+    results = []
+
+    def run(position):
+        with app.app_context():
+            barrier.wait()
+            results.append(work(position))
+            db.session.remove()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(REQUESTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+@pytest.mark.parametrize("file_app", ["deferred", "immediate"], indirect=True)
+def test_parallel_redemptions_never_overspend(file_app):
+    """Test 100 parallel redemptions spend no more points than there are."""
+    user_id = file_app.config["STRESS_USER"]
+    with file_app.app_context():
+        GamificationService.earn_points("review", user_id, COST * AFFORDABLE)
+
+    results = _in_parallel(
+        file_app,
+        lambda _position: GamificationService.redeem_reward("free_topping", user_id),
+    )
+
+    with file_app.app_context():
+        succeeded = [code for success, _message, code in results if success]
+        balance = PointsLedgerService.get_balance(user_id)
+        spent = -sum(
+            points
+            for (points,) in db.session.query(PointsTransaction.points).filter_by(
+                user_id=user_id, event_type="redemption"
+            )
+        )
+
+        assert len(results) == REQUESTS
+        assert len(succeeded) == AFFORDABLE
+        assert len(set(succeeded)) == len(succeeded)
+        assert spent == COST * len(succeeded)
+        assert balance == COST * AFFORDABLE - spent == 0
+        assert db.session.get(User, user_id).total_points == balance
+        assert Redemption.query.filter_by(user_id=user_id).count() == AFFORDABLE
+        assert Coupon.query.filter_by(user_id=user_id).count() == AFFORDABLE
+
+
+@pytest.mark.parametrize("file_app", ["deferred", "immediate"], indirect=True)
+def test_parallel_coupon_use_claims_once(file_app):
+    """Test one coupon applied to 100 orders in parallel lands on one."""
+    user_id = file_app.config["STRESS_USER"]
+    with file_app.app_context():
+        code = _coupon(user_id)
+        order_ids = [_order(user_id) for _ in range(REQUESTS)]
+
+    def apply(position):
+        order = db.session.get(Order, order_ids[position])
+        ok, _message, _discount, _dict = GamificationService.apply_coupon(
+            code, user_id, order
+        )
+        return ok, order_ids[position]
+
+    results = _in_parallel(file_app, apply)
+    claimed = [order_id for ok, order_id in results if ok]
+    with file_app.app_context():
+        final_order_id = Coupon.query.filter_by(coupon_code=code).one().used_order_id
+
+    # Any order may take the coupon from an unpaid one, but it ends up on one
+    consumed = _in_parallel(
+        file_app,
+        lambda position: GamificationService.consume_coupon(
+            db.session.get(Order, order_ids[position])
+        ),
+    )
+
+    with file_app.app_context():
+        coupon = Coupon.query.filter_by(coupon_code=code).one()
+
+        assert len(results) == len(consumed) == REQUESTS
+        assert final_order_id in claimed
+        assert coupon.used_order_id == final_order_id
+        assert consumed.count(True) == 1
+        assert coupon.is_used is True
@@ -0,0 +1,173 @@
+"""
+Test cases for the batched, cached rewards snapshot.
+"""
+
+from datetime import date, timedelta
+
+from database.db import db
+from models.gamification import (
+    Badge,
+    Coupon,
+    DailyBonus,
+    Redemption,
+    UserBadge,
+    UserChallengeProgress,
+    WeeklyChallenge,
+)
+from services.challenge_calendar import ChallengeCalendar
+from services.gamification_service import GamificationService
+from services.rewards_snapshot import RewardsSnapshot
+from tests.query_counter import count_queries
+
+
+def _seed_rewards(user_id, count, first=0):
+    """count of each: daily bonuses, weekly challenges, badges and redemptions"""
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())
+    for n in range(first, first + count):
+        bonus = DailyBonus(
+            bonus_date=today, description=f"Bonus {n}", condition=f"daily_{n}"
+        )
+        challenge = WeeklyChallenge(
+            week_start=week_start,
+            week_end=week_start + timedelta(days=6),
+            description=f"Challenge {n}",
+            condition=f"weekly_{n}",
+        )
+        badge = Badge(name=f"Badge {n}", slug=f"badge-{n}", badge_type="special")
+        redemption = Redemption(
+            user_id=user_id, reward_type="free_topping", points_cost=100
+        )
+        db.session.add_all([bonus, challenge, badge, redemption])
+        db.session.flush()
+        db.session.add_all(
+            [
+                UserChallengeProgress(
+                    user_id=user_id,
+                    daily_bonus_id=bonus.id,
+                    progress=1,
+                    target=1,
+                    completed=True,
+                ),
+                UserChallengeProgress(
+                    user_id=user_id, challenge_id=challenge.id, progress=1, target=3
+                ),
+                UserBadge(user_id=user_id, badge_id=badge.id),
+                Coupon(
+                    user_id=user_id,
+                    redemption_id=redemption.id,
+                    coupon_code=f"SHACK-TEST{n:02d}",
+                    reward_type="free_topping",
+                    expiry_date=today + timedelta(days=90),
+                ),
+            ]
+        )
+    db.session.commit()
+
+
+class TestRewardsSnapshot:
+    """Test cases for RewardsSnapshot."""
+
+    def test_query_count_is_flat(self, app, test_user):
+        """Test building costs the same queries for 1 or 10 of everything."""
+        with app.app_context():
+            _seed_rewards(test_user, 1)
+            RewardsSnapshot.build(test_user)  # creates the user's stats row
+            ChallengeCalendar.clear()
+            db.session.expunge_all()
+            small, snapshot = count_queries(lambda: RewardsSnapshot.build(test_user))
+            assert len(snapshot.redemptions) == 1
+
+            _seed_rewards(test_user, 9, first=1)
+            ChallengeCalendar.clear()  # as the scheduler does after generating
+            db.session.expunge_all()
+            large, snapshot = count_queries(lambda: RewardsSnapshot.build(test_user))
+
+            assert large == small
+            assert len(snapshot.daily_bonuses) == 10
+            assert all(entry["completed"] for entry in snapshot.daily_bonuses)
+            assert snapshot.weekly_challenges[0]["progress"]["progress"] == 1
+            assert sum(badge["earned"] for badge in snapshot.badges) == 10
+            assert all(r["coupon"]["is_valid"] for r in snapshot.redemptions)
+
+    def test_cached_until_write(self, app, test_user):
+        """Test the snapshot is reused until a gamification write for the user."""
+        with app.app_context():
+            first = RewardsSnapshot.for_user(test_user)
+
+            count, second = count_queries(lambda: RewardsSnapshot.for_user(test_user))
+            assert count == 0
+            assert second is first
+
+            GamificationService.earn_points("review", test_user, 40)
+            third = RewardsSnapshot.for_user(test_user)
+
+            assert third is not first
+            assert third.points == first.points + 40
+
+    def test_weekly_challenge_defaults(self, app, test_user):
+        """Test challenges without progress report 0 of the default target."""
+        with app.app_context():
+            today = date.today()
+            db.session.add(
+                WeeklyChallenge(
+                    week_start=today,
+                    week_end=today + timedelta(days=6),
+                    description="Try it",
+                    condition="anything",
+                )
+            )
+            db.session.commit()
+
+            challenges = RewardsSnapshot.build(test_user).weekly_challenge_list()
+
+            assert [
+                (c["progress"], c["target"], c["completed"])
+                for c in challenges
+                if c["description"] == "Try it"
+            ] == [(0, 3, False)]
+
+
+class TestRewardsSnapshotRoutes:
+    """Test cases for the routes served from the snapshot."""
+
+    def test_routes_share_the_snapshot(self, authenticated_client, app, test_user):
+        """Test the JSON endpoints read one cached snapshot."""
+        with app.app_context():
+            _seed_rewards(test_user, 2)
+
+        redemptions = authenticated_client.get("/gamification/api/redemptions")
+        badges = authenticated_client.get("/gamification/api/badges/all")
+        mine = authenticated_client.get("/gamification/api/badges")
+
+        assert sorted(
+            r["coupon"]["coupon_code"] for r in redemptions.get_json()["redemptions"]
+        ) == [
+            "SHACK-TEST00",
+            "SHACK-TEST01",
+        ]
+        earned = [b for b in badges.get_json()["badges"] if b["earned"]]
+        assert len(earned) == 2
+        assert all(b["earned_at"] for b in earned)
+        assert [b["badge"]["slug"] for b in mine.get_json()["badges"]] == [
+            "badge-0",
+            "badge-1",
+        ]
+        with app.app_context():
+            assert list(app.extensions["rewards_snapshots"].snapshots) == [test_user]
+
+    def test_redeem_refreshes_history(self, authenticated_client, app, test_user):
+        """Test a redemption shows up in the history straight away."""
+        with app.app_context():
+            GamificationService.earn_points("review", test_user, 200)
+        assert authenticated_client.get("/gamification/api/redemptions").get_json() == {
+            "redemptions": []
+        }
+
+        authenticated_client.post(
+            "/gamification/api/points/redeem", json={"reward_type": "free_topping"}
+        )
+        data = authenticated_client.get("/gamification/api/redemptions").get_json()
+
+        assert [r["reward_type"] for r in data["redemptions"]] == ["free_topping"]
+        assert data["redemptions"][0]["coupon"]["is_used"] is False
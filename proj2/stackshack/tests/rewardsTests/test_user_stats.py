@@ -0,0 +1,182 @@
+"""
+Test cases for incremental per-user behavioral counters.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+from controllers.payment_controller import PaymentController
+from database.db import db
+from models.gamification import UserStats
+from models.menu_item import MenuItem
+from models.order import Order, OrderItem
+from services.badge_engine import BadgeEngine
+from services.user_stats_service import UserStatsService
+
+
+def _order(user_id, items, ordered_at, status="Paid", burger_name=None):
+    """Create an order containing the given MenuItems."""
+    order = Order(
+        user_id=user_id,
+        total_price=Decimal("10.00"),
+        status=status,
+        ordered_at=ordered_at,
+    )
+    db.session.add(order)
+    db.session.flush()
+    for item in items:
+        db.session.add(
+            OrderItem(
+                order_id=order.id,
+                menu_item_id=item.id,
+                name=item.name,
+                price=item.price,
+                quantity=1,
+                burger_name=burger_name,
+            )
+        )
+    db.session.commit()
+    return order
+
+
+class TestUserStatsService:
+    """Test cases for building and updating UserStats."""
+
+    def test_rebuild_skips_unpaid_orders(self, app, test_user, sample_menu_items):
+        """Test pending and cancelled orders are not counted."""
+        with app.app_context():
+            bun = db.session.get(MenuItem, sample_menu_items[0])
+            _order(test_user, [bun], datetime(2024, 1, 10, 17, 0))
+            _order(test_user, [bun], datetime(2024, 1, 11, 17, 0), status="Pending")
+            _order(test_user, [bun], datetime(2024, 1, 12, 17, 0), status="Cancelled")
+            # A skip_queue coupon marks an order Priority before it is paid
+            _order(test_user, [bun], datetime(2024, 1, 13, 17, 0), status="Priority")
+
+            stats = UserStatsService.rebuild(test_user)
+            assert stats.order_count == 1
+            assert stats.lunch_orders == 1
+
+    def test_record_order_is_incremental(self, app, test_user, sample_menu_items):
+        """Test a second paid order updates the existing row."""
+        with app.app_context():
+            patty = db.session.get(MenuItem, sample_menu_items[1])
+            sauce = db.session.get(MenuItem, sample_menu_items[4])
+
+            first = _order(test_user, [patty], datetime(2024, 1, 10, 14, 0))
+            UserStatsService.record_order(first)
+            db.session.commit()
+
+            second = _order(
+                test_user,
+                [patty, sauce],
+                datetime(2024, 1, 11, 2, 0),
+                burger_name="Surprise Box Burger",
+            )
+            UserStatsService.record_order(second)
+            db.session.commit()
+
+            stats = UserStats.query.filter_by(user_id=test_user).one()
+            assert stats.order_count == 2
+            assert stats.early_orders == 1
+            assert stats.late_orders == 1
+            assert stats.surprise_orders == 1
+            assert stats.sauces_tried == ["ketchup"]
+            assert stats.patties_tried == ["beef patty"]
+            assert stats.burger_counts == {"Surprise Box Burger": 1}
+
+    def test_record_order_adds_to_stale_row(self, app, test_user, sample_menu_items):
+        """Test counters are added in the database, not over a stale value."""
+        with app.app_context():
+            bun = db.session.get(MenuItem, sample_menu_items[0])
+            UserStatsService.record_order(
+                _order(test_user, [bun], datetime(2024, 1, 10, 17, 0))
+            )
+            db.session.commit()
+            stats = UserStats.query.filter_by(user_id=test_user).one()
+            assert stats.order_count == 1
+            # Another payment lands behind this session's back
+            db.session.execute(
+                UserStats.__table__.update()
+                .where(UserStats.__table__.c.user_id == test_user)
+                .values(order_count=5, lunch_orders=5, burger_counts={"Classic": 5})
+            )
+
+            UserStatsService.record_order(
+                _order(
+                    test_user,
+                    [bun],
+                    datetime(2024, 1, 11, 17, 0),
+                    burger_name="Classic",
+                )
+            )
+            db.session.commit()
+
+            stats = UserStats.query.filter_by(user_id=test_user).one()
+            assert stats.order_count == 6
+            assert stats.lunch_orders == 6
+            assert stats.burger_counts == {"Classic": 6}
+
+    def test_incremental_matches_rebuild(self, app, test_user, sample_menu_items):
+        """Test incremental counters agree with a full rebuild."""
+        with app.app_context():
+            items = [db.session.get(MenuItem, i) for i in sample_menu_items]
+            for hour in [3, 13, 17, 21, 23]:
+                order = _order(
+                    test_user,
+                    items,
+                    datetime(2024, 2, 1, hour, 0),
+                    burger_name="Classic",
+                )
+                UserStatsService.record_order(order)
+                db.session.commit()
+
+            incremental = UserStats.query.filter_by(user_id=test_user).one().to_dict()
+            rebuilt = UserStatsService.rebuild(test_user).to_dict()
+            incremental.pop("updated_at")
+            rebuilt.pop("updated_at")
+            assert incremental == rebuilt
+
+    def test_badge_progress(self, app, test_user, sample_menu_items):
+        """Test progress is reported for history-based badges only."""
+        with app.app_context():
+            sauce = db.session.get(MenuItem, sample_menu_items[4])
+            _order(test_user, [sauce], datetime(2024, 1, 10, 17, 0))
+
+            progress = {p["slug"]: p for p in BadgeEngine.badge_progress(test_user)}
+            assert "veggie_champion" not in progress
+            assert progress["sauce_collector"]["current"] == 1
+            assert progress["sauce_collector"]["target"] == 1
+            assert progress["stackshack_regular"]["current"] == 1
+            assert progress["stackshack_regular"]["target"] == 20
+
+
+class TestPaymentUpdatesStats:
+    """Test cases for stats updates during payment."""
+
+    def test_successful_payment_records_order(self, app, test_user, sample_order):
+        """Test the paid order lands in UserStats."""
+        with app.test_request_context():
+            with patch(
+                "controllers.payment_controller.PaymentGatewayService"
+            ) as mock_gateway:
+                mock_gateway.return_value.process_payment.return_value = {
+                    "success": True,
+                    "transaction_id": "TXN-STATS-1",
+                    "payment_method": "wallet",
+                    "status": "success",
+                    "message": "Payment successful",
+                }
+                success, _message, _transaction = PaymentController.process_payment(
+                    {
+                        "order_id": sample_order,
+                        "user_id": test_user,
+                        "amount": 10.0,
+                        "payment_method": "wallet",
+                    }
+                )
+
+            assert success is True
+            stats = UserStats.query.filter_by(user_id=test_user).one()
+            assert stats.order_count == 1
+            assert stats.patties_tried == ["beef patty"]
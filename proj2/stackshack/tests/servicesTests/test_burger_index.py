@@ -0,0 +1,95 @@
+"""
+Tests for the predefined burger index.
+"""
+
+from types import SimpleNamespace
+
+from data_burgers import PREDEFINED_BURGERS
+from database.db import db
+from models.menu_item import MenuItem
+from seed_menu import seed_menu_items
+from services.burger_index import BurgerIndex, tag_mask
+from services.burger_recommendations import BurgerRecommendationService
+from services.menu_catalog import MenuCatalog
+from tests.query_counter import count_queries
+
+
+class TestBurgerIndex:
+    """Tests for BurgerIndex."""
+
+    def test_entries_are_resolved(self, app):
+        """Every predefined burger resolves against the seeded menu."""
+        with app.app_context():
+            seed_menu_items()
+            index = BurgerIndex.current()
+
+            assert len(index.by_slug) == len(PREDEFINED_BURGERS)
+            entry = index.by_slug["rainbow_root_burger"]
+            assert entry.missing == ()
+            assert len(entry.ingredient_ids) == 5
+            expected = sum(
+                float(MenuItem.query.filter_by(name=name).first().price)
+                for name in entry.ingredients
+            )
+            assert entry.price == expected
+
+    def test_tag_lookups(self, app):
+        """Exact, superset and overlapping tag lookups use the bitmask."""
+        with app.app_context():
+            seed_menu_items()
+            index = BurgerIndex.current()
+
+            vegan = [
+                b["slug"] for b in PREDEFINED_BURGERS if b["dietary_tags"] == ["vegan"]
+            ]
+            assert [e.slug for e in index.with_tags(["vegan"])] == vegan
+            vegan_gf = index.including(["vegan", "gluten_free"])
+            assert vegan_gf
+            assert all(
+                {"vegan", "gluten_free"} <= set(e.dietary_tags) for e in vegan_gf
+            )
+            assert index.with_tags(["gluten_free", "vegan"]) == index.with_tags(
+                ["vegan", "gluten_free"]
+            )
+            assert tag_mask(["unknown"]) == 0
+            assert {e.slug for e in index.matching_any(["vegan"])} >= set(vegan)
+
+    def test_missing_ingredient(self, app):
+        """Burgers with an ingredient missing from the menu carry no price."""
+        with app.app_context():
+            index = BurgerIndex.current()
+
+            entry = index.by_slug["rainbow_root_burger"]
+            assert entry.price is None
+            assert "beetroot bun" in entry.missing
+
+    def test_rebuilt_with_catalog(self, app):
+        """Stock changes show up once the menu catalog is invalidated."""
+        with app.app_context():
+            seed_menu_items()
+            index = BurgerIndex.current()
+            entry = index.by_slug["rainbow_root_burger"]
+            assert index.out_of_stock(entry) == []
+
+            MenuItem.query.filter_by(name="beetroot bun").first().stock_quantity = 0
+            db.session.commit()
+            MenuCatalog.invalidate()
+
+            rebuilt = BurgerIndex.current()
+            assert rebuilt is not index
+            assert rebuilt.out_of_stock(entry) == ["beetroot bun"]
+
+    def test_recommendations_without_queries(self, app):
+        """Recommendations render from the index once it is built."""
+        with app.app_context():
+            seed_menu_items()
+            BurgerIndex.current()
+
+            count, sections = count_queries(
+                lambda: BurgerRecommendationService.get_recommendations_for_user(
+                    SimpleNamespace()
+                )
+            )
+
+            assert count == 0
+            assert sections[0]["burgers"]
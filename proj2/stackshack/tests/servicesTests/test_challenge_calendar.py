@@ -0,0 +1,164 @@
+"""
+Test cases for the pre-generated challenge calendar.
+"""
+
+from collections import Counter
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from database.db import db
+from models.gamification import DailyBonus, WeeklyChallenge
+from models.user import User
+from services.challenge_calendar import ChallengeCalendar
+from services.challenge_service import ChallengeService
+from tests.query_counter import capture_queries
+
+MONDAY = date(2024, 3, 11)
+
+
+class TestSchedule:
+    """Test cases for ChallengeService.schedule."""
+
+    def test_fills_weeks_ahead_once(self, app):
+        """Test 2 bonuses per day and 3 challenges per week, and re-runs add none."""
+        with app.app_context():
+            statements, created = capture_queries(
+                lambda: ChallengeService.schedule(MONDAY + timedelta(days=2), weeks=3)
+            )
+
+            assert created == (2 * (21 - 2), 3 * 3)
+            assert sum(s.startswith("INSERT") for s in statements) == 2
+            per_day = Counter(day for (day,) in db.session.query(DailyBonus.bonus_date))
+            assert set(per_day.values()) == {2}
+            assert min(per_day) == MONDAY + timedelta(days=2)
+            per_week = Counter(
+                (start, end)
+                for start, end in db.session.query(
+                    WeeklyChallenge.week_start, WeeklyChallenge.week_end
+                )
+            )
+            assert per_week == {
+                (MONDAY + timedelta(weeks=n), MONDAY + timedelta(weeks=n, days=6)): 3
+                for n in range(3)
+            }
+
+            assert ChallengeService.schedule(MONDAY, weeks=3) == (2 * 2, 0)
+            assert ChallengeService.schedule(MONDAY, weeks=3) == (0, 0)
+
+    def test_tops_up_partial_days(self, app):
+        """Test a day with one bonus gets one more, with a different condition."""
+        with app.app_context():
+            db.session.add(
+                DailyBonus(
+                    bonus_date=MONDAY,
+                    description="Go Keto!",
+                    condition="keto_bun",
+                    points_reward=40,
+                )
+            )
+            db.session.commit()
+
+            ChallengeService.generate_daily_challenges(MONDAY)
+
+            conditions = [
+                b.condition for b in DailyBonus.query.filter_by(bonus_date=MONDAY)
+            ]
+            assert len(conditions) == 2
+            assert conditions[0] == "keto_bun" != conditions[1]
+
+    def test_duplicate_conditions_rejected(self, app):
+        """Test the unique key stops the same challenge twice on a day."""
+        with app.app_context():
+            row = {
+                "bonus_date": MONDAY,
+                "description": "Go Keto!",
+                "condition": "keto_bun",
+                "points_reward": 40,
+            }
+            db.session.execute(insert(DailyBonus), [row])
+            with pytest.raises(IntegrityError):
+                db.session.execute(insert(DailyBonus), [row])
+            db.session.rollback()
+
+    def test_losing_a_race_fills_the_rest(self, app):
+        """Test a scheduler beaten to some slots re-reads and fills the gaps."""
+        with app.app_context():
+            missing = ChallengeService._missing
+
+            def beaten(model, *args):
+                rows = missing(model, *args)
+                if model is DailyBonus and not beaten.done:
+                    # Another process commits one of the same rows first
+                    beaten.done = True
+                    db.session.execute(insert(DailyBonus), rows[:1])
+                    db.session.commit()
+                return rows
+
+            beaten.done = False
+            with patch.object(ChallengeService, "_missing", beaten):
+                ChallengeService.schedule(MONDAY, weeks=1)
+
+            per_day = Counter(day for (day,) in db.session.query(DailyBonus.bonus_date))
+            assert per_day == {MONDAY + timedelta(days=n): 2 for n in range(7)}
+
+
+class TestChallengeCalendar:
+    """Test cases for ChallengeCalendar."""
+
+    def test_reads_are_cached(self, app):
+        """Test a day's bonuses and a week's challenges are loaded once."""
+        with app.app_context():
+            ChallengeService.schedule(MONDAY, weeks=1)
+
+            statements, bonuses = capture_queries(
+                lambda: ChallengeCalendar.daily_bonuses(MONDAY)
+            )
+            assert len(statements) == 1
+            assert len(bonuses) == 2
+            assert bonuses[0].to_dict()["bonus_date"] == "2024-03-11"
+
+            ChallengeCalendar.weekly_challenges(MONDAY)
+            statements, challenges = capture_queries(
+                lambda: (
+                    ChallengeCalendar.daily_bonuses(MONDAY),
+                    ChallengeCalendar.weekly_challenges(MONDAY + timedelta(days=4)),
+                )
+            )
+            assert statements == []
+            assert len(challenges[1]) == 3
+
+    def test_unscheduled_day_is_generated(self, app):
+        """Test the first read of a day the scheduler missed generates its week."""
+        with app.app_context():
+            bonuses = ChallengeCalendar.daily_bonuses(MONDAY + timedelta(days=5))
+
+            assert len(bonuses) == 2
+            assert DailyBonus.query.count() == 2 * 2
+            assert WeeklyChallenge.query.count() == 3
+
+    def test_rewards_reads_do_not_generate(self, app, client):
+        """Test rewards reads only select once the calendar is scheduled."""
+        user = User(username="calendar", email="calendar@example.com")
+        user.set_password("testpassword123")
+        db.session.add(user)
+        db.session.commit()
+        ChallengeService.schedule(weeks=1)
+        client.post(
+            "/auth/login",
+            data={"username": "calendar", "password": "testpassword123"},
+        )
+
+        statements, response = capture_queries(
+            lambda: client.get("/gamification/api/daily-bonus")
+        )
+
+        assert len(response.get_json()["bonuses"]) == 2
+        assert not any(
+            s.startswith("INSERT INTO daily_bonuses")
+            or s.startswith("INSERT INTO weekly_challenges")
+            for s in statements
+        )
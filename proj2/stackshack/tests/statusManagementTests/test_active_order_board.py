@@ -0,0 +1,128 @@
+"""
+Tests for the in-memory active order board.
+"""
+
+from controllers.status_controller import StatusController
+from database.db import db
+from models.order import Order
+from services.active_order_board import ActiveOrderBoard
+from tests.query_counter import count_queries
+
+
+class TestActiveOrderBoard:
+    """Test cases for ActiveOrderBoard."""
+
+    def test_seeded_with_one_query(self, app, multiple_orders_various_statuses):
+        """Test only orders in progress are loaded, in a single query."""
+        pending, preparing, ready, delivered = multiple_orders_various_statuses
+
+        count, board = count_queries(ActiveOrderBoard.current)
+        version, orders = board.snapshot()
+
+        assert count == 1
+        assert [order.id for order in orders] == [pending, preparing, ready]
+        assert orders[0].items[0].name == "Burger"
+        assert count_queries(ActiveOrderBoard.current)[0] == 0
+
+    def test_status_changes_update_board(
+        self, app, test_customer_user, multiple_orders_various_statuses
+    ):
+        """Test controller updates move and drop orders and bump the version."""
+        pending, preparing, ready, _delivered = multiple_orders_various_statuses
+        board = ActiveOrderBoard.current()
+        start = board.version
+
+        StatusController.update_order_status(preparing, "Ready for Pickup")
+        StatusController.update_order_status(ready, "Delivered")
+        StatusController.cancel_order(pending, test_customer_user)
+
+        assert board.version == start + 3
+        _version, orders = board.snapshot()
+        assert [(order.id, order.status) for order in orders] == [
+            (preparing, "Ready for Pickup")
+        ]
+
+        delta = board.to_dict(since=start + 1)
+        assert delta["full"] is False
+        assert delta["orders"] == []
+        assert delta["removed"] == [pending, ready]
+        assert board.to_dict(since=board.version)["removed"] == []
+
+    def test_stale_versions_get_full_snapshot(
+        self, app, multiple_orders_various_statuses
+    ):
+        """Test versions from before a seed or from the future get everything."""
+        board = ActiveOrderBoard.current()
+        board.seed()
+
+        assert board.to_dict(since=board.version - 1)["full"] is True
+        assert board.to_dict(since=board.version + 5)["full"] is True
+        assert board.to_dict()["full"] is True
+        assert len(board.to_dict()["orders"]) == 3
+
+    def test_priority_orders_first(self, app, multiple_orders_various_statuses):
+        """Test skip-the-queue orders sort ahead of older ones."""
+        _pending, _preparing, ready, _delivered = multiple_orders_various_statuses
+        board = ActiveOrderBoard.current()
+
+        order = db.session.get(Order, ready)
+        order.status = "Priority"
+        db.session.commit()
+        ActiveOrderBoard.record_order(order)
+
+        assert board.snapshot()[1][0].id == ready
+
+    def test_undated_orders_sort_first(self, app, multiple_orders_various_statuses):
+        """Test an order without ordered_at sorts as the oldest."""
+        pending, preparing, ready, _delivered = multiple_orders_various_statuses
+        db.session.get(Order, ready).ordered_at = None
+        db.session.commit()
+
+        _version, orders = ActiveOrderBoard.current().snapshot()
+
+        assert [order.id for order in orders] == [ready, pending, preparing]
+
+
+class TestBoardRoutes:
+    """Test cases for the board endpoint and manage page."""
+
+    def login(self, client, username, password):
+        return client.post(
+            "/auth/login",
+            data={"username": username, "password": password},
+            follow_redirects=True,
+        )
+
+    def test_board_json_for_staff(
+        self, client, app, test_staff_user, multiple_orders_various_statuses
+    ):
+        """Test staff get the board as JSON and deltas by version."""
+        self.login(client, "staff1", "staffpass123")
+
+        data = client.get("/status/board").get_json()
+        assert data["success"] is True
+        assert data["full"] is True
+        assert len(data["orders"]) == 3
+
+        data = client.get(f"/status/board?since={data['version']}").get_json()
+        assert data["full"] is False
+        assert data["orders"] == []
+
+    def test_board_denied_to_customers(self, client, app, test_customer_user):
+        """Test customers cannot read the board."""
+        self.login(client, "customer1", "password123")
+
+        assert client.get("/status/board").status_code == 403
+
+    def test_manage_page_shows_active_orders(
+        self, client, app, test_staff_user, multiple_orders_various_statuses
+    ):
+        """Test the manage page lists only orders in progress by default."""
+        self.login(client, "staff1", "staffpass123")
+
+        active = client.get("/status/manage").data.decode()
+        everything = client.get("/status/manage?view=all").data.decode()
+
+        assert "Show all orders" in active
+        assert active.count("<tr>") == 1 + 3
+        assert everything.count("<tr>") == 1 + 4
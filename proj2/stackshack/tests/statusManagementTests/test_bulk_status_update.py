@@ -0,0 +1,197 @@
+"""
+Tests for bulk order status updates.
+"""
+
+from decimal import Decimal
+
+from controllers.status_controller import StatusController
+from database.db import db
+from models.order import Order
+from services.active_order_board import ActiveOrderBoard
+from services.order_events import OrderEventHub
+from tests.query_counter import capture_queries
+
+
+def _orders(user_id, status, count):
+    orders = [
+        Order(user_id=user_id, total_price=Decimal("8.00"), status=status)
+        for _ in range(count)
+    ]
+    db.session.add_all(orders)
+    db.session.commit()
+    return [order.id for order in orders]
+
+
+class TestBulkUpdateStatus:
+    """Test cases for StatusController.bulk_update_status."""
+
+    def test_one_update_per_source_status(self, app, test_customer_user):
+        """Test a dozen orders move with one select and one UPDATE per status."""
+        preparing = _orders(test_customer_user, "Preparing", 12)
+        paid = _orders(test_customer_user, "Paid", 2)
+        updates = [(order_id, "Ready for Pickup") for order_id in preparing]
+        updates += [(order_id, "Preparing") for order_id in paid]
+
+        statements, (success, message, results) = capture_queries(
+            lambda: StatusController.bulk_update_status(updates)
+        )
+
+        assert success is True
+        assert message == "Updated 14 of 14 orders."
+        assert all(result["success"] for result in results)
+        assert [s.split()[0] for s in statements].count("UPDATE") == 2
+        assert [s.split()[0] for s in statements].count("SELECT") == 1
+        assert {
+            order.status for order in Order.query.filter(Order.id.in_(preparing))
+        } == {"Ready for Pickup"}
+
+    def test_invalid_transitions_reported_per_order(
+        self, app, pending_order, preparing_order, delivered_order
+    ):
+        """Test invalid or unknown orders fail without blocking valid ones."""
+        success, _message, results = StatusController.bulk_update_status(
+            [
+                (preparing_order, "Ready for Pickup"),
+                (pending_order, "Delivered"),
+                (delivered_order, "Ready for Pickup"),
+                (99999, "Preparing"),
+            ]
+        )
+
+        assert success is True
+        assert [result["success"] for result in results] == [True, False, False, False]
+        assert results[1]["message"] == (
+            "Invalid status transition from Pending to Delivered."
+        )
+        assert results[2]["message"] == "Cannot update a delivered order."
+        assert results[3]["message"] == "Order not found."
+        assert db.session.get(Order, pending_order).status == "Pending"
+
+    def test_concurrent_change_not_overwritten(self, app, preparing_order, monkeypatch):
+        """Test the status guard skips an order changed after it was read."""
+        real_execute = db.session.execute
+
+        def execute(statement, *args, **kwargs):
+            if statement.is_dml:
+                # Another staff member cancels the order in between
+                real_execute(
+                    Order.__table__.update()
+                    .where(Order.id == preparing_order)
+                    .values(status="Cancelled")
+                )
+            return real_execute(statement, *args, **kwargs)
+
+        monkeypatch.setattr(db.session, "execute", execute)
+        _success, message, results = StatusController.bulk_update_status(
+            [(preparing_order, "Ready for Pickup")]
+        )
+        monkeypatch.undo()
+
+        assert message == "Updated 0 of 1 orders."
+        assert results[0]["success"] is False
+        assert results[0]["status"] == "Cancelled"
+        assert db.session.get(Order, preparing_order).status == "Cancelled"
+
+    def test_order_already_at_target_not_reported(
+        self, app, test_customer_user, monkeypatch
+    ):
+        """Test an order someone else moved to the same status is not claimed."""
+        mine, theirs = _orders(test_customer_user, "Preparing", 2)
+        hub = OrderEventHub.current()
+        real_execute = db.session.execute
+
+        def execute(statement, *args, **kwargs):
+            if statement.is_dml:
+                # Another staff member marks one order ready in between
+                real_execute(
+                    Order.__table__.update()
+                    .where(Order.id == theirs)
+                    .values(status="Ready for Pickup")
+                )
+            return real_execute(statement, *args, **kwargs)
+
+        monkeypatch.setattr(db.session, "execute", execute)
+        _success, message, results = StatusController.bulk_update_status(
+            [(mine, "Ready for Pickup"), (theirs, "Ready for Pickup")]
+        )
+        monkeypatch.undo()
+
+        assert message == "Updated 1 of 2 orders."
+        assert results[0]["success"] is True
+        assert results[1]["success"] is False
+        assert results[1]["status"] == "Ready for Pickup"
+        assert results[1]["message"] == "Order was already moved to Ready for Pickup."
+        assert [e["order_id"] for e in hub.buffer] == [mine]
+
+    def test_board_and_events_updated_once(
+        self, app, test_customer_user, multiple_orders_various_statuses
+    ):
+        """Test the board and event hub get the whole batch."""
+        _pending, preparing, ready, _delivered = multiple_orders_various_statuses
+        board = ActiveOrderBoard.current()
+        hub = OrderEventHub.current()
+        start = board.version
+
+        StatusController.bulk_update_status(
+            [(preparing, "Ready for Pickup"), (ready, "Delivered")]
+        )
+
+        assert board.version == start + 2
+        assert ready not in board.orders
+        assert board.orders[preparing].status == "Ready for Pickup"
+        assert [(e["order_id"], e["status"]) for e in hub.buffer] == [
+            (preparing, "Ready for Pickup"),
+            (ready, "Delivered"),
+        ]
+
+
+class TestBulkUpdateRoute:
+    """Test cases for /status/update/bulk."""
+
+    def login(self, client, username, password):
+        return client.post(
+            "/auth/login",
+            data={"username": username, "password": password},
+            follow_redirects=True,
+        )
+
+    def test_staff_bulk_update(
+        self, client, app, test_staff_user, preparing_order, pending_order
+    ):
+        """Test staff get per-order results."""
+        self.login(client, "staff1", "staffpass123")
+
+        response = client.post(
+            "/status/update/bulk",
+            json={
+                "order_ids": [preparing_order, pending_order],
+                "status": "Ready for Pickup",
+            },
+        )
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert [result["success"] for result in data["results"]] == [True, False]
+
+    def test_bulk_update_bad_request(self, client, app, test_staff_user):
+        """Test missing or malformed updates are rejected."""
+        self.login(client, "staff1", "staffpass123")
+
+        assert client.post("/status/update/bulk", json={}).status_code == 400
+        assert (
+            client.post(
+                "/status/update/bulk", json={"updates": [{"order_id": "x"}]}
+            ).status_code
+            == 400
+        )
+
+    def test_customer_denied(self, client, app, test_customer_user, preparing_order):
+        """Test customers cannot bulk update."""
+        self.login(client, "customer1", "password123")
+
+        response = client.post(
+            "/status/update/bulk",
+            json={"order_ids": [preparing_order], "status": "Ready for Pickup"},
+        )
+
+        assert response.status_code == 403
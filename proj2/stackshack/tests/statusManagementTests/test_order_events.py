@@ -0,0 +1,135 @@
+"""
+Tests for the order status event hub and its SSE stream.
+"""
+
+import json
+
+from controllers.status_controller import StatusController
+from services import order_events
+from services.order_events import OrderEventHub
+
+
+def _events(frames):
+    """Decode the order_status events among SSE frames"""
+    return [
+        json.loads(frame.split("data: ", 1)[1])
+        for frame in frames
+        if "event: order_status" in frame
+    ]
+
+
+class TestOrderEventHub:
+    """Test cases for OrderEventHub."""
+
+    def test_customers_only_see_their_orders(self):
+        """Test customer streams are filtered by user and order ids."""
+        hub = OrderEventHub()
+        customer = hub.stream(user_id=1, last_event_id=0, heartbeat=0.01)
+        one_order = hub.stream(user_id=1, order_ids=[11], last_event_id=0)
+        staff = hub.stream(last_event_id=0, heartbeat=0.01)
+        for stream in (customer, one_order, staff):
+            next(stream)  # retry frame; subscribes
+
+        hub.publish(10, 1, "Paid")
+        hub.publish(20, 2, "Paid")
+        hub.publish(11, 1, "Preparing")
+
+        assert [e["order_id"] for e in _events([next(customer), next(customer)])] == [
+            10,
+            11,
+        ]
+        assert _events([next(one_order)])[0]["status"] == "Preparing"
+        assert [e["order_id"] for e in _events([next(staff) for _ in range(3)])] == [
+            10,
+            20,
+            11,
+        ]
+
+    def test_resume_from_last_event_id(self):
+        """Test a reconnecting stream replays only what it missed."""
+        hub = OrderEventHub()
+        for order_id in (1, 2, 3):
+            hub.publish(order_id, 7, "Paid")
+
+        stream = hub.stream(user_id=7, last_event_id=1)
+        frames = [next(stream) for _ in range(3)]
+
+        assert frames[0].startswith("retry:")
+        assert frames[1].startswith("id: 2\n")
+        assert [e["order_id"] for e in _events(frames)] == [2, 3]
+
+    def test_reset_when_buffer_moved_on(self, monkeypatch):
+        """Test a client too far behind is told to start over."""
+        monkeypatch.setattr(order_events, "BUFFER_SIZE", 2)
+        hub = OrderEventHub()
+        for order_id in (1, 2, 3, 4):
+            hub.publish(order_id, 7, "Paid")
+
+        stream = hub.stream(last_event_id=0)
+        frames = [next(stream) for _ in range(4)]
+
+        assert frames[1].startswith("event: reset")
+        assert [e["order_id"] for e in _events(frames)] == [3, 4]
+
+    def test_heartbeat_and_unsubscribe(self):
+        """Test idle streams send heartbeats and unsubscribe on close."""
+        hub = OrderEventHub()
+        stream = hub.stream(heartbeat=0.01)
+        next(stream)
+
+        assert next(stream) == ": heartbeat\n\n"
+        assert len(hub.subscriptions) == 1
+        stream.close()
+        assert hub.subscriptions == set()
+
+    def test_controllers_publish(
+        self, app, test_customer_user, pending_order, preparing_order
+    ):
+        """Test status updates and cancellations are published."""
+        hub = OrderEventHub.current()
+
+        StatusController.update_order_status(preparing_order, "Ready for Pickup")
+        StatusController.cancel_order(pending_order, test_customer_user)
+
+        assert [(e["order_id"], e["status"]) for e in hub.buffer] == [
+            (preparing_order, "Ready for Pickup"),
+            (pending_order, "Cancelled"),
+        ]
+
+
+class TestStreamRoute:
+    """Test cases for /status/stream."""
+
+    def login(self, client, username, password):
+        return client.post(
+            "/auth/login",
+            data={"username": username, "password": password},
+            follow_redirects=True,
+        )
+
+    def test_stream_resumes_for_customer(
+        self, client, app, test_customer_user, pending_order
+    ):
+        """Test the stream replays the customer's events after Last-Event-ID."""
+        self.login(client, "customer1", "password123")
+        hub = OrderEventHub.current()
+        hub.publish(pending_order, test_customer_user, "Paid")
+        hub.publish(999, test_customer_user + 1, "Paid")
+
+        response = client.get(
+            "/status/stream", headers={"Last-Event-ID": "0"}, buffered=False
+        )
+        frames = response.response
+        first, second = next(frames), next(frames)
+        response.close()
+
+        assert response.mimetype == "text/event-stream"
+        assert first.startswith(b"retry:")
+        event = json.loads(second.decode().split("data: ", 1)[1])
+        assert (event["order_id"], event["status"]) == (pending_order, "Paid")
+
+    def test_stream_bad_arguments(self, client, app, test_customer_user):
+        """Test malformed order ids are rejected."""
+        self.login(client, "customer1", "password123")
+
+        assert client.get("/status/stream?orders=abc").status_code == 400